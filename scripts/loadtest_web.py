@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Measure how many record page requests per second the web server can answer.
+
+For each number of gunicorn workers, the server is started the same way that production
+starts it and the given record pages are requested for a while at each concurrency
+level, with the page cache turned off so that every request reaches the database.
+For example:
+
+    DATABASE_URL=postgresql://... scripts/loadtest_web.py --workers 1 2 4 /g/1/c/2 /g/1/u/3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+HOST = "127.0.0.1"
+DESCRIPTION = "Measure how many record page requests per second the web server can answer."
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen[bytes]:
+    return subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--workers",
+            str(workers),
+            "spellbot.web.server:app",
+            "--worker-class",
+            "aiohttp.worker.GunicornWebWorker",
+            "--bind",
+            f"{HOST}:{port}",
+        ],
+        env={**os.environ, "RECORD_CACHE_SIZE": "0"},
+    )
+
+
+async def wait_until_up(base: str, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{base}/"):
+                    return
+            except aiohttp.ClientConnectionError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.25)
+
+
+async def drive(base: str, paths: list[str], concurrency: int, duration_s: float) -> float:
+    """Request `paths` round robin from `concurrency` clients, returning requests/sec."""
+    urls = itertools.cycle(f"{base}{path}" for path in paths)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    completed = 0
+    errors = 0
+
+    async def client(session: aiohttp.ClientSession, deadline: float) -> None:
+        nonlocal completed, errors
+        while time.monotonic() < deadline:
+            async with session.get(next(urls)) as resp:
+                await resp.read()
+                if resp.status == 200:
+                    completed += 1
+                else:
+                    errors += 1
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.monotonic()
+        deadline = start + duration_s
+        await asyncio.gather(*(client(session, deadline) for _ in range(concurrency)))
+        elapsed = time.monotonic() - start
+    if errors:
+        print(f"  {errors} requests failed", file=sys.stderr)  # noqa: T201
+    return completed / elapsed
+
+
+async def run(args: argparse.Namespace) -> None:
+    print(f"{'workers':>8} {'concurrency':>12} {'req/s':>10}")  # noqa: T201
+    for workers in args.workers:
+        server = None if args.url else start_server(workers, args.port)
+        base = args.url or f"http://{HOST}:{args.port}"
+        try:
+            await wait_until_up(base)
+            for concurrency in args.concurrency:
+                rate = await drive(base, args.paths, concurrency, args.duration)
+                print(f"{workers:>8} {concurrency:>12} {rate:>10.1f}")  # noqa: T201
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        if args.url:
+            break
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("paths", nargs="+", help="record pages to request, like /g/1/c/2")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--port", type=int, default=8405)
+    parser.add_argument("--url", help="test an already running server instead")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from __future__ import annotations
 from .admin_action import AdminAction
 from .block_action import BlockAction
 from .leave_action import LeaveAction
-from .lfg_action import LookingForGameAction
+from .lfg_action import LookingForGameAction, OutboxAction
 from .record_action import RecordAction
 from .score_action import ScoreAction
 from .tasks_action import TasksAction
@@ -15,6 +15,7 @@ __all__ = [
     "BlockAction",
     "LeaveAction",
     "LookingForGameAction",
+    "OutboxAction",
     "RecordAction",
     "ScoreAction",
     "TasksAction",
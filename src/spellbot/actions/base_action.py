@@ -5,10 +5,9 @@ from contextlib import asynccontextmanager
 from typing import TYPE_CHECKING, NoReturn, Self, cast
 
 import discord
-from asgiref.sync import sync_to_async
 from ddtrace import tracer
 
-from spellbot.database import DatabaseSession, db_session_manager
+from spellbot.database import DatabaseSession, database_sync_to_async, db_session_manager
 from spellbot.errors import (
     GuildBannedError,
     SpellBotError,
@@ -17,7 +16,9 @@ from spellbot.errors import (
     UserVerifiedError,
 )
 from spellbot.metrics import setup_ignored_errors
+from spellbot.prometheus import INTERACTION_SECONDS
 from spellbot.services import ServicesRegistry
+from spellbot.sql_budget import sql_stats
 from spellbot.utils import user_can_moderate
 
 if TYPE_CHECKING:
@@ -29,7 +30,7 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-@sync_to_async()
+@database_sync_to_async
 def handle_exception(ex: Exception) -> NoReturn:
     if isinstance(ex, SpellBotError):  # pragma: no cover
         raise ex
@@ -103,11 +104,18 @@ class BaseAction:
         interaction: discord.Interaction,
     ) -> AsyncGenerator[Self, None]:
         action = cls(bot, interaction)
-        with tracer.trace(name=f"spellbot.interactions.{cls.__name__}.create") as span:
+        with (
+            tracer.trace(name=f"spellbot.interactions.{cls.__name__}.create") as span,
+            INTERACTION_SECONDS.time(action=cls.__name__),
+            sql_stats() as stats,
+        ):
             setup_ignored_errors(span)
+            span.set_tag("action", cls.__name__)
             async with db_session_manager():
                 try:
                     await action.upsert_request_objects()
                     yield action
                 except Exception as ex:  # pragma: no cover
                     await handle_exception(ex)
+                finally:
+                    stats.report(span)
@@ -4,6 +4,7 @@ import logging
 
 from ddtrace import tracer
 
+from spellbot.locks import seat_key
 from spellbot.operations import (
     safe_fetch_text_channel,
     safe_get_partial_message,
@@ -96,14 +97,16 @@ class LeaveAction(BaseAction):
     @tracer.wrap()
     async def execute(self, origin: bool = False) -> None:
         """Leave a game in the channel or the game clicked on by the user."""
-        if origin:
-            return await self._handle_click()
-        return await self._handle_command()
+        async with self.bot.locks.acquire([seat_key(self.interaction.user.id)]):
+            if origin:
+                return await self._handle_click()
+            return await self._handle_command()
 
     @tracer.wrap()
     async def execute_all(self) -> None:
         """Leave ALL games in ALL channels for this user."""
-        game_ids = await self.services.games.dequeue_players([self.interaction.user.id])
+        async with self.bot.locks.acquire([seat_key(self.interaction.user.id)]):
+            game_ids = await self.services.games.dequeue_players([self.interaction.user.id])
         message_xids = await self.services.games.message_xids(game_ids)
         for message_xid in message_xids:
             data = await self.services.games.select_by_message_xid(message_xid)
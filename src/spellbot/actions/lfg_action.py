@@ -2,18 +2,25 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import TYPE_CHECKING
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import TYPE_CHECKING, NamedTuple
 
 import discord
 from ddtrace import tracer
 
+from spellbot.database import db_session_manager, rollback_session
 from spellbot.enums import GameFormat, GameService
-from spellbot.models import GameStatus
+from spellbot.locks import queue_key, seat_key, user_key
+from spellbot.metrics import add_span_error, setup_ignored_errors
+from spellbot.models import GameStatus, JobKind
 from spellbot.operations import (
+    fan_out,
     safe_add_role,
     safe_channel_reply,
     safe_create_voice_channel,
     safe_ensure_voice_category,
+    safe_fetch_guild,
     safe_fetch_text_channel,
     safe_fetch_user,
     safe_followup_channel,
@@ -23,20 +30,41 @@ from spellbot.operations import (
     safe_update_embed_origin,
     save_create_channel_invite,
 )
+from spellbot.scheduler import background
+from spellbot.services import ServicesRegistry
 from spellbot.settings import settings
+from spellbot.sql_budget import sql_stats
 from spellbot.views import BaseView, PendingGameView, StartedGameView, StartedGameViewWithConfirm
 
-from .base_action import BaseAction
+from .base_action import BaseAction, handle_exception
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Iterable
+
     from discord.message import Message
 
     from spellbot import SpellBot
-    from spellbot.models import GameDict
+    from spellbot.locks import LockKey
+    from spellbot.models import ChannelDict, GameDict, JobDict
 
 logger = logging.getLogger(__name__)
 
 
+class SeatedGame(NamedTuple):
+    game_id: int
+    new: bool
+    origin: bool
+    other_game_ids: list[int]
+
+
+def started_game_view(bot: SpellBot, channel_data: ChannelDict, game: GameDict) -> BaseView | None:
+    if channel_data.get("show_points", False) and not game["confirmed"]:
+        if channel_data.get("require_confirmation", False):
+            return StartedGameViewWithConfirm(bot=bot)
+        return StartedGameView(bot=bot)
+    return None
+
+
 class LookingForGameAction(BaseAction):
     def __init__(self, bot: SpellBot, interaction: discord.Interaction) -> None:
         super().__init__(bot, interaction)
@@ -85,6 +113,42 @@ class LookingForGameAction(BaseAction):
             friend_xids = await self.services.games.filter_pending_games(friend_xids)
         return friend_xids
 
+    @tracer.wrap()
+    async def get_lock_keys(
+        self,
+        friend_xids: list[int],
+        seats: int,
+        format: int,
+        service: int,
+        message_xid: int | None,
+    ) -> list[LockKey]:
+        """Get lock keys for every queue and player that this interaction could touch."""
+        assert self.guild
+        assert self.channel
+
+        keys = [user_key(xid) for xid in (self.interaction.user.id, *friend_xids)]
+
+        if message_xid is not None:
+            # The user clicked on a Join Game button, so only that game's queue matters.
+            if found := await self.services.games.select_by_message_xid(message_xid):
+                keys.append(
+                    queue_key(
+                        found["guild_xid"],
+                        found["channel_xid"],
+                        found["format"],
+                        found["seats"],
+                        found["service"],
+                    ),
+                )
+            return keys
+
+        # Otherwise we may seat the user in this channel or in any of its mirror targets.
+        scopes = [(self.guild.id, self.channel.id)]
+        mirrors = await self.services.mirrors.get(self.guild.id, self.channel.id)
+        scopes.extend((mirror["to_guild_xid"], mirror["to_channel_xid"]) for mirror in mirrors)
+        keys.extend(queue_key(g, c, format, seats, service) for g, c in scopes)
+        return keys
+
     @tracer.wrap()
     async def upsert_game(
         self,
@@ -156,7 +220,7 @@ class LookingForGameAction(BaseAction):
         return False
 
     @tracer.wrap()
-    async def execute(  # noqa: C901
+    async def execute(
         self,
         friends: str | None = None,
         seats: int | None = None,
@@ -170,17 +234,50 @@ class LookingForGameAction(BaseAction):
                 self.interaction.user,
                 "Sorry, that command is not supported in this context.",
             )
-            return None
-
-        # True if user clicked on a Join Game button.
-        # False if user issued a /lfg command in chat.
-        origin = bool(message_xid is not None)
+            return
 
         actual_friends: str = await self.get_friends(friends)
         actual_format: int = await self.get_format(format)
         actual_seats: int = await self.get_seats(actual_format, seats)
         actual_service: int = await self.get_service(service)
 
+        friend_xids = list(map(int, re.findall(r"<@!?(\d+)>", actual_friends)))
+
+        keys = await self.get_lock_keys(
+            friend_xids,
+            actual_seats,
+            actual_format,
+            actual_service,
+            message_xid,
+        )
+        async with self.bot.locks.acquire(keys):
+            seated = await self._execute_locked(
+                friend_xids,
+                actual_seats,
+                actual_format,
+                actual_service,
+                message_xid,
+            )
+        if seated is not None:
+            # Only seating the players needs to happen while holding the locks.
+            await self._handle_seated_game(seated)
+
+    @tracer.wrap()
+    async def _execute_locked(  # noqa: C901
+        self,
+        friend_xids: list[int],
+        seats: int,
+        format: int,
+        service: int,
+        message_xid: int | None,
+    ) -> SeatedGame | None:
+        assert self.guild
+        assert self.channel
+
+        # True if user clicked on a Join Game button.
+        # False if user issued a /lfg command in chat.
+        origin = bool(message_xid is not None)
+
         if await self.services.users.is_waiting(self.channel.id):
             msg = "You're already in a game in this channel."
             if origin:
@@ -203,9 +300,7 @@ class LookingForGameAction(BaseAction):
             await safe_followup_channel(self.interaction, msg)
             return None
 
-        friend_xids = list(map(int, re.findall(r"<@!?(\d+)>", actual_friends)))
-
-        if len(friend_xids) + 1 > actual_seats:
+        if len(friend_xids) + 1 > seats:
             await safe_send_user(
                 self.interaction.user,
                 "You mentioned too many players.",
@@ -214,38 +309,40 @@ class LookingForGameAction(BaseAction):
 
         friend_xids = await self.filter_friend_xids(friend_xids)
 
-        new = await self.upsert_game(
-            friend_xids,
-            actual_seats,
-            actual_format,
-            actual_service,
-            message_xid,
-        )
+        new = await self.upsert_game(friend_xids, seats, format, service, message_xid)
         if new is None:
             return None
 
-        fully_seated = await self.services.games.fully_seated()
-        started_game_id: int | None = None
-        other_game_ids: list[int] = []
-        if fully_seated:
-            other_game_ids = await self.services.games.other_game_ids()
-            game_data = await self.services.games.to_dict()
-            started_game_id = await self.make_game_ready(game_data)
-            await self._handle_voice_creation(self.guild.id)
+        if await self.services.games.fully_seated():
+            player_xids = await self.services.games.player_xids()
+            async with self.bot.locks.acquire(seat_key(xid) for xid in player_xids):
+                # While waiting on the seat locks, some of these players may have left
+                # or been seated in a game elsewhere, so we have to check once more.
+                if await self.services.games.fully_seated():
+                    other_game_ids = await self.services.games.other_game_ids()
+                    game_id = await self.services.games.make_ready(None)
+                    return SeatedGame(game_id, new, origin, other_game_ids)
 
         await self._handle_embed_creation(
             new=new,
             origin=origin,
-            fully_seated=fully_seated,
+            fully_seated=False,
         )
-
-        if fully_seated:
-            assert started_game_id is not None
-            await self._handle_direct_messages()
-            await self._update_other_game_posts(other_game_ids)
-            return None
         return None
 
+    @tracer.wrap()
+    async def _handle_seated_game(self, seated: SeatedGame) -> None:
+        """Carry out the side effects of starting a game that make_ready() put in the outbox."""
+        outbox = OutboxAction(self.bot, self.interaction)
+        await outbox.run_leased(seated.game_id, [JobKind.CREATE_LINK, JobKind.CREATE_VOICE])
+        await self._handle_embed_creation(
+            new=seated.new,
+            origin=seated.origin,
+            fully_seated=True,
+        )
+        await outbox.run_leased(seated.game_id, [JobKind.NOTIFY_PLAYERS])
+        await self._update_other_game_posts(seated.other_game_ids)
+
     @tracer.wrap()
     async def _update_other_game_posts(self, other_game_ids: list[int]) -> None:
         """Update any other pending games to show that some players are no longer available."""
@@ -254,14 +351,18 @@ class LookingForGameAction(BaseAction):
         if not other_game_ids:
             return
 
+        # Render every embed up front, the games service can only look at one game at a time.
+        posts: dict[int, tuple[int, int, discord.Embed]] = {}
         message_xids = await self.services.games.message_xids(other_game_ids)
         for message_xid in message_xids:
             data = await self.services.games.select_by_message_xid(message_xid)
             if not data:
                 continue
+            embed = await self.services.games.to_embed()
+            posts[message_xid] = (data["guild_xid"], data["channel_xid"], embed)
 
-            channel_xid = data["channel_xid"]
-            guild_xid = data["guild_xid"]
+        async def update(message_xid: int) -> None:
+            guild_xid, channel_xid, embed = posts[message_xid]
             if (channel := await safe_fetch_text_channel(self.bot, guild_xid, channel_xid)) and (
                 message := safe_get_partial_message(
                     channel,
@@ -269,13 +370,14 @@ class LookingForGameAction(BaseAction):
                     message_xid,
                 )
             ):
-                embed = await self.services.games.to_embed()
                 await safe_update_embed(
                     message,
                     embed=embed,
                     view=PendingGameView(bot=self.bot),
                 )
 
+        await fan_out(posts, update, bucket=lambda message_xid: posts[message_xid][1])
+
     @tracer.wrap()
     async def add_points(self, message: Message, points: int) -> None:
         found = await self.services.games.select_by_message_xid(message.id)
@@ -390,68 +492,20 @@ class LookingForGameAction(BaseAction):
             return
 
         assert self.interaction.guild_id
-        await self.services.games.upsert(
-            guild_xid=self.interaction.guild_id,
-            channel_xid=self.channel.id,
-            author_xid=found_players[0],
-            friends=found_players[1:],
-            seats=requested_seats,
-            format=game_format.value,
-            service=game_service.value,
-            create_new=True,
-        )
-        game_data = await self.services.games.to_dict()
-        await self.make_game_ready(game_data)
-        await self._handle_voice_creation(self.interaction.guild_id)
-        await self._handle_embed_creation(new=True, origin=False, fully_seated=True)
-        await self._handle_direct_messages()
-
-    @tracer.wrap()
-    async def make_game_ready(self, game: GameDict) -> int:
-        game_link = await self.bot.create_game_link(game)
-        return await self.services.games.make_ready(game_link)
-
-    @tracer.wrap()
-    async def _handle_voice_creation(self, guild_xid: int) -> None:
-        if not await self.services.guilds.should_voice_create():
-            return
-        use_max_bitrate = await self.services.guilds.get_use_max_bitrate()
-
-        category_prefix = self.channel_data["voice_category"]
-        category = await safe_ensure_voice_category(
-            self.bot,
-            guild_xid,
-            category_prefix,
-        )
-        if not category:
-            return
-
-        game_data = await self.services.games.to_dict()
-        game_id = game_data["id"]
-        voice_channel = await safe_create_voice_channel(
-            self.bot,
-            guild_xid,
-            f"Game-SB{game_id}",
-            category=category,
-            use_max_bitrate=use_max_bitrate,
-        )
-        if not voice_channel:
-            return
-
-        should_create_invite = self.channel_data.get("voice_invite", False)
-        invite: discord.Invite | None = None
-        if should_create_invite:
-            invite = await save_create_channel_invite(
-                voice_channel,
-                max_age=2 * 60 * 60,  # 2 hours
-                max_uses=0,  # unlimited uses
-                temporary=True,
-                reason=f"Creating temporary voice channel invite for Game-SB{game_id}",
+        async with self.bot.locks.acquire(seat_key(xid) for xid in found_players):
+            await self.services.games.upsert(
+                guild_xid=self.interaction.guild_id,
+                channel_xid=self.channel.id,
+                author_xid=found_players[0],
+                friends=found_players[1:],
+                seats=requested_seats,
+                format=game_format.value,
+                service=game_service.value,
+                create_new=True,
             )
-
-        await self.services.games.set_voice(
-            voice_xid=voice_channel.id,
-            voice_invite_link=invite.url if invite else None,
+            game_id = await self.services.games.make_ready(None)
+        await self._handle_seated_game(
+            SeatedGame(game_id, new=True, origin=False, other_game_ids=[])
         )
 
     @tracer.wrap()
@@ -481,15 +535,15 @@ class LookingForGameAction(BaseAction):
 
         # also send the game post to all configured mirrors
         mirrors = await self.services.mirrors.get(self.guild.id, self.channel.id)
-        for mirror in mirrors:
-            to_guild_xid = mirror["to_guild_xid"]
-            to_channel_xid = mirror["to_channel_xid"]
+
+        async def mirror(to: tuple[int, int]) -> discord.Message | None:
+            to_guild_xid, to_channel_xid = to
             logger.info("Mirroring game post to %s/%s ...", to_guild_xid, to_channel_xid)
 
             to_channel = await safe_fetch_text_channel(self.bot, to_guild_xid, to_channel_xid)
             if to_channel is None:
                 logger.error("Failed to fetch channel %s", to_channel_xid)
-                continue
+                return None
             logger.info("Mirroring game post to %s ...", to_channel)
 
             to_message = await safe_channel_reply(
@@ -497,12 +551,20 @@ class LookingForGameAction(BaseAction):
             )
             if to_message is None:
                 logger.error("Failed to create post in channel %s", to_channel)
-                continue
+                return None
             logger.info("Mirrored game post to %s", to_message)
-            await self.services.games.add_post(to_guild_xid, to_channel_xid, to_message.id)
+            return to_message
+
+        mirrored = await fan_out(
+            [(mirror["to_guild_xid"], mirror["to_channel_xid"]) for mirror in mirrors],
+            mirror,
+        )
+        for (to_guild_xid, to_channel_xid), to_message in mirrored.results.items():
+            if to_message is not None:
+                await self.services.games.add_post(to_guild_xid, to_channel_xid, to_message.id)
 
     @tracer.wrap()
-    async def _handle_embed_creation(  # noqa: C901,PLR0912
+    async def _handle_embed_creation(
         self,
         new: bool,
         origin: bool,
@@ -518,11 +580,7 @@ class LookingForGameAction(BaseAction):
 
         view: BaseView | None = None
         if fully_seated:
-            if self.channel_data.get("show_points", False) and not game_data["confirmed"]:
-                if self.channel_data.get("require_confirmation", False):
-                    view = StartedGameViewWithConfirm(bot=self.bot)
-                else:
-                    view = StartedGameView(bot=self.bot)
+            view = started_game_view(self.bot, self.channel_data, game_data)
         else:
             view = PendingGameView(bot=self.bot)
 
@@ -531,12 +589,14 @@ class LookingForGameAction(BaseAction):
             return
 
         # update the game post(s) for this game, which should already exist
+        posts = {post["message_xid"]: post for post in game_data.get("posts", [])}
 
-        for post in game_data.get("posts", []):
+        async def update(message_xid: int) -> None:
+            assert self.guild
+            assert self.channel
             message: discord.Message | discord.PartialMessage | None = None
-            guild_xid = post["guild_xid"]
-            channel_xid = post["channel_xid"]
-            message_xid = post["message_xid"]
+            guild_xid = posts[message_xid]["guild_xid"]
+            channel_xid = posts[message_xid]["channel_xid"]
 
             channel: discord.TextChannel | None = None
             if self.guild.id == guild_xid and self.channel.id == channel_xid:
@@ -548,28 +608,30 @@ class LookingForGameAction(BaseAction):
 
             if channel is None:
                 # failed for find the channel for this post
-                continue
+                return
 
             # The post we're going to update here is the origin post:
-            if self.interaction.message and self.interaction.message.id == message_xid:
-                content = self.channel_data.get("extra", None)
-                if await safe_update_embed_origin(
+            if (
+                self.interaction.message
+                and self.interaction.message.id == message_xid
+                and await safe_update_embed_origin(
                     self.interaction,
                     content=content,
                     embed=embed,
                     view=view,
-                ):
-                    # successfully updated the origin post
-                    continue
+                )
+            ):
+                # successfully updated the origin post
+                return
 
             message = safe_get_partial_message(channel, guild_xid, message_xid)
             if not message:
                 # failed to find the message for this post
-                continue
+                return
 
-            if not await safe_update_embed(message, embed=embed, view=view):
-                # failed to update the message for this post
-                continue
+            await safe_update_embed(message, embed=embed, view=view)
+
+        await fan_out(posts, update, bucket=lambda message_xid: posts[message_xid]["channel_xid"])
 
         if not origin:
             await self._reply_found_embed()
@@ -589,62 +651,245 @@ class LookingForGameAction(BaseAction):
         await safe_followup_channel(self.interaction, embed=embed)
 
     @tracer.wrap()
-    async def _handle_direct_messages(self) -> None:
+    async def ensure_users_exist(
+        self,
+        user_xids: list[int],
+        *,
+        exclude_self: bool = True,
+    ) -> list[int]:
+        """
+        Ensure DB users exist for the given list of external IDs.
+
+        When exclude_self is True, don't create a user for IDs matching the author's.
+        """
+        found_users: list[int] = []
+        for user_xid in user_xids:
+            if exclude_self and user_xid == self.interaction.user.id:
+                continue
+            user = await safe_fetch_user(self.bot, user_xid)
+            if not user:
+                continue
+            data = await self.services.users.upsert(user)
+            if data["banned"]:
+                continue
+            found_users.append(user_xid)
+        return found_users
+
+
+class OutboxAction:
+    """
+    Carries out the side effects of starting a game that were recorded in the outbox.
+
+    The action that started the game normally runs these jobs itself right away, while
+    it still holds their lease. Jobs that fail, or whose lease runs out because the bot
+    went away partway through, are picked up again later by the outbox task.
+    """
+
+    # Cleaning up the posts of expired games is left to the expire games task.
+    KINDS = (JobKind.CREATE_LINK, JobKind.CREATE_VOICE, JobKind.NOTIFY_PLAYERS)
+
+    def __init__(self, bot: SpellBot, interaction: discord.Interaction | None = None) -> None:
+        self.bot = bot
+        self.interaction = interaction
+        self.services = ServicesRegistry()
+
+    @classmethod
+    @asynccontextmanager
+    async def create(cls, bot: SpellBot) -> AsyncGenerator[OutboxAction, None]:
+        action = cls(bot)
+        with (
+            tracer.trace(name=f"spellbot.interactions.{cls.__name__}.create") as span,
+            sql_stats() as stats,
+            background(),
+        ):
+            setup_ignored_errors(span)
+            span.set_tag("action", cls.__name__)
+            async with db_session_manager():
+                try:
+                    yield action
+                except Exception as ex:  # pragma: no cover
+                    await handle_exception(ex)
+                finally:
+                    stats.report(span)
+
+    @tracer.wrap()
+    async def run_leased(self, game_id: int, kinds: Iterable[JobKind]) -> None:
+        for job in await self.services.jobs.leased(game_id, kinds):
+            await self.run(job)
+
+    @tracer.wrap()
+    async def run_due(self) -> None:
+        logger.info("starting task run_due_jobs")
+        for job in await self.services.jobs.claim(settings.OUTBOX_BATCH, self.KINDS):
+            logger.info("running job %s, attempt %s", job["key"], job["attempts"])
+            await self.run(job)
+        await self.services.jobs.purge(timedelta(days=1))
+
+    @tracer.wrap()
+    async def run(self, job: JobDict) -> None:
+        handlers = {
+            JobKind.CREATE_LINK: self.create_link,
+            JobKind.CREATE_VOICE: self.create_voice,
+            JobKind.NOTIFY_PLAYERS: self.notify_players,
+        }
+        try:
+            # The game is gone if it was deleted, and the job with it, so there's nothing to do.
+            if game := await self.services.games.select(job["game_id"]):
+                await handlers[JobKind(job["kind"])](game)
+        except Exception as ex:
+            add_span_error(ex)
+            logger.exception("error: exception in outbox job %s", job["key"])
+            await rollback_session()
+            retry = await self.services.jobs.fail(job, f"{ex.__class__.__name__}: {ex}")
+            if retry is None:
+                logger.warning("lost the lease on outbox job %s", job["key"])
+            elif not retry:
+                logger.warning("giving up on outbox job %s", job["key"])
+            return
+        if not await self.services.jobs.finish(job):
+            logger.warning("lost the lease on outbox job %s", job["key"])
+
+    async def _warn(self, message: str) -> None:
+        if self.interaction is not None:
+            await safe_followup_channel(self.interaction, message)
+        else:
+            logger.warning("%s", message)
+
+    async def _fetch_guild(self, guild_xid: int) -> discord.Guild | None:
+        if self.interaction is not None:
+            return self.interaction.guild
+        return await safe_fetch_guild(self.bot, guild_xid)
+
+    @tracer.wrap()
+    async def refresh_posts(self, game: GameDict) -> None:
+        """Show the current state of the selected game in all of its posts."""
+        channel_data = await self.services.channels.select(game["channel_xid"])
+        if channel_data is None:
+            return
+        embed = await self.services.games.to_embed()
+        view = started_game_view(self.bot, channel_data, game)
+        for post in game["posts"]:
+            guild_xid = post["guild_xid"]
+            channel = await safe_fetch_text_channel(self.bot, guild_xid, post["channel_xid"])
+            if channel and (
+                message := safe_get_partial_message(channel, guild_xid, post["message_xid"])
+            ):
+                await safe_update_embed(message, embed=embed, view=view)
+
+    @tracer.wrap()
+    async def create_link(self, game: GameDict) -> None:
+        if game["spelltable_link"]:
+            return
+        if link := await self.bot.create_game_link(game):
+            await self.services.games.set_link(link)
+            if self.interaction is None:
+                await self.refresh_posts(await self.services.games.to_dict())
+
+    @tracer.wrap()
+    async def create_voice(self, game: GameDict) -> None:
+        if game["voice_xid"]:
+            return
+        guild_xid = game["guild_xid"]
+        await self.services.guilds.select(guild_xid)
+        if not await self.services.guilds.should_voice_create():
+            return
+        use_max_bitrate = await self.services.guilds.get_use_max_bitrate()
+        channel_data = await self.services.channels.select(game["channel_xid"])
+        if channel_data is None:
+            return
+
+        category_prefix = channel_data["voice_category"]
+        category = await safe_ensure_voice_category(
+            self.bot,
+            guild_xid,
+            category_prefix,
+        )
+        if not category:
+            return
+
+        game_id = game["id"]
+        voice_channel = await safe_create_voice_channel(
+            self.bot,
+            guild_xid,
+            f"Game-SB{game_id}",
+            category=category,
+            use_max_bitrate=use_max_bitrate,
+        )
+        if not voice_channel:
+            return
+
+        should_create_invite = channel_data.get("voice_invite", False)
+        invite: discord.Invite | None = None
+        if should_create_invite:
+            invite = await save_create_channel_invite(
+                voice_channel,
+                max_age=2 * 60 * 60,  # 2 hours
+                max_uses=0,  # unlimited uses
+                temporary=True,
+                reason=f"Creating temporary voice channel invite for Game-SB{game_id}",
+            )
+
+        await self.services.games.set_voice(
+            voice_xid=voice_channel.id,
+            voice_invite_link=invite.url if invite else None,
+        )
+        if self.interaction is None:
+            await self.refresh_posts(await self.services.games.to_dict())
+
+    @tracer.wrap()
+    async def notify_players(self, game: GameDict) -> None:
         player_xids = await self.services.games.player_xids()
         embed = await self.services.games.to_embed(dm=True)
-        failed_xids: list[int] = []
 
         # notify players
-        fetched_players: dict[int, discord.User] = {}
-        for player_xid in player_xids:
-            player = await safe_fetch_user(self.bot, player_xid)
-            if player:
-                fetched_players[player_xid] = player
+        async def notify(player_xid: int) -> discord.User | None:
+            if player := await safe_fetch_user(self.bot, player_xid):
                 await safe_send_user(player, embed=embed)
-            else:
-                failed_xids.append(player_xid)
+            return player
+
+        notified = await fan_out(player_xids, notify)
+        fetched_players = {xid: player for xid, player in notified.results.items() if player}
+        failed_xids = [xid for xid in player_xids if xid not in fetched_players]
 
         # give out awards
-        assert self.interaction.guild_id is not None
-        new_roles = await self.services.awards.give_awards(
-            self.interaction.guild_id,
-            player_xids,
-        )
-        assert self.interaction.guild
-        for player_xid, new_awards in new_roles.items():
-            for new_award in new_awards:
-                if player_xid not in fetched_players:
+        guild = await self._fetch_guild(game["guild_xid"])
+        new_roles = await self.services.awards.give_awards(game["guild_xid"], player_xids)
+
+        async def award(player_xid: int) -> None:
+            for new_award in new_roles[player_xid]:
+                if guild is None or player_xid not in fetched_players:
                     warning = (
                         f"Unable to {'take' if new_award.remove else 'give'}"
                         f" role {new_award.role}"
                         f" {'from' if new_award.remove else 'to'}"
                         f" user <@{player_xid}>"
                     )
-                    await safe_followup_channel(self.interaction, warning)
+                    await self._warn(warning)
                     continue
                 player = fetched_players[player_xid]
-                await safe_add_role(
-                    player,
-                    self.interaction.guild,
-                    new_award.role,
-                    new_award.remove,
-                )
+                await safe_add_role(player, guild, new_award.role, new_award.remove)
                 await safe_send_user(player, new_award.message)
 
+        await fan_out(new_roles, award)
+
         # notify issues with player permissions
         if failed_xids:
             failures = ", ".join(f"<@!{xid}>" for xid in failed_xids)
-            warning = f"Unable to send Direct Messages to some players: {failures}"
-            await safe_followup_channel(self.interaction, warning)
+            await self._warn(f"Unable to send Direct Messages to some players: {failures}")
 
-        await self._handle_watched_players(player_xids)
+        if guild is not None:
+            await self._notify_watchers(game, guild, player_xids)
 
     @tracer.wrap()
-    async def _handle_watched_players(self, player_xids: list[int]) -> None:
+    async def _notify_watchers(
+        self,
+        game: GameDict,
+        guild: discord.Guild,
+        player_xids: list[int],
+    ) -> None:
         """Notify moderators about watched players."""
-        assert self.interaction.guild
         mod_role: discord.Role | None = None
-        for role in self.interaction.guild.roles:
+        for role in guild.roles:
             if role.name.startswith(settings.MOD_PREFIX):
                 mod_role = role
                 break
@@ -656,45 +901,17 @@ class LookingForGameAction(BaseAction):
         if not watch_notes:
             return
 
-        data = await self.services.games.to_dict()
-
         embed = discord.Embed()
         embed.set_thumbnail(url=settings.ICO_URL)
         embed.set_author(name="Watched user(s) joined a game")
         embed.color = settings.INFO_EMBED_COLOR
         description = ""
-        for jump_link in data["jump_links"].values():
+        for jump_link in game["jump_links"].values():
             description += f"[⇤ Jump to the game post]({jump_link})\n"
-        description += f"[➤ Spectate the game on SpellTable]({data['spectate_link']})\n\n**Users:**"
+        description += f"[➤ Spectate the game on SpellTable]({game['spectate_link']})\n\n**Users:**"
         for user_xid, note in watch_notes.items():
             description += f"\n• <@{user_xid}>: {note}"
         embed.description = description
-        embed.add_field(name="Game ID", value=f"SB{data['id']}", inline=False)
+        embed.add_field(name="Game ID", value=f"SB{game['id']}", inline=False)
 
-        for member in mod_role.members:
-            await safe_send_user(member, embed=embed)
-
-    @tracer.wrap()
-    async def ensure_users_exist(
-        self,
-        user_xids: list[int],
-        *,
-        exclude_self: bool = True,
-    ) -> list[int]:
-        """
-        Ensure DB users exist for the given list of external IDs.
-
-        When exclude_self is True, don't create a user for IDs matching the author's.
-        """
-        found_users: list[int] = []
-        for user_xid in user_xids:
-            if exclude_self and user_xid == self.interaction.user.id:
-                continue
-            user = await safe_fetch_user(self.bot, user_xid)
-            if not user:
-                continue
-            data = await self.services.users.upsert(user)
-            if data["banned"]:
-                continue
-            found_users.append(user_xid)
-        return found_users
+        await fan_out(mod_role.members, lambda member: safe_send_user(member, embed=embed))
@@ -72,3 +72,27 @@ class ScoreAction(BaseAction):
         embed.description = description
         embed.color = settings.INFO_EMBED_COLOR
         await safe_send_channel(self.interaction, embed=embed, ephemeral=True)
+
+    async def top_elo(self) -> None:
+        assert self.interaction.channel
+        assert hasattr(self.interaction.channel, "name")
+        channel_name = self.interaction.channel.name  # type: ignore
+        channel_xid = self.interaction.channel.id
+        guild_xid = self.interaction.guild_id
+
+        assert guild_xid is not None
+        data = await self.services.plays.top_elo(guild_xid, channel_xid)
+
+        embed = discord.Embed()
+        embed.set_thumbnail(url=settings.ICO_URL)
+        embed.title = f"Top players in #{channel_name} (ELO)"
+        description = ""
+        description += "Rank \xa0\xa0\xa0 ELO \xa0\xa0\xa0 Games \xa0\xa0\xa0 Player\n"
+        for rank, datum in enumerate(data):
+            user_xid, elo, count = datum
+            description += (
+                f"{rank+1:\xa0>6}\xa0{elo:\xa0>12}\xa0{count:\xa0>18}\xa0\xa0\xa0<@{user_xid}>\n"
+            )
+        embed.description = description
+        embed.color = settings.INFO_EMBED_COLOR
+        await safe_send_channel(self.interaction, embed=embed, ephemeral=True)
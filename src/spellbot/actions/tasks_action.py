@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import logging
 import re
 from contextlib import asynccontextmanager
@@ -12,17 +11,24 @@ from dateutil import tz
 from ddtrace import tracer
 
 from spellbot.database import db_session_manager, rollback_session
+from spellbot.enums import GameService
 from spellbot.metrics import add_span_error, setup_ignored_errors
+from spellbot.models import JobKind
 from spellbot.operations import (
     bot_can_delete_channel,
+    fan_out,
     safe_delete_channel,
     safe_delete_message,
     safe_fetch_text_channel,
     safe_get_partial_message,
     safe_update_embed,
 )
+from spellbot.scheduler import background
 from spellbot.services import GamesService, ServicesRegistry
+from spellbot.services.links import link_pool_target
 from spellbot.settings import settings
+from spellbot.spelltable import generate_spelltable_link
+from spellbot.sql_budget import sql_stats
 
 from .base_action import handle_exception
 
@@ -32,7 +38,7 @@ if TYPE_CHECKING:
     from discord.channel import VoiceChannel
 
     from spellbot import SpellBot
-    from spellbot.models import GameDict
+    from spellbot.models import JobDict, PostDict
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +55,7 @@ class VoiceChannelFilterer:
 
     async def filter(self, voice_channels: list[VoiceChannel]) -> list[VoiceChannel]:
         channels: list[VoiceChannel] = []
+        renamed: list[VoiceChannel] = []
 
         for channel in voice_channels:
             logger.info("considering channel %s(%s)", channel.name, channel.id)
@@ -72,11 +79,16 @@ class VoiceChannelFilterer:
                 channels.append(channel)
                 continue
 
-            logger.info("looking for matching game in database")
-            found = await self.games.select_by_voice_xid(channel.id)
-            if found:
-                logger.info("matching game found, adding to delete list")
-                channels.append(channel)
+            renamed.append(channel)
+
+        if renamed:
+            # Look up the games of every channel that doesn't match the name format at once.
+            logger.info("looking for matching games of %s channels in database", len(renamed))
+            found = await self.games.voice_xids([channel.id for channel in renamed])
+            for channel in renamed:
+                if channel.id in found:
+                    logger.info("matching game found for %s, adding to delete list", channel.id)
+                    channels.append(channel)
 
         return channels
 
@@ -90,13 +102,20 @@ class TasksAction:
     @asynccontextmanager
     async def create(cls, bot: SpellBot) -> AsyncGenerator[TasksAction, None]:
         action = cls(bot)
-        with tracer.trace(name=f"spellbot.interactions.{cls.__name__}.create") as span:
+        with (
+            tracer.trace(name=f"spellbot.interactions.{cls.__name__}.create") as span,
+            sql_stats() as stats,
+            background(),
+        ):
             setup_ignored_errors(span)
+            span.set_tag("action", cls.__name__)
             async with db_session_manager():
                 try:
                     yield action
                 except Exception as ex:  # pragma: no cover
                     await handle_exception(ex)
+                finally:
+                    stats.report(span)
 
     async def cleanup_old_voice_channels(self) -> None:
         logger.info("starting task cleanup_old_voice_channels")
@@ -109,93 +128,125 @@ class TasksAction:
             await rollback_session()
 
     async def gather_channels(self) -> list[VoiceChannel]:
-        channels: list[VoiceChannel] = []
+        candidates: list[VoiceChannel] = []
         active_guild_xids = {g.id for g in self.bot.guilds}
-        channel_filterer = VoiceChannelFilterer(self.services.games)
-
-        for guild_xid in await self.services.guilds.voiced():
-            await self.services.guilds.select(guild_xid)
-            guild_name = await self.services.guilds.current_name()
-            logger.info("looking in guild %s(%s)", guild_name, guild_xid)
-            prefixes = await self.services.guilds.voice_category_prefixes()
 
+        for guild_xid, prefixes in (await self.services.guilds.voiced()).items():
             if guild_xid not in active_guild_xids:
-                logger.info("guild is not active")
+                logger.info("guild %s is not active", guild_xid)
                 continue
 
             guild = self.bot.get_guild(guild_xid)
             if not guild:
-                logger.info("could not get guild from discord.py cache")
+                logger.info("could not get guild %s from discord.py cache", guild_xid)
                 continue
 
+            logger.info("looking in guild %s(%s)", guild.name, guild_xid)
             voice_categories = filter(
                 lambda c, ps=prefixes: any(c.name.startswith(prefix) for prefix in ps),
                 guild.categories,
             )
             for category in voice_categories:
                 logger.info("looking in category %s", category.name)
-                voice_channels = await channel_filterer.filter(category.voice_channels)
-                channels.extend(voice_channels)
+                candidates.extend(category.voice_channels)
 
-        return channels
+        return await VoiceChannelFilterer(self.services.games).filter(candidates)
 
     async def delete_channels(self, channels: list[VoiceChannel]) -> None:
-        for batch, channel in enumerate(sorted(channels, key=lambda c: c.created_at)):
+        for channel in sorted(channels, key=lambda c: c.created_at):
             logger.info("deleting channel %s(%s)", channel.name, channel.id)
             await safe_delete_channel(channel, channel.guild.id)
-            await asyncio.sleep(5)
-
-            # Try to avoid rate limiting by the Discord API
-            if batch + 1 > settings.VOICE_CLEANUP_BATCH:
-                remaining = len(channels) - settings.VOICE_CLEANUP_BATCH
-                logger.info("batch limit reached, %s channels remain", remaining)
-                break
 
     async def expire_inactive_games(self) -> None:
         logger.info("starting task expire_inactive_games")
         try:
-            games = await self.services.games.inactive_games()
-            await self.expire_games(games)
+            if game_ids := await self.services.games.expire_inactive():
+                logger.info("expired %s inactive games: %s", len(game_ids), game_ids)
+            await self.cleanup_expired_posts()
         except BaseException as e:  # Catch EVERYTHING so tasks don't die
             add_span_error(e)
             logger.exception("error: exception in background task")
             await rollback_session()
 
-    async def expire_games(self, games: list[GameDict]) -> None:
-        batch = 0
-        for game in games:
-            game_id = game["id"]
-            logger.info("expiring game %s...", game_id)
-            dequeued = await self.services.games.delete_games([game_id])
-            await self.expire_game(game, dequeued)
-
-            batch += 1
-            if batch >= 5:  # pragma: no cover
-                await asyncio.sleep(5)
-                batch = 0
-            else:
-                await asyncio.sleep(1)
-
-    async def expire_game(self, game: GameDict, dequeued: int) -> None:
-        for post in game.get("posts", []):
-            guild_xid = post["guild_xid"]
-            channel_xid = post["channel_xid"]
-            message_xid = post["message_xid"]
-
-            chan = await safe_fetch_text_channel(self.bot, guild_xid, channel_xid)
-            if not chan:
-                continue
+    async def cleanup_expired_posts(self) -> None:
+        """
+        Delete or update the posts of expired games, as recorded in the outbox.
+
+        Jobs are finished a batch at a time, so a run that's interrupted picks up where
+        it left off once their lease runs out. Posts in different channels are cleaned
+        up concurrently, since each channel has its own Discord rate limit buckets, and
+        the REST scheduler paces the requests in each channel.
+        """
+        kinds = [JobKind.DELETE_POSTS, JobKind.EXPIRE_POSTS]
+        while jobs := await self.services.jobs.claim(settings.OUTBOX_BATCH, kinds):
+            failed = await self.cleanup_posts(jobs)
+            for job in jobs:
+                if ex := failed.get(job["game_id"]):
+                    await self.services.jobs.fail(job, f"{ex.__class__.__name__}: {ex}")
+            await self.services.jobs.finish_all(
+                [job for job in jobs if job["game_id"] not in failed],
+            )
 
-            if not (post := safe_get_partial_message(chan, guild_xid, message_xid)):
-                continue
+    async def cleanup_posts(self, jobs: list[JobDict]) -> dict[int, Exception]:
+        """Clean up the posts of the games of the given jobs, returning any errors by game."""
+        expire = {job["game_id"] for job in jobs if job["kind"] == JobKind.EXPIRE_POSTS.value}
+        posts = {
+            post["message_xid"]: post
+            for post in await self.services.games.posts([job["game_id"] for job in jobs])
+        }
+        cleaned = await fan_out(
+            posts,
+            lambda message_xid: self.cleanup_post(
+                posts[message_xid],
+                expire=posts[message_xid]["game_id"] in expire,
+            ),
+            bucket=lambda message_xid: posts[message_xid]["channel_xid"],
+        )
+        logger.info("cleaned up %s posts of %s expired games", len(posts), len(jobs))
+        return {posts[message_xid]["game_id"]: ex for message_xid, ex in cleaned.failures.items()}
+
+    async def cleanup_post(self, post: PostDict, *, expire: bool) -> None:
+        guild_xid = post["guild_xid"]
+        channel_xid = post["channel_xid"]
+        message_xid = post["message_xid"]
+
+        chan = await safe_fetch_text_channel(self.bot, guild_xid, channel_xid)
+        if not chan:
+            return
+
+        if not (message := safe_get_partial_message(chan, guild_xid, message_xid)):
+            return
+
+        if expire:
+            await safe_update_embed(
+                message,
+                content="Sorry, this game was expired due to inactivity.",
+                embed=None,
+                view=None,
+            )
+        else:
+            await safe_delete_message(message)
 
-            channel_data = await self.services.channels.select(channel_xid)
-            if not dequeued or channel_data and channel_data["delete_expired"]:
-                await safe_delete_message(post)
-            else:
-                await safe_update_embed(
-                    post,
-                    content="Sorry, this game was expired due to inactivity.",
-                    embed=None,
-                    view=None,
-                )
+    async def provision_links(self) -> None:
+        if self.bot.mock_games or settings.SPELLTABLE_POOL_MAX <= 0:
+            return
+        logger.info("starting task provision_links")
+        try:
+            service = GameService.SPELLTABLE.value
+            links = self.services.links
+            await links.purge()
+            target = link_pool_target(await links.starts_per_hour(service))
+            needed = min(target - await links.stock(service), settings.SPELLTABLE_POOL_BATCH)
+            if needed <= 0:
+                return
+            created = await fan_out(
+                range(needed),
+                lambda _: generate_spelltable_link(None, self.bot.spelltable),
+            )
+            new_links = [link for link in created.results.values() if link]
+            await links.add(service, new_links)
+            logger.info("provisioned %s of %s links, target is %s", len(new_links), needed, target)
+        except BaseException as e:  # Catch EVERYTHING so tasks don't die
+            add_span_error(e)
+            logger.exception("error: exception in background task")
+            await rollback_session()
@@ -67,6 +67,32 @@ if not getenv("DISABLE_UVLOOP", ""):  # pragma: no cover
     required=False,
     help="Use the given port number to serve the API",
 )
+@click.option(
+    "-b",
+    "--backfill-leaderboards",
+    default=False,
+    is_flag=True,
+    help="Recount every player's games for the leaderboards from their plays, then exit",
+)
+@click.option(
+    "-c",
+    "--cluster",
+    type=click.IntRange(min=1),
+    required=False,
+    help="Run the bot's shards across this many worker processes",
+)
+@click.option(
+    "--shard-count",
+    type=click.IntRange(min=1),
+    required=False,
+    help="The total number of shards, by default the number that Discord recommends",
+)
+@click.option(
+    "--shard-ids",
+    type=str,
+    required=False,
+    help="Only run these comma separated shards, other processes run the rest",
+)
 @click.version_option(version=__version__)
 def main(
     log_level: str | None,
@@ -75,6 +101,10 @@ def main(
     mock_games: bool,
     api: bool,
     port: int | None = None,
+    backfill_leaderboards: bool = False,
+    cluster: int | None = None,
+    shard_count: int | None = None,
+    shard_ids: str | None = None,
 ) -> None:
     if dev:
         hupper.start_reloader("spellbot.main")
@@ -112,7 +142,9 @@ def main(
                 assert conn is not None
                 conn.close()
 
-    if api:
+    if backfill_leaderboards:
+        asyncio.run(backfill())
+    elif api:
         from .web import launch_web_server
 
         loop = asyncio.new_event_loop()
@@ -120,8 +152,49 @@ def main(
         launch_web_server(loop, port or settings.PORT)
         loop.run_forever()
     else:
-        from .client import build_bot
+        run_bot(level, mock_games, cluster, shard_count, shard_ids)
+
+
+async def backfill(worker_id: str | None = None) -> None:
+    """Recount the play counts behind the /top leaderboards from the full play history."""
+    import logging
+
+    from .database import db_session_manager, initialize_connection
+    from .services import PlaysService
+
+    await initialize_connection("spellbot-backfill", use_async=False, worker_id=worker_id)
+    async with db_session_manager():
+        guilds = await PlaysService().backfill_play_counts()
+    logging.root.info("recounted leaderboards for %s guilds", guilds)
+
+
+def run_bot(
+    level: str,
+    mock_games: bool,
+    cluster: int | None,
+    shard_count: int | None,
+    shard_ids: str | None,
+) -> None:
+    """Run the bot in this process, or as a cluster of worker processes."""
+    if shard_ids is not None and shard_count is None:
+        msg = "--shard-ids requires --shard-count"
+        raise click.UsageError(msg)
+
+    assert settings.BOT_TOKEN is not None
+    if cluster:
+        from .cluster import Supervisor, recommended_shard_count
+
+        if shard_count is None:
+            shard_count = asyncio.run(recommended_shard_count(settings.BOT_TOKEN))
+        args = ["--log-level", level, *(["--mock-games"] if mock_games else [])]
+        Supervisor(cluster, shard_count, args).run()
+        return
+
+    from .client import build_bot
 
-        assert settings.BOT_TOKEN is not None
-        bot = build_bot(mock_games=mock_games)
-        bot.run(settings.BOT_TOKEN)
+    bot = build_bot(
+        mock_games=mock_games,
+        shard_ids=[int(s) for s in shard_ids.split(",")] if shard_ids else None,
+        shard_count=shard_count,
+    )
+    bot.run(settings.BOT_TOKEN)
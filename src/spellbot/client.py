@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from contextlib import asynccontextmanager
 from typing import TYPE_CHECKING
 from uuid import uuid4
 
@@ -10,18 +9,37 @@ import discord
 from ddtrace import tracer
 from discord.ext.commands import AutoShardedBot, CommandError, CommandNotFound, Context
 
-from .database import db_session_manager, initialize_connection
+from .database import (
+    db_session_manager,
+    dispose_async_engine,
+    initialize_connection,
+    release_connection,
+)
 from .enums import GameService
+from .invalidation import InvalidationBus
+from .leader import LeaderElection
+from .link_client import LinkClient
+from .locks import AdvisoryLockManager, LockManager
+from .matchmaking import rebuild_matchmaking_index
 from .metrics import setup_ignored_errors, setup_metrics
 from .operations import safe_delete_message
-from .services import ChannelsService, GamesService, GuildsService, VerifiesService
+from .prometheus import start_exporter
+from .scheduler import install_scheduler
+from .services import (
+    ChannelsService,
+    GamesService,
+    GuildsService,
+    ServicesRegistry,
+    VerifiesService,
+)
 from .settings import settings
 from .spelltable import generate_spelltable_link
 from .tablestream import generate_tablestream_link
 from .utils import user_can_moderate
+from .verification import VerificationPolicy, verification_policies
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator
+    from aiohttp import web
 
     from .models import GameDict
 
@@ -34,6 +52,8 @@ class SpellBot(AutoShardedBot):
         self,
         mock_games: bool = False,
         create_connection: bool = True,
+        shard_ids: list[int] | None = None,
+        shard_count: int | None = None,
     ) -> None:
         intents = discord.Intents().default()
         intents.members = True
@@ -45,10 +65,27 @@ class SpellBot(AutoShardedBot):
             help_command=None,
             intents=intents,
             application_id=settings.BOT_APPLICATION_ID,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
         )
         self.mock_games = mock_games
         self.create_connection = create_connection
-        self.critical_lock = asyncio.Lock()
+        # Only running some of the shards means that other processes run the rest.
+        self.clustered = shard_ids is not None
+        self.locks: LockManager | AdvisoryLockManager = (
+            AdvisoryLockManager(settings.DATABASE_URL, "spellbot-locks")
+            if self.clustered
+            else LockManager()
+        )
+        self.spelltable = LinkClient("spelltable", timeout_s=settings.SPELLTABLE_TIMEOUT_S)
+        self.tablestream = LinkClient("tablestream", timeout_s=settings.TABLESTREAM_TIMEOUT_S)
+        self.services = ServicesRegistry()
+        self.exporter: web.AppRunner | None = None
+        self.leader: LeaderElection | None = None
+        self.invalidations: InvalidationBus | None = None
+        self.policies_task: asyncio.Task[None] | None = None
+        # Verifications being written, by guild, user and the verified value written.
+        self.verifications: dict[tuple[int, int, bool | None], asyncio.Task[bool]] = {}
 
     async def on_ready(self) -> None:  # pragma: no cover
         logger.info("client ready")
@@ -61,6 +98,21 @@ class SpellBot(AutoShardedBot):
         if self.create_connection:  # pragma: no cover
             logger.info("initializing database connection...")
             await initialize_connection("spellbot-bot")
+            # The index only knows about games changed by this process.
+            if settings.MATCHMAKING_INDEX and not self.clustered:
+                logger.info("building matchmaking index...")
+                async with db_session_manager():
+                    await rebuild_matchmaking_index()
+            logger.info("loading verification policies...")
+            await self.load_verification_policies()
+            self.leader = LeaderElection(settings.DATABASE_URL, "spellbot-leader")
+            self.leader.start()
+            self.invalidations = InvalidationBus(settings.DATABASE_URL, "spellbot-invalidations")
+            self.invalidations.start()
+
+        install_scheduler()
+        if settings.METRICS_PORT:
+            self.exporter = await start_exporter(settings.HOST, settings.METRICS_PORT)
 
         # register persistent views
         from .views import PendingGameView, SetupView, StartedGameView, StartedGameViewWithConfirm
@@ -75,16 +127,49 @@ class SpellBot(AutoShardedBot):
 
         await load_extensions(self)
 
-    @asynccontextmanager
-    async def guild_lock(self, guild_xid: int) -> AsyncGenerator[None, None]:
-        # We used to have a lock per guild, but now that users can join games in
-        # multiple guilds at the same time, we need to have a global lock for the
-        # critical paths related to joining and leaving games. That is why we're
-        # ignoring the passed in guild_xid parameter. In the future this could be
-        # refactored to use a more fine-grained locking mechanism, or else remove
-        # the unused parameter.
-        async with self.critical_lock:
-            yield
+    async def close(self) -> None:  # pragma: no cover
+        await super().close()
+        await self.spelltable.close()
+        await self.tablestream.close()
+        await dispose_async_engine()
+        if self.leader is not None:
+            await self.leader.stop()
+        if self.invalidations is not None:
+            await self.invalidations.stop()
+        if isinstance(self.locks, AdvisoryLockManager):
+            await self.locks.close()
+        if self.exporter is not None:
+            await self.exporter.cleanup()
+
+    def is_leader(self) -> bool:
+        """Return True if this process should run the bot's background tasks."""
+        # Without a leader election, as in tests, this is the only process.
+        return self.leader is None or self.leader.is_leader
+
+    async def load_verification_policies(self) -> None:
+        version = verification_policies.version()
+        try:
+            async with db_session_manager():
+                policies = await ChannelsService().verification_policies()
+        except Exception:
+            logger.exception("failed to load verification policies")
+            return
+        verification_policies.load(policies, version)
+
+    def load_verification_policies_soon(self) -> None:
+        if self.policies_task is None or self.policies_task.done():
+            self.policies_task = asyncio.create_task(self.load_verification_policies())
+
+    def needs_verification(self, message: discord.Message) -> bool:
+        """Return False if the message is known not to need verifying."""
+        # don't try to verify the bot itself
+        if self.user and message.author.id == self.user.id:  # pragma: no cover
+            return False
+        # Note: In tests the policies are loaded by the tests that need them.
+        if not verification_policies.loaded and self.create_connection:  # pragma: no cover
+            self.load_verification_policies_soon()
+        # most channels don't have any verification settings, so there's nothing to do
+        return verification_policies.needs_database(message.channel.id)
 
     @tracer.wrap()
     async def create_game_link(self, game: GameDict) -> str | None:
@@ -92,9 +177,17 @@ class SpellBot(AutoShardedBot):
             return f"http://exmaple.com/game/{uuid4()}"
         service = game.get("service")
         if service == GameService.SPELLTABLE.value:
-            return await generate_spelltable_link(game)
+            if settings.SPELLTABLE_POOL_MAX <= 0:
+                return await generate_spelltable_link(game, self.spelltable)
+            if link := await self.services.links.take(service):
+                return link
+            # The pool ran dry, so create one now and count it towards the rate of game
+            # starts that the pool is refilled for.
+            if link := await generate_spelltable_link(game, self.spelltable):
+                await self.services.links.record(service, link)
+            return link
         if service == GameService.TABLE_STREAM.value:
-            return await generate_tablestream_link(game)
+            return await generate_tablestream_link(game, self.tablestream)
         return None
 
     @tracer.wrap(name="interaction", resource="on_message")
@@ -130,8 +223,7 @@ class SpellBot(AutoShardedBot):
         if span:
             span.set_tag("author_id", message_author_xid)
 
-        # don't try to verify the bot itself
-        if self.user and message_author_xid == self.user.id:  # pragma: no cover
+        if not self.needs_verification(message):
             return None
 
         async with db_session_manager():
@@ -163,20 +255,48 @@ class SpellBot(AutoShardedBot):
         assert message.guild is not None
         await guilds.upsert(message.guild)
         channels = ChannelsService()
+        version = verification_policies.version(message.channel.id)
         channel_data = await channels.upsert(message.channel)
+        verification_policies.update(
+            message.channel.id,
+            VerificationPolicy.from_channel(channel_data),
+            version,
+        )
         if channel_data["auto_verify"]:
             verified = True
-        verify = VerifiesService()
         assert message.guild
         guild: discord.Guild = message.guild
-        await verify.upsert(guild.id, message_author_xid, verified)
+        user_is_verified = await self.verify(guild.id, message_author_xid, verified)
         if not user_can_moderate(message.author, guild, message.channel):
-            user_is_verified = await verify.is_verified()
             if user_is_verified and channel_data["unverified_only"]:
                 await safe_delete_message(message)
             if not user_is_verified and channel_data["verified_only"]:
                 await safe_delete_message(message)
 
+    async def verify(self, guild_xid: int, user_xid: int, verified: bool | None) -> bool:
+        """Write a user's verification, along with any identical write already underway."""
+        key = (guild_xid, user_xid, verified)
+        task = self.verifications.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._verify(guild_xid, user_xid, verified))
+            self.verifications[key] = task
+
+            def done(task: asyncio.Task[bool]) -> None:
+                if self.verifications.get(key) is task:
+                    del self.verifications[key]
+
+            task.add_done_callback(done)
+        # The write has its own session, which may need a connection from the pool.
+        await release_connection()
+        # Shielded so that one message's cancellation doesn't fail everyone else's.
+        return await asyncio.shield(task)
+
+    async def _verify(self, guild_xid: int, user_xid: int, verified: bool | None) -> bool:
+        async with db_session_manager():
+            verify = VerifiesService()
+            await verify.upsert(guild_xid, user_xid, verified)
+            return await verify.is_verified()
+
     @tracer.wrap()
     async def handle_message_deleted(self, message: discord.Message) -> None:
         games = GamesService()
@@ -189,7 +309,17 @@ class SpellBot(AutoShardedBot):
             await games.delete_games([game_id])
 
 
-def build_bot(mock_games: bool = False, create_connection: bool = True) -> SpellBot:
-    bot = SpellBot(mock_games=mock_games, create_connection=create_connection)
+def build_bot(
+    mock_games: bool = False,
+    create_connection: bool = True,
+    shard_ids: list[int] | None = None,
+    shard_count: int | None = None,
+) -> SpellBot:
+    bot = SpellBot(
+        mock_games=mock_games,
+        create_connection=create_connection,
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+    )
     setup_metrics()
     return bot
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+import time
+from typing import TYPE_CHECKING, Any
+
+from discord.http import HTTPClient
+
+from .settings import settings
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY_S = 10
+
+
+def shard_ranges(shard_count: int, workers: int) -> list[list[int]]:
+    """Split the shards into `workers` contiguous ranges whose sizes differ by at most one."""
+    workers = max(min(workers, shard_count), 1)
+    size, extra = divmod(shard_count, workers)
+    ranges: list[list[int]] = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def recommended_shard_count(token: str) -> int:  # pragma: no cover
+    """Ask Discord how many shards the bot should be running."""
+    http = HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shard_count, _ = await http.get_bot_gateway()
+    finally:
+        await http.close()
+    return shard_count
+
+
+def run_worker(args: list[str]) -> None:  # pragma: no cover
+    from .cli import main
+
+    main(args)
+
+
+class Supervisor:
+    """
+    Runs the bot as a cluster of worker processes that each run a range of the shards.
+
+    Workers are started one after another, giving the shards of each worker time to
+    identify with Discord before the next worker starts, since Discord only lets one
+    shard identify at a time. A worker that exits is restarted after a short delay.
+    Interrupting or terminating the supervisor stops every worker.
+
+    Everything that workers share goes through the database: matchmaking locks are
+    advisory locks rather than in-process locks, and one worker at a time is elected
+    to run the background tasks.
+    """
+
+    def __init__(self, workers: int, shard_count: int, args: list[str]) -> None:
+        self.shard_count = shard_count
+        self.ranges = shard_ranges(shard_count, workers)
+        self.args = args
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: dict[int, BaseProcess] = {}
+        self.stopping = False
+
+    def worker_args(self, index: int) -> list[str]:
+        shard_ids = ",".join(map(str, self.ranges[index]))
+        return [*self.args, "--shard-ids", shard_ids, "--shard-count", str(self.shard_count)]
+
+    def spawn(self, index: int) -> None:
+        logger.info("starting worker %s for shards %s", index, self.ranges[index])
+        process = self.context.Process(
+            target=run_worker,
+            args=(self.worker_args(index),),
+            name=f"spellbot-worker-{index}",
+        )
+        process.start()
+        self.processes[index] = process
+
+    def wait(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(1.0, max(deadline - time.monotonic(), 0.0)))
+
+    def stop(self, *_: Any) -> None:
+        self.stopping = True
+
+    def run(self) -> None:  # pragma: no cover
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        logger.info("running %s shards in %s workers", self.shard_count, len(self.ranges))
+        try:
+            for index, shard_ids in enumerate(self.ranges):
+                if self.stopping:
+                    break
+                self.spawn(index)
+                self.wait(settings.CLUSTER_IDENTIFY_DELAY_S * len(shard_ids))
+            while not self.stopping:
+                self.restart_exited()
+                self.wait(1)
+        finally:
+            self.shutdown()
+
+    def restart_exited(self) -> None:
+        for index, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            logger.warning("worker %s exited with code %s", index, process.exitcode)
+            self.wait(RESTART_DELAY_S)
+            if self.stopping:
+                return
+            self.spawn(index)
+
+    def shutdown(self) -> None:
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for index, process in self.processes.items():
+            process.join(30)
+            if process.is_alive():  # pragma: no cover
+                logger.warning("killing worker %s", index)
+                process.kill()
+                process.join()
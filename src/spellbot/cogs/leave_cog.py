@@ -25,23 +25,15 @@ class LeaveGameCog(commands.Cog):
     @app_commands.command(name="leave", description="Leaves pending games in this channel.")
     @tracer.wrap(name="interaction", resource="leave_command")
     async def leave_command(self, interaction: discord.Interaction) -> None:
-        assert interaction.guild is not None
         add_span_context(interaction)
-        async with (
-            self.bot.guild_lock(interaction.guild.id),
-            LeaveAction.create(self.bot, interaction) as action,
-        ):
+        async with LeaveAction.create(self.bot, interaction) as action:
             await action.execute()
 
     @app_commands.command(name="leave_all", description="Leaves all pending games.")
     @tracer.wrap(name="interaction", resource="leave_all_command")
     async def leave_all(self, interaction: discord.Interaction) -> None:
-        assert interaction.guild is not None
         add_span_context(interaction)
-        async with (
-            self.bot.guild_lock(interaction.guild.id),
-            LeaveAction.create(self.bot, interaction) as action,
-        ):
+        async with LeaveAction.create(self.bot, interaction) as action:
             await action.execute_all()
 
 
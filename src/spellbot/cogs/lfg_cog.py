@@ -49,13 +49,9 @@ class LookingForGameCog(commands.Cog):
         format: int | None = None,
         service: int | None = None,
     ) -> None:
-        assert interaction.guild is not None
         add_span_context(interaction)
         await safe_defer_interaction(interaction)
-        async with (
-            self.bot.guild_lock(interaction.guild.id),
-            LookingForGameAction.create(self.bot, interaction) as action,
-        ):
+        async with LookingForGameAction.create(self.bot, interaction) as action:
             await action.execute(friends=friends, seats=seats, format=format, service=service)
 
 
@@ -47,16 +47,21 @@ class ScoreCog(commands.Cog):
     @app_commands.command(name="top", description="View the top players in this channel.")
     @app_commands.describe(monthly="Ranks for this month only?")
     @app_commands.describe(ago="How many months ago?")
+    @app_commands.describe(elo="Rank players by ELO instead of games played?")
     @tracer.wrap(name="interaction", resource="top")
     async def top(
         self,
         interaction: discord.Interaction,
         monthly: bool = True,
         ago: int = 0,
+        elo: bool = False,
     ) -> None:
         add_span_context(interaction)
         async with ScoreAction.create(self.bot, interaction) as action:
-            await action.top(monthly, ago)
+            if elo:
+                await action.top_elo()
+            else:
+                await action.top(monthly, ago)
 
 
 async def setup(bot: SpellBot) -> None:  # pragma: no cover
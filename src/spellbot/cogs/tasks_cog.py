@@ -6,8 +6,9 @@ from discord import Client
 from discord.ext import commands, tasks
 
 from spellbot import SpellBot
-from spellbot.actions import TasksAction
+from spellbot.actions import OutboxAction, TasksAction
 from spellbot.environment import running_in_pytest
+from spellbot.prometheus import TASK_SECONDS
 from spellbot.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -52,11 +53,18 @@ class TasksCog(commands.Cog):  # pragma: no cover
         if not running_in_pytest():
             self.cleanup_old_voice_channels.start()
             self.expire_inactive_games.start()
+            self.run_outbox.start()
+            self.provision_links.start()
 
+    # Every process cleans up the voice channels of the guilds on its own shards, so
+    # unlike the other tasks this one doesn't have to run on the elected leader.
     @tasks.loop(minutes=settings.VOICE_CLEANUP_LOOP_M)
     async def cleanup_old_voice_channels(self) -> None:
         try:
-            with tracer.trace(name="command", resource="cleanup_old_voice_channels"):
+            with (
+                tracer.trace(name="command", resource="cleanup_old_voice_channels"),
+                TASK_SECONDS.time(task="cleanup_old_voice_channels"),
+            ):
                 async with TasksAction.create(self.bot) as action:
                     await action.cleanup_old_voice_channels()
         except BaseException:  # Catch EVERYTHING so tasks don't die
@@ -68,8 +76,13 @@ class TasksCog(commands.Cog):  # pragma: no cover
 
     @tasks.loop(minutes=settings.EXPIRE_GAMES_LOOP_M)
     async def expire_inactive_games(self) -> None:
+        if not self.bot.is_leader():
+            return
         try:
-            with tracer.trace(name="command", resource="expire_inactive_games"):
+            with (
+                tracer.trace(name="command", resource="expire_inactive_games"),
+                TASK_SECONDS.time(task="expire_inactive_games"),
+            ):
                 async with TasksAction.create(self.bot) as action:
                     await action.expire_inactive_games()
         except BaseException:  # Catch EVERYTHING so tasks don't die
@@ -79,6 +92,41 @@ class TasksCog(commands.Cog):  # pragma: no cover
     async def before_expire_inactive_games(self) -> None:
         await wait_until_ready(self.bot)
 
+    # Jobs are leased before they're run, so every process can work through the outbox.
+    @tasks.loop(seconds=settings.OUTBOX_LOOP_S)
+    async def run_outbox(self) -> None:
+        try:
+            with (
+                tracer.trace(name="command", resource="run_outbox"),
+                TASK_SECONDS.time(task="run_outbox"),
+            ):
+                async with OutboxAction.create(self.bot) as action:
+                    await action.run_due()
+        except BaseException:  # Catch EVERYTHING so tasks don't die
+            logger.exception("error: exception in task cog")
+
+    @run_outbox.before_loop
+    async def before_run_outbox(self) -> None:
+        await wait_until_ready(self.bot)
+
+    @tasks.loop(seconds=settings.SPELLTABLE_POOL_LOOP_S)
+    async def provision_links(self) -> None:
+        if not self.bot.is_leader():
+            return
+        try:
+            with (
+                tracer.trace(name="command", resource="provision_links"),
+                TASK_SECONDS.time(task="provision_links"),
+            ):
+                async with TasksAction.create(self.bot) as action:
+                    await action.provision_links()
+        except BaseException:  # Catch EVERYTHING so tasks don't die
+            logger.exception("error: exception in task cog")
+
+    @provision_links.before_loop
+    async def before_provision_links(self) -> None:
+        await wait_until_ready(self.bot)
+
 
 async def setup(bot: SpellBot) -> None:  # pragma: no cover
     await bot.add_cog(TasksCog(bot), guild=settings.GUILD_OBJECT)
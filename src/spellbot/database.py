@@ -1,14 +1,19 @@
 from __future__ import annotations
 
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 from contextvars import ContextVar
-from typing import TYPE_CHECKING, Any, Generic, NoReturn, TypeVar
+from datetime import UTC, datetime
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Generic, NoReturn, ParamSpec, TypeVar
 from uuid import uuid4
 
 from asgiref.sync import sync_to_async
-from sqlalchemy.engine import create_engine
+from sqlalchemy import event, text
+from sqlalchemy.engine import create_engine, make_url
 from sqlalchemy.engine.base import Connection, Engine, Transaction
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine as sa_create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
 from wrapt import CallableObjectProxy
@@ -17,10 +22,12 @@ from .models import create_all, reverse_all
 from .settings import settings
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator
+    from collections.abc import AsyncGenerator, Callable, Coroutine, Generator
 
 logger = logging.getLogger(__name__)
 ProxiedObject = TypeVar("ProxiedObject")
+P = ParamSpec("P")
+T = TypeVar("T")
 context_vars: dict[ContextLocal, ContextVar] = {}  # type: ignore
 
 
@@ -68,8 +75,48 @@ engine = TypedProxy.of_type(Engine)
 connection = TypedProxy.of_type(Connection)
 transaction = TypedProxy.of_type(Transaction)
 db_session_maker = TypedProxy.of_type(sessionmaker)
+async_engine = TypedProxy.of_type(AsyncEngine)
+async_db_session_maker = TypedProxy.of_type(async_sessionmaker)
 DatabaseSession = ContextLocal.of_type(Session)
 
+# The pooled AsyncSession for the current interaction when running in async engine mode.
+current_async_session: ContextVar[AsyncSession | None] = ContextVar(
+    "current_async_session",
+    default=None,
+)
+
+
+def using_async_engine() -> bool:
+    return async_db_session_maker.__wrapped__ is not None
+
+
+def database_sync_to_async(func: Callable[P, T]) -> Callable[P, Coroutine[Any, Any, T]]:
+    """
+    Run a function that uses `DatabaseSession` from async code.
+
+    By default this is asgiref's thread sensitive `sync_to_async()`, which means that
+    all database work runs one call at a time on a single executor thread. When the
+    current interaction has a pooled `AsyncSession` the function is instead run inside
+    of `AsyncSession.run_sync()`, where `DatabaseSession` is the synchronous facade of
+    that session. Its queries are then awaited on the event loop by asyncpg, so work
+    from concurrent interactions can overlap.
+    """
+    threaded = sync_to_async(func)
+
+    @wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        session = current_async_session.get()
+        if session is None:
+            return await threaded(*args, **kwargs)
+
+        def call(sync_session: Session) -> T:
+            DatabaseSession.set(sync_session)
+            return func(*args, **kwargs)
+
+        return await session.run_sync(call)
+
+    return wrapper
+
 
 @sync_to_async()
 def initialize_connection(
@@ -78,6 +125,7 @@ def initialize_connection(
     use_transaction: bool = False,
     run_migrations: bool = True,
     worker_id: str | None = None,
+    use_async: bool | None = None,
 ) -> None:
     """
     Connect to the database.
@@ -97,13 +145,22 @@ def initialize_connection(
     sessions are created. This transaction can then be entirely rolled back using
     `rollback_transaction()`. This is useful for allowing tests to run within their
     own transaction that is always rolled back.
+
+    If `use_async` is set to `True`, which defaults to the `DATABASE_ASYNC` setting,
+    then interactions instead get their own `AsyncSession` from an asyncpg connection
+    pool. See `initialize_async_engine()` for details.
     """
+    if use_async is None:
+        use_async = settings.DATABASE_ASYNC
     db_url = settings.DATABASE_URL
     if worker_id:
         db_url += f"-{worker_id}"
         app += f"-{worker_id}"
     if run_migrations:  # pragma: no cover
         create_all(db_url)
+    if use_async:  # pragma: no cover
+        initialize_async_engine(db_url, app)
+        return
     engine_obj = create_engine(
         db_url,
         echo=settings.DATABASE_ECHO,
@@ -123,23 +180,150 @@ def initialize_connection(
     db_session_maker.set(db_session_maker_obj)
 
 
+def _encode_timestamp(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value.isoformat(sep=" ")
+
+
+async def _register_codecs(conn: Any) -> None:
+    # psycopg2 quietly stores timezone aware datetimes in our `timestamp without time zone`
+    # columns, but asyncpg refuses them. All of our timestamps are in UTC, so normalize.
+    await conn.set_type_codec(
+        "timestamp",
+        encoder=_encode_timestamp,
+        decoder=datetime.fromisoformat,
+        schema="pg_catalog",
+    )
+
+
+def initialize_async_engine(
+    db_url: str,
+    app: str,
+    *,
+    pool_size: int | None = None,
+    max_overflow: int | None = None,
+) -> None:
+    """
+    Create the asyncpg engine and connection pool used by async engine mode.
+
+    Unlike the default mode, which shares a single connection for the lifetime of
+    the bot, each interaction checks out its own connection from the pool for the
+    duration of its session. The pool is sized by `DATABASE_POOL_SIZE` and
+    `DATABASE_MAX_OVERFLOW` unless given a size. Connections are created on the
+    event loop that first needs them, so this must be called from the event loop
+    that will be using the pool.
+    """
+    url = make_url(db_url).set(drivername="postgresql+asyncpg")
+    async_engine_obj = sa_create_async_engine(
+        url,
+        echo=settings.DATABASE_ECHO,
+        connect_args={"server_settings": {"application_name": app}},
+        isolation_level="AUTOCOMMIT",
+        pool_size=settings.DATABASE_POOL_SIZE if pool_size is None else pool_size,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        pool_pre_ping=True,
+    )
+
+    @event.listens_for(async_engine_obj.sync_engine, "connect")
+    def on_connect(dbapi_connection: Any, _: Any) -> None:
+        dbapi_connection.run_async(_register_codecs)
+
+    async_engine.set(async_engine_obj)
+    async_db_session_maker.set(async_sessionmaker(async_engine_obj, expire_on_commit=False))
+
+
+async def dispose_async_engine() -> None:
+    if not using_async_engine():
+        return
+    await async_engine.dispose()
+    async_engine.set(None)
+    async_db_session_maker.set(None)
+
+
 @sync_to_async()
-def begin_session() -> None:
+def _begin_sync_session() -> None:
     db_session = db_session_maker()
     DatabaseSession.set(db_session)
 
 
 @sync_to_async()
-def rollback_session() -> None:  # pragma: no cover
+def _rollback_sync_session() -> None:  # pragma: no cover
     DatabaseSession.rollback()
 
 
 @sync_to_async()
-def end_session() -> None:
+def _end_sync_session() -> None:
     DatabaseSession.commit()
     DatabaseSession.close()
 
 
+async def begin_session() -> None:
+    if not using_async_engine():
+        return await _begin_sync_session()
+    session: AsyncSession = async_db_session_maker()
+    current_async_session.set(session)
+    DatabaseSession.set(session.sync_session)
+    return None
+
+
+async def rollback_session() -> None:  # pragma: no cover
+    session = current_async_session.get()
+    if session is None:
+        return await _rollback_sync_session()
+    return await session.rollback()
+
+
+async def end_session() -> None:
+    session = current_async_session.get()
+    if session is None:
+        return await _end_sync_session()
+    try:
+        await session.commit()
+    finally:
+        await session.close()
+        current_async_session.set(None)
+
+
+async def release_connection() -> None:
+    """
+    Return the pooled connection of the current session until it next runs a query.
+
+    Work done so far is committed, which with autocommit connections only ends the
+    session's transaction. In the default mode the one connection is never released.
+    """
+    session = current_async_session.get()
+    if session is not None:
+        await session.commit()
+
+
+@contextmanager
+def atomic() -> Generator[None, None, None]:
+    """
+    Commit everything written to the current session in a block together, or nothing.
+
+    Sessions use autocommit connections, where each statement is committed on its own
+    as soon as it runs, so this wraps the block in an explicit transaction. In tests,
+    where everything runs in a transaction that's rolled back at the end, this uses a
+    savepoint instead. The block must not commit the session itself.
+    """
+    connection = DatabaseSession.connection()
+    if not getattr(connection.connection.dbapi_connection, "autocommit", False):
+        with DatabaseSession.begin_nested():
+            yield
+        return
+    connection.execute(text("BEGIN"))
+    try:
+        yield
+        DatabaseSession.flush()
+    except BaseException:
+        connection.execute(text("ROLLBACK"))
+        # Forget the changes to objects in the session too, so they aren't written later.
+        DatabaseSession.rollback()
+        raise
+    connection.execute(text("COMMIT"))
+
+
 @asynccontextmanager
 async def db_session_manager() -> AsyncGenerator[None, None]:
     await begin_session()
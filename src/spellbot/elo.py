@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import TYPE_CHECKING
+
+import pytz
+from ddtrace import tracer
+from sqlalchemy import BigInteger, Integer, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import insert
+
+from .database import DatabaseSession, database_sync_to_async
+from .models import Game, Play, Record
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ELO = 1500
+K_FACTOR = 32  # growth rate
+REPLAY_BATCH_SIZE = 10_000
+
+
+def place(points: int | None) -> int:
+    """Convert the points that a player reported into their place in the game."""
+    points = points or 0
+    if points >= 3:  # first place
+        return 1
+    if points > 0:  # second place
+        return 2
+    return 3  # last place
+
+
+def elo_changes(elos: Sequence[int], places: Sequence[int], k: int = K_FACTOR) -> list[int]:
+    """
+    Return the change to each player's ELO for a game, given their ELOs and places.
+
+    Every player is scored against every other player in the game. That's done as a
+    matrix, S - E, of actual scores minus expected scores. Since the expected score of
+    player i against player j is `q[i] / (q[i] + q[j])` where `q = 10 ** (elo / 400)`,
+    only one power needs to be computed per player rather than one per pair.
+    """
+    q = [10.0 ** (elo / 400.0) for elo in elos]
+    changes: list[int] = []
+    for i, (qi, pi) in enumerate(zip(q, places, strict=True)):
+        change = 0
+        for j, (qj, pj) in enumerate(zip(q, places, strict=True)):
+            if i == j:
+                continue
+            s = 1.0 if pi < pj else 0.5 if pi == pj else 0.0
+            change += round(k * (s - qi / (qi + qj)))
+        changes.append(change)
+    return changes
+
+
+def play_game(elos: dict[int, int], places: dict[int, int]) -> dict[int, int]:
+    """Apply a game's results to the ELOs of its players and return their new ELOs."""
+    user_xids = sorted(places)
+    before = [elos.get(xid, DEFAULT_ELO) for xid in user_xids]
+    changes = elo_changes(before, [places[xid] for xid in user_xids])
+    after = {xid: elo + change for xid, elo, change in zip(user_xids, before, changes, strict=True)}
+    elos.update(after)
+    return after
+
+
+def load_elos(guild_xid: int, channel_xid: int, user_xids: Iterable[int]) -> dict[int, int]:
+    """Load the current ELOs of the given players, players without a record are left out."""
+    rows = DatabaseSession.execute(
+        select(Record.user_xid, Record.elo).where(
+            Record.guild_xid == guild_xid,
+            Record.channel_xid == channel_xid,
+            Record.user_xid.in_(list(user_xids)),
+        ),
+    )
+    return dict(rows.tuples().all())
+
+
+def save_elos(
+    guild_xid: int,
+    channel_xid: int,
+    elos: dict[int, int],
+    existing: Iterable[int],
+) -> None:
+    """
+    Write ELOs back to the database without committing.
+
+    Records of the `existing` players are changed with a single `UPDATE ... FROM
+    (VALUES ...)` statement and the rest are created with a single `INSERT`.
+    """
+    now = datetime.now(tz=pytz.utc)
+    existing = set(existing)
+    updated = [(xid, elo) for xid, elo in elos.items() if xid in existing]
+    created = [
+        {
+            "guild_xid": guild_xid,
+            "channel_xid": channel_xid,
+            "user_xid": xid,
+            "elo": elo,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for xid, elo in elos.items()
+        if xid not in existing
+    ]
+    if updated:
+        data = values(
+            column("user_xid", BigInteger),
+            column("elo", Integer),
+            name="data",
+        ).data(updated)
+        DatabaseSession.execute(
+            update(Record)
+            .where(
+                Record.guild_xid == guild_xid,
+                Record.channel_xid == channel_xid,
+                Record.user_xid == data.c.user_xid,
+            )
+            .values(elo=data.c.elo, updated_at=now)
+            .execution_options(synchronize_session=False),
+        )
+    if created:
+        upsert = insert(Record).values(created)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[Record.guild_xid, Record.channel_xid, Record.user_xid],
+            set_={"elo": upsert.excluded.elo, "updated_at": upsert.excluded.updated_at},
+        )
+        DatabaseSession.execute(upsert)
+
+
+@tracer.wrap()
+def update_elos(guild_xid: int, channel_xid: int, places: dict[int, int]) -> dict[int, int]:
+    """Apply a game's results to the records of its players and return their new ELOs."""
+    elos = load_elos(guild_xid, channel_xid, places)
+    existing = set(elos)
+    after = play_game(elos, places)
+    save_elos(guild_xid, channel_xid, after, existing)
+    return after
+
+
+def replay_plays(
+    plays: Iterable[tuple[int, int, int | None]],
+    elos: dict[int, int] | None = None,
+) -> dict[int, int]:
+    """
+    Replay games in order, from `(game_id, user_xid, points)` rows grouped by game.
+
+    Starts over from the default ELO for every player unless `elos` is given.
+    """
+    elos = {} if elos is None else elos
+    for _, rows in groupby(plays, key=itemgetter(0)):
+        play_game(elos, {user_xid: place(points) for _, user_xid, points in rows})
+    return elos
+
+
+@tracer.wrap()
+def replay(guild_xid: int, channel_xid: int, batch_size: int = REPLAY_BATCH_SIZE) -> int:
+    """
+    Recompute every ELO in a channel from the history of its confirmed games.
+
+    Plays are streamed from the database `batch_size` rows at a time, in the order that
+    their games were confirmed, so memory use only grows with the number of players.
+    Returns the number of records written.
+    """
+    confirmed = (
+        select(Play.game_id, func.max(Play.confirmed_at).label("confirmed_at"))  # type: ignore
+        .join(Game, Game.id == Play.game_id)
+        .where(Game.guild_xid == guild_xid, Game.channel_xid == channel_xid)
+        .group_by(Play.game_id)
+        .having(func.count(Play.confirmed_at) == func.count())
+        .subquery()
+    )
+    rows = DatabaseSession.execute(
+        select(Play.game_id, Play.user_xid, Play.points)  # type: ignore
+        .join(confirmed, confirmed.c.game_id == Play.game_id)
+        .order_by(confirmed.c.confirmed_at, Play.game_id)
+        .execution_options(yield_per=batch_size),
+    )
+    elos = replay_plays((game_id, user_xid, points) for game_id, user_xid, points in rows)
+    existing = DatabaseSession.scalars(
+        select(Record.user_xid).where(
+            Record.guild_xid == guild_xid,
+            Record.channel_xid == channel_xid,
+        ),
+    ).all()
+    save_elos(guild_xid, channel_xid, elos, existing)
+    DatabaseSession.commit()
+    logger.info("replayed ELO for %s players in channel %s", len(elos), channel_xid)
+    return len(elos)
+
+
+@database_sync_to_async
+def replay_elo(guild_xid: int, channel_xid: int, batch_size: int = REPLAY_BATCH_SIZE) -> int:
+    return replay(guild_xid, channel_xid, batch_size)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from .database import DatabaseSession
+from .settings import settings
+from .upsert_cache import caches, clear_upsert_caches, set_degraded
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+    from sqlalchemy.ext.asyncio import AsyncConnection
+
+    from .upsert_cache import UpsertCache
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "spellbot_invalidations"
+
+
+def _notify(message: dict[str, Any]) -> None:
+    DatabaseSession.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": json.dumps(message)},
+    )
+
+
+def invalidate(cache: UpsertCache, key: Hashable) -> None:
+    """Evict a changed row from a cache here and in every other process."""
+    cache.invalidate(key)
+    _notify({"cache": cache.name, "key": key})
+
+
+def invalidate_all() -> None:
+    """Clear every cache here and in every other process."""
+    clear_upsert_caches()
+    _notify({"cache": None})
+
+
+def handle_message(payload: str) -> None:
+    message = json.loads(payload)
+    if message["cache"] is None:
+        clear_upsert_caches()
+        return
+    cache = caches.get(message["cache"])
+    if cache is None:
+        logger.warning("invalidation for unknown cache: %s", payload)
+        return
+    key = message["key"]
+    # JSON has no tuples, but composite keys are tuples.
+    cache.invalidate(tuple(key) if isinstance(key, list) else key)
+
+
+class InvalidationBus:
+    """
+    Evicts rows from this process's caches when other processes change them.
+
+    Every invalidation is also published with Postgres `NOTIFY` by the session that
+    made the change, and this listens for them on a dedicated connection. Checking the
+    connection every `heartbeat_s` seconds notices when it has been lost, as does the
+    connection itself when it's closed. Until it's back, invalidations may be missed,
+    so the caches are put into degraded mode where entries expire after a short TTL.
+    Once it's back, anything missed in the meantime is forgotten by clearing them.
+    """
+
+    def __init__(self, db_url: str, app: str, *, heartbeat_s: float | None = None) -> None:
+        self.heartbeat_s = heartbeat_s or settings.INVALIDATION_HEARTBEAT_S
+        self.engine = create_async_engine(
+            make_url(db_url).set(drivername="postgresql+asyncpg"),
+            connect_args={"server_settings": {"application_name": app}},
+            isolation_level="AUTOCOMMIT",
+            poolclass=NullPool,
+        )
+        self.connection: AsyncConnection | None = None
+        self.raw: Any = None
+        self.task: asyncio.Task[None] | None = None
+
+    @property
+    def listening(self) -> bool:
+        return self.connection is not None
+
+    def on_notify(self, _connection: Any, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            handle_message(payload)
+        except Exception:
+            logger.exception("bad invalidation: %s", payload)
+
+    def on_terminate(self, _connection: Any) -> None:
+        set_degraded(True)
+
+    async def heartbeat(self) -> bool:
+        """Start listening, or check that we still are; returns True if listening."""
+        try:
+            async with asyncio.timeout(self.heartbeat_s):
+                if self.connection is None:
+                    self.connection = await self.engine.connect()
+                    raw = (await self.connection.get_raw_connection()).driver_connection
+                    assert raw is not None
+                    raw.add_termination_listener(self.on_terminate)
+                    self.raw = raw
+                    await raw.add_listener(CHANNEL, self.on_notify)
+                    logger.info("listening for cache invalidations")
+                    # Anything could have changed while we weren't listening.
+                    clear_upsert_caches()
+                else:
+                    await self.connection.execute(text("SELECT 1"))
+            set_degraded(False)
+        except Exception:
+            logger.warning("lost cache invalidation connection", exc_info=True)
+            set_degraded(True)
+            await self._disconnect()
+        return self.listening
+
+    async def run(self) -> None:
+        while True:
+            await self.heartbeat()
+            await asyncio.sleep(self.heartbeat_s)
+
+    def start(self) -> None:
+        set_degraded(True)
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        await self._disconnect()
+        await self.engine.dispose()
+
+    async def _disconnect(self) -> None:
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        if self.raw is not None:
+            # Closing the connection on purpose isn't losing it.
+            self.raw.remove_termination_listener(self.on_terminate)
+            self.raw = None
+        with suppress(Exception):
+            await connection.invalidate()
+        with suppress(Exception):
+            await connection.close()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import suppress
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from .settings import settings
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+# The advisory lock that the leader holds, an arbitrary number that's unique to SpellBot.
+LEADER_LOCK_KEY = 0x5B_7A5C_0001
+
+
+class LeaderElection:
+    """
+    Elects one process, of all of the processes running the bot, to run background tasks.
+
+    The leader is whichever process holds a session level Postgres advisory lock. Every
+    process campaigns for the lock on a dedicated connection every `heartbeat_s` seconds.
+    The leader uses that heartbeat to check that its connection, and with it its lock,
+    is still alive, and steps down if it isn't or if the check takes too long.
+
+    Postgres releases the lock as soon as the leader's session ends, whether it stopped
+    cleanly, crashed, or lost its connection, and another process then takes over on
+    its next heartbeat. A leader that loses its connection may keep running tasks until
+    its own next heartbeat, so background tasks must tolerate a brief overlap.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        app: str,
+        *,
+        key: int = LEADER_LOCK_KEY,
+        heartbeat_s: float | None = None,
+    ) -> None:
+        self.key = key
+        self.heartbeat_s = heartbeat_s or settings.LEADER_HEARTBEAT_S
+        self.engine = create_async_engine(
+            make_url(db_url).set(drivername="postgresql+asyncpg"),
+            connect_args={"server_settings": {"application_name": app}},
+            isolation_level="AUTOCOMMIT",
+            poolclass=NullPool,
+        )
+        self.connection: AsyncConnection | None = None
+        self.is_leader = False
+        self.task: asyncio.Task[None] | None = None
+
+    async def heartbeat(self) -> bool:
+        """Campaign for leadership, or check that it is still held; returns True if leader."""
+        try:
+            async with asyncio.timeout(self.heartbeat_s):
+                if self.connection is None:
+                    self.connection = await self.engine.connect()
+                if self.is_leader:
+                    await self.connection.execute(text("SELECT 1"))
+                else:
+                    acquired = await self.connection.scalar(
+                        text("SELECT pg_try_advisory_lock(:key)"),
+                        {"key": self.key},
+                    )
+                    if acquired:
+                        logger.info("elected leader")
+                    self.is_leader = bool(acquired)
+        except Exception:
+            logger.warning("lost leader election connection", exc_info=True)
+            if self.is_leader:
+                logger.warning("stepping down as leader")
+            self.is_leader = False
+            await self._disconnect()
+        return self.is_leader
+
+    async def run(self) -> None:
+        while True:
+            await self.heartbeat()
+            await asyncio.sleep(self.heartbeat_s)
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop campaigning and hand off leadership, if held, to another process."""
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        if self.is_leader and self.connection is not None:
+            with suppress(Exception):
+                await self.connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"),
+                    {"key": self.key},
+                )
+            logger.info("stepped down as leader")
+        self.is_leader = False
+        await self._disconnect()
+        await self.engine.dispose()
+
+    async def _disconnect(self) -> None:
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        with suppress(Exception):
+            await connection.invalidate()
+        with suppress(Exception):
+            await connection.close()
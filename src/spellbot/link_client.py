@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import aiohttp
+from aiohttp.client_exceptions import ClientError
+
+from .settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(ClientError):
+    """Requests to a service are failing fast because it has been failing."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"{name} circuit breaker is open")
+
+
+class LinkTimeoutError(aiohttp.ServerTimeoutError):
+    """Every attempt at a request to a service timed out."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"{name} request timed out")
+
+
+class LinkResponse(NamedTuple):
+    status: int
+    body: bytes
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a service after it has failed too many times in a row.
+
+    Once `failures` requests in a row have failed the breaker opens and every request
+    fails immediately. After `reset_s` seconds a single trial request is let through:
+    if it succeeds the breaker closes again, otherwise it stays open for another
+    `reset_s` seconds.
+    """
+
+    def __init__(self, failures: int, reset_s: float) -> None:
+        self.threshold = failures
+        self.reset_s = reset_s
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self.trial and time.monotonic() - self.opened_at >= self.reset_s:
+            self.trial = True
+            return True
+        return False
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self.trial = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class LinkClient:
+    """
+    A long-lived HTTP client for one of the services that SpellBot creates game links with.
+
+    Requests share a pool of keep-alive connections, so that starting a game doesn't
+    have to wait for a new TCP and TLS handshake every time. The session is created on
+    first use, since it has to be created inside of the running event loop, and must
+    be closed with `close()` on shutdown.
+
+    A request that hasn't finished after `hedge_after_s` seconds is hedged, unless every
+    connection is busy: the same request is sent again and whichever of the two answers
+    first wins. Creating a game link has no side effects other than an unused game, so
+    that is always safe. Failed requests are retried up to `attempts` times in all with
+    exponential back off, and when every attempt fails the failure is reported to the
+    service's circuit breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        timeout_s: float,
+        hedge_after_s: float | None = None,
+        attempts: int | None = None,
+    ) -> None:
+        self.name = name
+        self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+        self.hedge_after_s = hedge_after_s or settings.LINK_HEDGE_AFTER_S
+        self.attempts = attempts or settings.LINK_ATTEMPTS
+        self.breaker = CircuitBreaker(settings.LINK_BREAKER_FAILURES, settings.LINK_BREAKER_RESET_S)
+        self._session: aiohttp.ClientSession | None = None
+        self._in_flight = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.LINK_POOL_SIZE,
+                keepalive_timeout=settings.LINK_KEEPALIVE_S,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def post(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str],
+        json: Any = None,
+    ) -> LinkResponse:
+        """
+        Send a POST request and return the response.
+
+        Server errors are retried. If they persist, the last of them is returned. Raises
+        `CircuitOpenError` without sending anything when the circuit breaker is open.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name)
+        response: LinkResponse | None = None
+        for attempt in range(self.attempts):
+            if attempt:
+                await asyncio.sleep(settings.LINK_BACKOFF_S * 2 ** (attempt - 1))
+            try:
+                response = await self._hedged(url, headers, json)
+            except (ClientError, TimeoutError) as ex:
+                logger.warning("%s request failed (attempt %s): %s", self.name, attempt + 1, ex)
+                if attempt + 1 < self.attempts:
+                    continue
+                self.breaker.failure()
+                if isinstance(ex, ClientError):
+                    raise
+                raise LinkTimeoutError(self.name) from ex
+            if response.status < 500:
+                self.breaker.success()
+                return response
+            logger.warning("%s request failed (attempt %s): %s", self.name, attempt + 1, response)
+        self.breaker.failure()
+        assert response is not None
+        return response
+
+    async def _send(self, url: str, headers: Mapping[str, str], json: Any) -> LinkResponse:
+        self._in_flight += 1
+        try:
+            async with self.session.post(url, headers=headers, json=json) as resp:
+                return LinkResponse(resp.status, await resp.read())
+        finally:
+            self._in_flight -= 1
+
+    async def _hedged(self, url: str, headers: Mapping[str, str], json: Any) -> LinkResponse:
+        tasks = {asyncio.ensure_future(self._send(url, headers, json))}
+        hedged = False
+        try:
+            while True:
+                done, tasks = await asyncio.wait(
+                    tasks,
+                    timeout=None if hedged else self.hedge_after_s,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task.exception() is None and task.result().status < 500:
+                        return task.result()
+                if not tasks:
+                    # Every request failed, so report how the last one of them did.
+                    return done.pop().result()
+                # When every connection is busy the request is most likely just waiting
+                # for one of them, and hedging it would only make everybody wait longer.
+                if not hedged and self._in_flight < settings.LINK_POOL_SIZE:
+                    tasks.add(asyncio.ensure_future(self._send(url, headers, json)))
+                    hedged = True
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from hashlib import blake2b
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from .database import release_connection
+from .prometheus import LOCK_WAIT_SECONDS
+from .settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Iterable
+
+    from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+# A lock key is a namespace followed by the integer ids that identify the resource.
+LockKey = tuple[str | int, ...]
+
+
+def queue_key(
+    guild_xid: int,
+    channel_xid: int,
+    format: int,
+    seats: int,
+    service: int,
+) -> LockKey:
+    """Key for the pending games that a player could be matched into."""
+    return ("queue", guild_xid, channel_xid, format, seats, service)
+
+
+def user_key(user_xid: int) -> LockKey:
+    """Key for a player that is joining games."""
+    return ("user", user_xid)
+
+
+def seat_key(user_xid: int) -> LockKey:
+    """Key for a player whose queue entries are being seated or removed."""
+    return ("seat", user_xid)
+
+
+class _Entry:
+    __slots__ = ("lock", "refs")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.refs = 0
+
+
+class LockManager:
+    """
+    Hands out asyncio locks keyed by the queues and players affected by an interaction.
+
+    Keys are always acquired in sorted order, so any two callers that share some keys
+    will contend on the lowest shared key first and can never deadlock each other.
+    Callers that need further locks while already holding some may only take `seat`
+    keys, and holders of `seat` keys never wait on any other lock. That gives a strict
+    two level hierarchy which is also deadlock free.
+
+    Locks are created on demand and discarded once nobody holds or waits on them.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[LockKey, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def locked(self, key: LockKey) -> bool:
+        entry = self._entries.get(key)
+        return bool(entry and entry.lock.locked())
+
+    def _checkout(self, key: LockKey) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+        entry.refs += 1
+        return entry
+
+    def _checkin(self, key: LockKey) -> None:
+        entry = self._entries[key]
+        entry.refs -= 1
+        if entry.refs == 0:
+            del self._entries[key]
+
+    @asynccontextmanager
+    async def acquire(self, keys: Iterable[LockKey]) -> AsyncGenerator[None, None]:
+        ordered = sorted(set(keys))
+        entries = [self._checkout(key) for key in ordered]
+        acquired: list[_Entry] = []
+        try:
+            start = time.perf_counter()
+            for entry in entries:
+                await entry.lock.acquire()
+                acquired.append(entry)
+            if ordered:
+                LOCK_WAIT_SECONDS.observe(time.perf_counter() - start, lock=str(ordered[0][0]))
+            yield
+        finally:
+            for entry in reversed(acquired):
+                entry.lock.release()
+            for key in ordered:
+                self._checkin(key)
+
+
+def advisory_key(key: LockKey) -> int:
+    """Map a lock key onto the signed 64 bit integer space of Postgres advisory locks."""
+    digest = blake2b(repr(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+# The connection holding the advisory locks of the current task, with its manager and task.
+_held: ContextVar[
+    tuple[AdvisoryLockManager, asyncio.Task[object] | None, AsyncConnection] | None
+] = ContextVar("held_advisory_locks", default=None)
+
+
+class AdvisoryLockManager:
+    """
+    Hands out Postgres advisory locks keyed like those of `LockManager`.
+
+    This is the lock manager used when the bot runs as a cluster of processes. Players
+    in different guilds, and so on different shards and in different processes, can be
+    matched into the same games through mirrored channels, and a player can click on
+    the same game in several guilds at once. So the locks that make matchmaking safe
+    have to be shared by every process, which session level advisory locks are.
+
+    Keys are hashed to integers and acquired in sorted order, on a connection that is
+    held until they're released. Nested calls from the same task reuse that connection
+    so the two level hierarchy of `LockManager` carries over unchanged, and a task that
+    holds locks never waits on the pool for another connection. If the connection is
+    lost while locks are held, Postgres releases them along with the session.
+
+    Changes made while holding the locks are visible to the next holder because the
+    bot's sessions autocommit every statement.
+    """
+
+    def __init__(self, db_url: str, app: str, *, pool_size: int | None = None) -> None:
+        self.engine = create_async_engine(
+            make_url(db_url).set(drivername="postgresql+asyncpg"),
+            connect_args={"server_settings": {"application_name": app}},
+            isolation_level="AUTOCOMMIT",
+            pool_size=pool_size or settings.CLUSTER_LOCK_POOL_SIZE,
+            max_overflow=0,
+            pool_pre_ping=True,
+        )
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+    @asynccontextmanager
+    async def acquire(self, keys: Iterable[LockKey]) -> AsyncGenerator[None, None]:
+        unique = set(keys)
+        held = _held.get()
+        if held is not None and held[:2] == (self, asyncio.current_task()):
+            async with self._locked(held[2], unique):
+                yield
+            return
+
+        # Tasks that hold locks may need another connection from the session pool, so
+        # waiting for locks while holding on to one could starve them of connections.
+        await release_connection()
+        async with self.engine.connect() as connection:
+            token = _held.set((self, asyncio.current_task(), connection))
+            try:
+                async with self._locked(connection, unique):
+                    yield
+            finally:
+                _held.reset(token)
+
+    @asynccontextmanager
+    async def _locked(
+        self,
+        connection: AsyncConnection,
+        keys: set[LockKey],
+    ) -> AsyncGenerator[None, None]:
+        ordered = sorted({advisory_key(key) for key in keys})
+        acquired = 0
+        try:
+            start = time.perf_counter()
+            for key in ordered:
+                await connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+                acquired += 1
+            if keys:
+                LOCK_WAIT_SECONDS.observe(time.perf_counter() - start, lock=str(min(keys)[0]))
+            yield
+        finally:
+            if acquired < len(ordered):
+                # Interrupted while waiting, so we can't know which locks the session has.
+                await self._discard(connection)
+            else:
+                await self._release(connection, ordered)
+
+    async def _release(self, connection: AsyncConnection, keys: list[int]) -> None:
+        if not keys:
+            return
+        try:
+            await connection.execute(
+                text("SELECT pg_advisory_unlock(key) FROM unnest(CAST(:keys AS bigint[])) key"),
+                {"keys": keys},
+            )
+        except Exception:
+            logger.warning("failed to release advisory locks", exc_info=True)
+            await self._discard(connection)
+        except BaseException:
+            await self._discard(connection)
+            raise
+
+    async def _discard(self, connection: AsyncConnection) -> None:
+        # Closing the session is the only other way to be sure that its locks are gone,
+        # rather than returning a connection that still holds some of them to the pool.
+        await asyncio.shield(connection.invalidate())
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, cast
+
+import pytz
+from sqlalchemy import or_, select
+
+from .database import DatabaseSession, database_sync_to_async
+from .locks import queue_key
+from .models import Block, Game, GameStatus, Queue
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .locks import LockKey
+
+logger = logging.getLogger(__name__)
+
+
+class MatchmakingIndexError(RuntimeError):
+    """The matchmaking index disagrees with the database."""
+
+
+def _naive_utc(ts: datetime) -> datetime:
+    if ts.tzinfo is None:
+        return ts
+    return ts.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+class PendingGame:
+    __slots__ = ("game_id", "key", "player_xids", "seats", "updated_at")
+
+    def __init__(self, game_id: int, key: LockKey, seats: int, updated_at: datetime) -> None:
+        self.game_id = game_id
+        self.key = key
+        self.seats = seats
+        self.updated_at = _naive_utc(updated_at)
+        self.player_xids: set[int] = set()
+
+
+class MatchmakingIndex:
+    """
+    In-process index of pending games, keyed by the queue they can be matched from.
+
+    The index is written to by the same service methods that write `Game` and `Queue`
+    rows, always after their changes have been committed, so that finding a game to
+    join doesn't have to go to the database at all. It is disabled until it has been
+    built from the database with `rebuild()`.
+
+    The block lists of players that are looking for games are cached here as well.
+    They're loaded on first use and dropped whenever somebody's blocks change.
+
+    When `verify` is set, every lookup first checks the entire index against the
+    database and raises `MatchmakingIndexError` on any difference. That's only meant
+    to be used in tests.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.verify = False
+        self._queues: dict[LockKey, dict[int, PendingGame]] = {}
+        self._games: dict[int, PendingGame] = {}
+        self._blocks: dict[int, frozenset[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, game_id: int) -> bool:
+        return game_id in self._games
+
+    def clear(self) -> None:
+        self._queues = {}
+        self._games = {}
+        self._blocks = {}
+
+    def disable(self) -> None:
+        self.enabled = False
+        self.clear()
+
+    def rebuild(self) -> None:
+        self.clear()
+        self._load(self._games, self._queues)
+        self.enabled = True
+        logger.info("matchmaking index built with %s pending games", len(self._games))
+
+    def _load(
+        self,
+        games: dict[int, PendingGame],
+        queues: dict[LockKey, dict[int, PendingGame]],
+    ) -> None:
+        rows = DatabaseSession.execute(
+            select(
+                Game.id,
+                Game.guild_xid,
+                Game.channel_xid,  # type: ignore
+                Game.format,  # type: ignore
+                Game.seats,  # type: ignore
+                Game.service,  # type: ignore
+                Game.updated_at,
+                Queue.user_xid,
+            )
+            .join(Queue, isouter=True)
+            .where(
+                Game.status == GameStatus.PENDING.value,
+                Game.deleted_at.is_(None),
+            ),
+        )
+        for game_id, guild_xid, channel_xid, format, seats, service, updated_at, xid in rows:
+            pending = games.get(game_id)
+            if pending is None:
+                key = queue_key(guild_xid, channel_xid, format, seats, service)
+                pending = games[game_id] = PendingGame(game_id, key, seats, updated_at)
+                queues.setdefault(key, {})[game_id] = pending
+            if xid is not None:
+                pending.player_xids.add(xid)
+
+    def check(self) -> list[str]:
+        """Compare the index to the database and return a description of any differences."""
+        games: dict[int, PendingGame] = {}
+        self._load(games, {})
+        problems = [
+            f"game {game_id} is pending but not indexed"
+            for game_id in sorted(games.keys() - self._games.keys())
+        ]
+        problems.extend(
+            f"game {game_id} is indexed but not pending"
+            for game_id in sorted(self._games.keys() - games.keys())
+        )
+        for game_id in sorted(games.keys() & self._games.keys()):
+            expected, actual = games[game_id], self._games[game_id]
+            if expected.key != actual.key:
+                problems.append(f"game {game_id} is indexed as {actual.key}, not {expected.key}")
+            if self._queues.get(actual.key, {}).get(game_id) is not actual:
+                problems.append(f"game {game_id} is missing from queue {actual.key}")
+            if expected.player_xids != actual.player_xids:
+                problems.append(
+                    f"game {game_id} has players {sorted(expected.player_xids)},"
+                    f" not {sorted(actual.player_xids)}",
+                )
+        for xid, blocks in self._blocks.items():
+            if blocks != self._load_blocks(xid):
+                problems.append(f"user {xid} has stale cached blocks")
+        return problems
+
+    def _load_blocks(self, xid: int) -> frozenset[int]:
+        rows = DatabaseSession.execute(
+            select(Block.user_xid, Block.blocked_user_xid).where(
+                or_(Block.user_xid == xid, Block.blocked_user_xid == xid),
+            ),
+        )
+        return frozenset(blocked if blocker == xid else blocker for blocker, blocked in rows)
+
+    def conflicts(self, xids: Iterable[int]) -> set[int]:
+        """Return every user that has blocked, or been blocked by, any of the given users."""
+        conflicts: set[int] = set()
+        for xid in xids:
+            blocks = self._blocks.get(xid)
+            if blocks is None:
+                blocks = self._blocks[xid] = self._load_blocks(xid)
+            conflicts.update(blocks)
+        return conflicts
+
+    def candidates(self, keys: Iterable[LockKey], joiners: list[int]) -> list[int]:
+        """Return the ids of games that the joiners could be seated in, oldest first."""
+        if self.verify and (problems := self.check()):
+            raise MatchmakingIndexError("; ".join(problems))
+        conflicts = self.conflicts(joiners)
+        found = [
+            game
+            for key in dict.fromkeys(keys)
+            for game in self._queues.get(key, {}).values()
+            if (not game.player_xids or len(game.player_xids) + len(joiners) <= game.seats)
+            and not game.player_xids & conflicts
+        ]
+        found.sort(key=lambda game: (game.updated_at, game.game_id))
+        return [game.game_id for game in found]
+
+    def player_count(self, game_id: int) -> int | None:
+        game = self._games.get(game_id)
+        return len(game.player_xids) if game else None
+
+    def add_game(self, game: Game) -> None:
+        if not self.enabled:
+            return
+        game_id = cast(int, game.id)
+        guild_xid = cast(int, game.guild_xid)
+        key = queue_key(guild_xid, game.channel_xid, game.format, game.seats, game.service)
+        pending = PendingGame(game_id, key, game.seats, cast(datetime, game.updated_at))
+        self._games[game_id] = pending
+        self._queues.setdefault(key, {})[game_id] = pending
+
+    def add_players(self, game_id: int, xids: Iterable[int]) -> None:
+        if not self.enabled:
+            return
+        if game := self._games.get(game_id):
+            game.player_xids.update(xids)
+
+    def remove_players(self, xids: Iterable[int], game_ids: Iterable[int] | None = None) -> None:
+        """Remove players from the given games, or from every game if none are given."""
+        if not self.enabled:
+            return
+        xids = set(xids)
+        games = (
+            self._games.values()
+            if game_ids is None
+            else [game for gid in game_ids if (game := self._games.get(gid))]
+        )
+        for game in games:
+            game.player_xids -= xids
+
+    def remove_games(self, game_ids: Iterable[int]) -> None:
+        if not self.enabled:
+            return
+        for game_id in game_ids:
+            game = self._games.pop(game_id, None)
+            if game is None:
+                continue
+            queue = self._queues.get(game.key)
+            if queue is not None:
+                queue.pop(game_id, None)
+                if not queue:
+                    del self._queues[game.key]
+
+    def touch(self, game_ids: Iterable[int], updated_at: datetime) -> None:
+        if not self.enabled:
+            return
+        for game_id in game_ids:
+            if game := self._games.get(game_id):
+                game.updated_at = _naive_utc(updated_at)
+
+    def invalidate_blocks(self, *xids: int) -> None:
+        """Drop the cached blocks of the given users, or of everybody if none are given."""
+        if not xids:
+            self._blocks = {}
+        for xid in xids:
+            self._blocks.pop(xid, None)
+
+
+matchmaking_index = MatchmakingIndex()
+
+
+@database_sync_to_async
+def rebuild_matchmaking_index() -> None:
+    matchmaking_index.rebuild()
@@ -48,11 +48,23 @@ def skip_if_no_metrics(f: Any) -> Callable[..., None]:  # pragma: no cover
     return wrapper
 
 
+INTERACTION_CALLBACK = re.compile(r"/interactions/([0-9]+)/([^/]+)/callback")
+WEBHOOK_MESSAGE = re.compile(r"/webhooks/([0-9]+)/([^/]+)/messages/@original")
+
+
+def discord_route(path: str) -> tuple[str, dict[str, str]]:
+    """Return the template of a Discord API route, and the values filled into it."""
+    if matches := INTERACTION_CALLBACK.match(path):
+        resource = r"/interactions/{interaction_id}/{interaction_token}/callback"
+        return resource, {"interaction_id": matches[1], "interaction_token": matches[2]}
+    if matches := WEBHOOK_MESSAGE.match(path):
+        resource = r"/webhooks/{application_id}/{interaction_token}/messages/@original"
+        return resource, {"application_id": matches[1], "interaction_token": matches[2]}
+    return path, {}
+
+
 @skip_if_no_metrics
 def patch_discord() -> None:  # pragma: no cover
-    interaction_callback = re.compile(r"/interactions/([0-9]+)/([^/]+)/callback")
-    webhook_message = re.compile(r"/webhooks/([0-9]+)/([^/]+)/messages/@original")
-
     def request(  # pragma: no cover
         wrapped: Callable,  # type: ignore
         instance: Any,
@@ -60,18 +72,7 @@ def patch_discord() -> None:  # pragma: no cover
         kwargs: Any,
     ) -> Any:
         route: Route = args[0]
-        path: str = route.path
-        additional_tags = {}
-        if matches := interaction_callback.match(path):
-            resource = r"/interactions/{interaction_id}/{interaction_token}/callback"
-            additional_tags["interaction_id"] = matches[1]
-            additional_tags["interaction_token"] = matches[2]
-        elif matches := webhook_message.match(path):
-            resource = r"/webhooks/{application_id}/{interaction_token}/messages/@original"
-            additional_tags["application_id"] = matches[1]
-            additional_tags["interaction_token"] = matches[2]
-        else:
-            resource = path
+        resource, additional_tags = discord_route(route.path)
         with tracer.trace(service="discord", name="http", resource=resource) as span:
             span.set_tags(
                 {
@@ -0,0 +1,50 @@
+"""
+Adds play counts.
+
+Revision ID: 3f8a6d2b5c71
+Revises: 9e4b7a2c1f60
+Create Date: 2024-11-08 10:26:44.519302
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f8a6d2b5c71"
+down_revision = "9e4b7a2c1f60"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "play_counts",
+        sa.Column("guild_xid", sa.BigInteger(), nullable=False),
+        sa.Column("channel_xid", sa.BigInteger(), nullable=False),
+        sa.Column("user_xid", sa.BigInteger(), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        sa.Column("games", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["channel_xid"], ["channels.xid"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["guild_xid"], ["guilds.xid"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_xid"], ["users.xid"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("guild_xid", "channel_xid", "user_xid", "period"),
+    )
+    op.create_index(
+        "ix_play_counts_leaderboard",
+        "play_counts",
+        ["guild_xid", "channel_xid", "period", "games"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_records_leaderboard",
+        "records",
+        ["guild_xid", "channel_xid", "elo"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_records_leaderboard", table_name="records")
+    op.drop_index("ix_play_counts_leaderboard", table_name="play_counts")
+    op.drop_table("play_counts")
@@ -0,0 +1,56 @@
+"""
+Adds jobs outbox.
+
+Revision ID: 5a1d3c7e9b2f
+Revises: 903df09f3815
+Create Date: 2024-11-02 10:41:27.518306
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5a1d3c7e9b2f"
+down_revision = "903df09f3815"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("(now() at time zone 'utc')"),
+            nullable=False,
+        ),
+        sa.Column("key", sa.String(length=100), nullable=False),
+        sa.Column("kind", sa.Integer(), nullable=False),
+        sa.Column("game_id", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "run_at",
+            sa.DateTime(),
+            server_default=sa.text("(now() at time zone 'utc')"),
+            nullable=False,
+        ),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("error", sa.String(length=1024), nullable=True),
+        sa.ForeignKeyConstraint(["game_id"], ["games.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("key"),
+    )
+    op.create_index(op.f("ix_jobs_game_id"), "jobs", ["game_id"], unique=False)
+    op.create_index(op.f("ix_jobs_run_at"), "jobs", ["run_at"], unique=False)
+    op.create_index(op.f("ix_jobs_finished_at"), "jobs", ["finished_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_jobs_finished_at"), table_name="jobs")
+    op.drop_index(op.f("ix_jobs_run_at"), table_name="jobs")
+    op.drop_index(op.f("ix_jobs_game_id"), table_name="jobs")
+    op.drop_table("jobs")
@@ -0,0 +1,49 @@
+"""
+Adds pooled links.
+
+Revision ID: 7c2e4f1a8d3b
+Revises: 5a1d3c7e9b2f
+Create Date: 2024-11-03 14:12:05.204417
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7c2e4f1a8d3b"
+down_revision = "5a1d3c7e9b2f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pooled_links",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("(now() at time zone 'utc')"),
+            nullable=False,
+        ),
+        sa.Column("service", sa.Integer(), nullable=False),
+        sa.Column("link", sa.String(length=255), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("taken_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("link"),
+    )
+    op.create_index(
+        op.f("ix_pooled_links_expires_at"),
+        "pooled_links",
+        ["expires_at"],
+        unique=False,
+    )
+    op.create_index(op.f("ix_pooled_links_taken_at"), "pooled_links", ["taken_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_pooled_links_taken_at"), table_name="pooled_links")
+    op.drop_index(op.f("ix_pooled_links_expires_at"), table_name="pooled_links")
+    op.drop_table("pooled_links")
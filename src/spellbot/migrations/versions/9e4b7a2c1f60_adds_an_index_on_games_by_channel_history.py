@@ -0,0 +1,29 @@
+"""
+Adds an index on games by channel history.
+
+Revision ID: 9e4b7a2c1f60
+Revises: 7c2e4f1a8d3b
+Create Date: 2024-11-05 19:41:27.318842
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9e4b7a2c1f60"
+down_revision = "7c2e4f1a8d3b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_games_channel_history",
+        "games",
+        ["guild_xid", "channel_xid", "updated_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_games_channel_history", table_name="games")
@@ -20,10 +20,13 @@ from .base import Base, create_all, literalquery, now, reverse_all  # noqa: I001
 from .award import GuildAward, UserAward, GuildAwardDict, UserAwardDict  # noqa: E402
 from .block import Block, BlockDict  # noqa: E402
 from .channel import Channel, ChannelDict  # noqa: E402
-from .game import Game, GameStatus, GameDict  # noqa: E402
+from .game import Game, GameStatus, GameDict, GameSnapshot, PlayerSnapshot  # noqa: E402
 from .guild import Guild, GuildDict  # noqa: E402
+from .job import Job, JobDict, JobKind  # noqa: E402
 from .mirror import Mirror, MirrorDict  # noqa: E402
 from .play import Play, PlayDict  # noqa: E402
+from .play_count import ALL_TIME, PlayCount, PlayCountDict, play_period  # noqa: E402
+from .pooled_link import PooledLink, PooledLinkDict  # noqa: E402
 from .post import Post, PostDict  # noqa: E402
 from .queue import Queue, QueueDict  # noqa: E402
 from .record import Record, RecordDict  # noqa: E402
@@ -32,6 +35,7 @@ from .verify import Verify, VerifyDict  # noqa: E402
 from .watch import Watch, WatchDict  # noqa: E402
 
 __all__ = [
+    "ALL_TIME",
     "Base",
     "Block",
     "BlockDict",
@@ -41,18 +45,28 @@ __all__ = [
     "Game",
     "GameDict",
     "GameDict",
+    "GameSnapshot",
     "GameStatus",
     "Guild",
     "GuildAward",
     "GuildAwardDict",
     "GuildDict",
     "import_models",
+    "Job",
+    "JobDict",
+    "JobKind",
     "literalquery",
     "Mirror",
     "MirrorDict",
     "now",
     "Play",
+    "PlayCount",
+    "PlayCountDict",
     "PlayDict",
+    "play_period",
+    "PlayerSnapshot",
+    "PooledLink",
+    "PooledLinkDict",
     "Post",
     "PostDict",
     "Queue",
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import Any
 
 import alembic
 import alembic.command
@@ -13,9 +13,6 @@ from sqlalchemy_utils import create_database, database_exists
 
 from . import import_models
 
-if TYPE_CHECKING:
-    from sqlalchemy.engine.base import Connection
-
 MODULE_ROOT = Path(__file__).resolve().parent
 PACKAGE_ROOT = MODULE_ROOT.parent
 MIGRATIONS_DIR = PACKAGE_ROOT / "migrations"
@@ -32,23 +29,25 @@ def create_all(database_url: str) -> None:
     engine = create_engine(database_url, echo=False)
     if not database_exists(engine.url):  # pragma: no cover
         create_database(engine.url)
-    connection: Connection = engine.connect()
-    config = alembic.config.Config(str(ALEMBIC_INI))
-    config.set_main_option("script_location", str(MIGRATIONS_DIR))
-    config.set_main_option("sqlalchemy.url", database_url)
-    config.attributes["connection"] = connection
-    alembic.command.upgrade(config, "head")
+    with engine.connect() as connection:
+        config = alembic.config.Config(str(ALEMBIC_INI))
+        config.set_main_option("script_location", str(MIGRATIONS_DIR))
+        config.set_main_option("sqlalchemy.url", database_url)
+        config.attributes["connection"] = connection
+        alembic.command.upgrade(config, "head")
+    engine.dispose()
 
 
 def reverse_all(database_url: str) -> None:
     import_models()
     engine = create_engine(database_url, echo=False)
-    connection: Connection = engine.connect()
-    config = alembic.config.Config(str(ALEMBIC_INI))
-    config.set_main_option("script_location", str(MIGRATIONS_DIR))
-    config.set_main_option("sqlalchemy.url", database_url)
-    config.attributes["connection"] = connection
-    alembic.command.downgrade(config, "base")
+    with engine.connect() as connection:
+        config = alembic.config.Config(str(ALEMBIC_INI))
+        config.set_main_option("script_location", str(MIGRATIONS_DIR))
+        config.set_main_option("sqlalchemy.url", database_url)
+        config.attributes["connection"] = connection
+        alembic.command.downgrade(config, "base")
+    engine.dispose()
 
 
 class StringLiteral(String):  # pragma: no cover
@@ -2,13 +2,22 @@ from __future__ import annotations
 
 from datetime import datetime
 from enum import Enum, auto
-from typing import TYPE_CHECKING, TypedDict, cast
+from typing import TYPE_CHECKING, NamedTuple, TypedDict, cast
 
 import discord
 from dateutil import tz
-from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, String
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql.expression import false, text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.orm import joinedload, relationship
+from sqlalchemy.sql.expression import and_, false, null, text
 
 from spellbot.enums import GameFormat, GameService
 from spellbot.settings import settings
@@ -50,6 +59,10 @@ class Game(Base):
     """Represents a pending or started SpellTable game."""
 
     __tablename__ = "games"
+    __table_args__ = (
+        # Supports paging through a channel's game history, see PlaysService.
+        Index("ix_games_channel_history", "guild_xid", "channel_xid", "updated_at", "id"),
+    )
 
     id = Column(
         Integer,
@@ -209,18 +222,210 @@ class Game(Base):
     def show_links(self, dm: bool = False) -> bool:
         return True if dm else self.guild.show_links
 
+    @property
+    def spectate_link(self) -> str | None:
+        return f"{self.spelltable_link}?spectate=true" if self.spelltable_link else None
+
+    @property
+    def jump_links(self) -> dict[int, str]:
+        return {post.guild_xid: post.jump_link for post in self.posts or []}
+
+    @property
+    def format_name(self) -> str:
+        return str(GameFormat(self.format))
+
+    @property
+    def confirmed(self) -> bool:
+        from spellbot.database import DatabaseSession
+
+        from . import Play, User
+
+        player_count = DatabaseSession.query(User).filter(User.xid.in_(self.player_xids)).count()
+        confirmed_count = (
+            DatabaseSession.query(Play)
+            .filter(
+                Play.game_id == self.id,
+                ~Play.confirmed_at.is_(None),
+            )
+            .count()
+        )
+        return player_count == confirmed_count
+
+    def snapshot(self) -> GameSnapshot:
+        return GameSnapshot.load(cast(int, self.id))
+
+    def to_embed(self, dm: bool = False) -> discord.Embed:
+        return self.snapshot().to_embed(dm)
+
+    def to_dict(self) -> GameDict:
+        return {
+            "id": self.id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "started_at": self.started_at,
+            "deleted_at": self.deleted_at,
+            "guild_xid": self.guild_xid,
+            "channel_xid": self.channel_xid,
+            "posts": [post.to_dict() for post in self.posts],
+            "voice_xid": self.voice_xid,
+            "voice_invite_link": self.voice_invite_link,
+            "seats": self.seats,
+            "status": self.status,
+            "format": self.format,
+            "service": self.service,
+            "spelltable_link": self.spelltable_link,
+            "spectate_link": self.spectate_link,
+            "jump_links": self.jump_links,
+            "confirmed": self.confirmed,
+            "requires_confirmation": self.channel.require_confirmation,
+        }
+
+
+class PlayerSnapshot(NamedTuple):
+    xid: int
+    name: str
+    points: int | None
+    confirmed: bool
+    elo: int | None
+
+
+class GameSnapshot(NamedTuple):
+    """
+    Everything needed to render a game's embed, loaded up front.
+
+    Rendering an embed straight from a `Game` runs queries for the players and then
+    for each player's points and ELO. A snapshot fetches all of that at once and is
+    immutable, so it can be rendered any number of times without touching the
+    database again.
+    """
+
+    id: int
+    guild_xid: int
+    channel_xid: int
+    seats: int
+    status: int
+    format: int
+    service: int
+    started_at: datetime | None
+    updated_at: datetime
+    spelltable_link: str | None
+    voice_xid: int | None
+    voice_invite_link: str | None
+    requires_confirmation: bool
+    guild_notice: str | None
+    guild_motd: str | None
+    guild_show_links: bool
+    channel_motd: str | None
+    channel_show_points: bool
+    channel_require_confirmation: bool
+    posts: tuple[tuple[int, str], ...]
+    players: tuple[PlayerSnapshot, ...]
+
+    @classmethod
+    def load(cls, game_id: int) -> GameSnapshot:
+        from spellbot.database import DatabaseSession
+
+        from . import Play, Queue, Record, User
+
+        game = (
+            DatabaseSession.query(Game)
+            .options(joinedload(Game.guild), joinedload(Game.channel), joinedload(Game.posts))
+            .filter(Game.id == game_id)
+            .one()
+        )
+        player_record = and_(
+            Record.guild_xid == game.guild_xid,
+            Record.channel_xid == game.channel_xid,
+            Record.user_xid == User.xid,
+        )
+        if game.started_at is None:
+            rows = (
+                DatabaseSession.query(User.xid, User.name, null(), null(), Record.elo)
+                .select_from(Queue)
+                .join(User, User.xid == Queue.user_xid)
+                .outerjoin(Record, player_record)
+                .filter(Queue.game_id == game_id)
+            )
+        else:
+            rows = (
+                DatabaseSession.query(
+                    User.xid, User.name, Play.points, Play.confirmed_at, Record.elo
+                )
+                .select_from(Play)
+                .join(User, User.xid == Play.user_xid)
+                .outerjoin(Record, player_record)
+                .filter(Play.game_id == game_id)
+            )
+        players = tuple(
+            PlayerSnapshot(
+                xid=xid,
+                name=name,
+                points=points,
+                confirmed=confirmed_at is not None,
+                elo=elo,
+            )
+            for xid, name, points, confirmed_at, elo in rows.order_by(User.xid)
+        )
+        return cls(
+            id=cast(int, game.id),
+            guild_xid=cast(int, game.guild_xid),
+            channel_xid=game.channel_xid,
+            seats=game.seats,
+            status=game.status,
+            format=game.format,
+            service=game.service,
+            started_at=cast(datetime | None, game.started_at),
+            updated_at=cast(datetime, game.updated_at),
+            spelltable_link=cast(str | None, game.spelltable_link),
+            voice_xid=cast(int | None, game.voice_xid),
+            voice_invite_link=cast(str | None, game.voice_invite_link),
+            requires_confirmation=cast(bool, game.requires_confirmation),
+            guild_notice=game.guild.notice,
+            guild_motd=game.guild.motd,
+            guild_show_links=game.guild.show_links,
+            channel_motd=game.channel.motd,
+            channel_show_points=game.channel.show_points,
+            channel_require_confirmation=game.channel.require_confirmation,
+            posts=tuple((post.guild_xid, post.jump_link) for post in game.posts or []),
+            players=players,
+        )
+
+    @property
+    def started_at_timestamp(self) -> int:
+        assert self.started_at is not None
+        return int(self.started_at.replace(tzinfo=tz.UTC).timestamp())
+
+    @property
+    def updated_at_timestamp(self) -> int:
+        return int(self.updated_at.replace(tzinfo=tz.UTC).timestamp())
+
+    @property
+    def spectate_link(self) -> str | None:
+        return f"{self.spelltable_link}?spectate=true" if self.spelltable_link else None
+
+    @property
+    def jump_links(self) -> dict[int, str]:
+        return dict(self.posts)
+
+    @property
+    def format_name(self) -> str:
+        return str(GameFormat(self.format))
+
+    def show_links(self, dm: bool = False) -> bool:
+        return True if dm else self.guild_show_links
+
     @property
     def embed_title(self) -> str:
         if self.status == GameStatus.STARTED.value:
             return "**Your game is ready!**"
-        remaining = int(cast(int, self.seats)) - len(self.players)
+        remaining = self.seats - len(self.players)
         plural = "s" if remaining > 1 else ""
         return f"**Waiting for {remaining} more player{plural} to join...**"
 
     def embed_description(self, dm: bool = False) -> str:  # noqa: C901,PLR0912
         description = ""
-        if self.guild.notice:
-            description += f"{self.guild.notice}\n\n"
+        if self.guild_notice:
+            description += f"{self.guild_notice}\n\n"
         if self.status == GameStatus.PENDING.value:
             if self.service == GameService.SPELLTABLE.value:
                 description += "_A SpellTable link will be created when all players have joined._"
@@ -258,13 +463,13 @@ class Game(Base):
                     "\n\nYou can also [jump to the original game post]"
                     f"({jump_link}) in <#{self.channel_xid}>."
                 )
-            elif self.channel.show_points:
+            elif self.channel_show_points:
                 description += "\n\nWhen your game is over use the drop down to report your points."
         placeholders = self.placeholders
-        if self.guild.motd:
-            description += f"\n\n{self.apply_placeholders(placeholders, self.guild.motd)}"
-        if self.channel.motd:
-            description += f"\n\n{self.apply_placeholders(placeholders, self.channel.motd)}"
+        if self.guild_motd:
+            description += f"\n\n{self.apply_placeholders(placeholders, self.guild_motd)}"
+        if self.channel_motd:
+            description += f"\n\n{self.apply_placeholders(placeholders, self.channel_motd)}"
         return description
 
     @property
@@ -276,7 +481,7 @@ class Game(Base):
             "game_start": game_start,
         }
         for i, player in enumerate(self.players):
-            placeholders[f"player_name_{i+1}"] = cast(str, player.name)
+            placeholders[f"player_name_{i+1}"] = player.name
         return placeholders
 
     def apply_placeholders(self, placeholders: dict[str, str], text: str) -> str:
@@ -289,32 +494,27 @@ class Game(Base):
         player_parts: list[tuple[str, int, str, str]] = []
         for player in self.players:
             points_str = ""
-            if self.status == GameStatus.STARTED.value:
-                points = player.points(cast(int, self.id))
-                if points is not None and points[0] is not None:
-                    points_value: int = points[0]
-                    points_confirmed: bool = points[1]
-                    plural_str = "s" if points_value > 1 or points_value == 0 else ""
-                    if self.requires_confirmation:
-                        if points_value == 3:
-                            value_str = "WIN"
-                        elif 1 <= points_value <= 2:
-                            value_str = "TIE"
-                        else:
-                            value_str = "LOSS"
+            if self.status == GameStatus.STARTED.value and player.points is not None:
+                plural_str = "s" if player.points > 1 or player.points == 0 else ""
+                if self.requires_confirmation:
+                    if player.points == 3:
+                        value_str = "WIN"
+                    elif 1 <= player.points <= 2:
+                        value_str = "TIE"
                     else:
-                        value_str = f"{points_value} point{plural_str}"
-                    confirmed_str = (
-                        "✅ "
-                        if points_confirmed
-                        else "❌ "
-                        if self.channel.require_confirmation
-                        else ""
-                    )
-                    points_str = f"\n**ﾠ⮑ {confirmed_str}{value_str}**"
+                        value_str = "LOSS"
+                else:
+                    value_str = f"{player.points} point{plural_str}"
+                confirmed_str = (
+                    "✅ "
+                    if player.confirmed
+                    else "❌ "
+                    if self.channel_require_confirmation
+                    else ""
+                )
+                points_str = f"\n**ﾠ⮑ {confirmed_str}{value_str}**"
 
-            elo = player.elo(self.guild_xid, self.channel_xid)
-            elo_str = f"**ELO {elo}** - " if elo else ""
+            elo_str = f"**ELO {player.elo}** - " if player.elo else ""
             player_parts.append((elo_str, player.xid, player.name, points_str))
 
         player_strs: list[str] = [
@@ -326,35 +526,6 @@ class Game(Base):
     def embed_footer(self) -> str:
         return f"SpellBot Game ID: #SB{self.id}"
 
-    @property
-    def spectate_link(self) -> str | None:
-        return f"{self.spelltable_link}?spectate=true" if self.spelltable_link else None
-
-    @property
-    def jump_links(self) -> dict[int, str]:
-        return {post.guild_xid: post.jump_link for post in self.posts or []}
-
-    @property
-    def format_name(self) -> str:
-        return str(GameFormat(self.format))
-
-    @property
-    def confirmed(self) -> bool:
-        from spellbot.database import DatabaseSession
-
-        from . import Play, User
-
-        player_count = DatabaseSession.query(User).filter(User.xid.in_(self.player_xids)).count()
-        confirmed_count = (
-            DatabaseSession.query(Play)
-            .filter(
-                Play.game_id == self.id,
-                ~Play.confirmed_at.is_(None),
-            )
-            .count()
-        )
-        return player_count == confirmed_count
-
     def to_embed(self, dm: bool = False) -> discord.Embed:
         embed = discord.Embed(title=self.embed_title)
         embed.set_thumbnail(
@@ -392,26 +563,3 @@ class Game(Base):
         )
         embed.set_footer(text=self.embed_footer)
         return embed
-
-    def to_dict(self) -> GameDict:
-        return {
-            "id": self.id,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-            "started_at": self.started_at,
-            "deleted_at": self.deleted_at,
-            "guild_xid": self.guild_xid,
-            "channel_xid": self.channel_xid,
-            "posts": [post.to_dict() for post in self.posts],
-            "voice_xid": self.voice_xid,
-            "voice_invite_link": self.voice_invite_link,
-            "seats": self.seats,
-            "status": self.status,
-            "format": self.format,
-            "service": self.service,
-            "spelltable_link": self.spelltable_link,
-            "spectate_link": self.spectate_link,
-            "jump_links": self.jump_links,
-            "confirmed": self.confirmed,
-            "requires_confirmation": self.channel.require_confirmation,
-        }
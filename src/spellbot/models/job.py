@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum, auto
+from typing import TYPE_CHECKING, TypedDict, cast
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from . import Base, now
+
+if TYPE_CHECKING:
+    from . import Game  # noqa: F401
+
+
+class JobKind(Enum):
+    CREATE_LINK = auto()
+    CREATE_VOICE = auto()
+    NOTIFY_PLAYERS = auto()
+    DELETE_POSTS = auto()
+    EXPIRE_POSTS = auto()
+
+
+class JobDict(TypedDict):
+    id: int
+    created_at: datetime
+    key: str
+    kind: int
+    game_id: int
+    attempts: int
+    run_at: datetime
+    locked_until: datetime | None
+    finished_at: datetime | None
+    error: str | None
+
+
+class Job(Base):
+    """A side effect of seating or expiring a game, kept in the outbox until it is carried out."""
+
+    __tablename__ = "jobs"
+
+    id = Column(
+        Integer,
+        autoincrement=True,
+        nullable=False,
+        primary_key=True,
+        doc="The ID of this job",
+    )
+    created_at = Column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default=now,
+        doc="UTC timestamp when this job was first created",
+    )
+    key = Column(
+        String(100),
+        nullable=False,
+        unique=True,
+        doc="Idempotency key, no more than one job is ever recorded for the same key",
+    )
+    kind: int = cast(
+        int,
+        Column(
+            Integer(),
+            nullable=False,
+            doc="The kind of side effect that this job carries out",
+        ),
+    )
+    game_id = Column(
+        Integer,
+        ForeignKey("games.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+        doc="The SpellBot game ID of the game that was seated or expired",
+    )
+    attempts = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        doc="How many times this job has been tried so far",
+    )
+    run_at = Column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default=now,
+        index=True,
+        doc="UTC timestamp after which this job may be run",
+    )
+    locked_until = Column(
+        DateTime,
+        nullable=True,
+        doc="UTC timestamp until which a worker has claimed this job",
+    )
+    finished_at = Column(
+        DateTime,
+        nullable=True,
+        index=True,
+        doc="UTC timestamp when this job was carried out or given up on",
+    )
+    error = Column(
+        String(1024),
+        nullable=True,
+        doc="The error from the most recent failed attempt at this job",
+    )
+
+    def to_dict(self) -> JobDict:
+        return {
+            "id": cast(int, self.id),
+            "created_at": cast(datetime, self.created_at),
+            "key": cast(str, self.key),
+            "kind": self.kind,
+            "game_id": cast(int, self.game_id),
+            "attempts": cast(int, self.attempts),
+            "run_at": cast(datetime, self.run_at),
+            "locked_until": cast(datetime | None, self.locked_until),
+            "finished_at": cast(datetime | None, self.finished_at),
+            "error": cast(str | None, self.error),
+        }
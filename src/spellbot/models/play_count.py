@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, TypedDict, cast
+
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer
+
+from . import Base
+
+if TYPE_CHECKING:
+    from datetime import date
+
+ALL_TIME = 0
+
+
+def play_period(started_at: date) -> int:
+    """Return the monthly period, like 202401 for January 2024, of a game start time."""
+    return started_at.year * 100 + started_at.month
+
+
+class PlayCountDict(TypedDict):
+    guild_xid: int
+    channel_xid: int
+    user_xid: int
+    period: int
+    games: int
+
+
+class PlayCount(Base):
+    """
+    How many games a user has played in a channel over some period of time.
+
+    There is a row for each month, as well as an all time row with a period of
+    `ALL_TIME`, so that leaderboards can be read straight off of an index.
+    """
+
+    __tablename__ = "play_counts"
+    __table_args__ = (
+        Index("ix_play_counts_leaderboard", "guild_xid", "channel_xid", "period", "games"),
+    )
+
+    guild_xid = Column(
+        BigInteger,
+        ForeignKey("guilds.xid", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+        doc="The external Discord ID of the associated guild",
+    )
+    channel_xid = Column(
+        BigInteger,
+        ForeignKey("channels.xid", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+        doc="The external Discord ID of the associated channel",
+    )
+    user_xid = Column(
+        BigInteger,
+        ForeignKey("users.xid", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+        doc="The external Discord ID of the associated user",
+    )
+    period = Column(
+        Integer,
+        primary_key=True,
+        nullable=False,
+        doc="The month as YYYYMM, or ALL_TIME for every game ever played",
+    )
+    games = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        doc="The number of games the user has played in the channel during the period",
+    )
+
+    def to_dict(self) -> PlayCountDict:
+        return {
+            "guild_xid": cast(int, self.guild_xid),
+            "channel_xid": cast(int, self.channel_xid),
+            "user_xid": cast(int, self.user_xid),
+            "period": cast(int, self.period),
+            "games": cast(int, self.games),
+        }
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TypedDict, cast
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from . import Base, now
+
+
+class PooledLinkDict(TypedDict):
+    id: int
+    created_at: datetime
+    service: int
+    link: str
+    expires_at: datetime
+    taken_at: datetime | None
+
+
+class PooledLink(Base):
+    """A game link that was created ahead of time, ready to be given to the next game."""
+
+    __tablename__ = "pooled_links"
+
+    id = Column(
+        Integer,
+        autoincrement=True,
+        nullable=False,
+        primary_key=True,
+        doc="The ID of this pooled link",
+    )
+    created_at = Column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default=now,
+        doc="UTC timestamp when this link was created",
+    )
+    service: int = cast(
+        int,
+        Column(
+            Integer(),
+            nullable=False,
+            doc="The service that this link was created with",
+        ),
+    )
+    link = Column(
+        String(255),
+        nullable=False,
+        unique=True,
+        doc="The game link",
+    )
+    expires_at = Column(
+        DateTime,
+        nullable=False,
+        index=True,
+        doc="UTC timestamp after which this link may no longer be given to a game",
+    )
+    taken_at = Column(
+        DateTime,
+        nullable=True,
+        index=True,
+        doc="UTC timestamp when this link was given to a game",
+    )
+
+    def to_dict(self) -> PooledLinkDict:
+        return {
+            "id": cast(int, self.id),
+            "created_at": cast(datetime, self.created_at),
+            "service": self.service,
+            "link": cast(str, self.link),
+            "expires_at": cast(datetime, self.expires_at),
+            "taken_at": cast(datetime | None, self.taken_at),
+        }
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING, TypedDict
 
-from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer
 from sqlalchemy.orm import relationship
 
 from . import Base, now
@@ -25,6 +25,7 @@ class Record(Base):
     """A users record (ELO) for a competitive ranked channel."""
 
     __tablename__ = "records"
+    __table_args__ = (Index("ix_records_leaderboard", "guild_xid", "channel_xid", "elo"),)
 
     created_at = Column(
         DateTime,
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import logging
-from asyncio import sleep
-from typing import TYPE_CHECKING, Any, cast
+from asyncio import Semaphore, gather, sleep
+from typing import TYPE_CHECKING, Any, Generic, NamedTuple, TypeVar, cast
 
 import discord
 from aiohttp.client_exceptions import ClientOSError
@@ -11,6 +11,7 @@ from discord.errors import DiscordException
 from discord.utils import MISSING
 
 from .metrics import add_span_error
+from .settings import settings
 from .utils import (
     CANT_SEND_CODE,
     bot_can_delete_channel,
@@ -27,7 +28,7 @@ from .utils import (
 )
 
 if TYPE_CHECKING:
-    from collections.abc import Awaitable, Callable
+    from collections.abc import Awaitable, Callable, Hashable, Iterable
 
     from discord.abc import MessageableChannel, PrivateChannel
     from discord.guild import GuildChannel
@@ -38,9 +39,24 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 bad_users: set[int] = set()
 
+Target = TypeVar("Target")
+Result = TypeVar("Result")
+
+
+class FanOut(NamedTuple, Generic[Target, Result]):
+    results: dict[Target, Result]
+    failures: dict[Target, Exception]
+
 
 @tracer.wrap()
 async def retry(func: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Retry an interaction response when the connection to Discord fails.
+
+    Interaction responses are sent with the interaction's token rather than through
+    the bot's HTTP client, so they don't go through the REST scheduler, which retries
+    every other Discord API request itself.
+    """
     times = 0
     while True:
         try:
@@ -52,6 +68,48 @@ async def retry(func: Callable[[], Awaitable[Any]]) -> Any:
             await sleep(times / 100)  # 10ms, 20ms, 30ms, etc.
 
 
+@tracer.wrap()
+async def fan_out(
+    targets: Iterable[Target],
+    func: Callable[[Target], Awaitable[Result]],
+    *,
+    bucket: Callable[[Target], Hashable] | None = None,
+    limit: int | None = None,
+) -> FanOut[Target, Result]:
+    """
+    Await func for every target concurrently, with at most `limit` calls in flight.
+
+    Targets that map to the same `bucket` share a Discord rate limit bucket, for
+    example edits to messages in the same channel, so they're called one after
+    another in the order given rather than all at once. An exception raised for
+    one target is recorded in `failures` and doesn't affect any of the others.
+    """
+    semaphore = Semaphore(limit or settings.FAN_OUT_CONCURRENCY)
+    ordered = list(dict.fromkeys(targets))
+    groups: dict[Hashable, list[Target]] = {}
+    for i, target in enumerate(ordered):
+        groups.setdefault(bucket(target) if bucket else i, []).append(target)
+
+    results: dict[Target, Result] = {}
+    failures: dict[Target, Exception] = {}
+
+    async def run(group: list[Target]) -> None:
+        for target in group:
+            async with semaphore:
+                try:
+                    results[target] = await func(target)
+                except Exception as ex:
+                    add_span_error(ex)
+                    logger.exception("fan out to %s failed", target)
+                    failures[target] = ex
+
+    await gather(*(run(group) for group in groups.values()))
+    return FanOut(
+        results={target: results[target] for target in ordered if target in results},
+        failures={target: failures[target] for target in ordered if target in failures},
+    )
+
+
 @tracer.wrap()
 async def safe_original_response(
     interaction: discord.Interaction,
@@ -96,7 +154,7 @@ async def safe_fetch_user(
         log="could not fetch user %(user_xid)s",
         user_xid=user_xid,
     ):
-        user = await retry(lambda: client.fetch_user(user_xid))
+        user = await client.fetch_user(user_xid)
     return user
 
 
@@ -118,7 +176,7 @@ async def safe_fetch_guild(
         log="could not fetch guild %(guild_xid)s",
         guild_xid=guild_xid,
     ):
-        guild = await retry(lambda: client.fetch_guild(guild_xid))
+        guild = await client.fetch_guild(guild_xid)
     return guild
 
 
@@ -151,7 +209,7 @@ async def safe_fetch_text_channel(
         guild_xid=guild_xid,
         channel_xid=channel_xid,
     ):
-        fetched = await retry(lambda: client.fetch_channel(channel_xid))
+        fetched = await client.fetch_channel(channel_xid)
         if isinstance(fetched, discord.TextChannel):
             channel = fetched
 
@@ -203,7 +261,7 @@ async def safe_update_embed(
         message_xid=message.id,
     ):
         try:
-            updated_message = await retry(lambda: message.edit(*args, **kwargs))
+            updated_message = await message.edit(*args, **kwargs)
         except discord.errors.NotFound:
             guild_xid = message.guild.id if message.guild else None
             logger.warning("in guild %s, unknown message %s", guild_xid, message.id)
@@ -236,7 +294,7 @@ async def safe_delete_message(message: discord.Message | discord.PartialMessage)
         log="could not delete message %(message_xid)s",
         message_xid=message.id,
     ):
-        await retry(message.delete)
+        await message.delete()
         success = True
     return success
 
@@ -275,7 +333,7 @@ async def safe_create_category_channel(
         span.set_tags({"guild_xid": str(guild_xid), "name": name})
 
     guild: discord.Guild | None
-    if not (guild := await retry(lambda: safe_fetch_guild(client, guild_xid))):
+    if not (guild := await safe_fetch_guild(client, guild_xid)):
         return None
 
     if not bot_can_manage_channels(guild):
@@ -288,7 +346,7 @@ async def safe_create_category_channel(
         log="in guild %(guild_xid)s, could not create category channel",
         guild_xid=guild_xid,
     ):
-        channel = await retry(lambda: guild.create_category_channel(name))
+        channel = await guild.create_category_channel(name)
     return channel
 
 
@@ -305,7 +363,7 @@ async def safe_create_voice_channel(
         span.set_tags({"guild_xid": str(guild_xid), "name": name})
 
     guild: discord.Guild | None
-    if not (guild := await retry(lambda: safe_fetch_guild(client, guild_xid))):
+    if not (guild := await safe_fetch_guild(client, guild_xid)):
         return None
 
     channel: discord.VoiceChannel | None = None
@@ -315,12 +373,10 @@ async def safe_create_voice_channel(
         log="in guild %(guild_xid)s, could not create voice channel",
         guild_xid=guild_xid,
     ):
-        channel = await retry(
-            lambda: guild.create_voice_channel(
-                name,
-                category=category,
-                bitrate=int(guild.bitrate_limit) if use_max_bitrate else MISSING,
-            )
+        channel = await guild.create_voice_channel(
+            name,
+            category=category,
+            bitrate=int(guild.bitrate_limit) if use_max_bitrate else MISSING,
         )
     return channel
 
@@ -335,7 +391,7 @@ async def safe_ensure_voice_category(  # noqa: C901
         span.set_tags({"guild_xid": str(guild_xid), "prefix": prefix})
 
     guild: discord.Guild | None
-    if not (guild := await retry(lambda: safe_fetch_guild(client, guild_xid))):
+    if not (guild := await safe_fetch_guild(client, guild_xid)):
         return None
 
     def category_num(cat: discord.CategoryChannel) -> int:
@@ -369,13 +425,7 @@ async def safe_ensure_voice_category(  # noqa: C901
     if available:
         return available
 
-    return await retry(
-        lambda: safe_create_category_channel(
-            client,
-            guild_xid,
-            category_name(len(full)),
-        ),
-    )
+    return await safe_create_category_channel(client, guild_xid, category_name(len(full)))
 
 
 @tracer.wrap()
@@ -408,7 +458,7 @@ async def safe_delete_channel(
         channel_xid=channel_xid,
     ):
         try:
-            await retry(channel.delete)  # type: ignore - this is asserted above
+            await channel.delete()  # type: ignore - this is asserted above
             success = True
         except discord.errors.NotFound:
             logger.warning("in guild  %s, unknown channel %s", guild_xid, channel_xid)
@@ -500,7 +550,7 @@ async def safe_channel_reply(
         guild_xid=guild_xid,
         channel_xid=channel_xid,
     ):
-        message = await retry(lambda: channel.send(*args, **kwargs))
+        message = await channel.send(*args, **kwargs)
     return message
 
 
@@ -523,7 +573,7 @@ async def save_create_channel_invite(
         guild_xid=guild_xid,
         channel_xid=channel_xid,
     ):
-        invite = await retry(lambda: channel.create_invite(*args, **kwargs))
+        invite = await channel.create_invite(*args, **kwargs)
     return invite
 
 
@@ -536,7 +586,7 @@ async def safe_message_reply(message: discord.Message, *args: Any, **kwargs: Any
         return
 
     try:
-        await retry(lambda: message.reply(*args, **kwargs))
+        await message.reply(*args, **kwargs)
     except Exception as ex:
         add_span_error(ex)
         logger.debug("debug: %s", ex, exc_info=True)
@@ -559,7 +609,7 @@ async def safe_send_user(
         return log_warning("no send method on user %(user)s %(xid)s", user=user, xid=user_xid)
 
     try:
-        await retry(lambda: user.send(*args, **kwargs))
+        await user.send(*args, **kwargs)
     except discord.errors.DiscordServerError as ex:
         add_span_error(ex)
         log_warning(
@@ -658,9 +708,9 @@ async def safe_add_role(
             )
             return
         if remove:
-            await retry(lambda: member.remove_roles(discord_role))
+            await member.remove_roles(discord_role)
         else:
-            await retry(lambda: member.add_roles(discord_role))
+            await member.add_roles(discord_role)
     except (
         discord.errors.Forbidden,
         discord.errors.HTTPException,
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from aiohttp import web
+from wrapt import wrap_function_wrapper
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Sequence
+
+    from discord.http import Route
+
+logger = logging.getLogger(__name__)
+
+LabelValues = tuple[str, ...]
+MetricT = TypeVar("MetricT", bound="Metric")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labels):
+            msg = f"{self.name} takes labels {self.labels}, not {tuple(labels)}"
+            raise ValueError(msg)
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _labels(self, key: LabelValues, **extra: str) -> str:
+        pairs = [*zip(self.labels, key, strict=True), *extra.items()]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> Iterator[str]:  # pragma: no cover
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self.totals: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self.totals[key] = self.totals.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.totals.items():
+            yield f"{self.name}{self._labels(key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """A value that can go up and down, or that is read by `collect` at scrape time."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        *,
+        collect: Callable[[], dict[LabelValues, float]] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.values: dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self._key(labels)] = value
+
+    def samples(self) -> Iterator[str]:
+        values = self.collect() if self.collect else self.values
+        for key, value in values.items():
+            yield f"{self.name}{self._labels(key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = (*sorted(buckets), math.inf)
+        self.counts: dict[LabelValues, list[int]] = {}
+        self.sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * len(self.buckets)
+            self.sums[key] = 0.0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        self.sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the body of the `with` statement took, even if it raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts, strict=True):
+                cumulative += count
+                le = _format_value(bound)
+                yield f"{self.name}_bucket{self._labels(key, le=le)} {cumulative}"
+            yield f"{self.name}_sum{self._labels(key)} {_format_value(self.sums[key])}"
+            yield f"{self.name}_count{self._labels(key)} {cumulative}"
+
+
+class Registry:
+    """
+    An in-process registry of metrics, rendered in the Prometheus text format.
+
+    Metrics are recorded whether or not anything scrapes them, since recording one is
+    only a dictionary update. Everything runs on the bot's event loop, so no locking.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: MetricT) -> MetricT:
+        if metric.name in self.metrics:
+            msg = f"metric {metric.name} is already registered"
+            raise ValueError(msg)
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = [line for metric in self.metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+def _pool_usage() -> dict[LabelValues, float]:
+    from .database import async_engine, engine, using_async_engine
+
+    pool: Any = None
+    if using_async_engine():
+        pool = async_engine.sync_engine.pool
+    elif engine.__wrapped__ is not None:
+        pool = engine.pool
+    if pool is None or not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("overflow",): max(pool.overflow(), 0),
+    }
+
+
+registry = Registry()
+INTERACTION_SECONDS = registry.register(
+    Histogram("spellbot_interaction_seconds", "Time taken by interactions.", ["action"]),
+)
+LOCK_WAIT_SECONDS = registry.register(
+    Histogram(
+        "spellbot_lock_wait_seconds",
+        "Time spent waiting on matchmaking locks.",
+        ["lock"],
+        buckets=(0.0001, 0.001, *DEFAULT_BUCKETS),
+    ),
+)
+DB_POOL_CONNECTIONS = registry.register(
+    Gauge(
+        "spellbot_db_pool_connections",
+        "Database connections in the pool.",
+        ["state"],
+        collect=_pool_usage,
+    ),
+)
+DISCORD_HTTP_SECONDS = registry.register(
+    Histogram(
+        "spellbot_discord_http_seconds",
+        "Time taken by Discord API requests, including rate limit waits.",
+        ["method", "route", "status"],
+    ),
+)
+DISCORD_RATE_LIMITS = registry.register(
+    Counter(
+        "spellbot_discord_rate_limits_total",
+        "Discord API requests that were rate limited.",
+        ["scope"],
+    ),
+)
+TASK_SECONDS = registry.register(
+    Histogram("spellbot_task_seconds", "Time taken by background tasks.", ["task"]),
+)
+
+
+class RateLimitHandler(logging.Handler):
+    """Counts the rate limits that discord.py logs as it handles them."""
+
+    def __init__(self) -> None:
+        super().__init__(level=logging.WARNING)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = str(record.msg)
+        if message.startswith("Global rate limit"):
+            DISCORD_RATE_LIMITS.inc(scope="global")
+        elif message.startswith("We are being rate limited"):
+            DISCORD_RATE_LIMITS.inc(scope="route")
+
+
+async def timed_request(
+    wrapped: Callable[..., Any],
+    instance: Any,
+    args: Any,
+    kwargs: Any,
+) -> Any:
+    """Time a Discord API request by its route template, wrapping `HTTPClient.request()`."""
+    from .metrics import discord_route
+
+    route: Route = args[0]
+    resource, _ = discord_route(route.path)
+    status = "error"  # if cancelled
+    start = time.perf_counter()
+    try:
+        result = await wrapped(*args, **kwargs)
+    except Exception as ex:
+        status = str(getattr(ex, "status", "error"))
+        raise
+    else:
+        status = "ok"
+        return result
+    finally:
+        DISCORD_HTTP_SECONDS.observe(
+            time.perf_counter() - start,
+            method=route.method,
+            route=resource,
+            status=status,
+        )
+
+
+def patch_discord_http() -> None:  # pragma: no cover
+    """Time every Discord API request and count the rate limits that they run into."""
+    wrap_function_wrapper("discord.http", "HTTPClient.request", timed_request)
+    logging.getLogger("discord.http").addHandler(RateLimitHandler())
+
+
+async def metrics_endpoint(request: web.Request) -> web.Response:
+    return web.Response(
+        body=registry.render().encode(),
+        headers={"Content-Type": CONTENT_TYPE},
+    )
+
+
+def build_exporter_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_endpoint)
+    return app
+
+
+async def start_exporter(host: str, port: int) -> web.AppRunner:  # pragma: no cover
+    """Serve the registry at `/metrics` on the given port, returning the runner to stop it."""
+    patch_discord_http()
+    runner = web.AppRunner(build_exporter_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("serving metrics on http://%s:%s/metrics", host, port)
+    return runner
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum, auto
+from typing import TYPE_CHECKING, Any
+
+from aiohttp.client_exceptions import ClientOSError
+from wrapt import wrap_function_wrapper
+
+from .settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from discord.http import HTTPClient, Ratelimit, Route
+
+logger = logging.getLogger(__name__)
+
+MAX_TRIES = 4
+
+
+class Lane(Enum):
+    INTERACTIVE = auto()
+    BACKGROUND = auto()
+
+
+# The lane that Discord API requests made in the current context are scheduled in.
+current_lane: ContextVar[Lane] = ContextVar("current_lane", default=Lane.INTERACTIVE)
+
+
+@contextmanager
+def background() -> Iterator[None]:
+    """Schedule the Discord API requests made in the current context in the background lane."""
+    token = current_lane.set(Lane.BACKGROUND)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+def find_ratelimit(http: HTTPClient, route: Route) -> Ratelimit | None:
+    """
+    Return the bucket that discord.py keeps for a route, if it has seen the route yet.
+
+    The buckets are private to discord.py. If they aren't where discord.py 2.x keeps
+    them, background requests are only held back by interactive ones.
+    """
+    bucket_hashes: dict[str, str] | None = getattr(http, "_bucket_hashes", None)
+    buckets: dict[str, Ratelimit] | None = getattr(http, "_buckets", None)
+    if bucket_hashes is None or buckets is None:
+        return None
+    bucket_hash = bucket_hashes.get(route.key)
+    keys = [f"{route.key}:{route.major_parameters}"]
+    if bucket_hash:
+        # discord.py stores a newly discovered bucket under either of these keys.
+        keys = [f"{bucket_hash}:{route.major_parameters}", bucket_hash + route.major_parameters]
+    return next((buckets[key] for key in keys if key in buckets), None)
+
+
+class RestScheduler:
+    """
+    Schedules every Discord API request that the bot makes in one of two lanes.
+
+    Requests in the interactive lane, which is the default, are sent right away.
+    Requests in the background lane, made by background tasks, wait until no
+    interactive request is in flight on the same route and until the route's rate
+    limit bucket, as tracked by discord.py from the rate limit headers of earlier
+    responses, has more than `reserve` requests left in its window. So background
+    work soaks up spare capacity without delaying responses to players.
+
+    Requests in both lanes are retried when the connection to Discord fails.
+    """
+
+    def __init__(self, *, reserve: int | None = None, concurrency: int | None = None) -> None:
+        self.reserve = settings.REST_RESERVE if reserve is None else reserve
+        self.concurrency = concurrency or settings.REST_BACKGROUND_CONCURRENCY
+        self.interactive: Counter[str] = Counter()
+        self._background: asyncio.Semaphore | None = None
+        self._idle: asyncio.Condition | None = None
+
+    @property
+    def idle(self) -> asyncio.Condition:
+        # Created on first use so that they belong to the event loop that uses them.
+        if self._idle is None:
+            self._idle = asyncio.Condition()
+        return self._idle
+
+    @property
+    def background(self) -> asyncio.Semaphore:
+        if self._background is None:
+            self._background = asyncio.Semaphore(self.concurrency)
+        return self._background
+
+    async def request(
+        self,
+        wrapped: Callable[..., Any],
+        instance: HTTPClient,
+        args: Any,
+        kwargs: Any,
+    ) -> Any:
+        """Schedule a Discord API request, wrapping `HTTPClient.request()`."""
+        route: Route = args[0]
+        key = f"{route.key}:{route.major_parameters}"
+        if current_lane.get() is Lane.BACKGROUND:
+            async with self.background:
+                await self.wait_for_capacity(instance, route, key)
+                return await self.send(wrapped, args, kwargs)
+
+        self.interactive[key] += 1
+        try:
+            return await self.send(wrapped, args, kwargs)
+        finally:
+            self.interactive[key] -= 1
+            if not self.interactive[key]:
+                del self.interactive[key]
+                async with self.idle:
+                    self.idle.notify_all()
+
+    async def wait_for_capacity(self, http: HTTPClient, route: Route, key: str) -> None:
+        while True:
+            if self.interactive[key]:
+                async with self.idle:
+                    await self.idle.wait_for(lambda: not self.interactive[key])
+                continue
+            ratelimit = find_ratelimit(http, route)
+            if ratelimit is None or ratelimit.expires is None or ratelimit.is_expired():
+                return
+            if ratelimit.remaining > min(self.reserve, ratelimit.limit - 1):
+                return
+            loop = asyncio.get_running_loop()
+            await asyncio.sleep(max(ratelimit.expires - loop.time(), 0.0))
+
+    async def send(self, wrapped: Callable[..., Any], args: Any, kwargs: Any) -> Any:
+        tries = 0
+        while True:
+            try:
+                tries += 1
+                return await wrapped(*args, **kwargs)
+            except ClientOSError:
+                if tries >= MAX_TRIES:
+                    raise
+                await asyncio.sleep(0.01 * 2 ** (tries - 1))  # 10ms, 20ms, 40ms
+
+
+scheduler = RestScheduler()
+
+
+def install_scheduler() -> None:
+    """Send every Discord API request that the bot makes through the scheduler."""
+    wrap_function_wrapper("discord.http", "HTTPClient.request", scheduler.request)
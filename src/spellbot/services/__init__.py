@@ -4,8 +4,10 @@ from .awards import AwardsService, NewAward
 from .channels import ChannelsService
 from .games import GamesService
 from .guilds import GuildsService
+from .jobs import JobsService
+from .links import LinksService
 from .mirrors import MirrorsService
-from .plays import PlaysService
+from .plays import Cursor, PlaysService, RecordsPage
 from .users import UsersService
 from .verifies import VerifiesService
 from .watches import WatchesService
@@ -17,6 +19,8 @@ class ServicesRegistry:
         self.channels = ChannelsService()
         self.games = GamesService()
         self.guilds = GuildsService()
+        self.jobs = JobsService()
+        self.links = LinksService()
         self.mirrors = MirrorsService()
         self.plays = PlaysService()
         self.users = UsersService()
@@ -27,11 +31,15 @@ class ServicesRegistry:
 __all__ = [
     "AwardsService",
     "ChannelsService",
+    "Cursor",
     "GamesService",
     "GuildsService",
+    "JobsService",
+    "LinksService",
     "MirrorsService",
     "NewAward",
     "PlaysService",
+    "RecordsPage",
     "ServicesRegistry",
     "UsersService",
     "VerifiesService",
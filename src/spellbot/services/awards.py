@@ -3,10 +3,9 @@ from __future__ import annotations
 from collections import defaultdict
 from typing import NamedTuple
 
-from asgiref.sync import sync_to_async
 from sqlalchemy.sql.expression import and_, or_
 
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async
 from spellbot.models import Game, GuildAward, Play, UserAward, Verify
 
 
@@ -17,7 +16,7 @@ class NewAward(NamedTuple):
 
 
 class AwardsService:
-    @sync_to_async()
+    @database_sync_to_async
     def give_awards(self, guild_xid: int, player_xids: list[int]) -> dict[int, list[NewAward]]:
         """Return dict of discord user ids -> role names to assign to that user."""
         new_roles: dict[int, list[NewAward]] = defaultdict(list)
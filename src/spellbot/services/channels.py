@@ -4,24 +4,30 @@ from datetime import datetime
 from typing import TYPE_CHECKING
 
 import pytz
-from asgiref.sync import sync_to_async
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.sql.expression import update
+from sqlalchemy.sql.expression import or_, update
 
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async
+from spellbot.invalidation import invalidate
 from spellbot.models import Channel, ChannelDict
+from spellbot.upsert_cache import channel_cache
+from spellbot.verification import VerificationPolicy
 
 if TYPE_CHECKING:
     from discord.abc import MessageableChannel
 
 
 class ChannelsService:
-    @sync_to_async()
+    @database_sync_to_async
     def upsert(self, channel: MessageableChannel) -> ChannelDict:
         assert channel.guild is not None
         name_max_len = Channel.name.property.columns[0].type.length  # type: ignore
         raw_name = getattr(channel, "name", "")
         name = raw_name[:name_max_len]
+        fingerprint = (channel.guild.id, name)
+        if cached := channel_cache.get(channel.id, fingerprint):
+            return cached.copy()
+        version = channel_cache.version(channel.id)
         values = {
             "xid": channel.id,
             "guild_xid": channel.guild.id,
@@ -41,18 +47,21 @@ class ChannelsService:
         DatabaseSession.commit()
 
         db_channel = DatabaseSession.query(Channel).filter(Channel.xid == channel.id).one()
-        return db_channel.to_dict()
+        data = db_channel.to_dict()
+        channel_cache.put(channel.id, fingerprint, data.copy(), version)
+        return data
 
-    @sync_to_async()
+    @database_sync_to_async
     def forget(self, xid: int) -> None:
         DatabaseSession.query(Channel).filter(Channel.xid == xid).delete(synchronize_session=False)
+        invalidate(channel_cache, xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def select(self, xid: int) -> ChannelDict | None:
         channel = DatabaseSession.query(Channel).filter(Channel.xid == xid).one_or_none()
         return channel.to_dict() if channel else None
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_default_seats(self, xid: int, seats: int) -> None:
         query = (
             update(Channel)
@@ -62,8 +71,9 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_default_format(self, xid: int, format: int) -> None:
         query = (
             update(Channel)
@@ -73,8 +83,9 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_default_service(self, xid: int, service: int) -> None:
         query = (
             update(Channel)
@@ -84,8 +95,23 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
+
+    @database_sync_to_async
+    def verification_policies(self) -> dict[int, VerificationPolicy]:
+        """Get the verification settings of every channel that has any."""
+        rows = DatabaseSession.query(
+            Channel.xid,
+            Channel.auto_verify,
+            Channel.verified_only,
+            Channel.unverified_only,
+        ).filter(or_(Channel.auto_verify, Channel.verified_only, Channel.unverified_only))
+        return {
+            int(xid): VerificationPolicy(bool(auto), bool(verified), bool(unverified))
+            for xid, auto, verified, unverified in rows
+        }
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_auto_verify(self, xid: int, setting: bool) -> None:
         query = (
             update(Channel)
@@ -95,8 +121,9 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_verified_only(self, xid: int, setting: bool) -> None:
         query = (
             update(Channel)
@@ -106,8 +133,9 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_unverified_only(self, xid: int, setting: bool) -> None:
         query = (
             update(Channel)
@@ -117,8 +145,9 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_motd(self, xid: int, message: str | None = None) -> str:
         if message:
             max_len = Channel.motd.property.columns[0].type.length  # type: ignore
@@ -133,9 +162,10 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
         return motd
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_extra(self, xid: int, message: str | None = None) -> str:
         if message:
             max_len = Channel.extra.property.columns[0].type.length  # type: ignore
@@ -150,9 +180,10 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
         return extra
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_voice_category(self, xid: int, value: str) -> str:
         max_len = Channel.voice_category.property.columns[0].type.length  # type: ignore
         name = value[:max_len]
@@ -164,9 +195,10 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
         return name
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_delete_expired(self, xid: int, value: bool) -> bool:
         query = (
             update(Channel)
@@ -176,9 +208,10 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
         return value
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_show_points(self, xid: int, value: bool) -> bool:
         query = (
             update(Channel)
@@ -188,9 +221,10 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
         return value
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_require_confirmation(self, xid: int, value: bool) -> bool:
         query = (
             update(Channel)
@@ -200,9 +234,10 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
         return value
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_voice_invite(self, xid: int, value: bool) -> bool:
         query = (
             update(Channel)
@@ -212,4 +247,5 @@ class ChannelsService:
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        invalidate(channel_cache, xid)
         return value
@@ -1,31 +1,34 @@
 from __future__ import annotations
 
 import logging
-from collections import defaultdict
 from datetime import datetime, timedelta
-from itertools import permutations
 from typing import TYPE_CHECKING, cast
 
 import pytz
-from asgiref.sync import sync_to_async
 from ddtrace import tracer
-from sqlalchemy import func, select, update
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import aliased
-from sqlalchemy.sql.expression import and_, asc, column, or_
+from sqlalchemy.sql.expression import and_, asc, or_
 from sqlalchemy.sql.functions import count
 
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, atomic, database_sync_to_async
+from spellbot.elo import place, update_elos
+from spellbot.locks import queue_key
+from spellbot.matchmaking import matchmaking_index
 from spellbot.models import (
     Block,
     Channel,
     Game,
     GameDict,
     GameStatus,
+    Job,
+    JobKind,
     MirrorDict,
     Play,
     PlayDict,
     Post,
+    PostDict,
     Queue,
     QueueDict,
     Record,
@@ -33,6 +36,8 @@ from spellbot.models import (
     UserAward,
     Watch,
 )
+from spellbot.services.jobs import job_key, lease_expiry
+from spellbot.services.plays import count_plays
 from spellbot.settings import settings
 
 if TYPE_CHECKING:
@@ -46,19 +51,28 @@ MAX_SPELLTABLE_LINK_LEN = Game.spelltable_link.property.columns[0].type.length
 class GamesService:
     game: Game | None = None
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def select(self, game_id: int) -> GameDict | None:
         self.game = DatabaseSession.query(Game).get(game_id)
         return self.game.to_dict() if self.game else None
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def select_by_voice_xid(self, voice_xid: int) -> bool:
         self.game = DatabaseSession.query(Game).filter(Game.voice_xid == voice_xid).one_or_none()
         return bool(self.game)
 
-    @sync_to_async()
+    @database_sync_to_async
+    @tracer.wrap()
+    def voice_xids(self, voice_xids: list[int]) -> set[int]:
+        """Return the given voice channel IDs that were created for a game."""
+        if not voice_xids:
+            return set()
+        query = select(Game.voice_xid).where(Game.voice_xid.in_(voice_xids))
+        return {int(voice_xid) for voice_xid in DatabaseSession.scalars(query)}
+
+    @database_sync_to_async
     @tracer.wrap()
     def select_by_message_xid(self, message_xid: int) -> GameDict | None:
         self.game = (
@@ -69,7 +83,7 @@ class GamesService:
         )
         return self.game.to_dict() if self.game else None
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def select_last_ranked_game(self, user_xid: int) -> GameDict | None:
         self.game = (
@@ -88,14 +102,14 @@ class GamesService:
         )
         return self.game.to_dict() if self.game else None
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def get_plays(self) -> dict[int, PlayDict]:
         assert self.game
         plays = DatabaseSession.query(Play).filter(Play.game_id == self.game.id).all()
         return {play.user_xid: play.to_dict() for play in plays}
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def get_record(self, guild_xid: int, channel_xid: int, user_xid: int) -> RecordDict:
         record = (
@@ -118,7 +132,7 @@ class GamesService:
             DatabaseSession.commit()
         return record.to_dict()
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def add_player(self, player_xid: int) -> None:
         assert self.game
@@ -141,18 +155,21 @@ class GamesService:
             .on_conflict_do_nothing(),
         )
         DatabaseSession.commit()
+        matchmaking_index.add_players(self.game.id, [player_xid])
 
         # This operation should "dirty" the Game, so we need to update its updated_at.
+        now = datetime.now(tz=pytz.utc)
         query = (
             update(Game)
             .where(Game.id == self.game.id)
-            .values(updated_at=datetime.now(tz=pytz.utc))
+            .values(updated_at=now)
             .execution_options(synchronize_session=False)
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        matchmaking_index.touch([self.game.id], now)
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def upsert(
         self,
@@ -198,6 +215,7 @@ class GamesService:
             )
             DatabaseSession.add(game)
             DatabaseSession.commit()
+            matchmaking_index.add_game(game)
             new = True
 
         # upsert into queues
@@ -217,6 +235,7 @@ class GamesService:
             .on_conflict_do_nothing(),
         )
         DatabaseSession.commit()
+        matchmaking_index.add_players(cast(int, game.id), user_xids)
 
         self.game = game
         return new
@@ -235,7 +254,22 @@ class GamesService:
         mirrors: list[MirrorDict] | None = None,
     ) -> Game | None:
         mirrors = mirrors or []
-        required_seats = 1 + len(friends)
+        joiners = [author_xid, *friends]
+        required_seats = len(joiners)
+        guild_channels = [
+            (guild_xid, channel_xid),
+            *[(m["to_guild_xid"], m["to_channel_xid"]) for m in mirrors],
+        ]
+
+        if matchmaking_index.enabled:
+            keys = [queue_key(gid, cid, format, seats, service) for gid, cid in guild_channels]
+            for game_id in matchmaking_index.candidates(keys, joiners):
+                game = DatabaseSession.get(Game, game_id)
+                if game and game.status == GameStatus.PENDING.value and game.deleted_at is None:
+                    return game
+                logger.warning("matchmaking index had a stale game: %s", game_id)
+                matchmaking_index.remove_games([game_id])
+            return None
 
         guild_channel_filter = or_(
             *[
@@ -243,22 +277,44 @@ class GamesService:
                     Game.guild_xid == gid,
                     Game.channel_xid == cid,
                 )
-                for gid, cid in [
-                    (guild_xid, channel_xid),
-                    *[(m["to_guild_xid"], m["to_channel_xid"]) for m in mirrors],
-                ]
+                for gid, cid in guild_channels
             ]
         )
 
-        player_count = count(Queue.user_xid).over(partition_by=Game.id)
-        inner = (
-            select(
-                Game,
-                Queue.user_xid,
-                player_count.label("player_count"),  # type: ignore
+        # The seat, block-list and mirror filters all happen in this one statement so
+        # that the number of round trips doesn't grow with the number of pending games.
+        player_count = (
+            select(count(Queue.user_xid))
+            .where(Queue.game_id == Game.id)
+            .correlate(Game)
+            .scalar_subquery()
+        )
+        open_seats = seats - required_seats
+        seats_filter = player_count <= open_seats if open_seats >= 0 else player_count == 0
+        player = aliased(Queue)
+        blocked = (
+            select(player.user_xid)
+            .join(
+                Block,
+                or_(
+                    # a joiner has blocked one of the players
+                    and_(
+                        Block.user_xid.in_(joiners),
+                        Block.blocked_user_xid == player.user_xid,
+                    ),
+                    # a player has blocked one of the joiners
+                    and_(
+                        Block.user_xid == player.user_xid,
+                        Block.blocked_user_xid.in_(joiners),
+                    ),
+                ),
             )
-            .join(Queue, isouter=True)
-            .filter(  # type: ignore
+            .where(player.game_id == Game.id)
+            .correlate(Game)
+        )
+        return (
+            DatabaseSession.query(Game)
+            .filter(
                 and_(
                     guild_channel_filter,
                     Game.seats == seats,
@@ -266,55 +322,22 @@ class GamesService:
                     Game.service == service,
                     Game.status == GameStatus.PENDING.value,
                     Game.deleted_at.is_(None),
+                    seats_filter,
+                    ~blocked.exists(),
                 ),
             )
-            .group_by(Game, Queue.user_xid)
             .order_by(asc(Game.updated_at))
-            .alias("inner")
-        )
-        outer = aliased(Game, inner)
-        found = DatabaseSession.query(outer).filter(
-            or_(
-                column("player_count") == 0,
-                and_(
-                    column("player_count") > 0,
-                    column("player_count") <= seats - required_seats,
-                ),
-            ),
+            .limit(1)
+            .one_or_none()
         )
 
-        joiners = [author_xid, *friends]
-        xids_blocked_by_joiners = [
-            row.blocked_user_xid
-            for row in DatabaseSession.query(Block).filter(Block.user_xid.in_(joiners))
-        ]
-
-        game: Game
-        for game in found.all():
-            players = [player.xid for player in game.players]
-            if any(xid in players for xid in xids_blocked_by_joiners):
-                continue  # a joiner has blocked one of the players
-
-            xids_blocked_by_players = [
-                row.blocked_user_xid
-                for row in DatabaseSession.query(Block).filter(
-                    Block.user_xid.in_(players),
-                )
-            ]
-            if any(xid in joiners for xid in xids_blocked_by_players):
-                continue  # a player has blocked one of the joiners
-
-            return game
-
-        return None
-
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def to_embed(self, dm: bool = False) -> discord.Embed:
         assert self.game
         return self.game.to_embed(dm)
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def add_post(self, guild_xid: int, channel_xid: int, message_xid: int) -> None:
         assert self.game
@@ -334,14 +357,16 @@ class GamesService:
         )
         DatabaseSession.commit()
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def fully_seated(self) -> bool:
         assert self.game
-        rows = DatabaseSession.query(Queue).filter(Queue.game_id == self.game.id).count()
+        rows = matchmaking_index.player_count(self.game.id) if matchmaking_index.enabled else None
+        if rows is None:
+            rows = DatabaseSession.query(Queue).filter(Queue.game_id == self.game.id).count()
         return rows == self.game.seats
 
-    @sync_to_async
+    @database_sync_to_async
     @tracer.wrap()
     def other_game_ids(self) -> list[int]:
         """Use the currently selected game, return any other games with overlapping players."""
@@ -353,27 +378,66 @@ class GamesService:
         )
         return [int(row[0]) for row in rows if row[0]]
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def make_ready(self, spelltable_link: str | None) -> int:
+        """
+        Start the currently selected game with whoever is queued up for it.
+
+        The side effects of starting the game are recorded in the outbox in the same
+        transaction, leased to the caller so that it can carry them out right away.
+        """
         assert self.game
         assert len(spelltable_link or "") <= MAX_SPELLTABLE_LINK_LEN
         queues: list[QueueDict] = [
             queue.to_dict()
             for queue in DatabaseSession.query(Queue).filter(Queue.game_id == self.game.id).all()
         ]
+        player_xids = [queue["user_xid"] for queue in queues]
 
-        # update game's state
-        self.game.spelltable_link = spelltable_link
-        self.game.status = GameStatus.STARTED.value
-        self.game.started_at = datetime.now(tz=pytz.utc)
+        with atomic():
+            # update game's state
+            self.game.spelltable_link = spelltable_link
+            self.game.status = GameStatus.STARTED.value
+            self.game.started_at = datetime.now(tz=pytz.utc)
+
+            # record the side effects of starting this game in the outbox
+            kinds = [JobKind.CREATE_VOICE, JobKind.NOTIFY_PLAYERS]
+            if not spelltable_link:
+                kinds.insert(0, JobKind.CREATE_LINK)
+            locked_until = lease_expiry()
+            DatabaseSession.execute(
+                insert(Job)
+                .values(
+                    [
+                        {
+                            "key": job_key(kind, self.game.id),  # type: ignore
+                            "kind": kind.value,
+                            "game_id": self.game.id,
+                            "attempts": 1,
+                            "locked_until": locked_until,
+                        }
+                        for kind in kinds
+                    ],
+                )
+                .on_conflict_do_nothing(),
+            )
 
-        if not queues:  # Not sure this is possible, but just in case.
-            DatabaseSession.commit()
-            return cast(int, self.game.id)
+            # Not sure it's possible for there to be no players, but just in case.
+            if queues:
+                self._seat_players(queues)
 
-        # upsert into plays
-        DatabaseSession.execute(
+        DatabaseSession.commit()
+        matchmaking_index.remove_games([self.game.id])
+        if player_xids:
+            matchmaking_index.remove_players(player_xids)
+        return cast(int, self.game.id)
+
+    def _seat_players(self, queues: list[QueueDict]) -> None:
+        assert self.game
+
+        # upsert into plays, and count any new ones towards the leaderboards
+        played = DatabaseSession.scalars(
             insert(Play)
             .values(
                 [
@@ -385,8 +449,10 @@ class GamesService:
                     for queue in queues
                 ],
             )
-            .on_conflict_do_nothing(),
-        )
+            .on_conflict_do_nothing()
+            .returning(Play.user_xid),
+        ).all()
+        count_plays(self.game, played)
 
         # upsert into user_awards
         DatabaseSession.execute(
@@ -409,16 +475,13 @@ class GamesService:
             synchronize_session=False,
         )
 
-        DatabaseSession.commit()
-        return cast(int, self.game.id)
-
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def player_xids(self) -> list[int]:
         assert self.game
         return self.game.player_xids
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def watch_notes(self, player_xids: list[int]) -> dict[int, str | None]:
         assert self.game
@@ -434,7 +497,15 @@ class GamesService:
         )
         return {cast(int, watch.user_xid): cast(str | None, watch.note) for watch in watched}
 
-    @sync_to_async()
+    @database_sync_to_async
+    @tracer.wrap()
+    def set_link(self, spelltable_link: str) -> None:
+        assert self.game
+        assert len(spelltable_link) <= MAX_SPELLTABLE_LINK_LEN
+        self.game.spelltable_link = spelltable_link
+        DatabaseSession.commit()
+
+    @database_sync_to_async
     @tracer.wrap()
     def set_voice(self, *, voice_xid: int, voice_invite_link: str | None = None) -> None:
         assert self.game
@@ -442,7 +513,7 @@ class GamesService:
         self.game.voice_invite_link = voice_invite_link
         DatabaseSession.commit()
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def filter_blocked_list(self, author_xid: int, other_xids: list[int]) -> list[int]:
         """Given an author, filters out any blocked players from a list of others."""
@@ -463,7 +534,7 @@ class GamesService:
             - set(users_who_blocked_author_or_other),
         )
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def filter_pending_games(self, user_xids: list[int]) -> list[int]:
         rows = DatabaseSession.query(
@@ -478,7 +549,7 @@ class GamesService:
             if counts.get(user_xid, 0) + 1 < settings.MAX_PENDING_GAMES
         ]
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def blocked(self, author_xid: int) -> bool:
         assert self.game
@@ -497,7 +568,7 @@ class GamesService:
             return True
         return any(xid in player_xids for xid in users_who_blocked_author)
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def players_included(self, player_xid: int) -> bool:
         """
@@ -518,7 +589,7 @@ class GamesService:
         )
         return bool(record)
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def add_points(self, player_xid: int, points: int) -> None:
         assert self.game
@@ -541,9 +612,10 @@ class GamesService:
             },
         )
         DatabaseSession.execute(upsert, values)
+        self._touch(datetime.now(tz=pytz.utc))
         DatabaseSession.commit()
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def confirm_points(self, player_xid: int) -> datetime:
         assert self.game
@@ -559,97 +631,56 @@ class GamesService:
             .values(confirmed_at=confirmed_at)
         )
         DatabaseSession.execute(query)
+        self._touch(confirmed_at)
         DatabaseSession.commit()
         return confirmed_at
 
-    @sync_to_async()
+    def _touch(self, now: datetime) -> None:
+        # Points are shown on the record pages, which are cached until a game in them is
+        # updated, so reporting or confirming points should "dirty" the Game as well.
+        assert self.game
+        DatabaseSession.execute(
+            update(Game)
+            .where(Game.id == self.game.id)
+            .values(updated_at=now)
+            .execution_options(synchronize_session=False),
+        )
+
+    @database_sync_to_async
     @tracer.wrap()
-    def update_records(self, plays: dict[int, PlayDict]) -> None:  # noqa: C901
+    def update_records(self, plays: dict[int, PlayDict]) -> None:
         assert self.game
-        guild_xid = self.game.guild_xid
-        channel_xid = self.game.channel_xid
-        records: dict[int, Record] = {
-            r.user_xid: r
-            for r in DatabaseSession.query(Record).filter(
-                Record.guild_xid == guild_xid,
-                Record.channel_xid == channel_xid,
-            )
-        }
-        if len(records) != len(plays):
-            # some players may not have Record objects for this guild/channel yet, so
-            # we must create them now (giving each player their default ELO scores).
-            for user_xid in plays:
-                if user_xid not in records:
-                    record = Record(
-                        guild_xid=guild_xid,
-                        channel_xid=channel_xid,
-                        user_xid=user_xid,
-                        elo=1500,
-                    )
-                    DatabaseSession.add(record)
-                    records[user_xid] = record
-
-        assert len(records) == len(plays)
-
-        def place(play: PlayDict) -> int:
-            points = play["points"] or 0
-            if points >= 3:  # first place
-                return 1
-            if points > 0:  # second place
-                return 2
-            return 3  # last place
-
-        def calc_s(play1: PlayDict, play2: PlayDict):
-            if place(play1) < place(play2):
-                return 1.0
-            if place(play1) == place(play2):
-                return 0.5
-            return 0.0
-
-        def calc_ea(rec1: Record, rec2: Record):
-            return 1 / (1.0 + pow(10.0, (rec2.elo - rec1.elo) / 400.0))
-
-        def calc_elo_change(play1: PlayDict, rec1: Record, play2: PlayDict, rec2: Record, k: int):
-            s = calc_s(play1, play2)
-            ea = calc_ea(rec1, rec2)
-            return round(k * (s - ea))
-
-        n = len(records)
-        k = 32  # growth rate
-        player_to_player = list(permutations(range(n), 2))
-
-        elo_changes = defaultdict(int)
-        plays_list = sorted(plays.values(), key=lambda p: p["user_xid"])
-        records_list = sorted(records.values(), key=lambda r: r.user_xid)
-        for i, j in player_to_player:
-            elo_changes[i] += calc_elo_change(
-                plays_list[i], records_list[i], plays_list[j], records_list[j], k
-            )
-        for i in range(n):
-            before = records_list[i].elo
-            after = before + elo_changes[i]
-            print(f"ELO {records_list[i].user_xid}, {before} -> {after} ...")  # noqa: T201
-            records_list[i].elo = after  # type: ignore
+        places = {user_xid: place(play["points"]) for user_xid, play in plays.items()}
+        update_elos(self.game.guild_xid, self.game.channel_xid, places)  # type: ignore
         DatabaseSession.commit()
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def to_dict(self) -> GameDict:
         assert self.game
         return self.game.to_dict()
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
-    def inactive_games(self) -> list[GameDict]:
-        limit = datetime.now(tz=pytz.utc) - timedelta(minutes=settings.EXPIRE_TIME_M)
-        records = (
-            DatabaseSession.query(Game)
+    def expire_inactive(self) -> list[int]:
+        """
+        Delete every inactive pending game at once and return the IDs of those games.
+
+        Cleaning up the posts of the expired games is recorded in the outbox, in the same
+        transaction, as a job for each game that has any posts. Posts of games that still
+        had players in them are updated to say that the game expired, unless their channel
+        deletes expired games, and all other posts are deleted.
+        """
+        now = datetime.now(tz=pytz.utc)
+        limit = now - timedelta(minutes=settings.EXPIRE_TIME_M)
+        inactive = (
+            select(Game.id)
             .join(Queue, isouter=True)
-            .filter(
-                Game.status == GameStatus.PENDING.value,
+            .where(
+                Game.status == GameStatus.PENDING.value,  # type: ignore
                 Game.deleted_at.is_(None),
             )
-            .group_by(Game)
+            .group_by(Game.id)
             .having(
                 or_(
                     Game.updated_at <= limit,
@@ -657,9 +688,48 @@ class GamesService:
                 ),
             )
         )
-        return [record.to_dict() for record in records]
+        expired = DatabaseSession.execute(
+            update(Game)
+            .where(Game.id.in_(inactive.scalar_subquery()))
+            .values(deleted_at=now)
+            .returning(Game.id, Game.channel_xid)  # type: ignore
+            .execution_options(synchronize_session=False),
+        ).all()
+        if not expired:
+            return []
+
+        game_ids = [game_id for game_id, _ in expired]
+        dequeued = set(
+            DatabaseSession.scalars(
+                delete(Queue).where(Queue.game_id.in_(game_ids)).returning(Queue.game_id),
+            ),
+        )
+        logger.info("dequeued players from %s of %s expired games", len(dequeued), len(expired))
+        deletes_expired = set(
+            DatabaseSession.scalars(
+                select(Channel.xid).where(  # type: ignore
+                    Channel.xid.in_({channel_xid for _, channel_xid in expired}),  # type: ignore
+                    Channel.delete_expired.is_(True),
+                ),
+            ),
+        )
+        posted = set(
+            DatabaseSession.scalars(select(Post.game_id).where(Post.game_id.in_(game_ids))),
+        )
+        jobs: list[dict[str, object]] = []
+        for game_id, channel_xid in expired:
+            if game_id not in posted:
+                continue
+            keep = game_id in dequeued and channel_xid not in deletes_expired
+            kind = JobKind.EXPIRE_POSTS if keep else JobKind.DELETE_POSTS
+            jobs.append({"key": job_key(kind, game_id), "kind": kind.value, "game_id": game_id})
+        if jobs:
+            DatabaseSession.execute(insert(Job).values(jobs).on_conflict_do_nothing())
+        DatabaseSession.commit()
+        matchmaking_index.remove_games(game_ids)
+        return game_ids
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def delete_games(self, game_ids: list[int]) -> int:
         query = (
@@ -673,9 +743,22 @@ class GamesService:
         )
         logger.info("dequeued %s players from games %s", dequeued, game_ids)
         DatabaseSession.commit()
+        matchmaking_index.remove_games(game_ids)
         return dequeued
 
-    @sync_to_async()
+    @database_sync_to_async
+    @tracer.wrap()
+    def posts(self, game_ids: list[int]) -> list[PostDict]:
+        """Return the posts of the given games, including those of deleted games."""
+        posts = (
+            DatabaseSession.query(Post)
+            .filter(Post.game_id.in_(game_ids))
+            .order_by(Post.game_id, Post.message_xid)
+            .all()
+        )
+        return [post.to_dict() for post in posts]
+
+    @database_sync_to_async
     @tracer.wrap()
     def message_xids(self, game_ids: list[int]) -> list[int]:
         query = select(
@@ -683,7 +766,7 @@ class GamesService:
         ).where(Post.game_id.in_(game_ids))
         return [int(row[0]) for row in DatabaseSession.execute(query) if row[0]]
 
-    @sync_to_async()
+    @database_sync_to_async
     @tracer.wrap()
     def dequeue_players(self, player_xids: list[int]) -> list[int]:
         """Remove the given players from any queues that they're in; returns changed game ids."""
@@ -692,4 +775,5 @@ class GamesService:
         for queue in queues:
             DatabaseSession.delete(queue)
         DatabaseSession.commit()
+        matchmaking_index.remove_players(player_xids, game_ids)
         return list(game_ids)
@@ -4,12 +4,13 @@ from datetime import datetime
 from typing import TYPE_CHECKING, cast
 
 import pytz
-from asgiref.sync import sync_to_async
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql.expression import and_
 
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async
+from spellbot.invalidation import invalidate
 from spellbot.models import Channel, Guild, GuildAward, GuildAwardDict, GuildDict
+from spellbot.upsert_cache import guild_cache
 
 if TYPE_CHECKING:
     import discord
@@ -18,11 +19,18 @@ if TYPE_CHECKING:
 class GuildsService:
     guild: Guild | None = None
 
-    @sync_to_async()
+    @database_sync_to_async
     def upsert(self, guild: discord.Guild) -> GuildDict | None:
         name_max_len = Guild.name.property.columns[0].type.length  # type: ignore
         raw_name = getattr(guild, "name", "")
         name = raw_name[:name_max_len]
+        if guild_cache.get(guild.id, name):
+            # Only the fact that the guild's row is up to date is cached, the rest
+            # of it, including its channels and awards, is always read fresh.
+            self.guild = DatabaseSession.get(Guild, guild.id)
+            if self.guild:
+                return self.guild.to_dict()
+        version = guild_cache.version(guild.id)
         values = {
             "xid": guild.id,
             "name": name,
@@ -46,9 +54,12 @@ class GuildsService:
             )
             .one_or_none()
         )
-        return self.guild.to_dict() if self.guild else None
+        if not self.guild:
+            return None
+        guild_cache.put(guild.id, name, True, version)
+        return self.guild.to_dict()
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_banned(self, banned: bool, xid: int) -> None:
         values = {
             "xid": xid,
@@ -67,8 +78,9 @@ class GuildsService:
         )
         DatabaseSession.execute(upsert, values)
         DatabaseSession.commit()
+        invalidate(guild_cache, xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def select(self, guild_xid: int) -> bool:
         self.guild = (
             DatabaseSession.query(Guild)
@@ -79,17 +91,17 @@ class GuildsService:
         )
         return bool(self.guild)
 
-    @sync_to_async()
+    @database_sync_to_async
     def should_voice_create(self) -> bool:
         assert self.guild
         return cast(bool, self.guild.voice_create)
 
-    @sync_to_async()
+    @database_sync_to_async
     def get_use_max_bitrate(self) -> bool:
         assert self.guild
         return cast(bool, self.guild.use_max_bitrate)
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_motd(self, message: str | None = None) -> None:
         if message:
             motd = message[: Guild.motd.property.columns[0].type.length]  # type: ignore
@@ -97,31 +109,35 @@ class GuildsService:
         else:
             self.guild.motd = ""  # type: ignore
         DatabaseSession.commit()
+        invalidate(guild_cache, self.guild.xid)  # type: ignore
 
-    @sync_to_async()
+    @database_sync_to_async
     def toggle_show_links(self) -> None:
         assert self.guild
         self.guild.show_links = not self.guild.show_links
         DatabaseSession.commit()
+        invalidate(guild_cache, self.guild.xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def toggle_voice_create(self) -> None:
         assert self.guild
         self.guild.voice_create = not self.guild.voice_create
         DatabaseSession.commit()
+        invalidate(guild_cache, self.guild.xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def toggle_use_max_bitrate(self) -> None:
         assert self.guild
         self.guild.use_max_bitrate = not self.guild.use_max_bitrate
         DatabaseSession.commit()
+        invalidate(guild_cache, self.guild.xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def current_name(self) -> str:
         assert self.guild
         return cast(str | None, self.guild.name) or ""
 
-    @sync_to_async()
+    @database_sync_to_async
     def voice_category_prefixes(self) -> list[str]:
         assert self.guild
         return [
@@ -132,19 +148,30 @@ class GuildsService:
             .all()
         ]
 
-    @sync_to_async()
-    def voiced(self) -> list[int]:
-        rows = DatabaseSession.query(Guild.xid).filter(Guild.voice_create.is_(True)).all()
-        if not rows:
-            return []
-        return [int(row[0]) for row in rows]
-
-    @sync_to_async()
+    @database_sync_to_async
+    def voiced(self) -> dict[int, list[str]]:
+        """Return the voice category prefixes of every guild that creates voice channels."""
+        rows = (
+            DatabaseSession.query(Guild.xid, Channel.voice_category)
+            .outerjoin(Channel, Channel.guild_xid == Guild.xid)
+            .filter(Guild.voice_create.is_(True))
+            .distinct()
+            .order_by(Guild.xid, Channel.voice_category)
+            .all()
+        )
+        voiced: dict[int, list[str]] = {}
+        for guild_xid, prefix in rows:
+            prefixes = voiced.setdefault(int(guild_xid), [])
+            if prefix is not None:
+                prefixes.append(str(prefix))
+        return voiced
+
+    @database_sync_to_async
     def to_dict(self) -> GuildDict:
         assert self.guild
         return self.guild.to_dict()
 
-    @sync_to_async()
+    @database_sync_to_async
     def has_award_with_count(self, count: int) -> bool:
         assert self.guild
         return bool(
@@ -158,7 +185,7 @@ class GuildsService:
             .one_or_none(),
         )
 
-    @sync_to_async()
+    @database_sync_to_async
     def award_add(
         self,
         count: int,
@@ -183,12 +210,14 @@ class GuildsService:
         )
         DatabaseSession.add(award)
         DatabaseSession.commit()
+        invalidate(guild_cache, self.guild.xid)
         return award.to_dict()
 
-    @sync_to_async()
+    @database_sync_to_async
     def award_delete(self, guild_award_id: int) -> None:
         assert self.guild
         award = DatabaseSession.query(GuildAward).get(guild_award_id)
         if award:
             DatabaseSession.delete(award)
         DatabaseSession.commit()
+        invalidate(guild_cache, self.guild.xid)
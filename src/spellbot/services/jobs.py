@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, cast
+
+import pytz
+from ddtrace import tracer
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.sql.expression import or_
+
+from spellbot.database import DatabaseSession, atomic, database_sync_to_async
+from spellbot.models import Job, JobDict, JobKind
+from spellbot.settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+MAX_ERROR_LEN = Job.error.property.columns[0].type.length
+
+
+def lease_expiry() -> datetime:
+    return datetime.now(tz=pytz.utc) + timedelta(seconds=settings.OUTBOX_LEASE_S)
+
+
+def job_key(kind: JobKind, game_id: int) -> str:
+    return f"{kind.name.lower()}:SB{game_id}"
+
+
+class JobsService:
+    @database_sync_to_async
+    @tracer.wrap()
+    def leased(self, game_id: int, kinds: Iterable[JobKind]) -> list[JobDict]:
+        """
+        Return the unfinished jobs of the given kinds for a game, oldest first.
+
+        Only jobs whose lease hasn't run out are returned, since once it has they may have
+        been claimed by someone else.
+        """
+        jobs = (
+            DatabaseSession.query(Job)
+            .filter(
+                Job.game_id == game_id,
+                Job.kind.in_([kind.value for kind in kinds]),  # type: ignore
+                Job.finished_at.is_(None),
+                Job.locked_until > datetime.now(tz=pytz.utc),
+            )
+            .order_by(Job.id)
+            .all()
+        )
+        return [job.to_dict() for job in jobs]
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def claim(self, limit: int, kinds: Iterable[JobKind]) -> list[JobDict]:
+        """Lease jobs of the given kinds that are due and that nobody else has leased."""
+        now = datetime.now(tz=pytz.utc)
+        due = (
+            select(Job.id)
+            .where(
+                Job.kind.in_([kind.value for kind in kinds]),  # type: ignore
+                Job.finished_at.is_(None),
+                Job.run_at <= now,
+                or_(Job.locked_until.is_(None), Job.locked_until < now),
+            )
+            .order_by(Job.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = DatabaseSession.scalars(
+            update(Job)
+            .where(Job.id.in_(due.scalar_subquery()))
+            .values(locked_until=lease_expiry(), attempts=Job.attempts + 1)
+            .returning(Job)
+            .execution_options(synchronize_session=False),
+        ).all()
+        DatabaseSession.commit()
+        return sorted((job.to_dict() for job in jobs), key=lambda job: job["id"])
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def finish(self, job: JobDict) -> bool:
+        """Finish a leased job, returning False if the lease has been lost to someone else."""
+        result = DatabaseSession.execute(
+            update(Job)
+            .where(Job.id == job["id"], Job.locked_until == job["locked_until"])
+            .values(finished_at=datetime.now(tz=pytz.utc), locked_until=None, error=None)
+            .execution_options(synchronize_session=False),
+        )
+        DatabaseSession.commit()
+        return bool(result.rowcount)
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def finish_all(self, jobs: list[JobDict]) -> None:
+        """Finish leased jobs, except for any whose lease has been lost to someone else."""
+        leases = [(job["id"], job["locked_until"]) for job in jobs]
+        DatabaseSession.execute(
+            update(Job)
+            .where(tuple_(Job.id, Job.locked_until).in_(leases))
+            .values(finished_at=datetime.now(tz=pytz.utc), locked_until=None, error=None)
+            .execution_options(synchronize_session=False),
+        )
+        DatabaseSession.commit()
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def fail(self, job: JobDict, error: str) -> bool | None:
+        """
+        Record a failed attempt at a leased job and return True if it's going to be retried.
+
+        Returns None, without recording anything, if the lease has been lost to someone else.
+        """
+        with atomic():
+            found = (
+                DatabaseSession.query(Job)
+                .filter(Job.id == job["id"], Job.locked_until == job["locked_until"])
+                .with_for_update()
+                .one_or_none()
+            )
+            if found is None:
+                return None
+            now = datetime.now(tz=pytz.utc)
+            attempts = cast(int, found.attempts)
+            retry = attempts < settings.OUTBOX_MAX_ATTEMPTS
+            found.error = error[:MAX_ERROR_LEN]
+            found.locked_until = None
+            if retry:
+                # Back off exponentially: 30 seconds, 1 minute, 2 minutes, etc.
+                found.run_at = now + timedelta(seconds=30 * 2 ** (attempts - 1))
+            else:
+                found.finished_at = now
+        DatabaseSession.commit()
+        return retry
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def purge(self, age: timedelta) -> int:
+        """Delete jobs that were finished more than the given age ago."""
+        cutoff = datetime.now(tz=pytz.utc) - age
+        deleted = (
+            DatabaseSession.query(Job)
+            .filter(Job.finished_at.is_not(None), Job.finished_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        DatabaseSession.commit()
+        return deleted
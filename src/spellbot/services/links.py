@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import math
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytz
+from ddtrace import tracer
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.sql.expression import and_, or_
+
+from spellbot.database import DatabaseSession, database_sync_to_async
+from spellbot.models import PooledLink
+from spellbot.settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+RATE_WINDOW = timedelta(hours=1)
+
+
+def link_pool_target(starts_per_hour: int) -> int:
+    """How many links to keep in the pool to cover the next few minutes of game starts."""
+    needed = math.ceil(starts_per_hour * settings.SPELLTABLE_POOL_LEAD_M / 60)
+    return max(settings.SPELLTABLE_POOL_MIN, min(needed, settings.SPELLTABLE_POOL_MAX))
+
+
+class LinksService:
+    @database_sync_to_async
+    @tracer.wrap()
+    def take(self, service: int) -> str | None:
+        """Take the pooled link closest to expiring, if there are any that haven't expired."""
+        now = datetime.now(tz=pytz.utc)
+        available = (
+            select(PooledLink.id)
+            .where(
+                and_(
+                    PooledLink.taken_at.is_(None),
+                    PooledLink.expires_at > now,
+                    PooledLink.service == service,  # type: ignore
+                ),
+            )
+            .order_by(PooledLink.expires_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        link = DatabaseSession.scalars(
+            update(PooledLink)
+            .where(PooledLink.id == available.scalar_subquery())
+            .values(taken_at=now)
+            .returning(PooledLink.link)
+            .execution_options(synchronize_session=False),
+        ).one_or_none()
+        DatabaseSession.commit()
+        return link
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def add(self, service: int, links: Iterable[str]) -> None:
+        now = datetime.now(tz=pytz.utc)
+        expires_at = now + timedelta(minutes=settings.SPELLTABLE_POOL_TTL_M)
+        rows = [
+            {"service": service, "link": link, "created_at": now, "expires_at": expires_at}
+            for link in links
+        ]
+        if rows:
+            DatabaseSession.execute(insert(PooledLink), rows)
+            DatabaseSession.commit()
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def record(self, service: int, link: str) -> None:
+        """Record a link that was created on demand because the pool was empty."""
+        now = datetime.now(tz=pytz.utc)
+        DatabaseSession.execute(
+            insert(PooledLink).values(
+                service=service,
+                link=link,
+                created_at=now,
+                expires_at=now,
+                taken_at=now,
+            ),
+        )
+        DatabaseSession.commit()
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def stock(self, service: int) -> int:
+        """Return the number of links in the pool that can still be taken."""
+        now = datetime.now(tz=pytz.utc)
+        return DatabaseSession.scalar(
+            select(func.count()).where(
+                and_(
+                    PooledLink.taken_at.is_(None),
+                    PooledLink.expires_at > now,
+                    PooledLink.service == service,  # type: ignore
+                ),
+            ),
+        )
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def starts_per_hour(self, service: int) -> int:
+        """Return the number of links that were given to games over the last hour."""
+        since = datetime.now(tz=pytz.utc) - RATE_WINDOW
+        return DatabaseSession.scalar(
+            select(func.count()).where(
+                and_(PooledLink.taken_at >= since, PooledLink.service == service),  # type: ignore
+            ),
+        )
+
+    @database_sync_to_async
+    @tracer.wrap()
+    def purge(self) -> int:
+        """Delete links that expired before being taken, or that were taken a while ago."""
+        now = datetime.now(tz=pytz.utc)
+        deleted = (
+            DatabaseSession.query(PooledLink)
+            .filter(
+                or_(
+                    and_(PooledLink.taken_at.is_(None), PooledLink.expires_at <= now),
+                    PooledLink.taken_at < now - RATE_WINDOW,
+                ),
+            )
+            .delete(synchronize_session=False)
+        )
+        DatabaseSession.commit()
+        return deleted
@@ -2,16 +2,16 @@ from __future__ import annotations
 
 import logging
 
-from asgiref.sync import sync_to_async
-
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async
+from spellbot.invalidation import invalidate
 from spellbot.models import Mirror, MirrorDict
+from spellbot.upsert_cache import mirror_cache
 
 logger = logging.getLogger(__name__)
 
 
 class MirrorsService:
-    @sync_to_async()
+    @database_sync_to_async
     def add_mirror(
         self,
         from_guild_xid: int,
@@ -27,13 +27,22 @@ class MirrorsService:
         )
         DatabaseSession.add(mirror)
         DatabaseSession.commit()
+        invalidate(mirror_cache, (from_guild_xid, from_channel_xid))
 
-    @sync_to_async()
+    @database_sync_to_async
     def get(self, from_guild_xid: int, from_channel_xid: int) -> list[MirrorDict]:
-        return [
+        # Looked up by every /lfg, but only changed by add_mirror().
+        key = (from_guild_xid, from_channel_xid)
+        cached = mirror_cache.get(key, None)
+        if cached is not None:
+            return list(cached)
+        version = mirror_cache.version(key)
+        mirrors = [
             m.to_dict()
             for m in DatabaseSession.query(Mirror).filter(
                 Mirror.from_guild_xid == from_guild_xid,
                 Mirror.from_channel_xid == from_channel_xid,
             )
         ]
+        mirror_cache.put(key, None, mirrors, version)
+        return list(mirrors)
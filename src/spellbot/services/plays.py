@@ -1,20 +1,24 @@
 from __future__ import annotations
 
 import datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any, NamedTuple, cast
 
 import pytz
-from asgiref.sync import sync_to_async
 from dateutil import tz
 from dateutil.relativedelta import relativedelta
-from sqlalchemy.sql.expression import and_, extract, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.expression import and_, func, text
 
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async
 from spellbot.enums import GameFormat
-from spellbot.models import Channel, Game, Guild, Play
+from spellbot.models import ALL_TIME, Channel, Game, Guild, Play, PlayCount, Record, play_period
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
 
 USER_PAGE_SIZE = 25
 CHANNEL_PAGE_SIZE = 10
+LEADERBOARD_SIZE = 10
 
 USER_RECORDS_SQL = r"""
     WITH game_plays AS (
@@ -33,12 +37,12 @@ USER_RECORDS_SQL = r"""
         WHERE
             games.guild_xid = :guild_xid AND
             plays.user_xid = :user_xid
-        ORDER BY games.updated_at DESC
-        OFFSET :offset
-        LIMIT :page_size
+            {keyset}
+        ORDER BY games.updated_at {direction}, games.id {direction}
+        LIMIT :limit
     )
     SELECT
-        game_plays.game_id,
+        game_plays.game_id AS id,
         game_plays.updated_at,
         game_plays.channel_xid,
         game_plays.message_xid,
@@ -55,7 +59,7 @@ USER_RECORDS_SQL = r"""
             ),
             '@'
             ORDER BY users.xid
-        )
+        ) AS scores
     FROM game_plays
     JOIN plays ON plays.game_id = game_plays.game_id
     JOIN users ON users.xid = plays.user_xid
@@ -68,17 +72,36 @@ USER_RECORDS_SQL = r"""
         game_plays.spelltable_link,
         game_plays.format,
         channels.name
-    ORDER BY game_plays.updated_at DESC
+    ORDER BY game_plays.updated_at {direction}, game_plays.game_id {direction}
     ;
 """
 
 CHANNEL_RECORDS_SQL = r"""
+    WITH channel_games AS (
+        SELECT
+            games.id,
+            games.updated_at,
+            posts.message_xid,
+            games.spelltable_link,
+            games.format
+        FROM games
+        JOIN posts ON posts.game_id = games.id
+            AND posts.guild_xid = games.guild_xid
+            AND posts.channel_xid = games.channel_xid
+        WHERE
+            games.guild_xid = :guild_xid AND
+            games.channel_xid = :channel_xid AND
+            EXISTS (SELECT 1 FROM plays WHERE plays.game_id = games.id)
+            {keyset}
+        ORDER BY games.updated_at {direction}, games.id {direction}
+        LIMIT :limit
+    )
     SELECT
-        games.id,
-        games.updated_at,
-        posts.message_xid,
-        games.spelltable_link,
-        games.format,
+        channel_games.id,
+        channel_games.updated_at,
+        channel_games.message_xid,
+        channel_games.spelltable_link,
+        channel_games.format,
         STRING_AGG(
             CONCAT(
                 REPLACE(REPLACE(users.name, ':', ''), '@', ''),
@@ -89,29 +112,121 @@ CHANNEL_RECORDS_SQL = r"""
             ),
             '@'
             ORDER BY users.xid
-        )
-    FROM games
-    JOIN plays ON plays.game_id = games.id
+        ) AS scores
+    FROM channel_games
+    JOIN plays ON plays.game_id = channel_games.id
     JOIN users ON users.xid = plays.user_xid
-    JOIN posts ON posts.game_id = games.id
-        AND posts.guild_xid = games.guild_xid
-        AND posts.channel_xid = games.channel_xid
-    WHERE
-        games.guild_xid = :guild_xid AND
-        games.channel_xid = :channel_xid
     GROUP BY
-        games.id,
-        games.updated_at,
-        posts.message_xid,
-        games.spelltable_link,
-        games.format
-    ORDER BY games.updated_at DESC
-    OFFSET :offset
-    LIMIT :page_size
+        channel_games.id,
+        channel_games.updated_at,
+        channel_games.message_xid,
+        channel_games.spelltable_link,
+        channel_games.format
+    ORDER BY channel_games.updated_at {direction}, channel_games.id {direction}
     ;
 """
 
 
+PLAY_COUNTS_SQL = r"""
+    INSERT INTO play_counts (guild_xid, channel_xid, user_xid, period, games)
+    SELECT
+        games.guild_xid,
+        games.channel_xid,
+        plays.user_xid,
+        periods.period,
+        count(*)
+    FROM plays
+    JOIN games ON games.id = plays.game_id
+    CROSS JOIN LATERAL (
+        VALUES
+            (CAST(:all_time AS INTEGER)),
+            (CAST(
+                extract(year FROM games.started_at) * 100 + extract(month FROM games.started_at)
+                AS INTEGER
+            ))
+    ) AS periods (period)
+    WHERE
+        games.guild_xid = :guild_xid AND
+        periods.period IS NOT NULL
+        {users}
+    GROUP BY games.guild_xid, games.channel_xid, plays.user_xid, periods.period
+    ON CONFLICT (guild_xid, channel_xid, user_xid, period)
+    DO UPDATE SET games = EXCLUDED.games
+"""
+
+
+KEYSET_FILTER = "AND (games.updated_at, games.id) {op} (:cursor_at, :cursor_id)"
+EPOCH = datetime.datetime(1970, 1, 1)  # noqa: DTZ001
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+class Cursor(NamedTuple):
+    """The position of a game in a history of games that's ordered from newest to oldest."""
+
+    updated_at: datetime.datetime
+    id: int
+
+    def encode(self) -> str:
+        return f"{(self.updated_at - EPOCH) // MICROSECOND}_{self.id}"
+
+    @classmethod
+    def decode(cls, value: str) -> Cursor:
+        """Parse a cursor created by `encode()`, raising ValueError if it isn't one."""
+        try:
+            micros, game_id = value.split("_")
+            return cls(EPOCH + int(micros) * MICROSECOND, int(game_id))
+        except (ValueError, OverflowError) as ex:
+            raise ValueError(value) from ex
+
+
+class RecordsPage(NamedTuple):
+    records: list[dict[str, Any]]
+    newer: Cursor | None
+    older: Cursor | None
+
+
+def paged_sql(sql: str, before: Cursor | None, after: Cursor | None) -> tuple[str, dict[str, Any]]:
+    """
+    Fill in the keyset pagination clauses of a records query.
+
+    Pages are found with a `(updated_at, id)` comparison against the cursor rather than
+    with an offset, so that a deep page costs the same as the first one. To get the page
+    of games newer than a cursor they are read in ascending order, and then reversed.
+    """
+    cursor = after or before
+    if cursor is None:
+        return sql.format(keyset="", direction="DESC"), {}
+    op, direction = (">", "ASC") if after else ("<", "DESC")
+    params = {"cursor_at": cursor.updated_at, "cursor_id": cursor.id}
+    return sql.format(keyset=KEYSET_FILTER.format(op=op), direction=direction), params
+
+
+def page_rows(
+    rows: Iterable[Any],
+    page_size: int,
+    before: Cursor | None,
+    after: Cursor | None,
+) -> tuple[list[Any], Cursor | None, Cursor | None]:
+    """
+    Trim rows fetched by a `paged_sql()` query down to a page, newest first.
+
+    The query asks for one more row than fits on a page to find out if there's another
+    page beyond it. Also returns the cursors for the pages of newer and older games.
+    """
+    page = list(rows)
+    more = len(page) > page_size
+    page = page[:page_size]
+    if after:
+        page.reverse()
+    if not page:
+        return page, None, None
+    has_newer = more if after else before is not None
+    has_older = True if after else more
+    newer = Cursor(page[0].updated_at, page[0].id) if has_newer else None
+    older = Cursor(page[-1].updated_at, page[-1].id) if has_older else None
+    return page, newer, older
+
+
 def make_scores(data: str) -> dict[str, Any]:
     scores = {}
     records = data.split("@")
@@ -143,8 +258,52 @@ def decomposed(combined_data: list[dict[str, Any]]) -> list[dict[str, Any]]:
     return decomposed_data
 
 
+def count_plays(game: Game, user_xids: Iterable[int]) -> None:
+    """Add a game that was just started to its players' play counts."""
+    assert game.started_at is not None
+    periods = [ALL_TIME, play_period(cast(datetime.datetime, game.started_at))]
+    rows = [
+        {
+            "guild_xid": game.guild_xid,
+            "channel_xid": game.channel_xid,
+            "user_xid": user_xid,
+            "period": period,
+            "games": 1,
+        }
+        # Always lock the rows in the same order so that concurrent games can't deadlock.
+        for user_xid in sorted(user_xids)
+        for period in periods
+    ]
+    if not rows:
+        return
+    upsert = insert(PlayCount).values(rows)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[
+            PlayCount.guild_xid,
+            PlayCount.channel_xid,
+            PlayCount.user_xid,
+            PlayCount.period,
+        ],
+        set_={"games": PlayCount.games + 1},
+    )
+    DatabaseSession.execute(upsert)
+
+
+def recount_plays(guild_xid: int, user_xids: list[int] | None = None) -> None:
+    """
+    Recount the play counts of a guild, or of just some of its users, from their plays.
+
+    Games that start while their players are being recounted might not be counted.
+    """
+    users = "AND plays.user_xid = ANY(:user_xids)" if user_xids is not None else ""
+    DatabaseSession.execute(
+        text(PLAY_COUNTS_SQL.format(users=users)),
+        {"guild_xid": guild_xid, "all_time": ALL_TIME, "user_xids": user_xids},
+    )
+
+
 class PlaysService:
-    @sync_to_async()
+    @database_sync_to_async
     def count(self, user_xid: int, guild_xid: int) -> int:
         return int(
             DatabaseSession.query(Play)
@@ -159,49 +318,81 @@ class PlaysService:
             or 0,
         )
 
-    @sync_to_async()
+    @database_sync_to_async
+    def user_records_updated_at(self, guild_xid: int, user_xid: int) -> datetime.datetime | None:
+        """Return when the most recently updated game that a user played in a guild changed."""
+        return (
+            DatabaseSession.query(func.max(Game.updated_at))
+            .join(Play, Play.game_id == Game.id)
+            .filter(and_(Play.user_xid == user_xid, Game.guild_xid == guild_xid))
+            .scalar()
+        )
+
+    @database_sync_to_async
+    def channel_records_updated_at(
+        self,
+        guild_xid: int,
+        channel_xid: int,
+    ) -> datetime.datetime | None:
+        """Return when the most recently updated game in a channel changed."""
+        return (
+            DatabaseSession.query(func.max(Game.updated_at))
+            .filter(and_(Game.guild_xid == guild_xid, Game.channel_xid == channel_xid))  # type: ignore
+            .scalar()
+        )
+
+    @database_sync_to_async
     def user_records(
         self,
         guild_xid: int,
         user_xid: int,
-        page: int = 0,
-    ) -> list[dict[str, Any]] | None:
+        before: Cursor | None = None,
+        after: Cursor | None = None,
+        page_size: int | None = None,
+    ) -> RecordsPage | None:
+        page_size = page_size or USER_PAGE_SIZE
         guild = DatabaseSession.query(Guild).filter(Guild.xid == guild_xid).one_or_none()
         if not guild:
             return None
 
+        sql, params = paged_sql(USER_RECORDS_SQL, before, after)
         rows = DatabaseSession.execute(
-            text(USER_RECORDS_SQL),
+            text(sql),
             {
                 "guild_xid": guild_xid,
                 "user_xid": user_xid,
-                "offset": page * USER_PAGE_SIZE,
-                "page_size": USER_PAGE_SIZE,
+                "limit": page_size + 1,
+                **params,
             },
         )
-        return [
+        page, newer, older = page_rows(rows, page_size, before, after)
+        records = [
             {
-                "id": row[0],
-                "updated_at": row[1].replace(tzinfo=tz.UTC).timestamp() * 1000,
+                "id": row.id,
+                "updated_at": row.updated_at.replace(tzinfo=tz.UTC).timestamp() * 1000,
                 "guild": guild_xid,
-                "channel": row[2],
-                "message": row[3],
-                "link": row[4],
-                "format": str(GameFormat(row[5])),
+                "channel": row.channel_xid,
+                "message": row.message_xid,
+                "link": row.spelltable_link,
+                "format": str(GameFormat(row.format)),
                 "guild_name": guild.name,
-                "channel_name": row[6],
-                "scores": make_scores(row[7]),
+                "channel_name": row.name,
+                "scores": make_scores(row.scores),
             }
-            for row in rows
+            for row in page
         ]
+        return RecordsPage(records, newer, older)
 
-    @sync_to_async()
+    @database_sync_to_async
     def channel_records(
         self,
         guild_xid: int,
         channel_xid: int,
-        page: int = 0,
-    ) -> list[dict[str, Any]] | None:
+        before: Cursor | None = None,
+        after: Cursor | None = None,
+        page_size: int | None = None,
+    ) -> RecordsPage | None:
+        page_size = page_size or CHANNEL_PAGE_SIZE
         guild = DatabaseSession.query(Guild).filter(Guild.xid == guild_xid).one_or_none()
         if not guild:
             return None
@@ -209,33 +400,35 @@ class PlaysService:
         if not channel:
             return None
 
+        sql, params = paged_sql(CHANNEL_RECORDS_SQL, before, after)
         rows = DatabaseSession.execute(
-            text(CHANNEL_RECORDS_SQL),
+            text(sql),
             {
                 "guild_xid": guild_xid,
                 "channel_xid": channel_xid,
-                "offset": page * CHANNEL_PAGE_SIZE,
-                "page_size": CHANNEL_PAGE_SIZE,
+                "limit": page_size + 1,
+                **params,
             },
         )
+        page, newer, older = page_rows(rows, page_size, before, after)
         combined_data = [
             {
-                "id": row[0],
-                "updated_at": row[1].replace(tzinfo=tz.UTC).timestamp() * 1000,
+                "id": row.id,
+                "updated_at": row.updated_at.replace(tzinfo=tz.UTC).timestamp() * 1000,
                 "guild": guild_xid,
                 "channel": channel_xid,
-                "message": row[2],
-                "link": row[3],
-                "format": str(GameFormat(row[4])),
+                "message": row.message_xid,
+                "link": row.spelltable_link,
+                "format": str(GameFormat(row.format)),
                 "guild_name": guild.name,
                 "channel_name": channel.name,
-                "scores": make_scores(row[5]),
+                "scores": make_scores(row.scores),
             }
-            for row in rows
+            for row in page
         ]
-        return decomposed(combined_data)
+        return RecordsPage(decomposed(combined_data), newer, older)
 
-    @sync_to_async()
+    @database_sync_to_async
     def top_records(
         self,
         guild_xid: int,
@@ -243,23 +436,58 @@ class PlaysService:
         monthly: bool,
         ago: int,
     ) -> list[tuple[str, Any]]:
-        filters = [
-            Play.game_id == Game.id,
-            Game.guild_xid == guild_xid,
-            Game.channel_xid == channel_xid,
-        ]
+        period = ALL_TIME
         if monthly:
             target = datetime.datetime.now(tz=pytz.utc).date() + relativedelta(months=-ago)
-            filters.append(extract("year", Game.started_at) == target.year)
-            filters.append(extract("month", Game.started_at) == target.month)
+            period = play_period(target)
+        result = (
+            DatabaseSession.query(PlayCount.user_xid, PlayCount.games)
+            .filter(
+                and_(
+                    PlayCount.guild_xid == guild_xid,
+                    PlayCount.channel_xid == channel_xid,
+                    PlayCount.period == period,
+                ),
+            )
+            .order_by(PlayCount.games.desc())
+            .limit(LEADERBOARD_SIZE)
+        )
+        return [tuple(row) for row in result.all()]
+
+    @database_sync_to_async
+    def top_elo(self, guild_xid: int, channel_xid: int) -> list[tuple[int, int, int]]:
+        """Return the user, ELO and number of games played of the highest rated players."""
         result = (
             DatabaseSession.query(
-                Play.user_xid,
-                func.count(Play.game_id).label("count"),
+                Record.user_xid,
+                Record.elo,
+                func.coalesce(PlayCount.games, 0),
             )
-            .filter(*filters)
-            .group_by(Play.user_xid)
-            .order_by(text("count DESC"))
-            .limit(10)
+            .outerjoin(
+                PlayCount,
+                and_(
+                    PlayCount.guild_xid == Record.guild_xid,
+                    PlayCount.channel_xid == Record.channel_xid,
+                    PlayCount.user_xid == Record.user_xid,
+                    PlayCount.period == ALL_TIME,
+                ),
+            )
+            .filter(
+                and_(
+                    Record.guild_xid == guild_xid,
+                    Record.channel_xid == channel_xid,
+                ),
+            )
+            .order_by(Record.elo.desc())
+            .limit(LEADERBOARD_SIZE)
         )
-        return result.all()
+        return [tuple(row) for row in result.all()]
+
+    @database_sync_to_async
+    def backfill_play_counts(self) -> int:
+        """Recount the play counts of every guild, returning how many guilds there were."""
+        guild_xids = [xid for (xid,) in DatabaseSession.query(Guild.xid).order_by(Guild.xid)]
+        for guild_xid in guild_xids:
+            recount_plays(guild_xid)
+            DatabaseSession.commit()
+        return len(guild_xids)
@@ -5,13 +5,16 @@ from datetime import datetime
 from typing import TYPE_CHECKING, Any, cast
 
 import pytz
-from asgiref.sync import sync_to_async
 from sqlalchemy import update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql.expression import and_
 
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async
+from spellbot.invalidation import invalidate, invalidate_all
+from spellbot.matchmaking import matchmaking_index
 from spellbot.models import Block, Game, Play, Post, Queue, User, UserAward, UserDict, Verify, Watch
+from spellbot.services.plays import recount_plays
+from spellbot.upsert_cache import user_cache
 
 if TYPE_CHECKING:
     import discord
@@ -22,13 +25,18 @@ logger = logging.getLogger(__name__)
 class UsersService:
     user: User | None = None
 
-    @sync_to_async()
+    @database_sync_to_async
     def upsert(self, target: discord.User | discord.Member) -> UserDict:
         assert hasattr(target, "id")
         xid = target.id
         max_name_len = User.name.property.columns[0].type.length  # type: ignore
         raw_name = getattr(target, "display_name", "")
         name = raw_name[:max_name_len]
+        if user_cache.get(xid, name):
+            self.user = DatabaseSession.get(User, xid)
+            if self.user:
+                return self.user.to_dict()
+        version = user_cache.version(xid)
         values = {"xid": xid, "name": name, "updated_at": datetime.now(tz=pytz.utc)}
         upsert = insert(User).values(**values)
         upsert = upsert.on_conflict_do_update(
@@ -43,14 +51,15 @@ class UsersService:
         DatabaseSession.commit()
         self.user = DatabaseSession.query(User).get(xid)
         assert self.user
+        user_cache.put(xid, name, True, version)
         return self.user.to_dict()
 
-    @sync_to_async()
+    @database_sync_to_async
     def select(self, user_xid: int) -> bool:
         self.user = DatabaseSession.query(User).filter(User.xid == user_xid).one_or_none()
         return bool(self.user)
 
-    @sync_to_async()
+    @database_sync_to_async
     def set_banned(self, banned: bool, xid: int) -> None:
         values = {
             "xid": xid,
@@ -69,8 +78,9 @@ class UsersService:
         )
         DatabaseSession.execute(upsert, values)
         DatabaseSession.commit()
+        invalidate(user_cache, xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def current_game_id(self, channel_xid: int) -> int | None:
         """Get the current PENDING game ID for the user in the given channel."""
         assert self.user
@@ -88,7 +98,7 @@ class UsersService:
         )
         return queue.game_id if queue else None
 
-    @sync_to_async()
+    @database_sync_to_async
     def leave_game(self, channel_xid: int) -> None:
         assert self.user
         pending_games = (
@@ -109,34 +119,37 @@ class UsersService:
             Queue.game_id.in_(left_game_ids),
         ).delete()
         DatabaseSession.commit()
+        matchmaking_index.remove_players([self.user.xid], left_game_ids)
 
         # This operation should "dirty" the Games, so
         # we need to update their updated_at field now.
+        now = datetime.now(tz=pytz.utc)
         query = (
             update(Game)
             .where(Game.id.in_(left_game_ids))
-            .values(updated_at=datetime.now(tz=pytz.utc))
+            .values(updated_at=now)
             .execution_options(synchronize_session=False)
         )
         DatabaseSession.execute(query)
         DatabaseSession.commit()
+        matchmaking_index.touch(left_game_ids, now)
 
-    @sync_to_async()
+    @database_sync_to_async
     def is_waiting(self, channel_xid: int) -> bool:
         assert self.user
         return self.user.waiting(channel_xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def is_confirmed(self, channel_xid: int) -> bool:
         assert self.user
         return self.user.confirmed(channel_xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def pending_games(self) -> int:
         assert self.user
         return self.user.pending_games()
 
-    @sync_to_async()
+    @database_sync_to_async
     def is_banned(self, target_xid: int | None = None) -> bool:
         if target_xid is not None:
             row = DatabaseSession.query(User.banned).filter(User.xid == target_xid).one_or_none()
@@ -145,7 +158,7 @@ class UsersService:
         assert self.user
         return cast(bool, self.user.banned)
 
-    @sync_to_async()
+    @database_sync_to_async
     def block(self, author_xid: int, target_xid: int) -> None:
         values = {
             "user_xid": author_xid,
@@ -155,8 +168,9 @@ class UsersService:
         upsert = upsert.on_conflict_do_nothing()
         DatabaseSession.execute(upsert, values)
         DatabaseSession.commit()
+        matchmaking_index.invalidate_blocks(author_xid, target_xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def unblock(self, author_xid: int, target_xid: int) -> None:
         DatabaseSession.query(Block).filter(
             and_(
@@ -165,8 +179,9 @@ class UsersService:
             ),
         ).delete(synchronize_session=False)
         DatabaseSession.commit()
+        matchmaking_index.invalidate_blocks(author_xid, target_xid)
 
-    @sync_to_async()
+    @database_sync_to_async
     def watch(self, guild_xid: int, user_xid: int, note: str | None = None) -> None:
         values: dict[str, Any] = {
             "guild_xid": guild_xid,
@@ -189,7 +204,7 @@ class UsersService:
         DatabaseSession.execute(upsert, values)
         DatabaseSession.commit()
 
-    @sync_to_async()
+    @database_sync_to_async
     def unwatch(self, guild_xid: int, user_xid: int) -> None:
         DatabaseSession.query(Watch).filter(
             and_(
@@ -199,7 +214,7 @@ class UsersService:
         ).delete(synchronize_session=False)
         DatabaseSession.commit()
 
-    @sync_to_async()
+    @database_sync_to_async
     def blocklist(self, user_xid: int) -> list[UserDict]:
         return [
             u.to_dict()
@@ -210,7 +225,7 @@ class UsersService:
             .all()
         ]
 
-    @sync_to_async()
+    @database_sync_to_async
     def move_user(  # pragma: no cover
         self,
         guild_xid: int,
@@ -374,7 +389,11 @@ class UsersService:
                 )
                 DatabaseSession.execute(award_upsert, award_values)
 
+            recount_plays(guild_xid, [to_user_xid])
+
             DatabaseSession.commit()
+            matchmaking_index.invalidate_blocks()
+            invalidate_all()
         except Exception:
             logger.exception("error moving user")
             DatabaseSession.rollback()
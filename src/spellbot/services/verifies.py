@@ -1,23 +1,31 @@
 from __future__ import annotations
 
-from asgiref.sync import sync_to_async
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql.expression import and_
 
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async
+from spellbot.invalidation import invalidate
 from spellbot.models import Verify
+from spellbot.upsert_cache import verify_cache
 
 
 class VerifiesService:
     current: Verify | None = None
 
-    @sync_to_async()
+    @database_sync_to_async
     def upsert(
         self,
         guild_xid: int,
         user_xid: int,
         verified: bool | None = None,
     ) -> None:
+        key = (guild_xid, user_xid)
+        cached = verify_cache.get(key, None)
+        if cached is not None and verified in (None, cached):
+            self.current = DatabaseSession.get(Verify, key)
+            if self.current:
+                return
+        version = verify_cache.version(key)
         values = {
             "user_xid": user_xid,
             "guild_xid": guild_xid,
@@ -38,6 +46,9 @@ class VerifiesService:
             )
         DatabaseSession.execute(upsert, values)
         DatabaseSession.commit()
+        if verified is not None:
+            invalidate(verify_cache, key)
+            version = verify_cache.version(key)
         self.current = (
             DatabaseSession.query(Verify)
             .filter(
@@ -48,8 +59,10 @@ class VerifiesService:
             )
             .one_or_none()
         )
+        if self.current:
+            verify_cache.put(key, None, bool(self.current.verified), version)
 
-    @sync_to_async()
+    @database_sync_to_async
     def is_verified(self) -> bool:
         assert self.current
         return bool(self.current.verified)
@@ -1,13 +1,11 @@
 from __future__ import annotations
 
-from asgiref.sync import sync_to_async
-
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async
 from spellbot.models import Watch, WatchDict
 
 
 class WatchesService:
-    @sync_to_async()
+    @database_sync_to_async
     def fetch(self, guild_xid: int) -> list[WatchDict]:
         watches = (
             DatabaseSession.query(Watch)
@@ -26,13 +26,33 @@ class Settings:
         "DD_API_KEY",
         "DD_APP_KEY",
         "DD_TRACE_ENABLED",
+        "METRICS_PORT",
         "DATABASE_URL",
+        "DATABASE_ASYNC",
+        "DATABASE_POOL_SIZE",
+        "DATABASE_MAX_OVERFLOW",
+        "WEB_POOL_SIZE",
         "SPELLTABLE_ROOT",
         "SPELLTABLE_CREATE",
         "SPELLTABLE_AUTH_KEY",
+        "SPELLTABLE_TIMEOUT_S",
+        "SPELLTABLE_POOL_MIN",
+        "SPELLTABLE_POOL_MAX",
+        "SPELLTABLE_POOL_TTL_M",
+        "SPELLTABLE_POOL_LEAD_M",
+        "SPELLTABLE_POOL_LOOP_S",
+        "SPELLTABLE_POOL_BATCH",
         "TABLESTREAM_ROOT",
         "TABLESTREAM_CREATE",
         "TABLESTREAM_AUTH_KEY",
+        "TABLESTREAM_TIMEOUT_S",
+        "LINK_POOL_SIZE",
+        "LINK_KEEPALIVE_S",
+        "LINK_HEDGE_AFTER_S",
+        "LINK_ATTEMPTS",
+        "LINK_BACKOFF_S",
+        "LINK_BREAKER_FAILURES",
+        "LINK_BREAKER_RESET_S",
         "BOT_INVITE_LINK",
         "INFO_EMBED_COLOR",
         "STARTED_EMBED_COLOR",
@@ -42,17 +62,34 @@ class Settings:
         "ADMIN_ROLE",
         "MOD_PREFIX",
         "MAX_PENDING_GAMES",
+        "MATCHMAKING_INDEX",
+        "FAN_OUT_CONCURRENCY",
+        "REST_RESERVE",
+        "REST_BACKGROUND_CONCURRENCY",
+        "UPSERT_CACHE_TTL_S",
+        "UPSERT_CACHE_SIZE",
+        "UPSERT_CACHE_FALLBACK_TTL_S",
+        "RECORD_CACHE_SIZE",
+        "RECORD_CACHE_TTL_S",
+        "EXPORT_BATCH_SIZE",
         "VOICE_GRACE_PERIOD_M",
         "VOICE_AGE_LIMIT_H",
         "VOICE_CLEANUP_LOOP_M",
-        "VOICE_CLEANUP_BATCH",
         "EXPIRE_GAMES_LOOP_M",
         "EXPIRE_TIME_M",
+        "OUTBOX_LOOP_S",
+        "OUTBOX_LEASE_S",
+        "OUTBOX_BATCH",
+        "OUTBOX_MAX_ATTEMPTS",
+        "LEADER_HEARTBEAT_S",
+        "INVALIDATION_HEARTBEAT_S",
+        "CLUSTER_LOCK_POOL_SIZE",
+        "CLUSTER_IDENTIFY_DELAY_S",
         "SUBSCRIBE_LINK",
         "DONATE_LINK",
     )
 
-    def __init__(self, guild_xid: int | None = None) -> None:
+    def __init__(self, guild_xid: int | None = None) -> None:  # noqa: PLR0915
         self.guild_xid = guild_xid
 
         # content
@@ -73,6 +110,9 @@ class Settings:
         self.DD_APP_KEY = getenv("DD_APP_KEY")
         self.DD_TRACE_ENABLED = getenv("DD_TRACE_ENABLED", "true").lower() == "true"
 
+        # prometheus
+        self.METRICS_PORT = int(getenv("METRICS_PORT") or "0")  # 0 turns off the exporter
+
         # database
         default_database_url = f"postgresql://postgres@{self.HOST}:5432/postgres"
         if running_in_pytest():  # pragma: no cover
@@ -82,16 +122,37 @@ class Settings:
             # SQLAlchemy 1.4.x removed support for the postgres:// URI scheme
             database_url = database_url.replace("postgres://", "postgresql://", 1)
         self.DATABASE_URL = database_url
+        self.DATABASE_ASYNC = getenv("DATABASE_ASYNC", "false").lower() == "true"
+        self.DATABASE_POOL_SIZE = int(getenv("DATABASE_POOL_SIZE", "10"))
+        self.DATABASE_MAX_OVERFLOW = int(getenv("DATABASE_MAX_OVERFLOW", "10"))
+        self.WEB_POOL_SIZE = int(getenv("WEB_POOL_SIZE", "5"))  # connections per web worker
 
         # spelltable
         self.SPELLTABLE_ROOT = "https://us-central1-magic-night-30324.cloudfunctions.net"
         self.SPELLTABLE_CREATE = f"{self.SPELLTABLE_ROOT}/createGame"
         self.SPELLTABLE_AUTH_KEY = getenv("SPELLTABLE_AUTH_KEY")
+        self.SPELLTABLE_TIMEOUT_S = 10.0
+        self.SPELLTABLE_POOL_MAX = int(getenv("SPELLTABLE_POOL_MAX", "20"))  # 0 to disable
+        self.SPELLTABLE_POOL_MIN = 2
+        self.SPELLTABLE_POOL_TTL_M = 60  # pooled links are discarded after this long
+        self.SPELLTABLE_POOL_LEAD_M = 10  # keep enough links for this long of game starts
+        self.SPELLTABLE_POOL_LOOP_S = 60
+        self.SPELLTABLE_POOL_BATCH = 10  # links created per loop at most
 
         # tablestream
         self.TABLESTREAM_ROOT = "https://api.table-stream.com"
         self.TABLESTREAM_CREATE = f"{self.TABLESTREAM_ROOT}/create-room"
         self.TABLESTREAM_AUTH_KEY = getenv("TABLESTREAM_AUTH_KEY")
+        self.TABLESTREAM_TIMEOUT_S = 10.0
+
+        # game link clients
+        self.LINK_POOL_SIZE = 20  # connections per service
+        self.LINK_KEEPALIVE_S = 60.0
+        self.LINK_HEDGE_AFTER_S = 2.0  # send a second request if the first is this slow
+        self.LINK_ATTEMPTS = 3
+        self.LINK_BACKOFF_S = 0.5
+        self.LINK_BREAKER_FAILURES = 5  # open the circuit after this many failures in a row
+        self.LINK_BREAKER_RESET_S = 30.0
 
         # configuration
         self.BOT_INVITE_LINK = (
@@ -108,14 +169,33 @@ class Settings:
         self.ADMIN_ROLE = "SpellBot Admin"
         self.MOD_PREFIX = "Moderator"
         self.MAX_PENDING_GAMES = 5
+        self.MATCHMAKING_INDEX = getenv("MATCHMAKING_INDEX", "true").lower() == "true"
+        self.FAN_OUT_CONCURRENCY = 8  # concurrent Discord calls per fan out
+        self.REST_RESERVE = 1  # requests per rate limit window kept for interactions
+        self.REST_BACKGROUND_CONCURRENCY = 4  # concurrent background Discord calls
+        self.UPSERT_CACHE_TTL_S = float(getenv("UPSERT_CACHE_TTL_S", "300"))  # 0 to disable
+        self.UPSERT_CACHE_SIZE = 10_000  # entries per cache
+        self.UPSERT_CACHE_FALLBACK_TTL_S = 10  # while invalidations might be missed
+        self.RECORD_CACHE_SIZE = int(getenv("RECORD_CACHE_SIZE", "1000"))  # 0 to disable
+        self.RECORD_CACHE_TTL_S = 300  # pages are re-rendered at least this often
+        self.EXPORT_BATCH_SIZE = 500  # games read at a time by the history exports
 
         # tasks
         self.VOICE_GRACE_PERIOD_M = 10  # 10 minutes
         self.VOICE_AGE_LIMIT_H = 5  # 5 hours
         self.VOICE_CLEANUP_LOOP_M = 30  # 30 minutes
-        self.VOICE_CLEANUP_BATCH = 30  # batch size
         self.EXPIRE_GAMES_LOOP_M = 10  # 10 minutes
         self.EXPIRE_TIME_M = 45  # 45 minutes
+        self.OUTBOX_LOOP_S = 60  # 1 minute
+        self.OUTBOX_LEASE_S = 300  # 5 minutes
+        self.OUTBOX_BATCH = 50  # batch size
+        self.OUTBOX_MAX_ATTEMPTS = 5
+        self.LEADER_HEARTBEAT_S = 10  # 10 seconds
+        self.INVALIDATION_HEARTBEAT_S = 10  # 10 seconds
+
+        # cluster
+        self.CLUSTER_LOCK_POOL_SIZE = int(getenv("CLUSTER_LOCK_POOL_SIZE", "10"))
+        self.CLUSTER_IDENTIFY_DELAY_S = 5  # Discord allows one shard to identify per 5 seconds
 
     def workaround_over_eager_caching(self, url: str) -> str:
         return f"{url}?{datetime.now(tz=pytz.utc).date().strftime('%Y-%m-%d')}"
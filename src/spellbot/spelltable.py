@@ -5,19 +5,19 @@ import logging
 from typing import TYPE_CHECKING, Any
 
 from aiohttp.client_exceptions import ClientError
-from aiohttp_retry import ExponentialRetry, RetryClient
 
 from spellbot import __version__
 from spellbot.metrics import add_span_error
 from spellbot.settings import settings
 
 if TYPE_CHECKING:
+    from spellbot.link_client import LinkClient
     from spellbot.models import GameDict
 
 logger = logging.getLogger(__name__)
 
 
-async def generate_spelltable_link(game: GameDict) -> str | None:
+async def generate_spelltable_link(game: GameDict | None, client: LinkClient) -> str | None:
     assert settings.SPELLTABLE_AUTH_KEY
 
     headers = {
@@ -28,31 +28,23 @@ async def generate_spelltable_link(game: GameDict) -> str | None:
     data: dict[str, Any] | None = None
     raw_data: bytes | None = None
     try:
-        async with (
-            RetryClient(
-                raise_for_status=False,
-                retry_options=ExponentialRetry(attempts=5),
-            ) as client,
-            client.post(settings.SPELLTABLE_CREATE, headers=headers) as resp,
-        ):
-            # Rather than use `resp.json()`, which respects mimetype, let's just
-            # grab the data and try to decode it ourselves.
-            # https://github.com/inyutin/aiohttp_retry/issues/55
-            raw_data = await resp.read()
-            data = json.loads(raw_data)
-            if not data or "gameUrl" not in data:
-                logger.warning(
-                    "warning: gameUrl missing from SpellTable API response (%s): %s",
-                    resp.status,
-                    data,
-                )
-                return None
-            assert data is not None
-            returned_url = str(data["gameUrl"])
-            return returned_url.replace(
-                "www.spelltable.com",
-                "spelltable.wizards.com",
+        resp = await client.post(settings.SPELLTABLE_CREATE, headers=headers)
+        # Rather than trust the response's mimetype, let's just decode it ourselves.
+        raw_data = resp.body
+        data = json.loads(raw_data)
+        if not data or "gameUrl" not in data:
+            logger.warning(
+                "warning: gameUrl missing from SpellTable API response (%s): %s",
+                resp.status,
+                data,
             )
+            return None
+        assert data is not None
+        returned_url = str(data["gameUrl"])
+        return returned_url.replace(
+            "www.spelltable.com",
+            "spelltable.wizards.com",
+        )
     except ClientError as ex:
         add_span_error(ex)
         logger.warning(
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from ddtrace._trace.span import Span
+
+# The statistics that SQL statements run in the current context are added to, if any.
+current_sql_stats: ContextVar[SqlStats | None] = ContextVar("current_sql_stats", default=None)
+
+
+class SqlStats:
+    """
+    Counts the SQL statements run while tracking something, like a bot interaction.
+
+    Statistics are tracked per async context, so concurrent interactions each get their
+    own counts. That includes queries run on the database thread by `sync_to_async()`,
+    since it runs them in a copy of the calling context. Tracking can be nested, and
+    statements are then also added to everything that encloses them.
+    """
+
+    def __init__(self, *, capture: bool = False, parent: SqlStats | None = None) -> None:
+        self.statements = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.parent = parent
+        self.captured: list[str] | None = [] if capture else None
+
+    def add(self, statement: str, rows: int, seconds: float) -> None:
+        self.statements += 1
+        self.rows += max(rows, 0)
+        self.seconds += seconds
+        if self.captured is not None:
+            self.captured.append(statement)
+        if self.parent is not None:
+            self.parent.add(statement, rows, seconds)
+
+    def report(self, span: Span) -> None:
+        span.set_metric("db.statements", self.statements)
+        span.set_metric("db.rows", self.rows)
+        span.set_metric("db.duration_ms", round(self.seconds * 1000, 3))
+
+
+@contextmanager
+def sql_stats(*, capture: bool = False) -> Iterator[SqlStats]:
+    """Track the SQL statements that are run in the current context until exiting."""
+    stats = SqlStats(capture=capture, parent=current_sql_stats.get())
+    token = current_sql_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_sql_stats.reset(token)
+
+
+@contextmanager
+def sql_budget(statements: int) -> Iterator[SqlStats]:
+    """
+    Fail with an `AssertionError` if more than `statements` SQL statements are run.
+
+    Meant for tests, so that a change that adds queries to a command, like an N+1
+    pattern, fails the test that covers that command and lists the queries it ran.
+    """
+    with sql_stats(capture=True) as stats:
+        yield stats
+    if stats.statements > statements:
+        listing = "\n".join(f"  {statement}" for statement in stats.captured or [])
+        msg = f"ran {stats.statements} SQL statements, over the budget of {statements}:\n"
+        raise AssertionError(msg + listing)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn: Any, *_: Any) -> None:
+    if current_sql_stats.get() is not None:
+        # A connection only runs one statement at a time.
+        conn.info["sql_budget_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    *_: Any,
+) -> None:
+    stats = current_sql_stats.get()
+    started = conn.info.pop("sql_budget_started", None)
+    if stats is None or started is None:
+        return
+    stats.add(statement, cursor.rowcount, time.perf_counter() - started)
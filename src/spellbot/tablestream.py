@@ -5,19 +5,19 @@ import logging
 from typing import TYPE_CHECKING, Any
 
 from aiohttp.client_exceptions import ClientError
-from aiohttp_retry import ExponentialRetry, RetryClient
 
 from spellbot import __version__
 from spellbot.metrics import add_span_error
 from spellbot.settings import settings
 
 if TYPE_CHECKING:
+    from spellbot.link_client import LinkClient
     from spellbot.models import GameDict
 
 logger = logging.getLogger(__name__)
 
 
-async def generate_tablestream_link(game: GameDict) -> str | None:
+async def generate_tablestream_link(game: GameDict, client: LinkClient) -> str | None:
     assert settings.TABLESTREAM_AUTH_KEY
 
     headers = {
@@ -49,35 +49,25 @@ async def generate_tablestream_link(game: GameDict) -> str | None:
     }
 
     try:
-        async with (
-            RetryClient(
-                raise_for_status=False,
-                retry_options=ExponentialRetry(attempts=5),
-            ) as client,
-            client.post(
-                settings.TABLESTREAM_CREATE,
-                headers=headers,
-                json=request_data,
-            ) as resp,
-        ):
-            # Rather than use `resp.json()`, which respects mimetype, let's just
-            # grab the data and try to decode it ourselves.
-            # https://github.com/inyutin/aiohttp_retry/issues/55
-            raw_data = await resp.read()
-            data = json.loads(raw_data)
-
-            # data = {
-            #     "room": {
-            #         "roomName": "amy-testing",
-            #         "roomId": "cc56f322-3338-4643-8cd3-251055aa515d",
-            #         "roomUrl": "https://table-stream.com/game?id=cc56f322-3338-4643-8cd3-251055aa515d",
-            #         "gameType": "MTGCommander",
-            #         "maxPlayers": 4,
-            #         "password": "J^vT!wL1kQ",
-            #     }
-            # }
+        resp = await client.post(
+            settings.TABLESTREAM_CREATE,
+            headers=headers,
+            json=request_data,
+        )
+        # Rather than trust the response's mimetype, let's just decode it ourselves.
+        raw_data = resp.body
+        data = json.loads(raw_data)
 
-            return None
+        # data = {
+        #     "room": {
+        #         "roomName": "amy-testing",
+        #         "roomId": "cc56f322-3338-4643-8cd3-251055aa515d",
+        #         "roomUrl": "https://table-stream.com/game?id=cc56f322-3338-4643-8cd3-251055aa515d",
+        #         "gameType": "MTGCommander",
+        #         "maxPlayers": 4,
+        #         "password": "J^vT!wL1kQ",
+        #     }
+        # }
     except ClientError as ex:
         add_span_error(ex)
         logger.warning(
@@ -95,3 +85,4 @@ async def generate_tablestream_link(game: GameDict) -> str | None:
         add_span_error(ex)
         logger.exception("error: unexpected exception: data: %s, raw: %s", data, raw_data)
         return None
+    return None
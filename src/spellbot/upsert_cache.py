@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from .settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+
+
+class CacheEntry(NamedTuple):
+    fingerprint: Hashable
+    value: Any
+    written_at: float
+
+
+class UpsertCache:
+    """
+    Remembers the rows most recently written by one of the upsert service methods.
+
+    Every interaction, and every message in a channel that needs verification, upserts
+    the same guild, channel, user and verify rows. When what Discord tells us about an
+    object, its `fingerprint`, is the same as what was written last time, the write can
+    be skipped entirely and the remembered row used instead.
+
+    Anything that changes a cached row must invalidate it after committing, with
+    `spellbot.invalidation.invalidate()`, which also evicts it from the caches of every
+    other process. Since an upsert can be in flight while that happens, callers take a
+    `version()` before going to the database and `put()` drops the result if the key
+    has been invalidated in the meantime.
+
+    Entries expire after `UPSERT_CACHE_TTL_S` seconds anyway. While the cache is
+    `degraded`, because invalidations from other processes might be getting missed,
+    they expire after `UPSERT_CACHE_FALLBACK_TTL_S` seconds instead.
+
+    Anything else that remembers what's in these rows can add itself to `listeners`,
+    to be called with each invalidated key, or with None when the cache is cleared.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._entries: dict[Hashable, CacheEntry] = {}
+        self._versions: dict[Hashable, int] = {}
+        self._epoch = 0
+        self.degraded = False
+        self.listeners: list[Callable[[Hashable | None], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.UPSERT_CACHE_TTL_S > 0
+
+    @property
+    def ttl_s(self) -> float:
+        if self.degraded:
+            return min(settings.UPSERT_CACHE_TTL_S, settings.UPSERT_CACHE_FALLBACK_TTL_S)
+        return settings.UPSERT_CACHE_TTL_S
+
+    def version(self, key: Hashable) -> tuple[int, int]:
+        return self._epoch, self._versions.get(key, 0)
+
+    def get(self, key: Hashable, fingerprint: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.fingerprint != fingerprint or entry.written_at + self.ttl_s <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry.value
+
+    def put(
+        self,
+        key: Hashable,
+        fingerprint: Hashable,
+        value: Any,
+        version: tuple[int, int],
+    ) -> None:
+        if not self.enabled or version != self.version(key):
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = CacheEntry(fingerprint, value, time.monotonic())
+        # Entries are kept in the order they were written, so the first is the oldest.
+        while len(self._entries) > settings.UPSERT_CACHE_SIZE:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+        self._versions[key] = self._versions.get(key, 0) + 1
+        for listener in self.listeners:
+            listener(key)
+
+    def clear(self) -> None:
+        self._entries = {}
+        self._versions = {}
+        self._epoch += 1
+        for listener in self.listeners:
+            listener(None)
+
+
+guild_cache = UpsertCache("guilds")
+channel_cache = UpsertCache("channels")
+user_cache = UpsertCache("users")
+verify_cache = UpsertCache("verify")
+mirror_cache = UpsertCache("mirrors")
+caches = {
+    cache.name: cache
+    for cache in (guild_cache, channel_cache, user_cache, verify_cache, mirror_cache)
+}
+
+
+def clear_upsert_caches() -> None:
+    for cache in caches.values():
+        cache.clear()
+
+
+def set_degraded(degraded: bool) -> None:
+    for cache in caches.values():
+        cache.degraded = degraded
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+from .upsert_cache import channel_cache
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+    from .models import ChannelDict
+
+
+class VerificationPolicy(NamedTuple):
+    auto_verify: bool
+    verified_only: bool
+    unverified_only: bool
+
+    @classmethod
+    def from_channel(cls, data: ChannelDict) -> VerificationPolicy:
+        return cls(
+            bool(data["auto_verify"]),
+            bool(data["verified_only"]),
+            bool(data["unverified_only"]),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return any(self)
+
+
+class VerificationPolicies:
+    """
+    Remembers the verification settings of every channel that has any.
+
+    Most messages are posted in channels without verification settings, where there's
+    nothing to do, and this lets the bot ignore those messages without going to the
+    database. It's loaded all at once with `load()` and then kept up to date by
+    `update()` whenever a channel's settings are read. Channels whose settings have been
+    invalidated in the channel cache, by this or any other process, are `stale` until
+    they are read again. Until it has been loaded, after the channel cache is cleared,
+    and while the channel cache is degraded, every channel is assumed to have settings.
+
+    Like the upsert caches, callers take a `version()` before going to the database and
+    the result is dropped if the channel has been invalidated in the meantime.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self._policies: dict[int, VerificationPolicy] = {}
+        self._stale: set[int] = set()
+        self._versions: dict[int, int] = {}
+        self._epoch = 0
+
+    def __len__(self) -> int:
+        return len(self._policies)
+
+    def version(self, channel_xid: int | None = None) -> tuple[int, int]:
+        if channel_xid is None:
+            return self._epoch, 0
+        return self._epoch, self._versions.get(channel_xid, 0)
+
+    def needs_database(self, channel_xid: int) -> bool:
+        """Return True unless the channel is known to have no verification settings."""
+        if not self.loaded or channel_cache.degraded:
+            return True
+        return channel_xid in self._policies or channel_xid in self._stale
+
+    def load(self, policies: dict[int, VerificationPolicy], version: tuple[int, int]) -> None:
+        if version[0] != self._epoch:
+            return
+        self._policies = {xid: policy for xid, policy in policies.items() if policy.enabled}
+        # Anything invalidated while these were being read may already be out of date.
+        self._stale.update(self._versions)
+        self.loaded = True
+
+    def update(
+        self,
+        channel_xid: int,
+        policy: VerificationPolicy,
+        version: tuple[int, int],
+    ) -> None:
+        if version != self.version(channel_xid):
+            return
+        self._stale.discard(channel_xid)
+        if policy.enabled:
+            self._policies[channel_xid] = policy
+        else:
+            self._policies.pop(channel_xid, None)
+
+    def invalidate(self, channel_xid: Hashable | None) -> None:
+        if channel_xid is None:
+            self.clear()
+            return
+        assert isinstance(channel_xid, int)
+        self._stale.add(channel_xid)
+        self._versions[channel_xid] = self._versions.get(channel_xid, 0) + 1
+
+    def clear(self) -> None:
+        self.loaded = False
+        self._policies = {}
+        self._stale = set()
+        self._versions = {}
+        self._epoch += 1
+
+
+verification_policies = VerificationPolicies()
+channel_cache.listeners.append(verification_policies.invalidate)
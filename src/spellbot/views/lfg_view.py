@@ -29,15 +29,11 @@ class PendingGameView(BaseView):
     ) -> None:
         from spellbot.actions import LookingForGameAction
 
-        assert interaction.guild is not None
         with tracer.trace(name="interaction", resource="join"):
             add_span_context(interaction)
             assert interaction.original_response
             await safe_defer_interaction(interaction)
-            async with (
-                self.bot.guild_lock(interaction.guild.id),
-                LookingForGameAction.create(self.bot, interaction) as action,
-            ):
+            async with LookingForGameAction.create(self.bot, interaction) as action:
                 original_response = await safe_original_response(interaction)
                 if original_response:
                     await action.execute(message_xid=original_response.id)
@@ -55,14 +51,10 @@ class PendingGameView(BaseView):
     ) -> None:
         from spellbot.actions import LeaveAction
 
-        assert interaction.guild is not None
         with tracer.trace(name="interaction", resource="leave"):
             add_span_context(interaction)
             await safe_defer_interaction(interaction)
-            async with (
-                self.bot.guild_lock(interaction.guild.id),
-                LeaveAction.create(self.bot, interaction) as action,
-            ):
+            async with LeaveAction.create(self.bot, interaction) as action:
                 await action.execute(origin=True)
 
 
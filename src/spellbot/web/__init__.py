@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from .builder import build_web_app, humanize, launch_web_server
+from .builder import build_web_app, database_pool, humanize, launch_web_server
 
 __all__ = [
     "build_web_app",
+    "database_pool",
     "humanize",
     "launch_web_server",
 ]
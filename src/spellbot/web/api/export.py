@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+from aiohttp.web_response import Response as WebResponse
+
+from spellbot.database import db_session_manager, release_connection
+from spellbot.services import PlaysService
+from spellbot.services.plays import decomposed
+from spellbot.settings import settings
+from spellbot.web.api.record import RecordKind
+
+if TYPE_CHECKING:
+    from spellbot.services import Cursor, RecordsPage
+
+logger = logging.getLogger(__name__)
+
+FIELDS = [
+    "game",
+    "time",
+    "guild",
+    "guild_name",
+    "channel",
+    "channel_name",
+    "format",
+    "link",
+    "user_name",
+    "user_xid",
+    "points",
+]
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def export_row(record: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "game": record["id"],
+        "time": datetime.fromtimestamp(record["updated_at"] / 1e3, tz=UTC).isoformat(),
+        "guild": record["guild"],
+        "guild_name": record["guild_name"],
+        "channel": record["channel"],
+        "channel_name": record["channel_name"],
+        "format": record["format"],
+        "link": record["link"],
+        "user_name": record["user_name"],
+        "user_xid": int(record["user_xid"]),
+        "points": int(record["user_points"]),
+    }
+
+
+def encode(rows: list[dict[str, Any]], fmt: str, *, header: bool) -> bytes:
+    if fmt == "ndjson":
+        return "".join(f"{json.dumps(row)}\n" for row in rows).encode()
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def fetch(
+    kind: RecordKind,
+    guild_xid: int,
+    target_xid: int,
+    before: Cursor | None,
+) -> RecordsPage | None:
+    plays = PlaysService()
+    if kind is RecordKind.CHANNEL:
+        return await plays.channel_records(
+            guild_xid=guild_xid,
+            channel_xid=target_xid,
+            before=before,
+            page_size=settings.EXPORT_BATCH_SIZE,
+        )
+    page = await plays.user_records(
+        guild_xid=guild_xid,
+        user_xid=target_xid,
+        before=before,
+        page_size=settings.EXPORT_BATCH_SIZE,
+    )
+    return page._replace(records=decomposed(page.records)) if page else None
+
+
+async def impl(request: web.Request, kind: RecordKind) -> web.StreamResponse:
+    """
+    Stream the entire history of games in a channel, or of a user in a guild.
+
+    Games are read in batches of `EXPORT_BATCH_SIZE`, newest first, using the same keyset
+    cursors as the record pages. Each batch is written out before the next one is read,
+    so memory use doesn't depend on the size of the history, and a slow client slows
+    down the reads rather than having them pile up. The pooled connection is given back
+    while each batch is written, so a slow client doesn't keep it from other requests.
+    """
+    try:
+        guild_xid = int(request.match_info["guild"])
+        target_xid = int(
+            request.match_info["channel" if kind is RecordKind.CHANNEL else "user"],
+        )
+    except ValueError:
+        return WebResponse(status=404)
+    fmt = request.query.get("format", "csv")
+    if fmt not in CONTENT_TYPES:
+        return WebResponse(status=400)
+
+    page = await fetch(kind, guild_xid, target_xid, None)
+    if page is None:
+        return WebResponse(status=404)
+
+    scope = "c" if kind is RecordKind.CHANNEL else "u"
+    filename = f"spellbot-{guild_xid}-{scope}-{target_xid}.{fmt}"
+    response = web.StreamResponse()
+    response.content_type = CONTENT_TYPES[fmt]
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    header = True
+    while page is not None:
+        await release_connection()
+        rows = [export_row(record) for record in page.records]
+        await response.write(encode(rows, fmt, header=header))
+        header = False
+        if page.older is None:
+            break
+        page = await fetch(kind, guild_xid, target_xid, page.older)
+
+    await response.write_eof()
+    return response
+
+
+async def channel_endpoint(request: web.Request) -> web.StreamResponse:
+    async with db_session_manager():
+        return await impl(request, RecordKind.CHANNEL)
+
+
+async def user_endpoint(request: web.Request) -> web.StreamResponse:
+    async with db_session_manager():
+        return await impl(request, RecordKind.USER)
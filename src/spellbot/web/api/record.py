@@ -2,16 +2,21 @@ from __future__ import annotations
 
 import logging
 from contextlib import suppress
+from datetime import UTC
 from enum import Enum, auto
 from typing import TYPE_CHECKING, NamedTuple
 
 import aiohttp_jinja2
+from aiohttp.helpers import ETAG_ANY
 from aiohttp.web_response import Response as WebResponse
 
 from spellbot.database import db_session_manager
-from spellbot.services import PlaysService
+from spellbot.services import Cursor, PlaysService
+from spellbot.web.cache import page_etag, record_cache
 
 if TYPE_CHECKING:
+    from datetime import datetime
+
     from aiohttp import web
 
 logger = logging.getLogger(__name__)
@@ -22,10 +27,15 @@ class RecordKind(Enum):
     USER = auto()
 
 
+class InvalidCursorError(ValueError):
+    """The page cursor in a request's query string isn't one that a page linked to."""
+
+
 class Opts(NamedTuple):
     guild_xid: int
     target_xid: int
-    page: int
+    before: Cursor | None
+    after: Cursor | None
     tz_offset: int | None
     tz_name: str | None
 
@@ -39,7 +49,13 @@ async def parse_opts(request: web.Request, kind: RecordKind) -> Opts:
     else:
         target_xid = int(request.match_info["user"])
 
-    page = max(int(request.query.get("page", 0)), 0)
+    before = request.query.get("before")
+    after = request.query.get("after")
+    try:
+        before_cursor = Cursor.decode(before) if before else None
+        after_cursor = Cursor.decode(after) if after else None
+    except ValueError as ex:
+        raise InvalidCursorError from ex
 
     tz_offset_cookie = request.cookies.get("timezone_offset")
     tz_offset: int | None = None
@@ -52,44 +68,92 @@ async def parse_opts(request: web.Request, kind: RecordKind) -> Opts:
     return Opts(
         guild_xid=guild_xid,
         target_xid=target_xid,
-        page=page,
+        before=before_cursor,
+        after=after_cursor,
         tz_offset=tz_offset,
         tz_name=tz_name,
     )
 
 
+def not_modified(request: web.Request, etag: str, last_modified: datetime | None) -> bool:
+    """Check if the client already has the version of the page that would be sent."""
+    if request.if_none_match is not None:
+        return any(tag.value in (etag, ETAG_ANY) for tag in request.if_none_match)
+    if request.if_modified_since is not None and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def cache_headers(response: WebResponse, etag: str, last_modified: datetime | None) -> WebResponse:
+    response.etag = etag
+    response.last_modified = last_modified
+    # Browsers should always check for a new version of the page, and the page that
+    # they get back depends on their timezone cookies.
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Cookie"
+    return response
+
+
 async def impl(request: web.Request, kind: RecordKind) -> WebResponse:
     try:
         opts = await parse_opts(request, kind)
+    except InvalidCursorError:
+        return WebResponse(status=400)
     except ValueError:
         return WebResponse(status=404)
 
     plays = PlaysService()
     if kind is RecordKind.CHANNEL:
-        records = await plays.channel_records(
+        updated_at = await plays.channel_records_updated_at(
+            guild_xid=opts.guild_xid,
+            channel_xid=opts.target_xid,
+        )
+    else:
+        updated_at = await plays.user_records_updated_at(
+            guild_xid=opts.guild_xid,
+            user_xid=opts.target_xid,
+        )
+    key = (kind, opts)
+    etag = page_etag(key, updated_at)
+    last_modified = updated_at.replace(tzinfo=UTC) if updated_at else None
+    if not_modified(request, etag, last_modified):
+        return cache_headers(WebResponse(status=304), etag, last_modified)
+
+    cache = request.app[record_cache]
+    if (body := cache.get(key, etag)) is not None:
+        response = WebResponse(text=body, content_type="text/html")
+        return cache_headers(response, etag, last_modified)
+
+    if kind is RecordKind.CHANNEL:
+        page = await plays.channel_records(
             guild_xid=opts.guild_xid,
             channel_xid=opts.target_xid,
-            page=opts.page,
+            before=opts.before,
+            after=opts.after,
         )
     else:
-        records = await plays.user_records(
+        page = await plays.user_records(
             guild_xid=opts.guild_xid,
             user_xid=opts.target_xid,
-            page=opts.page,
+            before=opts.before,
+            after=opts.after,
         )
 
-    if records is None:
+    if page is None:
         return WebResponse(status=404)
 
     path = f"{'channel' if kind is RecordKind.CHANNEL else 'user'}_record.html.j2"
     context = {
-        "records": records,
+        "records": page.records,
         "tz_offset": opts.tz_offset,
         "tz_name": opts.tz_name,
-        "prev_page": f"{request.path}?page={max(opts.page - 1, 0)}",
-        "next_page": f"{request.path}?page={opts.page + 1}",
+        "prev_page": f"{request.path}?after={page.newer.encode()}" if page.newer else None,
+        "next_page": f"{request.path}?before={page.older.encode()}" if page.older else None,
+        "export_page": f"{request.path}/export",
     }
-    return aiohttp_jinja2.render_template(path, request, context)
+    body = aiohttp_jinja2.render_string(path, request, context)
+    cache.put(key, etag, body)
+    return cache_headers(WebResponse(text=body, content_type="text/html"), etag, last_modified)
 
 
 async def channel_endpoint(request: web.Request) -> WebResponse:
@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 from contextlib import suppress
 from datetime import datetime, timedelta
+from os import getpid
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -12,13 +13,15 @@ import pytz
 from aiohttp import web
 from babel.dates import format_datetime
 
-from spellbot.database import initialize_connection
+from spellbot.database import dispose_async_engine, initialize_async_engine
 from spellbot.models import import_models
 from spellbot.settings import settings
-from spellbot.web.api import ping, record
+from spellbot.web.api import export, ping, record
+from spellbot.web.cache import PageCache, record_cache
 
 if TYPE_CHECKING:
     from asyncio.events import AbstractEventLoop as Loop
+    from collections.abc import AsyncIterator, Callable
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +38,7 @@ def humanize(ts: int, offset: int, zone: str) -> str:
 def build_web_app() -> web.Application:
     import_models()
     app = web.Application()
+    app[record_cache] = PageCache(settings.RECORD_CACHE_SIZE)
     aiohttp_jinja2.setup(
         app,
         loader=jinja2.FileSystemLoader(TEMPLATES_ROOT),
@@ -45,16 +49,41 @@ def build_web_app() -> web.Application:
             web.get(r"/", ping.endpoint),
             web.get(r"/g/{guild}/c/{channel}", record.channel_endpoint),
             web.get(r"/g/{guild}/u/{user}", record.user_endpoint),
+            web.get(r"/g/{guild}/c/{channel}/export", export.channel_endpoint),
+            web.get(r"/g/{guild}/u/{user}/export", export.user_endpoint),
         ],
     )
     return app
 
 
+def database_pool(name: str) -> Callable[[web.Application], AsyncIterator[None]]:
+    """
+    Create a cleanup context that gives a web server its own database connection pool.
+
+    The pool is created when the app starts up, on the event loop that serves its
+    requests, so that every request gets a connection of its own and queries run on
+    that loop with asyncpg. Under gunicorn each worker process has its own app, loop and
+    pool, of at most `WEB_POOL_SIZE` connections. The pool is closed on shutdown.
+    """
+
+    async def context(_: web.Application) -> AsyncIterator[None]:
+        initialize_async_engine(
+            settings.DATABASE_URL,
+            f"{name}-{getpid()}",
+            pool_size=settings.WEB_POOL_SIZE,
+            max_overflow=0,
+        )
+        yield
+        await dispose_async_engine()
+
+    return context
+
+
 def launch_web_server(loop: Loop, port: int) -> None:  # pragma: no cover
     app = build_web_app()
+    app.cleanup_ctx.append(database_pool("spellbot-web"))
     runner = web.AppRunner(app)
     loop.run_until_complete(runner.setup())
-    loop.run_until_complete(initialize_connection("spellbot-web"))
     site = web.TCPSite(runner, settings.HOST, port)
     loop.run_until_complete(site.start())
     logger.info("server running: http://%s:%s", settings.HOST, port)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, NamedTuple
+
+from aiohttp import web
+
+from spellbot.settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+    from datetime import datetime
+
+
+class CachedPage(NamedTuple):
+    etag: str
+    body: str
+
+
+class PageCache:
+    """
+    Remembers the most recently rendered record pages.
+
+    A page is cached under everything that goes into rendering it, such as its route,
+    cursor and timezone cookies, along with an ETag for the data it was rendered from.
+    The ETag is derived from when a game in the page's scope was last updated, so any
+    change to those games makes the cached page stale without having to tell the web
+    server about it. Since the bot and the web server run as separate processes, that
+    is the only way that they could find out.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._pages: OrderedDict[Hashable, CachedPage] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, key: Hashable, etag: str) -> str | None:
+        page = self._pages.get(key)
+        if page is None or page.etag != etag:
+            return None
+        self._pages.move_to_end(key)
+        return page.body
+
+    def put(self, key: Hashable, etag: str, body: str) -> None:
+        if self.size <= 0:
+            return
+        self._pages[key] = CachedPage(etag, body)
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.size:
+            self._pages.popitem(last=False)
+
+
+def page_etag(key: Hashable, updated_at: datetime | None) -> str:
+    """
+    Return the ETag of a page rendered for `key` from games last updated at `updated_at`.
+
+    Pages also show names that can change without touching any games, so the ETag also
+    changes every `RECORD_CACHE_TTL_S` seconds to pick those up eventually.
+    """
+    period = int(time.time() // settings.RECORD_CACHE_TTL_S)
+    data = repr((key, updated_at, period)).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+record_cache = web.AppKey("record_cache", PageCache)
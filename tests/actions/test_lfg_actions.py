@@ -1,21 +1,27 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
 from unittest.mock import AsyncMock
 
 import pytest
 import pytest_asyncio
+import pytz
 
-from spellbot.actions import LookingForGameAction
+from spellbot.actions import LookingForGameAction, OutboxAction, lfg_action
+from spellbot.database import DatabaseSession
 from spellbot.enums import GameFormat, GameService
-from tests.mocks import mock_discord_object
+from spellbot.models import Game, Job
+from spellbot.services import GamesService
+from tests.mocks import mock_discord_object, mock_operations
 
 if TYPE_CHECKING:
     import discord
     from pytest_mock import MockerFixture
 
     from spellbot import SpellBot
-    from spellbot.models import User
+    from spellbot.models import Channel, Guild, User
+    from tests.fixtures import Factories
 
 
 @pytest_asyncio.fixture
@@ -66,3 +72,71 @@ class TestLookingForGameAction:
             discord_user,
             "Sorry, that command is not supported in this context.",
         )
+
+
+@pytest.mark.asyncio
+class TestOutboxAction:
+    async def start_abandoned_game(
+        self,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+    ) -> tuple[Game, list[discord.User]]:
+        """Start a game and then walk away from its jobs, as if the bot had restarted."""
+        game = factories.game.create(guild=guild, channel=channel, seats=2)
+        factories.post.create(guild=guild, channel=channel, game=game, message_xid=1234)
+        players = [mock_discord_object(factories.user.create(game=game)) for _ in range(2)]
+        games = GamesService()
+        await games.select(game.id)
+        await games.make_ready(None)
+        DatabaseSession.query(Job).update(
+            {Job.locked_until: datetime.now(tz=pytz.utc) - timedelta(seconds=1)},
+        )
+        DatabaseSession.commit()
+        return game, players
+
+    async def test_run_due(
+        self,
+        bot: SpellBot,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+    ) -> None:
+        game, players = await self.start_abandoned_game(factories, guild, channel)
+
+        with mock_operations(lfg_action, users=players):
+            async with OutboxAction.create(bot) as action:
+                await action.run_due()
+
+            assert lfg_action.safe_send_user.call_count == len(players)
+            lfg_action.safe_update_embed.assert_called_once()
+
+        DatabaseSession.expire_all()
+        assert game.spelltable_link
+        assert all(job.finished_at is not None for job in DatabaseSession.query(Job))
+
+    async def test_run_failure(
+        self,
+        bot: SpellBot,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+        mocker: MockerFixture,
+    ) -> None:
+        game, players = await self.start_abandoned_game(factories, guild, channel)
+        mocker.patch.object(bot, "create_game_link", AsyncMock(side_effect=RuntimeError("down")))
+        # The test's own transaction would otherwise be rolled back along with the job's.
+        mocker.patch.object(lfg_action, "rollback_session", AsyncMock())
+
+        with mock_operations(lfg_action, users=players):
+            async with OutboxAction.create(bot) as action:
+                await action.run_due()
+
+            # Players are still notified even when their game's link couldn't be created.
+            assert lfg_action.safe_send_user.call_count == len(players)
+
+        DatabaseSession.expire_all()
+        assert game.spelltable_link is None
+        failed = DatabaseSession.query(Job).filter(Job.finished_at.is_(None)).one()
+        assert failed.error == "RuntimeError: down"
+        assert failed.locked_until is None
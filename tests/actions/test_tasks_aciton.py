@@ -13,7 +13,19 @@ import pytz
 from spellbot.actions import TasksAction
 from spellbot.client import build_bot
 from spellbot.database import DatabaseSession
-from spellbot.services import ChannelsService, GamesService, GuildsService, ServicesRegistry
+from spellbot.enums import GameService
+from spellbot.models import Job, JobKind
+from spellbot.services import (
+    ChannelsService,
+    GamesService,
+    GuildsService,
+    JobsService,
+    LinksService,
+    ServicesRegistry,
+)
+from spellbot.services.jobs import job_key
+from spellbot.settings import settings
+from spellbot.sql_budget import sql_budget
 from tests.mocks import mock_discord_object
 
 if TYPE_CHECKING:
@@ -42,7 +54,8 @@ async def mock_services() -> MagicMock:
     services.games = MagicMock(spec=GamesService)
     services.channels = MagicMock(spec=ChannelsService)
     services.guilds = MagicMock(spec=GuildsService)
-    services.guilds.voiced = AsyncMock()
+    services.guilds.voiced = AsyncMock(return_value={})
+    services.jobs = MagicMock(spec=JobsService)
     return services
 
 
@@ -139,8 +152,10 @@ class TestTaskExpireInactiveChannels:
         caplog: pytest.LogCaptureFixture,
     ) -> None:
         action.services = mock_services
+        mock_services.games.expire_inactive.return_value = []
+        mock_services.jobs.claim.return_value = []
         await action.expire_inactive_games()
-        mock_services.games.delete_games.assert_not_called()
+        mock_services.jobs.finish_all.assert_not_called()
         assert "starting task expire_inactive_games" in caplog.text
 
     async def test_when_exception_raised(
@@ -149,7 +164,7 @@ class TestTaskExpireInactiveChannels:
         caplog: pytest.LogCaptureFixture,
         mocker: MockerFixture,
     ) -> None:
-        mocker.patch.object(action, "expire_games", AsyncMock(side_effect=RuntimeError))
+        mocker.patch.object(action, "cleanup_expired_posts", AsyncMock(side_effect=RuntimeError))
         await action.expire_inactive_games()
         assert "error: exception in background task" in caplog.text
 
@@ -167,6 +182,7 @@ class TestTaskExpireInactiveChannels:
 
         DatabaseSession.expire_all()
         assert game.deleted_at is None
+        assert DatabaseSession.query(Job).count() == 0
 
     async def test_when_empty_game_exists(
         self,
@@ -200,15 +216,8 @@ class TestTaskExpireInactiveChannels:
 
         DatabaseSession.expire_all()
         assert game.deleted_at is not None
-        assert f"expiring game {game.id}..." in caplog.text
+        assert f"expired 1 inactive games: [{game.id}]" in caplog.text
 
-    @pytest.mark.parametrize(
-        "message_xid",
-        [
-            pytest.param(1234, id="message"),
-            pytest.param(None, id="no_message"),
-        ],
-    )
     @pytest.mark.parametrize(
         "chan",
         [
@@ -224,37 +233,34 @@ class TestTaskExpireInactiveChannels:
         ],
     )
     @pytest.mark.parametrize(
-        "delete_expired",
+        ("players", "delete_expired", "expire"),
         [
-            pytest.param(True, id="delete"),
-            pytest.param(False, id="update"),
+            pytest.param(True, False, True, id="update"),
+            pytest.param(True, True, False, id="delete_expired"),
+            pytest.param(False, False, False, id="delete_empty"),
         ],
     )
-    async def test_when_inactive_game_with_players_exists(
+    async def test_when_inactive_game_with_posts_exists(
         self,
         action: TasksAction,
-        mock_services: MagicMock,
-        caplog: pytest.LogCaptureFixture,
         factories: Factories,
         mocker: MockerFixture,
-        message_xid: int | None,
         chan: Any,
         post: Any,
+        players: bool,
         delete_expired: bool,
+        expire: bool,
     ) -> None:
         guild: Guild = factories.guild.create()
-        channel: Channel = factories.channel.create(guild=guild)
+        channel: Channel = factories.channel.create(guild=guild, delete_expired=delete_expired)
         game: Game = factories.game.create(
             guild=guild,
             channel=channel,
             updated_at=datetime.now(tz=pytz.utc) - timedelta(days=1),
         )
-        if message_xid is not None:
-            factories.post.create(guild=guild, channel=channel, game=game, message_xid=message_xid)
-        factories.user.create(game=game)
-        action.services = mock_services
-        action.services.games.inactive_games.return_value = [game.to_dict()]
-        action.services.channels.select.return_value = {"delete_expired": delete_expired}
+        factories.post.create(guild=guild, channel=channel, game=game, message_xid=1234)
+        if players:
+            factories.user.create(game=game)
         mock_fetch_channel = AsyncMock(return_value=chan)
         mocker.patch("spellbot.actions.tasks_action.safe_fetch_text_channel", mock_fetch_channel)
         mock_get_partial = MagicMock(return_value=post)
@@ -267,23 +273,91 @@ class TestTaskExpireInactiveChannels:
         await action.expire_inactive_games()
 
         DatabaseSession.expire_all()
-        action.services.games.delete_games.assert_called_once_with([game.id])
-        assert f"expiring game {game.id}..." in caplog.text
-        if message_xid is not None:
-            mock_fetch_channel.assert_called_once_with(action.bot, guild.xid, channel.xid)
-            if chan is not None:
-                mock_get_partial.assert_called_once_with(chan, guild.xid, message_xid)
-                if post is not None:
-                    action.services.channels.select.assert_called_once_with(channel.xid)
-                    if delete_expired:
-                        mock_delete_message.assert_called_once_with(post)
-                    else:
-                        mock_update_embed.assert_called_once_with(
-                            post,
-                            content="Sorry, this game was expired due to inactivity.",
-                            embed=None,
-                            view=None,
-                        )
+        assert game.deleted_at is not None
+        job = DatabaseSession.query(Job).one()
+        assert job.kind == (JobKind.EXPIRE_POSTS if expire else JobKind.DELETE_POSTS).value
+        assert job.finished_at is not None
+        mock_fetch_channel.assert_called_once_with(action.bot, guild.xid, channel.xid)
+        if chan is None:
+            mock_get_partial.assert_not_called()
+            return
+        mock_get_partial.assert_called_once_with(chan, guild.xid, 1234)
+        if post is None:
+            mock_delete_message.assert_not_called()
+            mock_update_embed.assert_not_called()
+        elif expire:
+            mock_delete_message.assert_not_called()
+            mock_update_embed.assert_called_once_with(
+                post,
+                content="Sorry, this game was expired due to inactivity.",
+                embed=None,
+                view=None,
+            )
+        else:
+            mock_update_embed.assert_not_called()
+            mock_delete_message.assert_called_once_with(post)
+
+    async def test_resumes_interrupted_cleanup(
+        self,
+        action: TasksAction,
+        factories: Factories,
+        mocker: MockerFixture,
+    ) -> None:
+        guild: Guild = factories.guild.create()
+        channel: Channel = factories.channel.create(guild=guild)
+        now = datetime.now(tz=pytz.utc)
+        games = [
+            factories.game.create(guild=guild, channel=channel, deleted_at=now) for _ in range(3)
+        ]
+        for i, game in enumerate(games):
+            factories.post.create(guild=guild, channel=channel, game=game, message_xid=100 + i)
+        # The run that expired these games went away after finishing the first job, and
+        # while it still held the lease on the second one.
+        kind = JobKind.DELETE_POSTS
+        leases = [{"finished_at": now}, {"locked_until": now + timedelta(minutes=1)}, {}]
+        jobs = [
+            Job(key=job_key(kind, game.id), kind=kind.value, game_id=game.id, **lease)
+            for game, lease in zip(games, leases, strict=True)
+        ]
+        DatabaseSession.add_all(jobs)
+        DatabaseSession.commit()
+        mocker.patch("spellbot.actions.tasks_action.safe_fetch_text_channel", AsyncMock())
+        mocker.patch("spellbot.actions.tasks_action.safe_get_partial_message", MagicMock())
+        mock_delete_message = AsyncMock()
+        mocker.patch("spellbot.actions.tasks_action.safe_delete_message", mock_delete_message)
+
+        await action.cleanup_expired_posts()
+        assert mock_delete_message.call_count == 1
+
+        jobs[1].locked_until = now - timedelta(seconds=1)  # type: ignore
+        DatabaseSession.commit()
+        await action.cleanup_expired_posts()
+        assert mock_delete_message.call_count == 2
+
+        DatabaseSession.expire_all()
+        assert all(job.finished_at is not None for job in DatabaseSession.query(Job))
+
+    async def test_when_cleanup_fails(
+        self,
+        action: TasksAction,
+        factories: Factories,
+        mocker: MockerFixture,
+    ) -> None:
+        guild: Guild = factories.guild.create()
+        channel: Channel = factories.channel.create(guild=guild)
+        game: Game = factories.game.create(guild=guild, channel=channel)
+        factories.post.create(guild=guild, channel=channel, game=game, message_xid=1234)
+        mocker.patch(
+            "spellbot.actions.tasks_action.safe_fetch_text_channel",
+            AsyncMock(side_effect=RuntimeError("oops")),
+        )
+
+        await action.expire_inactive_games()
+
+        DatabaseSession.expire_all()
+        job = DatabaseSession.query(Job).one()
+        assert job.finished_at is None
+        assert job.error == "RuntimeError: oops"
 
 
 @pytest.mark.asyncio
@@ -315,7 +389,7 @@ class TestTaskCleanupOldVoiceChannels:
         caplog: pytest.LogCaptureFixture,
         factories: Factories,
     ) -> None:
-        factories.guild.create(voice_create=True)
+        guild = factories.guild.create(voice_create=True)
         mocker.patch(
             "spellbot.client.SpellBot.guilds",
             new_callable=PropertyMock,
@@ -324,7 +398,7 @@ class TestTaskCleanupOldVoiceChannels:
         bot = build_bot(mock_games=True, create_connection=False)
         async with TasksAction.create(bot) as action:
             await action.cleanup_old_voice_channels()
-        assert "guild is not active" in caplog.text
+        assert f"guild {guild.xid} is not active" in caplog.text
 
     async def test_when_guild_is_not_cached(
         self,
@@ -341,7 +415,7 @@ class TestTaskCleanupOldVoiceChannels:
         bot = build_bot(mock_games=True, create_connection=False)
         async with TasksAction.create(bot) as action:
             await action.cleanup_old_voice_channels()
-        assert "could not get guild from discord.py cache" in caplog.text
+        assert f"could not get guild {guild.xid} from discord.py cache" in caplog.text
 
     async def test_when_guild_has_no_categories(
         self,
@@ -520,9 +594,8 @@ class TestTaskCleanupOldVoiceChannels:
 
         voice_channel.delete.assert_not_called()
 
-    async def test_when_voice_channel_is_occupied_and_old(
+    async def test_when_many_voice_channels_are_renamed(
         self,
-        caplog: pytest.LogCaptureFixture,
         game: Game,
         channel: Channel,
         make_voice_channel: Callable[..., discord.VoiceChannel],
@@ -532,26 +605,34 @@ class TestTaskCleanupOldVoiceChannels:
         manage_perms = discord.Permissions(
             discord.Permissions.manage_channels.flag,
         )
-        voice_channel = make_voice_channel(
-            id=4001,
-            name=f"Game-SB{game.id}",
-            perms=manage_perms,
-            created_at=datetime.now(tz=pytz.utc) - timedelta(days=1),
-        )
-        voice_channel.voice_states.keys = lambda: True  # type: ignore
-        make_category_channel(
-            id=3001,
-            name=channel.voice_category,
-            perms=manage_perms,
-            voice_channels=[voice_channel],
-        )
+        voice_channels = [
+            make_voice_channel(
+                id=4001 + i,
+                name=f"Voice {i}",
+                perms=manage_perms,
+                created_at=datetime.now(tz=pytz.utc) - timedelta(hours=1),
+            )
+            for i in range(6)
+        ]
+        for voice_channel in voice_channels:
+            voice_channel.voice_states.keys = lambda: False  # type: ignore
+        game.voice_xid = voice_channels[4].id  # type: ignore
+        DatabaseSession.commit()
+        for i in range(2):
+            make_category_channel(
+                id=3001 + i,
+                name=f"{channel.voice_category} {i}",
+                perms=manage_perms,
+                voice_channels=voice_channels[i * 3 : i * 3 + 3],
+            )
 
-        await action.cleanup_old_voice_channels()
+        # one query for the voiced guilds and one for the games of all the channels
+        with sql_budget(2):
+            channels = await action.gather_channels()
 
-        voice_channel.delete.assert_called_once()
-        assert f"deleting channel Game-SB{game.id}({voice_channel.id})" in caplog.text
+        assert channels == [voice_channels[4]]
 
-    async def test_when_voice_channel_is_deleted(
+    async def test_when_voice_channel_is_occupied_and_old(
         self,
         caplog: pytest.LogCaptureFixture,
         game: Game,
@@ -567,9 +648,9 @@ class TestTaskCleanupOldVoiceChannels:
             id=4001,
             name=f"Game-SB{game.id}",
             perms=manage_perms,
-            created_at=datetime.now(tz=pytz.utc) - timedelta(hours=1),
+            created_at=datetime.now(tz=pytz.utc) - timedelta(days=1),
         )
-        voice_channel.voice_states.keys = lambda: False  # type: ignore
+        voice_channel.voice_states.keys = lambda: True  # type: ignore
         make_category_channel(
             id=3001,
             name=channel.voice_category,
@@ -582,7 +663,7 @@ class TestTaskCleanupOldVoiceChannels:
         voice_channel.delete.assert_called_once()
         assert f"deleting channel Game-SB{game.id}({voice_channel.id})" in caplog.text
 
-    async def test_when_voice_channel_is_deleted_and_batched(
+    async def test_when_voice_channel_is_deleted(
         self,
         caplog: pytest.LogCaptureFixture,
         game: Game,
@@ -590,11 +671,7 @@ class TestTaskCleanupOldVoiceChannels:
         make_voice_channel: Callable[..., discord.VoiceChannel],
         make_category_channel: Callable[..., discord.CategoryChannel],
         action: TasksAction,
-        mocker: MockerFixture,
     ) -> None:
-        import spellbot.actions.tasks_action as mod
-
-        mocker.patch.object(mod.settings, "VOICE_CLEANUP_BATCH", 0)
         manage_perms = discord.Permissions(
             discord.Permissions.manage_channels.flag,
         )
@@ -616,4 +693,54 @@ class TestTaskCleanupOldVoiceChannels:
 
         voice_channel.delete.assert_called_once()
         assert f"deleting channel Game-SB{game.id}({voice_channel.id})" in caplog.text
-        assert "batch limit reached" in caplog.text
+
+
+@pytest.mark.asyncio
+class TestTaskProvisionLinks:
+    async def test_provision_links(
+        self,
+        action: TasksAction,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        import spellbot.actions.tasks_action as mod
+
+        links = iter(range(100))
+        generate = AsyncMock(side_effect=lambda *_: f"https://spelltable.com/game/{next(links)}")
+        monkeypatch.setattr(mod, "generate_spelltable_link", generate)
+        monkeypatch.setattr(action.bot, "mock_games", False)
+
+        await action.provision_links()
+        # topping up a full pool does nothing
+        await action.provision_links()
+
+        assert generate.call_count == settings.SPELLTABLE_POOL_MIN
+        service = GameService.SPELLTABLE.value
+        assert await LinksService().stock(service) == settings.SPELLTABLE_POOL_MIN
+
+    async def test_provision_links_failures(
+        self,
+        action: TasksAction,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        import spellbot.actions.tasks_action as mod
+
+        monkeypatch.setattr(mod, "generate_spelltable_link", AsyncMock(return_value=None))
+        monkeypatch.setattr(action.bot, "mock_games", False)
+
+        await action.provision_links()
+
+        assert await LinksService().stock(GameService.SPELLTABLE.value) == 0
+
+    async def test_provision_links_mock_games(
+        self,
+        action: TasksAction,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        import spellbot.actions.tasks_action as mod
+
+        generate = AsyncMock()
+        monkeypatch.setattr(mod, "generate_spelltable_link", generate)
+
+        await action.provision_links()
+
+        generate.assert_not_called()
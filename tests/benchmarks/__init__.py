@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import statistics
+from contextlib import contextmanager
+from os import getenv
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import event
+
+from spellbot.database import DatabaseSession
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+# Benchmarks run at a small size by default so that they stay cheap enough for CI.
+# Set BENCHMARK_SCALE to a larger integer to get more meaningful numbers locally.
+BENCHMARK_SCALE = max(int(getenv("BENCHMARK_SCALE", "1")), 1)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def report(name: str, samples: list[float], **extra: float) -> dict[str, float]:
+    """Print and return summary latency statistics (in milliseconds) for a benchmark."""
+    stats = {
+        "n": float(len(samples)),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        **extra,
+    }
+    summary = ", ".join(f"{k}={v:.2f}" for k, v in stats.items())
+    print(f"\n[benchmark] {name}: {summary}")  # noqa: T201
+    return stats
+
+
+@contextmanager
+def count_queries() -> Generator[list[str], None, None]:
+    """Collect the SQL statements sent to the database by the current session."""
+    statements: list[str] = []
+    bind = DatabaseSession.get_bind().engine
+
+    def before_cursor_execute(*args: Any) -> None:
+        statements.append(args[2])
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
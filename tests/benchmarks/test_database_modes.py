@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+
+from spellbot.database import (
+    DatabaseSession,
+    database_sync_to_async,
+    db_session_manager,
+    dispose_async_engine,
+    initialize_async_engine,
+    using_async_engine,
+)
+from spellbot.models import Guild
+from spellbot.settings import settings
+
+from . import BENCHMARK_SCALE, report
+
+INTERACTIONS = 50 * BENCHMARK_SCALE
+QUERY_LATENCY_S = 0.005
+
+
+@database_sync_to_async
+def lookup(guild_xid: int) -> bool:
+    # Stand in for a typical interaction: a slow-ish query followed by a simple lookup.
+    DatabaseSession.execute(text("SELECT pg_sleep(:s)"), {"s": QUERY_LATENCY_S})
+    return DatabaseSession.query(Guild).filter(Guild.xid == guild_xid).one_or_none() is not None
+
+
+async def run_workload() -> tuple[list[float], float]:
+    async def interaction(guild_xid: int) -> float:
+        start = time.perf_counter()
+        async with db_session_manager():
+            await lookup(guild_xid)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(interaction(i) for i in range(INTERACTIONS)))
+    return list(samples), time.perf_counter() - start
+
+
+@pytest.mark.asyncio
+class TestDatabaseModes:
+    async def test_latency(self, worker_id: str) -> None:
+        samples, classic_wall_s = await run_workload()
+        classic = report("database sync_to_async", samples, wall_s=classic_wall_s)
+
+        initialize_async_engine(f"{settings.DATABASE_URL}-{worker_id}", "spellbot-benchmark")
+        try:
+            assert using_async_engine()
+            await run_workload()  # warm up the connection pool
+            samples, async_wall_s = await run_workload()
+        finally:
+            await dispose_async_engine()
+        pooled = report("database asyncpg pool", samples, wall_s=async_wall_s)
+
+        # A single shared connection can only ever run one query at a time.
+        assert classic_wall_s >= INTERACTIONS * QUERY_LATENCY_S
+        assert pooled["p50_ms"] < classic["p50_ms"]
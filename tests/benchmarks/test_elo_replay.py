@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import random
+import time
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+from sqlalchemy import insert
+
+from spellbot.database import DatabaseSession
+from spellbot.elo import replay, replay_plays
+from spellbot.models import Game, Play, Record, User
+
+from . import BENCHMARK_SCALE, report
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from spellbot.models import Channel, Guild
+
+SEATS = 4
+PLAYERS = 500
+# Use BENCHMARK_SCALE=1000 to replay a million games.
+GAMES = 1_000 * BENCHMARK_SCALE
+DB_GAMES = 200 * BENCHMARK_SCALE
+
+
+def synthetic_plays(games: int, seed: int = 0) -> Iterator[tuple[int, int, int]]:
+    rng = random.Random(seed)  # noqa: S311
+    for game_id in range(games):
+        players = rng.sample(range(1, PLAYERS + 1), SEATS)
+        for seat, user_xid in enumerate(players):
+            yield game_id, user_xid, 3 if seat == 0 else rng.choice((0, 1))
+
+
+class TestEloReplay:
+    def test_replay_in_memory(self) -> None:
+        start = time.perf_counter()
+        elos = replay_plays(synthetic_plays(GAMES))
+        elapsed = time.perf_counter() - start
+        report("elo replay in memory", [elapsed / GAMES], games=GAMES)
+
+        assert len(elos) == PLAYERS
+
+
+@pytest.mark.asyncio
+class TestEloReplayDatabase:
+    async def test_replay_from_plays(self, guild: Guild, channel: Channel) -> None:
+        DatabaseSession.execute(
+            insert(User),
+            [{"xid": xid, "name": f"user-{xid}"} for xid in range(1, PLAYERS + 1)],
+        )
+        game_ids = DatabaseSession.scalars(
+            insert(Game).returning(Game.id),
+            [
+                {"guild_xid": guild.xid, "channel_xid": channel.xid, "seats": SEATS}
+                for _ in range(DB_GAMES)
+            ],
+        ).all()
+        confirmed_at = datetime.now(tz=UTC)
+        plays = list(synthetic_plays(DB_GAMES))
+        DatabaseSession.execute(
+            insert(Play),
+            [
+                {
+                    "game_id": game_ids[n],
+                    "user_xid": user_xid,
+                    "og_guild_xid": guild.xid,
+                    "points": points,
+                    "confirmed_at": confirmed_at + timedelta(seconds=n),
+                }
+                for n, user_xid, points in plays
+            ],
+        )
+
+        start = time.perf_counter()
+        written = replay(guild.xid, channel.xid, batch_size=1_000)
+        elapsed = time.perf_counter() - start
+        report("elo replay from plays", [elapsed], games=DB_GAMES)
+
+        assert written == DatabaseSession.query(Record).count()
+        DatabaseSession.expire_all()
+        elos = dict(DatabaseSession.query(Record.user_xid, Record.elo).tuples().all())
+        assert elos == replay_plays(plays)
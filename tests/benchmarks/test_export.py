@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import insert
+
+from spellbot.database import DatabaseSession
+from spellbot.models import Game, Play, Post, User
+from spellbot.web.api import export
+from spellbot.web.api.export import encode
+
+from . import BENCHMARK_SCALE, report
+
+if TYPE_CHECKING:
+    from aiohttp.client import ClientSession
+
+    from spellbot.models import Channel, Guild
+
+SEATS = 4
+GAMES = 1_000 * BENCHMARK_SCALE
+
+
+def add_history(guild: Guild, channel: Channel, games: int) -> None:
+    start = datetime(2020, 1, 1)  # noqa: DTZ001
+    game_ids = DatabaseSession.scalars(
+        insert(Game).returning(Game.id),
+        [
+            {
+                "guild_xid": guild.xid,
+                "channel_xid": channel.xid,
+                "seats": SEATS,
+                "updated_at": start + timedelta(seconds=n),
+            }
+            for n in range(games)
+        ],
+    ).all()
+    DatabaseSession.execute(
+        insert(Post),
+        [
+            {
+                "guild_xid": guild.xid,
+                "channel_xid": channel.xid,
+                "game_id": game_id,
+                "message_xid": game_id,
+            }
+            for game_id in game_ids
+        ],
+    )
+    DatabaseSession.execute(
+        insert(Play),
+        [
+            {"game_id": game_id, "user_xid": xid, "og_guild_xid": guild.xid, "points": 1}
+            for game_id in game_ids
+            for xid in range(1, SEATS + 1)
+        ],
+    )
+    DatabaseSession.commit()
+
+
+# How much the test client and server buffer in between depends on how busy the machine
+# is, so only memory allocated by SpellBot's own code is counted.
+OWN_CODE = [tracemalloc.Filter(inclusive=True, filename_pattern="*/spellbot/*")]
+
+
+def own_memory() -> int:
+    snapshot = tracemalloc.take_snapshot().filter_traces(OWN_CODE)
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+
+async def stream(client: ClientSession, url: str) -> tuple[int, float, int]:
+    """Download an export a chunk at a time, returning its size, duration and peak memory."""
+    measuring = 0.0
+    peak = 0
+
+    def measured_encode(*args: Any, **kwargs: Any) -> bytes:
+        # A batch of records and the rows made from them are all in memory by now.
+        nonlocal measuring, peak
+        start = time.perf_counter()
+        peak = max(peak, own_memory())
+        measuring += time.perf_counter() - start
+        return encode(*args, **kwargs)
+
+    tracemalloc.start()
+    begin = time.perf_counter()
+    size = 0
+    with patch.object(export, "encode", measured_encode):
+        resp = await client.get(url)
+        async for chunk in resp.content.iter_any():
+            size += len(chunk)
+    elapsed = time.perf_counter() - begin - measuring
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+@pytest.mark.asyncio
+class TestExport:
+    async def test_channel_export_memory(
+        self,
+        client: ClientSession,
+        guild: Guild,
+        channel: Channel,
+    ) -> None:
+        DatabaseSession.execute(
+            insert(User),
+            [{"xid": xid, "name": f"user-{xid}"} for xid in range(1, SEATS + 1)],
+        )
+        url = f"/g/{guild.xid}/c/{channel.xid}/export"
+
+        add_history(guild, channel, GAMES)
+        small_size, small_elapsed, small_peak = await stream(client, url)
+        add_history(guild, channel, GAMES * 3)
+        large_size, large_elapsed, large_peak = await stream(client, url)
+
+        report(f"export {GAMES} games", [small_elapsed], bytes=small_size, peak=small_peak)
+        report(f"export {GAMES * 4} games", [large_elapsed], bytes=large_size, peak=large_peak)
+
+        assert large_size > small_size * 3.5
+        # Memory use depends on the batch size, not on the size of the history.
+        assert large_peak < small_peak * 1.5
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+from sqlalchemy import insert, text
+
+from spellbot.database import DatabaseSession
+from spellbot.enums import GameFormat, GameService
+from spellbot.models import Block, Game, Queue, User
+from spellbot.services import GamesService
+
+from . import BENCHMARK_SCALE, count_queries, report
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from spellbot.models import Channel, Guild
+    from tests.fixtures import Factories
+
+SEATS = 4
+FORMAT = GameFormat.COMMANDER.value
+SERVICE = GameService.SPELLTABLE.value
+AUTHOR_XID = 1
+ROUNDS = 20
+
+
+@pytest.fixture
+def seed_pending_games(
+    factories: Factories,
+) -> Callable[[Guild, Channel, int], None]:
+    """
+    Seed a channel with lots of pending games that the author can not join.
+
+    Each game has one other player who has been blocked by the author, so every one
+    of them has to be considered and then rejected before the matchmaking gives up.
+    """
+    factories.user.create(xid=AUTHOR_XID)
+    next_xid = AUTHOR_XID + 1
+
+    def seed(guild: Guild, channel: Channel, games: int) -> None:
+        nonlocal next_xid
+        xids = list(range(next_xid, next_xid + games))
+        next_xid += games
+        DatabaseSession.execute(insert(User), [{"xid": xid, "name": f"user-{xid}"} for xid in xids])
+        game_ids = DatabaseSession.scalars(
+            insert(Game).returning(Game.id),
+            [
+                {
+                    "guild_xid": guild.xid,
+                    "channel_xid": channel.xid,
+                    "seats": SEATS,
+                    "format": FORMAT,
+                    "service": SERVICE,
+                }
+                for _ in xids
+            ],
+        ).all()
+        DatabaseSession.execute(
+            insert(Queue),
+            [
+                {"user_xid": xid, "game_id": game_id, "og_guild_xid": guild.xid}
+                for xid, game_id in zip(xids, game_ids, strict=True)
+            ],
+        )
+        DatabaseSession.execute(
+            insert(Block),
+            [{"user_xid": AUTHOR_XID, "blocked_user_xid": xid} for xid in xids],
+        )
+        # Give the planner real statistics, as autovacuum would in production.
+        DatabaseSession.execute(text("ANALYZE"))
+
+    return seed
+
+
+@pytest.mark.asyncio
+class TestFindExisting:
+    def measure(self, guild: Guild, channel: Channel) -> tuple[list[float], int]:
+        games = GamesService()
+        samples: list[float] = []
+        with count_queries() as statements:
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                found = games._find_existing(
+                    guild_xid=guild.xid,
+                    channel_xid=channel.xid,
+                    author_xid=AUTHOR_XID,
+                    friends=[],
+                    seats=SEATS,
+                    format=FORMAT,
+                    service=SERVICE,
+                )
+                samples.append(time.perf_counter() - start)
+                assert found is None
+        return samples, len(statements) // ROUNDS
+
+    async def test_busy_server(
+        self,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+        seed_pending_games: Callable[[Guild, Channel, int], None],
+    ) -> None:
+        seed_pending_games(guild, channel, 10)
+        quiet, quiet_queries = self.measure(guild, channel)
+
+        # Lots of pending games and blocks elsewhere should not slow this channel down.
+        for _ in range(10):
+            other = factories.channel.create(guild=guild)
+            seed_pending_games(guild, other, 200 * BENCHMARK_SCALE)
+        busy, busy_queries = self.measure(guild, channel)
+
+        quiet_stats = report("find existing (quiet server)", quiet, queries=quiet_queries)
+        busy_stats = report("find existing (busy server)", busy, queries=busy_queries)
+
+        assert quiet_queries == busy_queries == 1
+        assert busy_stats["p50_ms"] < quiet_stats["p50_ms"] * 3 + 5
+
+    async def test_busy_channel(
+        self,
+        guild: Guild,
+        channel: Channel,
+        seed_pending_games: Callable[[Guild, Channel, int], None],
+    ) -> None:
+        # Every pending game in the channel has to be rejected, but that should all still
+        # happen inside of the database rather than with a round trip per game.
+        seed_pending_games(guild, channel, 10)
+        small, small_queries = self.measure(guild, channel)
+        seed_pending_games(guild, channel, 2000 * BENCHMARK_SCALE)
+        large, large_queries = self.measure(guild, channel)
+
+        report("find existing (10 games in channel)", small, queries=small_queries)
+        report("find existing (2000 games in channel)", large, queries=large_queries)
+
+        assert small_queries == large_queries == 1
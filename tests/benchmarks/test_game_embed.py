@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import pytest
+import pytz
+
+from spellbot.models import GameStatus
+
+from . import count_queries, report
+
+if TYPE_CHECKING:
+    from spellbot.models import Channel, Game, Guild
+    from tests.fixtures import Factories
+
+ROUNDS = 20
+
+
+@pytest.mark.asyncio
+class TestGameEmbed:
+    def measure(self, game: Game) -> tuple[list[float], int]:
+        samples: list[float] = []
+        with count_queries() as statements:
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                game.to_embed()
+                samples.append(time.perf_counter() - start)
+        return samples, len(statements) // ROUNDS
+
+    @pytest.mark.parametrize("seats", [2, 8])
+    async def test_queries_per_render(
+        self,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+        seats: int,
+    ) -> None:
+        game = factories.game.create(
+            seats=seats,
+            status=GameStatus.STARTED.value,
+            started_at=datetime(2021, 10, 31, tzinfo=pytz.utc),
+            guild=guild,
+            channel=channel,
+        )
+        for _ in range(seats):
+            player = factories.user.create(game=game)
+            factories.record.create(
+                guild_xid=guild.xid,
+                channel_xid=channel.xid,
+                user_xid=player.xid,
+            )
+
+        samples, queries = self.measure(game)
+        report(f"game embed ({seats} players)", samples, queries=queries)
+
+        # One query for the game, its guild, channel and posts, and one for the players.
+        assert queries == 2
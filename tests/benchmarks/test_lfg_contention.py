@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from spellbot.actions import LookingForGameAction, lfg_action
+from spellbot.database import DatabaseSession
+from spellbot.models import Game, GameStatus
+from tests.mocks import build_author, build_channel, build_guild, build_interaction
+
+from . import BENCHMARK_SCALE, report
+
+if TYPE_CHECKING:
+    from spellbot import SpellBot
+    from spellbot.models import GameDict
+
+GUILDS = 20 * BENCHMARK_SCALE
+SEATS = 4
+LINK_LATENCY_S = 0.05
+
+
+@pytest.mark.asyncio
+class TestLookingForGameContention:
+    async def test_many_guilds(self, bot: SpellBot, monkeypatch: pytest.MonkeyPatch) -> None:
+        next_message_xid = 1
+
+        def get_next_message(*args: Any, **kwargs: Any) -> discord.Message:
+            nonlocal next_message_xid
+            message = MagicMock(spec=discord.Message)
+            message.id = next_message_xid
+            next_message_xid += 1
+            return message
+
+        monkeypatch.setattr(lfg_action, "safe_fetch_user", AsyncMock(return_value=None))
+        monkeypatch.setattr(
+            lfg_action,
+            "safe_followup_channel",
+            AsyncMock(side_effect=get_next_message),
+        )
+        monkeypatch.setattr(
+            lfg_action,
+            "safe_get_partial_message",
+            MagicMock(side_effect=get_next_message),
+        )
+        monkeypatch.setattr(lfg_action, "safe_update_embed_origin", AsyncMock(return_value=True))
+        monkeypatch.setattr(lfg_action, "safe_update_embed", AsyncMock(return_value=True))
+
+        # Simulate a slow link service so that any serialization between guilds shows up.
+        in_flight = 0
+        max_in_flight = 0
+
+        async def create_game_link(game: GameDict) -> str:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(LINK_LATENCY_S)
+            in_flight -= 1
+            return f"https://spelltable.example.com/game/{game['id']}"
+
+        monkeypatch.setattr(bot, "create_game_link", create_game_link)
+
+        async def run(interaction: discord.Interaction) -> float:
+            start = time.perf_counter()
+            async with LookingForGameAction.create(bot, interaction) as action:
+                await action.execute(seats=SEATS)
+            return time.perf_counter() - start
+
+        interactions: list[discord.Interaction] = []
+        for g in range(GUILDS):
+            guild = build_guild(g)
+            channel = build_channel(guild, g)
+            interactions.extend(
+                build_interaction(guild, channel, build_author(g * SEATS + s)) for s in range(SEATS)
+            )
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(run(i) for i in interactions))
+        elapsed = time.perf_counter() - start
+
+        report(
+            "lfg contention",
+            list(samples),
+            guilds=GUILDS,
+            wall_s=elapsed,
+            max_links_in_flight=max_in_flight,
+        )
+
+        games = DatabaseSession.query(Game).all()
+        assert len(games) == GUILDS
+        assert all(game.status == GameStatus.STARTED.value for game in games)
+
+        # With a single global lock only one link could ever be in flight at a time.
+        assert max_in_flight > 1
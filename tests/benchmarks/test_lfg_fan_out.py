@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from spellbot.actions import LookingForGameAction, lfg_action
+from tests.mocks import build_author, build_channel, build_guild, build_interaction
+
+from . import report
+
+if TYPE_CHECKING:
+    from spellbot import SpellBot
+    from spellbot.models import GameDict
+
+SEATS = 4
+DISCORD_LATENCY_S = 0.1
+
+
+@pytest.mark.asyncio
+class TestLookingForGameFanOut:
+    async def test_seating_latency(self, bot: SpellBot, monkeypatch: pytest.MonkeyPatch) -> None:
+        next_message_xid = 1
+
+        def get_next_message(*args: Any, **kwargs: Any) -> discord.Message:
+            nonlocal next_message_xid
+            message = MagicMock(spec=discord.Message)
+            message.id = next_message_xid
+            next_message_xid += 1
+            return message
+
+        # Every direct message takes a while, as it would against the real Discord API.
+        in_flight = 0
+        max_in_flight = 0
+        sends: list[tuple[float, float]] = []
+
+        async def send_user(*args: Any, **kwargs: Any) -> None:
+            nonlocal in_flight, max_in_flight
+            start = time.perf_counter()
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(DISCORD_LATENCY_S)
+            in_flight -= 1
+            sends.append((start, time.perf_counter()))
+
+        monkeypatch.setattr(lfg_action, "safe_fetch_user", AsyncMock(return_value=MagicMock()))
+        monkeypatch.setattr(lfg_action, "safe_send_user", send_user)
+        monkeypatch.setattr(
+            lfg_action,
+            "safe_followup_channel",
+            AsyncMock(side_effect=get_next_message),
+        )
+        monkeypatch.setattr(
+            lfg_action,
+            "safe_get_partial_message",
+            MagicMock(side_effect=get_next_message),
+        )
+        monkeypatch.setattr(lfg_action, "safe_update_embed_origin", AsyncMock(return_value=True))
+        monkeypatch.setattr(lfg_action, "safe_update_embed", AsyncMock(return_value=True))
+
+        async def create_game_link(game: GameDict) -> str:
+            return f"https://spelltable.example.com/game/{game['id']}"
+
+        monkeypatch.setattr(bot, "create_game_link", create_game_link)
+
+        guild = build_guild()
+        channel = build_channel(guild)
+        samples: list[float] = []
+        for s in range(SEATS):
+            interaction = build_interaction(guild, channel, build_author(s))
+            start = time.perf_counter()
+            async with LookingForGameAction.create(bot, interaction) as action:
+                await action.execute(seats=SEATS)
+            samples.append(time.perf_counter() - start)
+
+        dms_s = max(end for _, end in sends) - min(start for start, _ in sends)
+        report("lfg fan out", samples, dms_s=dms_s, max_dms_in_flight=max_in_flight)
+
+        assert len(sends) == SEATS
+        assert max_in_flight == SEATS
+        # Sending the direct messages one at a time would take at least this long.
+        assert dms_s < SEATS * DISCORD_LATENCY_S
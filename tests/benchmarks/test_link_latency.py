@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from spellbot import spelltable
+from spellbot.link_client import LinkClient
+from spellbot.settings import settings
+from spellbot.spelltable import generate_spelltable_link
+from tests.mocks.link_server import FakeLinkServer
+
+from . import BENCHMARK_SCALE, report
+
+GAME_STARTS = 100 * BENCHMARK_SCALE
+SERVER_LATENCY_S = 0.02
+STALL_EVERY = 25
+# Long enough that a stall is unmistakable even on a busy CI machine. Stalled requests
+# are cancelled once their hedge answers, so this doesn't slow the benchmark down.
+STALL_S = 10.0
+HEDGE_AFTER_S = 0.1
+
+
+@pytest.mark.asyncio
+class TestLinkLatency:
+    async def test_concurrent_game_starts(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        client = LinkClient("spelltable", timeout_s=10, hedge_after_s=HEDGE_AFTER_S)
+        samples: list[float] = []
+
+        async def start_game() -> str | None:
+            start = time.perf_counter()
+            link = await generate_spelltable_link(MagicMock(), client)
+            samples.append(time.perf_counter() - start)
+            return link
+
+        async with FakeLinkServer(
+            latency_s=SERVER_LATENCY_S,
+            stall_every=STALL_EVERY,
+            stall_s=STALL_S,
+        ) as server:
+            monkeypatch.setattr(spelltable.settings, "SPELLTABLE_AUTH_KEY", "auth-key")
+            monkeypatch.setattr(spelltable.settings, "SPELLTABLE_CREATE", server.url)
+            links = await asyncio.gather(*(start_game() for _ in range(GAME_STARTS)))
+            await client.close()
+
+        stats = report(
+            "spelltable links",
+            samples,
+            requests=server.requests,
+            connections=len(server.connections),
+        )
+
+        assert all(links)
+        # Connections are pooled, so there are never more than the pool allows.
+        assert len(server.connections) <= settings.LINK_POOL_SIZE
+        # Stalled requests are hedged rather than waited on.
+        assert stats["p99_ms"] < STALL_S * 1000
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+from sqlalchemy import insert, text
+
+from spellbot.database import DatabaseSession
+from spellbot.models import Game, Play, Post, User
+from spellbot.services import Cursor, PlaysService
+from spellbot.services.plays import CHANNEL_PAGE_SIZE
+
+from . import BENCHMARK_SCALE, report
+
+if TYPE_CHECKING:
+    from spellbot.models import Channel, Guild
+
+SEATS = 4
+# Use BENCHMARK_SCALE=50 to be able to page 10,000 pages deep.
+GAMES = 2_000 * BENCHMARK_SCALE
+DEEP_PAGE = GAMES // CHANNEL_PAGE_SIZE - 1
+SAMPLES = 20
+
+
+@pytest.mark.asyncio
+class TestRecordPages:
+    async def test_channel_records_deep_page(self, guild: Guild, channel: Channel) -> None:
+        DatabaseSession.execute(
+            insert(User),
+            [{"xid": xid, "name": f"user-{xid}"} for xid in range(1, SEATS + 1)],
+        )
+        start = datetime(2020, 1, 1)  # noqa: DTZ001
+        games = DatabaseSession.execute(
+            insert(Game).returning(Game.id, Game.updated_at),
+            [
+                {
+                    "guild_xid": guild.xid,
+                    "channel_xid": channel.xid,
+                    "seats": SEATS,
+                    "updated_at": start + timedelta(seconds=n),
+                }
+                for n in range(GAMES)
+            ],
+        ).all()
+        DatabaseSession.execute(
+            insert(Post),
+            [
+                {
+                    "guild_xid": guild.xid,
+                    "channel_xid": channel.xid,
+                    "game_id": game_id,
+                    "message_xid": game_id,
+                }
+                for game_id, _ in games
+            ],
+        )
+        DatabaseSession.execute(
+            insert(Play),
+            [
+                {"game_id": game_id, "user_xid": xid, "og_guild_xid": guild.xid, "points": 1}
+                for game_id, _ in games
+                for xid in range(1, SEATS + 1)
+            ],
+        )
+        DatabaseSession.commit()
+        # Give the planner the statistics that a real database would have for these tables.
+        DatabaseSession.execute(text("ANALYZE games, posts, plays"))
+
+        # The cursor that the previous page links to is the last game on that page.
+        newest_first = sorted(games, key=lambda game: (game.updated_at, game.id), reverse=True)
+        deep = newest_first[DEEP_PAGE * CHANNEL_PAGE_SIZE - 1]
+        cursor = Cursor(deep.updated_at, deep.id)
+
+        plays = PlaysService()
+        first: list[float] = []
+        deepest: list[float] = []
+        for _ in range(SAMPLES):
+            begin = time.perf_counter()
+            page = await plays.channel_records(guild.xid, channel.xid)
+            first.append(time.perf_counter() - begin)
+            begin = time.perf_counter()
+            deep_page = await plays.channel_records(guild.xid, channel.xid, before=cursor)
+            deepest.append(time.perf_counter() - begin)
+
+        first_stats = report("channel records page 1", first, games=GAMES)
+        deep_stats = report(f"channel records page {DEEP_PAGE + 1}", deepest, games=GAMES)
+
+        assert page is not None
+        assert deep_page is not None
+        assert len(deep_page.records) == CHANNEL_PAGE_SIZE * SEATS
+        assert deep_page.records[-1]["id"] == newest_first[-1].id
+        # A deep page is found through the index, rather than by skipping every game
+        # before it, so it costs about as much as the first page.
+        assert deep_stats["p50_ms"] < first_stats["p50_ms"] * 3 + 5
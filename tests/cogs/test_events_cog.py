@@ -10,6 +10,7 @@ from spellbot.cogs import EventsCog
 from spellbot.database import DatabaseSession
 from spellbot.enums import GameFormat
 from spellbot.models import Game, GameStatus, Play, User
+from spellbot.sql_budget import sql_budget
 from tests.mixins import InteractionMixin
 from tests.mocks import mock_discord_object, mock_operations
 
@@ -40,11 +41,12 @@ class TestCogEvents(InteractionMixin):
         with mock_operations(lfg_action, users=users):
             lfg_action.safe_followup_channel.return_value = message
 
-            await self.run(
-                cog.game,
-                players=f"<@{player1.xid}><@{player2.xid}>",
-                format=cast(int, GameFormat.LEGACY.value),
-            )
+            with sql_budget(73):
+                await self.run(
+                    cog.game,
+                    players=f"<@{player1.xid}><@{player2.xid}>",
+                    format=cast(int, GameFormat.LEGACY.value),
+                )
 
         game = DatabaseSession.query(Game).one()
         assert game.status == GameStatus.STARTED.value
@@ -9,6 +9,7 @@ import pytest_asyncio
 from spellbot.actions import leave_action
 from spellbot.cogs import LeaveGameCog
 from spellbot.database import DatabaseSession
+from spellbot.sql_budget import sql_budget
 from spellbot.views.lfg_view import PendingGameView
 from tests.mixins import InteractionMixin
 from tests.mocks import mock_operations
@@ -38,7 +39,8 @@ class TestCogLeaveGame(InteractionMixin):
             leave_action.safe_fetch_text_channel.return_value = self.interaction.channel
             leave_action.safe_get_partial_message.return_value = message
 
-            await self.run(cog.leave_command)
+            with sql_budget(31):
+                await self.run(cog.leave_command)
 
             leave_action.safe_send_channel.assert_called_once_with(
                 self.interaction,
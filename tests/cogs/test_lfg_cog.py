@@ -14,6 +14,7 @@ from spellbot.cogs import LookingForGameCog
 from spellbot.database import DatabaseSession
 from spellbot.enums import GameFormat, GameService
 from spellbot.models import Channel, Game, GameStatus, Queue, User
+from spellbot.sql_budget import sql_budget
 from spellbot.views import PendingGameView
 from tests.mixins import InteractionMixin
 from tests.mocks import mock_discord_object, mock_operations
@@ -40,7 +41,8 @@ def cog(bot: SpellBot) -> LookingForGameCog:
 @pytest.mark.asyncio
 class TestCogLookingForGame(InteractionMixin):
     async def test_lfg(self, cog: LookingForGameCog, channel: Channel) -> None:
-        await self.run(cog.lfg)
+        with sql_budget(30):
+            await self.run(cog.lfg)
         game = DatabaseSession.query(Game).one()
         user = DatabaseSession.query(User).one()
         assert game.channel_xid == channel.xid
@@ -78,7 +80,8 @@ class TestCogLookingForGame(InteractionMixin):
             message.id = game.posts[0].message_xid
             lfg_action.safe_get_partial_message.return_value = message
 
-            await self.run(cog.lfg)
+            with sql_budget(74):
+                await self.run(cog.lfg)
 
             DatabaseSession.expire_all()
             game = DatabaseSession.query(Game).one()
@@ -9,6 +9,8 @@ import pytest_asyncio
 import pytz
 
 from spellbot.cogs import ScoreCog
+from spellbot.services import PlaysService
+from spellbot.sql_budget import sql_budget
 from tests.mixins import InteractionMixin
 from tests.mocks import build_channel, build_guild, build_interaction, mock_discord_object
 
@@ -29,7 +31,8 @@ async def cog(bot: SpellBot) -> ScoreCog:
 @pytest.mark.asyncio
 class TestCogScore(InteractionMixin):
     async def test_score(self, cog: ScoreCog, user: User, channel: Channel) -> None:
-        await self.run(cog.score)
+        with sql_budget(12):
+            await self.run(cog.score)
 
         assert self.last_send_message("embed") == {
             "author": {"name": f"Record of games played on {self.guild.name}"},
@@ -116,7 +119,8 @@ class TestCogScore(InteractionMixin):
         }
 
     async def test_history(self, cog: ScoreCog, channel: Channel) -> None:
-        await self.run(cog.history)
+        with sql_budget(11):
+            await self.run(cog.history)
 
         assert self.last_send_message("embed") == {
             "author": {"name": f"Recent games played in {channel.name}"},
@@ -173,7 +177,9 @@ class TestCogScore(InteractionMixin):
             )
             self.factories.play.create(user_xid=user4.xid, game_id=game.id)
 
-        await self.run(cog.top, monthly=False)
+        await PlaysService().backfill_play_counts()
+        with sql_budget(12):
+            await self.run(cog.top, monthly=False)
         assert self.last_send_message("embed") == {
             "title": f"Top players in #{channel.name} (all time)",
             "color": self.settings.INFO_EMBED_COLOR,
@@ -215,3 +221,35 @@ class TestCogScore(InteractionMixin):
             "thumbnail": {"url": self.settings.ICO_URL},
             "type": "rich",
         }
+
+    async def test_top_elo(
+        self,
+        cog: ScoreCog,
+        channel: Channel,
+        add_user: Callable[..., User],
+    ) -> None:
+        user1 = add_user()
+        user2 = add_user()
+        self.factories.record.create(guild=self.guild, channel=channel, user=user1, elo=1450)
+        self.factories.record.create(guild=self.guild, channel=channel, user=user2, elo=1550)
+        for _ in range(3):
+            game = self.factories.game.create(
+                guild_xid=self.guild.xid,
+                channel_xid=channel.xid,
+                started_at=datetime.now(tz=pytz.utc),
+            )
+            self.factories.play.create(user_xid=user1.xid, game_id=game.id)
+        await PlaysService().backfill_play_counts()
+
+        await self.run(cog.top, elo=True)
+        assert self.last_send_message("embed") == {
+            "title": f"Top players in #{channel.name} (ELO)",
+            "color": self.settings.INFO_EMBED_COLOR,
+            "description": (
+                "Rank \xa0\xa0\xa0 ELO \xa0\xa0\xa0 Games \xa0\xa0\xa0 Player\n"
+                f"{1:\xa0>6}\xa0{1550:\xa0>12}\xa0{0:\xa0>18}\xa0\xa0\xa0<@{user2.xid}>\n"
+                f"{2:\xa0>6}\xa0{1450:\xa0>12}\xa0{3:\xa0>18}\xa0\xa0\xa0<@{user1.xid}>\n"
+            ),
+            "thumbnail": {"url": self.settings.ICO_URL},
+            "type": "rich",
+        }
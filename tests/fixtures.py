@@ -15,10 +15,16 @@ from spellbot.database import (
     DatabaseSession,
     db_session_maker,
     delete_test_database,
+    dispose_async_engine,
+    initialize_async_engine,
     initialize_connection,
     rollback_transaction,
 )
+from spellbot.matchmaking import MatchmakingIndex
+from spellbot.matchmaking import matchmaking_index as default_matchmaking_index
 from spellbot.settings import Settings
+from spellbot.settings import settings as default_settings
+from spellbot.upsert_cache import clear_upsert_caches
 from spellbot.web import build_web_app
 from tests.factories import (
     BlockFactory,
@@ -40,7 +46,7 @@ from tests.mocks import build_author, build_channel, build_guild, build_interact
 
 if TYPE_CHECKING:
     from asyncio import AbstractEventLoop
-    from collections.abc import Awaitable, Callable, Generator
+    from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
 
     import discord
     from aiohttp.test_utils import TestClient
@@ -130,6 +136,42 @@ def cleanup_databases(worker_id: str) -> Generator[None, None, None]:
     delete_test_database(worker_id)
 
 
+@pytest_asyncio.fixture
+async def async_database(worker_id: str) -> AsyncGenerator[None, None]:
+    """
+    Switch sessions to async engine mode for the duration of a test.
+
+    Note that async sessions use their own pooled connections, so unlike the rest of
+    the test suite their work is committed rather than rolled back at the end.
+    """
+    db_url = f"{default_settings.DATABASE_URL}-{worker_id}"
+    initialize_async_engine(db_url, f"spellbot-test-async-{worker_id}")
+    yield
+    await dispose_async_engine()
+
+
+@pytest.fixture
+def matchmaking_index() -> Generator[MatchmakingIndex, None, None]:
+    """
+    Enable the matchmaking index in consistency-check mode for the duration of a test.
+
+    Tests must call `rebuild()` once they have set up their data using factories,
+    since factories write to the database without updating the index.
+    """
+    default_matchmaking_index.verify = True
+    yield default_matchmaking_index
+    default_matchmaking_index.verify = False
+    default_matchmaking_index.disable()
+
+
+@pytest.fixture(autouse=True)
+def upsert_caches() -> Generator[None, None, None]:
+    """Every test rolls back its data, so forget anything upserted by the previous one."""
+    clear_upsert_caches()
+    yield
+    clear_upsert_caches()
+
+
 @pytest_asyncio.fixture(autouse=True)
 def use_session_context(session_context: contextvars.Context) -> None:
     for cvar in session_context:
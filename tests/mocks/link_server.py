@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Self
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+
+class FakeLinkServer:
+    """
+    A local stand-in for the SpellTable API that creates game links.
+
+    Every response takes `latency_s` seconds. Every `stall_every`th request instead
+    takes `stall_s` seconds, and the first `fail_first` requests fail with a server
+    error. The server keeps track of how many requests it has seen and on how many
+    different connections they arrived.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency_s: float = 0.0,
+        stall_every: int = 0,
+        stall_s: float = 60.0,
+        fail_first: int = 0,
+    ) -> None:
+        self.latency_s = latency_s
+        self.stall_every = stall_every
+        self.stall_s = stall_s
+        self.fail_first = fail_first
+        self.requests = 0
+        self.connections: set[int] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        app = web.Application()
+        app.router.add_post("/createGame", self.create_game)
+        self.server = TestServer(app)
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("/createGame"))
+
+    async def __aenter__(self) -> Self:
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.server.close()
+
+    async def create_game(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        n = self.requests
+        self.connections.add(id(request.transport))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            stall = self.stall_every and n % self.stall_every == 0
+            await asyncio.sleep(self.stall_s if stall else self.latency_s)
+            if n <= self.fail_first:
+                return web.Response(status=503, body=b"upstream request timeout")
+            body: dict[str, Any] = {"gameUrl": f"https://www.spelltable.com/game/{n}"}
+            return web.json_response(body)
+        finally:
+            self.in_flight -= 1
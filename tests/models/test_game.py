@@ -10,7 +10,7 @@ import pytz
 
 from spellbot.database import DatabaseSession
 from spellbot.enums import GameService
-from spellbot.models import Game, GameStatus, Play
+from spellbot.models import Game, GameStatus, Play, PlayerSnapshot
 
 if TYPE_CHECKING:
     from freezegun.api import FrozenDateTimeFactory
@@ -814,3 +814,27 @@ class TestModelGame:
             "title": "**Your game is ready!**",
             "type": "rich",
         }
+
+    def test_game_snapshot(self, factories: Factories) -> None:
+        guild = factories.guild.create()
+        channel = factories.channel.create(guild=guild)
+        game = factories.game.create(seats=4, guild=guild, channel=channel)
+        player = factories.user.create(game=game)
+        factories.record.create(
+            guild_xid=guild.xid,
+            channel_xid=channel.xid,
+            user_xid=player.xid,
+            elo=1500,
+        )
+
+        snapshot = game.snapshot()
+
+        assert snapshot.id == game.id
+        assert snapshot.players == (
+            PlayerSnapshot(
+                xid=player.xid, name=player.name, points=None, confirmed=False, elo=1500
+            ),
+        )
+        with pytest.raises(AttributeError):
+            snapshot.seats = 2
+        assert snapshot.to_embed().to_dict() == game.to_embed().to_dict()
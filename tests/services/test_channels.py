@@ -7,6 +7,7 @@ import pytest
 from spellbot.database import DatabaseSession
 from spellbot.models import Channel, Guild
 from spellbot.services import ChannelsService
+from spellbot.verification import VerificationPolicy
 from tests.factories import ChannelFactory
 
 
@@ -37,6 +38,33 @@ class TestServiceChannels:
         assert channel.xid == discord_channel.id
         assert channel.name == "new-name"
 
+    async def test_channels_upsert_cached(self, guild: Guild) -> None:
+        channels = ChannelsService()
+        discord_channel = MagicMock()
+        discord_channel.id = 201
+        discord_channel.name = "channel-name"
+        discord_guild = MagicMock()
+        discord_guild.id = guild.xid
+        discord_channel.guild = discord_guild
+        data = await channels.upsert(discord_channel)
+        assert data["default_seats"] == 4
+
+        # changes made elsewhere aren't seen until the cache is invalidated
+        DatabaseSession.query(Channel).filter(Channel.xid == discord_channel.id).update(
+            {Channel.default_seats: 3},
+        )
+        data = await channels.upsert(discord_channel)
+        assert data["default_seats"] == 4
+
+        await channels.set_default_seats(discord_channel.id, 2)
+        data = await channels.upsert(discord_channel)
+        assert data["default_seats"] == 2
+
+        # callers may modify the data that they get back
+        data["default_seats"] = 5
+        data = await channels.upsert(discord_channel)
+        assert data["default_seats"] == 2
+
     async def test_channels_select(self, guild: Guild) -> None:
         channels = ChannelsService()
         assert not await channels.select(404)
@@ -85,6 +113,14 @@ class TestServiceChannels:
         assert data is not None
         assert data["unverified_only"]
 
+    async def test_channels_verification_policies(self, guild: Guild) -> None:
+        channel = ChannelFactory.create(guild=guild, verified_only=True)
+        ChannelFactory.create(guild=guild)
+
+        policies = await ChannelsService().verification_policies()
+        policy = VerificationPolicy(auto_verify=False, verified_only=True, unverified_only=False)
+        assert policies == {channel.xid: policy}
+
     async def test_channels_set_auto_verify(self, guild: Guild) -> None:
         channel = ChannelFactory.create(guild=guild, auto_verify=False)
 
@@ -1,19 +1,24 @@
 from __future__ import annotations
 
 from datetime import UTC, datetime, timedelta
+from typing import cast
 from unittest.mock import patch
 
 import pytest
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.expression import and_
 
-from spellbot.database import DatabaseSession
+from spellbot.database import DatabaseSession, database_sync_to_async, db_session_manager
 from spellbot.enums import GameFormat, GameService
 from spellbot.models import (
     Channel,
     Game,
     GameStatus,
     Guild,
+    Job,
+    JobKind,
     Play,
+    PlayCount,
     Post,
     Queue,
     User,
@@ -46,6 +51,14 @@ class TestServiceGames:
         assert await games.select_by_voice_xid(game.voice_xid)
         assert not await games.select_by_voice_xid(404)
 
+    async def test_games_voice_xids(self, guild: Guild, channel: Channel) -> None:
+        GameFactory.create(guild=guild, channel=channel, voice_xid=12345)
+        GameFactory.create(guild=guild, channel=channel, voice_xid=67890)
+
+        games = GamesService()
+        assert await games.voice_xids([12345, 404]) == {12345}
+        assert await games.voice_xids([]) == set()
+
     async def test_games_select_by_message_xid(self, guild: Guild, channel: Channel) -> None:
         game = GameFactory.create(guild=guild, channel=channel)
         PostFactory.create(guild=guild, channel=channel, game=game)
@@ -136,6 +149,71 @@ class TestServiceGames:
         assert found.spelltable_link == "http://link"
         assert found.status == GameStatus.STARTED.value
 
+    async def test_games_make_ready_records_jobs(self, game: Game) -> None:
+        UserFactory.create(game=game)
+        games = GamesService()
+        await games.select(game.id)
+        await games.make_ready(None)
+
+        jobs = DatabaseSession.query(Job).filter(Job.game_id == game.id).order_by(Job.id).all()
+        assert [job.kind for job in jobs] == [
+            JobKind.CREATE_LINK.value,
+            JobKind.CREATE_VOICE.value,
+            JobKind.NOTIFY_PLAYERS.value,
+        ]
+        assert all(job.locked_until is not None and job.finished_at is None for job in jobs)
+
+    async def test_games_make_ready_is_atomic(self, game: Game) -> None:
+        user = UserFactory.create(game=game)
+        games = GamesService()
+        await games.select(game.id)
+
+        with (
+            patch("spellbot.services.games.job_key", return_value=None),
+            pytest.raises(IntegrityError),
+        ):
+            await games.make_ready("http://link")
+
+        DatabaseSession.expire_all()
+        found = DatabaseSession.query(Game).get(game.id)
+        assert found
+        assert found.status == GameStatus.PENDING.value
+        assert found.player_xids == [user.xid]
+        assert not DatabaseSession.query(Play).filter(Play.game_id == game.id).count()
+
+    async def test_games_make_ready_counts_plays(self, guild: Guild, channel: Channel) -> None:
+        user1 = UserFactory.create()
+        user2 = UserFactory.create()
+        games = GamesService()
+        for players in ([user1, user2], [user1]):
+            game = GameFactory.create(guild=guild, channel=channel)
+            for player in players:
+                QueueFactory.create(user_xid=player.xid, game_id=game.id)
+            await games.select(game.id)
+            await games.make_ready("http://link")
+
+        month = datetime.now(tz=UTC).year * 100 + datetime.now(tz=UTC).month
+        counts = {
+            (count.user_xid, count.period): count.games
+            for count in DatabaseSession.query(PlayCount).all()
+        }
+        assert counts == {
+            (user1.xid, 0): 2,
+            (user1.xid, month): 2,
+            (user2.xid, 0): 1,
+            (user2.xid, month): 1,
+        }
+
+    async def test_games_set_link(self, game: Game) -> None:
+        games = GamesService()
+        await games.select(game.id)
+        await games.set_link("http://link")
+
+        DatabaseSession.expire_all()
+        found = DatabaseSession.query(Game).get(game.id)
+        assert found
+        assert found.spelltable_link == "http://link"
+
     async def test_games_player_xids(self, game: Game) -> None:
         user1 = UserFactory.create(game=game)
         user2 = UserFactory.create(game=game)
@@ -189,6 +267,12 @@ class TestServiceGames:
         PostFactory.create(guild=game.guild, channel=game.channel, game=game)
         assert await games.message_xids([game.id]) == [game.posts[0].message_xid]
 
+    async def test_posts(self, game: Game) -> None:
+        post = PostFactory.create(guild=game.guild, channel=game.channel, game=game)
+        game.deleted_at = datetime.now(tz=UTC)  # type: ignore
+        DatabaseSession.commit()
+        assert await GamesService().posts([game.id]) == [post.to_dict()]  # type: ignore
+
     async def test_dequeue_players(self, game: Game) -> None:
         user1 = UserFactory.create(game=game)
         user2 = UserFactory.create(game=game)
@@ -230,6 +314,18 @@ class TestServiceGamesPlays:
         found = DatabaseSession.query(Play).filter(Play.user_xid == user2.xid).one()
         assert found.points is None
 
+    async def test_games_add_points_touches_game(self, game: Game) -> None:
+        user = UserFactory.create(game=game)
+        PlayFactory.create(user_xid=user.xid, game_id=game.id, points=None)
+        updated_at = game.to_dict()["updated_at"]
+
+        games = GamesService()
+        await games.select(game.id)
+        await games.add_points(user.xid, 3)
+
+        DatabaseSession.refresh(game)
+        assert game.to_dict()["updated_at"] > updated_at
+
 
 @pytest.mark.asyncio
 class TestServiceGamesConfirmPoints:
@@ -245,6 +341,8 @@ class TestServiceGamesConfirmPoints:
         DatabaseSession.refresh(play)
         assert play.points == 5
         assert play.confirmed_at is not None
+        DatabaseSession.refresh(game)
+        assert game.updated_at == play.confirmed_at
 
 
 @pytest.mark.asyncio
@@ -524,3 +622,89 @@ class TestServiceGamesUpsert:
         assert new
         assert game.players == [user1]
         assert other_game.players == [user2]
+
+    async def test_lfg_skips_blocked_game_for_next_game(self, game: Game) -> None:
+        games = GamesService()
+        user1 = UserFactory.create(xid=101, game=game)
+        next_game = GameFactory.create(
+            guild=game.guild,
+            channel=game.channel,
+            updated_at=game.updated_at + timedelta(minutes=1),
+        )
+        user2 = UserFactory.create(xid=102, game=next_game)
+        user3 = UserFactory.create(xid=103)
+        BlockFactory.create(user_xid=user1.xid, blocked_user_xid=user3.xid)
+
+        new = await games.upsert(
+            guild_xid=game.guild.xid,
+            channel_xid=game.channel.xid,
+            author_xid=user3.xid,
+            friends=[],
+            seats=game.seats,
+            format=game.format,
+            service=GameService.SPELLTABLE.value,
+        )
+
+        DatabaseSession.expire_all()
+        assert not new
+        assert game.players == [user1]
+        assert {p.xid for p in next_game.players} == {user2.xid, user3.xid}
+
+
+# Far away from the ids used by other tests, since this data is committed.
+OFFSET = 9_000_000
+
+
+@database_sync_to_async
+def create_pending_game() -> int:
+    DatabaseSession.add(Guild(xid=OFFSET, name="guild"))
+    DatabaseSession.add(Channel(xid=OFFSET, guild_xid=OFFSET, name="channel"))
+    DatabaseSession.add(User(xid=OFFSET, name="user"))
+    game = Game(guild_xid=OFFSET, channel_xid=OFFSET, seats=2)
+    DatabaseSession.add(game)
+    DatabaseSession.flush()
+    game_id = cast(int, game.id)
+    DatabaseSession.add(Queue(user_xid=OFFSET, game_id=game_id, og_guild_xid=OFFSET))
+    DatabaseSession.commit()
+    return game_id
+
+
+@database_sync_to_async
+def game_state(game_id: int) -> tuple[int, int, int]:
+    game = DatabaseSession.get(Game, game_id)
+    assert game
+    plays = DatabaseSession.query(Play).filter(Play.game_id == game_id).count()
+    jobs = DatabaseSession.query(Job).filter(Job.game_id == game_id).count()
+    return game.status, plays, jobs
+
+
+@database_sync_to_async
+def delete_pending_game(game_id: int) -> None:
+    for model in (Play, Job, Queue):
+        DatabaseSession.query(model).filter(model.game_id == game_id).delete()
+    DatabaseSession.query(Game).filter(Game.id == game_id).delete()
+    DatabaseSession.query(User).filter(User.xid == OFFSET).delete()
+    DatabaseSession.query(Guild).filter(Guild.xid == OFFSET).delete()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("async_database")
+class TestServiceGamesMakeReadyAutocommit:
+    async def test_failed_start_is_rolled_back(self) -> None:
+        async with db_session_manager():
+            game_id = await create_pending_game()
+        try:
+            async with db_session_manager():
+                games = GamesService()
+                await games.select(game_id)
+                with (
+                    patch("spellbot.services.games.job_key", return_value=None),
+                    pytest.raises(IntegrityError),
+                ):
+                    await games.make_ready("http://link")
+
+            async with db_session_manager():
+                assert await game_state(game_id) == (GameStatus.PENDING.value, 0, 0)
+        finally:
+            async with db_session_manager():
+                await delete_pending_game(game_id)
@@ -7,7 +7,7 @@ import pytest
 from spellbot.database import DatabaseSession
 from spellbot.models import Guild, GuildAward
 from spellbot.services import GuildsService
-from tests.factories import GuildAwardFactory, GuildFactory
+from tests.factories import ChannelFactory, GuildAwardFactory, GuildFactory
 
 
 @pytest.mark.asyncio
@@ -34,6 +34,28 @@ class TestServiceGuilds:
         assert guild.xid == discord_guild.id
         assert guild.name == "new-name"
 
+    async def test_guilds_upsert_cached(self) -> None:
+        discord_guild = MagicMock()
+        discord_guild.id = 101
+        discord_guild.name = "guild-name"
+        guilds = GuildsService()
+        await guilds.upsert(discord_guild)
+        DatabaseSession.expire_all()
+        guild = DatabaseSession.query(Guild).get(discord_guild.id)
+        assert guild
+        updated_at = guild.updated_at
+
+        # nothing has changed, so nothing is written
+        data = await guilds.upsert(discord_guild)
+        assert data
+        assert data["updated_at"] == updated_at
+
+        # an admin setting changed, so it is written again
+        await guilds.toggle_show_links()
+        data = await guilds.upsert(discord_guild)
+        assert data
+        assert data["updated_at"] != updated_at
+
     async def test_guilds_select(self) -> None:
         guilds = GuildsService()
         assert not await guilds.select(404)
@@ -144,13 +166,16 @@ class TestServiceGuilds:
 
     async def test_guilds_voiced(self) -> None:
         guilds = GuildsService()
-        assert await guilds.voiced() == []
+        assert await guilds.voiced() == {}
 
         guild1 = GuildFactory.create(voice_create=True)
         GuildFactory.create()
         guild3 = GuildFactory.create(voice_create=True)
+        ChannelFactory.create(guild=guild1, voice_category="Voice")
+        ChannelFactory.create(guild=guild1, voice_category="Voice")
+        ChannelFactory.create(guild=guild1, voice_category="Games")
 
-        assert set(await guilds.voiced()) == {guild1.xid, guild3.xid}
+        assert await guilds.voiced() == {guild1.xid: ["Games", "Voice"], guild3.xid: []}
 
     async def test_guilds_to_dict(self) -> None:
         guild = GuildFactory.create(xid=101)
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+import pytz
+
+from spellbot.database import DatabaseSession
+from spellbot.models import Job, JobKind
+from spellbot.services import JobsService
+from spellbot.services.jobs import job_key
+from spellbot.settings import settings
+
+if TYPE_CHECKING:
+    from spellbot.models import Game
+
+
+def lease() -> datetime:
+    # Like the leases read back from the database.
+    return (datetime.now(tz=pytz.utc) + timedelta(minutes=1)).replace(tzinfo=None)
+
+
+def add_job(game: Game, kind: JobKind, **kwargs: object) -> Job:
+    job = Job(key=job_key(kind, game.id), kind=kind.value, game_id=game.id, **kwargs)  # type: ignore
+    DatabaseSession.add(job)
+    DatabaseSession.commit()
+    return job
+
+
+@pytest.mark.asyncio
+class TestServiceJobs:
+    async def test_leased(self, game: Game) -> None:
+        now = datetime.now(tz=pytz.utc)
+        voice = add_job(game, JobKind.CREATE_VOICE, locked_until=lease())
+        notify = add_job(game, JobKind.NOTIFY_PLAYERS, locked_until=lease())
+        add_job(game, JobKind.CREATE_LINK, locked_until=lease(), finished_at=now)
+        # Once its lease has run out a job may be claimed by someone else.
+        add_job(game, JobKind.DELETE_POSTS, locked_until=now - timedelta(seconds=1))
+
+        jobs = JobsService()
+        leased = await jobs.leased(game.id, [JobKind.CREATE_LINK, JobKind.CREATE_VOICE])
+        assert [job["id"] for job in leased] == [voice.id]
+        leased = await jobs.leased(game.id, list(JobKind))
+        assert [job["id"] for job in leased] == [voice.id, notify.id]
+
+    async def test_claim(self, game: Game) -> None:
+        now = datetime.now(tz=pytz.utc)
+        due = add_job(game, JobKind.CREATE_LINK)
+        expired = add_job(game, JobKind.CREATE_VOICE, locked_until=now - timedelta(seconds=1))
+        add_job(game, JobKind.NOTIFY_PLAYERS, locked_until=now + timedelta(minutes=1))
+
+        jobs = JobsService()
+        claimed = await jobs.claim(10, list(JobKind))
+
+        assert [job["id"] for job in claimed] == [due.id, expired.id]
+        assert all(job["attempts"] == 1 for job in claimed)
+        assert all(job["locked_until"] is not None for job in claimed)
+        # Now that they've been leased nobody else can claim them.
+        assert await jobs.claim(10, list(JobKind)) == []
+
+    async def test_claim_not_due(self, game: Game) -> None:
+        add_job(game, JobKind.CREATE_LINK, run_at=datetime.now(tz=pytz.utc) + timedelta(hours=1))
+
+        assert await JobsService().claim(10, list(JobKind)) == []
+
+    async def test_finish(self, game: Game) -> None:
+        job = add_job(game, JobKind.CREATE_LINK, error="oops", locked_until=lease())
+
+        assert await JobsService().finish(job.to_dict())
+
+        DatabaseSession.expire_all()
+        assert job.finished_at is not None
+        assert job.error is None
+
+    async def test_finish_lost_lease(self, game: Game) -> None:
+        job = add_job(game, JobKind.CREATE_LINK, locked_until=lease())
+        leased = job.to_dict()
+        # The lease ran out and the job was claimed by someone else.
+        job.locked_until = lease() + timedelta(minutes=1)  # type: ignore
+        DatabaseSession.commit()
+
+        assert not await JobsService().finish(leased)
+
+        DatabaseSession.expire_all()
+        assert job.finished_at is None
+
+    async def test_claim_kinds(self, game: Game) -> None:
+        add_job(game, JobKind.CREATE_LINK)
+        cleanup = add_job(game, JobKind.DELETE_POSTS)
+
+        claimed = await JobsService().claim(10, [JobKind.DELETE_POSTS, JobKind.EXPIRE_POSTS])
+
+        assert [job["id"] for job in claimed] == [cleanup.id]
+
+    async def test_finish_all(self, game: Game) -> None:
+        link = add_job(game, JobKind.CREATE_LINK, locked_until=lease())
+        voice = add_job(game, JobKind.CREATE_VOICE, locked_until=lease())
+        notify = add_job(game, JobKind.NOTIFY_PLAYERS, locked_until=lease())
+        leased = [link.to_dict(), voice.to_dict()]
+        voice.locked_until = lease() + timedelta(minutes=1)  # type: ignore
+        DatabaseSession.commit()
+
+        await JobsService().finish_all(leased)
+
+        DatabaseSession.expire_all()
+        assert link.finished_at is not None
+        assert voice.finished_at is None
+        assert notify.finished_at is None
+
+    async def test_fail(self, game: Game) -> None:
+        job = add_job(game, JobKind.CREATE_LINK, attempts=1, locked_until=lease())
+
+        assert await JobsService().fail(job.to_dict(), "oops")
+
+        DatabaseSession.expire_all()
+        assert job.error == "oops"
+        assert job.finished_at is None
+        assert job.locked_until is None
+        assert job.run_at > datetime.now(tz=pytz.utc).replace(tzinfo=None)
+
+    async def test_fail_gives_up(self, game: Game) -> None:
+        attempts = settings.OUTBOX_MAX_ATTEMPTS
+        job = add_job(game, JobKind.CREATE_LINK, attempts=attempts, locked_until=lease())
+
+        assert await JobsService().fail(job.to_dict(), "oops") is False
+
+        DatabaseSession.expire_all()
+        assert job.finished_at is not None
+
+    async def test_fail_lost_lease(self, game: Game) -> None:
+        job = add_job(game, JobKind.CREATE_LINK, attempts=1, locked_until=lease())
+        leased = job.to_dict()
+        job.locked_until = lease() + timedelta(minutes=1)  # type: ignore
+        DatabaseSession.commit()
+
+        assert await JobsService().fail(leased, "oops") is None
+
+        DatabaseSession.expire_all()
+        assert job.error is None
+        assert job.locked_until is not None
+
+    async def test_fail_missing_job(self, game: Game) -> None:
+        job = add_job(game, JobKind.CREATE_LINK, locked_until=lease())
+        leased = job.to_dict()
+        DatabaseSession.delete(job)
+        DatabaseSession.commit()
+
+        assert await JobsService().fail(leased, "oops") is None
+
+    async def test_purge(self, game: Game) -> None:
+        now = datetime.now(tz=pytz.utc)
+        add_job(game, JobKind.CREATE_LINK, finished_at=now - timedelta(days=2))
+        recent = add_job(game, JobKind.CREATE_VOICE, finished_at=now)
+        pending = add_job(game, JobKind.NOTIFY_PLAYERS)
+
+        assert await JobsService().purge(timedelta(days=1)) == 1
+
+        assert {job.id for job in DatabaseSession.query(Job).all()} == {recent.id, pending.id}
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from spellbot.database import DatabaseSession
+from spellbot.enums import GameService
+from spellbot.models import PooledLink
+from spellbot.services import LinksService
+from spellbot.services.links import link_pool_target
+from spellbot.settings import settings
+
+SERVICE = GameService.SPELLTABLE.value
+
+
+def pooled_link(link: str, *, expires_in: timedelta, taken_ago: timedelta | None = None) -> None:
+    now = datetime.now(tz=pytz.utc)
+    DatabaseSession.add(
+        PooledLink(
+            service=SERVICE,
+            link=link,
+            created_at=now,
+            expires_at=now + expires_in,
+            taken_at=None if taken_ago is None else now - taken_ago,
+        ),
+    )
+    DatabaseSession.commit()
+
+
+@pytest.mark.asyncio
+class TestServiceLinks:
+    async def test_take_empty(self) -> None:
+        assert await LinksService().take(SERVICE) is None
+
+    async def test_take_soonest_to_expire(self) -> None:
+        pooled_link("late", expires_in=timedelta(minutes=50))
+        pooled_link("soon", expires_in=timedelta(minutes=5))
+        pooled_link("expired", expires_in=timedelta(minutes=-5))
+        pooled_link("taken", expires_in=timedelta(minutes=1), taken_ago=timedelta(minutes=1))
+
+        links = LinksService()
+        assert await links.take(SERVICE) == "soon"
+        assert await links.take(SERVICE) == "late"
+        assert await links.take(SERVICE) is None
+
+    async def test_take_other_service(self) -> None:
+        pooled_link("link", expires_in=timedelta(minutes=5))
+        assert await LinksService().take(GameService.TABLE_STREAM.value) is None
+
+    async def test_add_and_stock(self) -> None:
+        links = LinksService()
+        await links.add(SERVICE, ["a", "b", "c"])
+        await links.add(SERVICE, [])
+        assert await links.stock(SERVICE) == 3
+
+        await links.take(SERVICE)
+        assert await links.stock(SERVICE) == 2
+
+    async def test_record(self) -> None:
+        links = LinksService()
+        await links.record(SERVICE, "on-demand")
+        assert await links.stock(SERVICE) == 0
+        assert await links.starts_per_hour(SERVICE) == 1
+        assert await links.take(SERVICE) is None
+
+    async def test_starts_per_hour(self) -> None:
+        pooled_link("recent", expires_in=timedelta(), taken_ago=timedelta(minutes=10))
+        pooled_link("old", expires_in=timedelta(), taken_ago=timedelta(hours=2))
+        pooled_link("untaken", expires_in=timedelta(minutes=10))
+        assert await LinksService().starts_per_hour(SERVICE) == 1
+
+    async def test_purge(self) -> None:
+        pooled_link("fresh", expires_in=timedelta(minutes=10))
+        pooled_link("expired", expires_in=timedelta(minutes=-1))
+        pooled_link("recent", expires_in=timedelta(), taken_ago=timedelta(minutes=10))
+        pooled_link("old", expires_in=timedelta(), taken_ago=timedelta(hours=2))
+
+        assert await LinksService().purge() == 2
+        remaining = DatabaseSession.query(PooledLink.link).order_by(PooledLink.link).all()
+        assert [row.link for row in remaining] == ["fresh", "recent"]
+
+
+class TestLinkPoolTarget:
+    def test_minimum(self) -> None:
+        assert link_pool_target(0) == settings.SPELLTABLE_POOL_MIN
+
+    def test_lead_time(self) -> None:
+        # 60 starts an hour is one a minute, so cover the lead time
+        assert link_pool_target(60) == min(
+            settings.SPELLTABLE_POOL_LEAD_M, settings.SPELLTABLE_POOL_MAX
+        )
+
+    def test_maximum(self) -> None:
+        assert link_pool_target(100_000) == settings.SPELLTABLE_POOL_MAX
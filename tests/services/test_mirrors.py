@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import pytest
+
+from spellbot.database import DatabaseSession
+from spellbot.models import Mirror
+from spellbot.services import MirrorsService
+from tests.factories import ChannelFactory, GuildFactory
+
+
+@pytest.mark.asyncio
+class TestServiceMirrors:
+    async def test_get_is_cached_until_a_mirror_is_added(self) -> None:
+        guild = GuildFactory.create()
+        channels = [ChannelFactory.create(guild=guild) for _ in range(3)]
+        mirrors = MirrorsService()
+        await mirrors.add_mirror(guild.xid, channels[0].xid, guild.xid, channels[1].xid)
+        assert len(await mirrors.get(guild.xid, channels[0].xid)) == 1
+
+        DatabaseSession.query(Mirror).delete()
+        assert len(await mirrors.get(guild.xid, channels[0].xid)) == 1
+
+        await mirrors.add_mirror(guild.xid, channels[0].xid, guild.xid, channels[2].xid)
+        found = await mirrors.get(guild.xid, channels[0].xid)
+        assert [m["to_channel_xid"] for m in found] == [channels[2].xid]
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+import pytest_asyncio
+
+from spellbot.services import Cursor, PlaysService
+from spellbot.services import plays as plays_module
+
+if TYPE_CHECKING:
+    from freezegun.api import FrozenDateTimeFactory
+
+    from spellbot.models import Channel, Game, Guild
+    from tests.fixtures import Factories
+
+GAMES = 23
+
+
+@pytest_asyncio.fixture
+async def games(guild: Guild, channel: Channel, factories: Factories) -> list[Game]:
+    user1 = factories.user.create(xid=101, name="user1")
+    user2 = factories.user.create(xid=102, name="user2")
+    start = datetime(2020, 1, 1)  # noqa: DTZ001
+    games = []
+    for i in range(GAMES):
+        # pairs of games share a timestamp, so that the game id has to break the tie
+        updated_at = start + timedelta(minutes=i // 2)
+        game = factories.game.create(
+            guild=guild,
+            channel=channel,
+            created_at=updated_at,
+            updated_at=updated_at,
+        )
+        factories.post.create(guild=guild, channel=channel, game=game, message_xid=900 + i)
+        factories.play.create(game_id=game.id, user_xid=user1.xid, points=i)
+        factories.play.create(game_id=game.id, user_xid=user2.xid, points=0)
+        games.append(game)
+    return sorted(games, key=lambda game: (game.updated_at, game.id), reverse=True)
+
+
+@pytest.mark.asyncio
+class TestServicePlays:
+    async def test_channel_records_pages(
+        self,
+        guild: Guild,
+        channel: Channel,
+        games: list[Game],
+    ) -> None:
+        plays = PlaysService()
+        seen: list[int] = []
+        pages = []
+        before = None
+        while True:
+            page = await plays.channel_records(guild.xid, channel.xid, before=before)
+            assert page is not None
+            pages.append(page)
+            seen.extend(record["id"] for record in page.records[::2])
+            if page.older is None:
+                break
+            before = page.older
+
+        assert seen == [game.id for game in games]
+        assert len(pages) == 3
+        assert pages[0].newer is None
+        assert pages[-1].newer is not None
+
+        # and then page back up again to the first page
+        after = pages[-1].newer
+        back: list[int] = []
+        while after is not None:
+            page = await plays.channel_records(guild.xid, channel.xid, after=after)
+            assert page is not None
+            back = [record["id"] for record in page.records[::2]] + back
+            after = page.newer
+        assert back == seen[: len(back)]
+        assert len(back) == len(seen) - GAMES % plays_module.CHANNEL_PAGE_SIZE
+
+    async def test_user_records_pages(
+        self,
+        guild: Guild,
+        games: list[Game],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(plays_module, "USER_PAGE_SIZE", 5)
+        plays = PlaysService()
+        seen: list[int] = []
+        before = None
+        while True:
+            page = await plays.user_records(guild.xid, 101, before=before)
+            assert page is not None
+            seen.extend(record["id"] for record in page.records)
+            if page.older is None:
+                break
+            before = page.older
+
+        assert seen == [game.id for game in games]
+
+        assert before is not None
+        page = await plays.user_records(guild.xid, 101, after=before)
+        assert page is not None
+        index = seen.index(before.id)
+        assert [record["id"] for record in page.records] == seen[index - 5 : index]
+
+    async def test_records_past_the_end(self, guild: Guild, channel: Channel) -> None:
+        cursor = Cursor(datetime(2020, 1, 1), 1)  # noqa: DTZ001
+        page = await PlaysService().channel_records(guild.xid, channel.xid, before=cursor)
+        assert page is not None
+        assert page.records == []
+        assert page.newer is None
+        assert page.older is None
+
+
+@pytest.mark.asyncio
+class TestServicePlaysLeaderboards:
+    async def test_backfill_play_counts(
+        self,
+        guild: Guild,
+        channel: Channel,
+        factories: Factories,
+        freezer: FrozenDateTimeFactory,
+    ) -> None:
+        freezer.move_to(datetime(2020, 2, 10, tzinfo=UTC))
+        user1 = factories.user.create()
+        user2 = factories.user.create()
+        for i, started_at in enumerate([datetime(2020, 1, 5), datetime(2020, 2, 5)]):  # noqa: DTZ001
+            game = factories.game.create(guild=guild, channel=channel, started_at=started_at)
+            factories.play.create(game_id=game.id, user_xid=user1.xid)
+            if i:
+                factories.play.create(game_id=game.id, user_xid=user2.xid)
+
+        plays = PlaysService()
+        assert await plays.top_records(guild.xid, channel.xid, monthly=False, ago=0) == []
+        assert await plays.backfill_play_counts() == 1
+        # Backfilling again recounts rather than adding to the counts.
+        assert await plays.backfill_play_counts() == 1
+
+        all_time = await plays.top_records(guild.xid, channel.xid, monthly=False, ago=0)
+        assert all_time == [(user1.xid, 2), (user2.xid, 1)]
+        this_month = await plays.top_records(guild.xid, channel.xid, monthly=True, ago=0)
+        assert sorted(this_month) == sorted([(user1.xid, 1), (user2.xid, 1)])
+        last_month = await plays.top_records(guild.xid, channel.xid, monthly=True, ago=1)
+        assert last_month == [(user1.xid, 1)]
+
+    async def test_top_elo(self, guild: Guild, channel: Channel, factories: Factories) -> None:
+        user1 = factories.user.create()
+        user2 = factories.user.create()
+        factories.record.create(guild=guild, channel=channel, user=user1, elo=1400)
+        factories.record.create(guild=guild, channel=channel, user=user2, elo=1600)
+        game = factories.game.create(guild=guild, channel=channel, started_at=datetime.now(tz=UTC))
+        factories.play.create(game_id=game.id, user_xid=user2.xid)
+
+        plays = PlaysService()
+        await plays.backfill_play_counts()
+        assert await plays.top_elo(guild.xid, channel.xid) == [
+            (user2.xid, 1600, 1),
+            (user1.xid, 1400, 0),
+        ]
+
+
+class TestCursor:
+    def test_round_trip(self) -> None:
+        cursor = Cursor(datetime(2020, 1, 1, 12, 30, 15, 123456), 42)  # noqa: DTZ001
+        assert Cursor.decode(cursor.encode()) == cursor
+
+    @pytest.mark.parametrize(
+        "value", ["", "abc", "1_2_3", "1577836800_x", "99999999999999999999_1"]
+    )
+    def test_decode_invalid(self, value: str) -> None:
+        with pytest.raises(ValueError):  # noqa: PT011
+            Cursor.decode(value)
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import json
+from typing import TYPE_CHECKING, Any
 
 import pytest
 
+from spellbot import invalidation
 from spellbot.services import VerifiesService
+from spellbot.upsert_cache import UpsertCache, caches
 
 if TYPE_CHECKING:
     from spellbot.models import Guild
@@ -25,3 +28,41 @@ class TestServiceVerifies:
 
         await verifies.upsert(guild.xid, user.xid, verified=False)
         assert not await verifies.is_verified()
+
+    async def test_verifies_upsert_cached(self, guild: Guild, factories: Factories) -> None:
+        user = factories.user.create()
+
+        verifies = VerifiesService()
+        await verifies.upsert(guild.xid, user.xid, verified=True)
+        assert await verifies.is_verified()
+
+        other = VerifiesService()
+        await other.upsert(guild.xid, user.xid)
+        assert await other.is_verified()
+
+        await other.upsert(guild.xid, user.xid, verified=False)
+        assert not await other.is_verified()
+
+    async def test_verifies_upsert_invalidates_other_processes(
+        self,
+        guild: Guild,
+        factories: Factories,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        user = factories.user.create()
+        key = (guild.xid, user.xid)
+
+        # Another process, with its own cache, that's told about every invalidation.
+        other = UpsertCache("verify")
+        other.put(key, None, True, other.version(key))
+        monkeypatch.setitem(caches, "verify", other)
+
+        def notify(message: dict[str, Any]) -> None:
+            invalidation.handle_message(json.dumps(message))
+
+        monkeypatch.setattr(invalidation, "_notify", notify)
+
+        verifies = VerifiesService()
+        await verifies.upsert(guild.xid, user.xid, verified=False)
+        assert not await verifies.is_verified()
+        assert other.get(key, None) is None
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import UTC, datetime
 from unittest.mock import AsyncMock, MagicMock
 
@@ -8,8 +9,9 @@ import pytest
 from discord import app_commands
 from discord.ext.commands import AutoShardedBot, CommandNotFound, Context, UserInputError
 
-from spellbot import SpellBot
+from spellbot import SpellBot, client
 from spellbot.database import DatabaseSession
+from spellbot.enums import GameService
 from spellbot.errors import (
     AdminOnlyError,
     GuildBannedError,
@@ -19,7 +21,9 @@ from spellbot.errors import (
     UserVerifiedError,
 )
 from spellbot.models import Channel, Guild, Verify
+from spellbot.services import LinksService
 from spellbot.utils import handle_interaction_errors
+from spellbot.verification import VerificationPolicy, verification_policies
 
 from .mixins import BaseMixin
 
@@ -31,6 +35,59 @@ class TestSpellBot(BaseMixin):
         assert link is not None
         assert link.startswith("http://exmaple.com/game/")
 
+    async def test_create_spelltable_link(
+        self,
+        bot: SpellBot,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        generate = AsyncMock(return_value="https://spelltable.wizards.com/game/1")
+        monkeypatch.setattr(client, "generate_spelltable_link", generate)
+        monkeypatch.setattr(bot, "mock_games", False)
+        game = {"service": GameService.SPELLTABLE.value}
+
+        link = await bot.create_game_link(game)  # type: ignore
+
+        assert link == "https://spelltable.wizards.com/game/1"
+        generate.assert_called_once_with(game, bot.spelltable)
+
+    async def test_create_spelltable_link_from_pool(
+        self,
+        bot: SpellBot,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        generate = AsyncMock(return_value="https://spelltable.wizards.com/game/2")
+        monkeypatch.setattr(client, "generate_spelltable_link", generate)
+        monkeypatch.setattr(bot, "mock_games", False)
+        await LinksService().add(
+            GameService.SPELLTABLE.value, ["https://spelltable.wizards.com/game/1"]
+        )
+        game = {"service": GameService.SPELLTABLE.value}
+
+        assert await bot.create_game_link(game) == "https://spelltable.wizards.com/game/1"  # type: ignore
+        assert await bot.create_game_link(game) == "https://spelltable.wizards.com/game/2"  # type: ignore
+        generate.assert_called_once_with(game, bot.spelltable)
+        assert await LinksService().starts_per_hour(GameService.SPELLTABLE.value) == 2
+
+    async def test_create_spelltable_link_when_pool_runs_dry(
+        self,
+        bot: SpellBot,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        generate = AsyncMock(return_value="https://spelltable.wizards.com/game/1")
+        monkeypatch.setattr(client, "generate_spelltable_link", generate)
+        monkeypatch.setattr(bot, "mock_games", False)
+        links = MagicMock(spec=LinksService)
+        links.take = AsyncMock(return_value=None)
+        monkeypatch.setattr(bot.services, "links", links)
+        game = {"service": GameService.SPELLTABLE.value}
+
+        assert await bot.create_game_link(game) == "https://spelltable.wizards.com/game/1"  # type: ignore
+        links.take.assert_called_once_with(GameService.SPELLTABLE.value)
+        links.record.assert_called_once_with(
+            GameService.SPELLTABLE.value,
+            "https://spelltable.wizards.com/game/1",
+        )
+
     @pytest.mark.parametrize(
         ("error", "response"),
         [
@@ -141,6 +198,64 @@ class TestSpellBot(BaseMixin):
         bot.handle_verification.assert_called_once_with(dpy_message)
         dpy_message.reply.assert_not_called()
 
+    async def test_on_message_without_verification_policy(
+        self,
+        dpy_message: discord.Message,
+        bot: SpellBot,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(bot, "handle_verification", AsyncMock())
+        verification_policies.load({}, verification_policies.version())
+        dpy_message.flags.value = 16
+        await bot.on_message(dpy_message)
+        bot.handle_verification.assert_not_called()
+
+    async def test_on_message_with_verification_policy(
+        self,
+        dpy_message: discord.Message,
+        bot: SpellBot,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(bot, "handle_verification", AsyncMock())
+        policy = VerificationPolicy(auto_verify=True, verified_only=False, unverified_only=False)
+        verification_policies.load(
+            {dpy_message.channel.id: policy},
+            verification_policies.version(),
+        )
+        dpy_message.flags.value = 16
+        await bot.on_message(dpy_message)
+        bot.handle_verification.assert_called_once_with(dpy_message)
+
+    async def test_load_verification_policies(self, bot: SpellBot) -> None:
+        channel = self.factories.channel.create(guild=self.factories.guild.create())
+        await bot.load_verification_policies()
+        assert verification_policies.loaded
+        assert not verification_policies.needs_database(channel.xid)
+
+    async def test_verify_coalesces_writes(
+        self,
+        bot: SpellBot,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        release = asyncio.Event()
+
+        async def write(*_: object) -> bool:
+            await release.wait()
+            return True
+
+        _verify = AsyncMock(side_effect=write)
+        monkeypatch.setattr(bot, "_verify", _verify)
+
+        first = asyncio.create_task(bot.verify(1, 2, None))
+        second = asyncio.create_task(bot.verify(1, 2, None))
+        other = asyncio.create_task(bot.verify(1, 2, True))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(first, second, other) == [True, True, True]
+        assert _verify.call_count == 2
+        assert not bot.verifications
+
     async def test_on_message_delete_happy_path(
         self,
         dpy_message: discord.Message,
@@ -295,6 +410,20 @@ class TestSpellBotHandleVerification(BaseMixin):
         assert found.user_xid == dpy_message.author.id
         assert not found.verified
 
+    async def test_updates_verification_policies(self, dpy_message: discord.Message) -> None:
+        assert dpy_message.guild
+        self.factories.guild.create(xid=dpy_message.guild.id)
+        self.factories.channel.create(
+            xid=dpy_message.channel.id,
+            verified_only=True,
+            guild_xid=dpy_message.guild.id,
+        )
+        verification_policies.load({}, verification_policies.version())
+
+        await self.bot.handle_verification(dpy_message)
+
+        assert verification_policies.needs_database(dpy_message.channel.id)
+
     async def test_with_auto_verify(self, dpy_message: discord.Message) -> None:
         assert dpy_message.guild
         assert dpy_message.author
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
-from spellbot.cli import main
+import pytest
+
+from spellbot import database
+from spellbot.cli import backfill, main
+from spellbot.database import DatabaseSession, db_session_manager, initialize_connection
+from spellbot.models import Channel, Game, Guild, Play, PlayCount, User
+from spellbot.models.play_count import ALL_TIME
 
 if TYPE_CHECKING:
     from unittest.mock import MagicMock
 
     from click.testing import CliRunner
+    from pytest_mock import MockerFixture
     from syrupy.assertion import SnapshotAssertion
 
 
@@ -53,7 +61,7 @@ class TestCLI:
         assert result.output == ""
         cli.hupper.start_reloader.assert_not_called()
         cli.configure_logging.assert_called_once_with("INFO")
-        cli.build_bot.assert_called_once_with(mock_games=False)
+        cli.build_bot.assert_called_once_with(mock_games=False, shard_ids=None, shard_count=None)
         cli.bot.run.assert_called_once_with("facedeadbeef")
 
     def test_run_bot_with_log_level(
@@ -80,8 +88,100 @@ class TestCLI:
 
     def test_run_bot_with_mock_games(self, cli: MagicMock, runner: CliRunner) -> None:
         runner.invoke(main, ["--mock-games"])
-        cli.build_bot.assert_called_once_with(mock_games=True)
+        cli.build_bot.assert_called_once_with(mock_games=True, shard_ids=None, shard_count=None)
+
+    def test_run_bot_with_shards(self, cli: MagicMock, runner: CliRunner) -> None:
+        result = runner.invoke(main, ["--shard-ids", "2,3", "--shard-count", "4"])
+        assert result.exit_code == 0
+        cli.build_bot.assert_called_once_with(mock_games=False, shard_ids=[2, 3], shard_count=4)
+
+    def test_run_bot_with_shards_without_count(self, cli: MagicMock, runner: CliRunner) -> None:
+        result = runner.invoke(main, ["--shard-ids", "2,3"])
+        assert result.exit_code == 2
+        assert "--shard-ids requires --shard-count" in result.output
+        cli.build_bot.assert_not_called()
+
+    def test_run_cluster(self, cli: MagicMock, runner: CliRunner, mocker: MockerFixture) -> None:
+        supervisor = mocker.patch("spellbot.cluster.Supervisor")
+        result = runner.invoke(main, ["--cluster", "2", "--shard-count", "4", "--mock-games"])
+        assert result.exit_code == 0
+        supervisor.assert_called_once_with(2, 4, ["--log-level", "INFO", "--mock-games"])
+        supervisor.return_value.run.assert_called_once_with()
+        cli.build_bot.assert_not_called()
+
+    def test_run_cluster_with_recommended_shards(
+        self,
+        cli: MagicMock,
+        runner: CliRunner,
+        mocker: MockerFixture,
+    ) -> None:
+        supervisor = mocker.patch("spellbot.cluster.Supervisor")
+        cli.asyncio.run.side_effect = lambda coro: coro.close() or 6
+        result = runner.invoke(main, ["--cluster", "3"])
+        assert result.exit_code == 0
+        supervisor.assert_called_once_with(3, 6, ["--log-level", "INFO"])
 
     def test_run_bot_with_dev(self, cli: MagicMock, runner: CliRunner) -> None:
         runner.invoke(main, ["--dev"])
         cli.hupper.start_reloader.assert_called_once_with("spellbot.main")
+
+    def test_backfill_leaderboards(self, cli: MagicMock, runner: CliRunner) -> None:
+        result = runner.invoke(main, ["--backfill-leaderboards"])
+        assert result.exit_code == 0
+        cli.asyncio.run.assert_called_once()
+        cli.asyncio.run.call_args.args[0].close()
+        cli.build_bot.assert_not_called()
+        cli.launch_web_server.assert_not_called()
+
+
+# Far away from the ids used by other tests, since this data is committed.
+OFFSET = 8_000_000
+
+
+@pytest.mark.asyncio
+@pytest.mark.nosession
+class TestBackfill:
+    async def test_backfill(self, worker_id: str) -> None:
+        guild_xid, channel_xid, user_xid = OFFSET + 1, OFFSET + 2, OFFSET + 3
+        await initialize_connection("spellbot-test", worker_id=worker_id)
+        try:
+            async with db_session_manager():
+                DatabaseSession.add(Guild(xid=guild_xid, name="guild"))
+                DatabaseSession.add(Channel(xid=channel_xid, guild_xid=guild_xid, name="channel"))
+                DatabaseSession.add(User(xid=user_xid, name="user"))
+                game = Game(
+                    guild_xid=guild_xid,
+                    channel_xid=channel_xid,
+                    seats=2,
+                    started_at=datetime.now(tz=UTC),
+                )
+                DatabaseSession.add(game)
+                DatabaseSession.flush()
+                DatabaseSession.add(
+                    Play(game_id=game.id, user_xid=user_xid, og_guild_xid=guild_xid)
+                )
+
+            # Like when it's run for real, backfill() has to set up its own connection.
+            database.connection.close()
+            database.engine.dispose()
+            database.db_session_maker.set(None)
+            await backfill(worker_id=worker_id)
+
+            async with db_session_manager():
+                count = DatabaseSession.get(
+                    PlayCount,
+                    (guild_xid, channel_xid, user_xid, ALL_TIME),
+                )
+                assert count is not None
+                assert count.games == 1
+        finally:
+            database.connection.close()
+            database.engine.dispose()
+            await initialize_connection("spellbot-test", worker_id=worker_id)
+            async with db_session_manager():
+                DatabaseSession.query(Play).filter(Play.user_xid == user_xid).delete()
+                DatabaseSession.query(Game).filter(Game.guild_xid == guild_xid).delete()
+                DatabaseSession.query(User).filter(User.xid == user_xid).delete()
+                DatabaseSession.query(Guild).filter(Guild.xid == guild_xid).delete()
+            database.connection.close()
+            database.engine.dispose()
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+from itertools import count
+from typing import TYPE_CHECKING, Any
+
+import pytest
+import pytest_asyncio
+
+from spellbot.actions import LookingForGameAction, lfg_action
+from spellbot.client import build_bot
+from spellbot.cluster import Supervisor, shard_ranges
+from spellbot.database import DatabaseSession, database_sync_to_async, db_session_manager
+from spellbot.enums import GameFormat
+from spellbot.locks import AdvisoryLockManager, LockManager
+from spellbot.models import Channel, Game, GameStatus, Guild, Job, Mirror, Play, Post, Queue, User
+from spellbot.services import ChannelsService, GuildsService, MirrorsService
+from spellbot.settings import settings
+from tests.mocks import (
+    build_author,
+    build_channel,
+    build_guild,
+    build_interaction,
+    build_message,
+    mock_operations,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+    import discord
+
+    from spellbot import SpellBot
+
+# Far away from the ids used by other tests, since this data is committed.
+OFFSET = 7_000_000
+PLAYERS = 24
+SEATS = 2
+
+
+class TestShardRanges:
+    def test_even(self) -> None:
+        assert shard_ranges(4, 2) == [[0, 1], [2, 3]]
+
+    def test_uneven(self) -> None:
+        assert shard_ranges(5, 3) == [[0, 1], [2, 3], [4]]
+
+    def test_more_workers_than_shards(self) -> None:
+        assert shard_ranges(2, 4) == [[0], [1]]
+
+
+class TestSupervisor:
+    def test_worker_args(self) -> None:
+        supervisor = Supervisor(2, 5, ["--log-level", "INFO"])
+        assert supervisor.worker_args(0) == [
+            "--log-level",
+            "INFO",
+            "--shard-ids",
+            "0,1,2",
+            "--shard-count",
+            "5",
+        ]
+        assert supervisor.worker_args(1)[-4:] == ["--shard-ids", "3,4", "--shard-count", "5"]
+
+
+@pytest.mark.asyncio
+class TestClusteredBot:
+    async def test_clustered_bot_uses_advisory_locks(self) -> None:
+        bot = build_bot(mock_games=True, create_connection=False, shard_ids=[1], shard_count=2)
+        assert bot.clustered
+        assert isinstance(bot.locks, AdvisoryLockManager)
+        await bot.locks.close()
+
+    async def test_single_process_bot_uses_local_locks(self, bot: SpellBot) -> None:
+        assert not bot.clustered
+        assert isinstance(bot.locks, LockManager)
+
+
+@database_sync_to_async
+def seating() -> list[tuple[int, int, list[int]]]:
+    """Get the status, seats and players of every game in the cluster's guilds."""
+    guild_xids = [build_guild(OFFSET + i).id for i in range(2)]
+    games = DatabaseSession.query(Game).filter(Game.guild_xid.in_(guild_xids)).all()
+    return [(game.status, game.seats, game.player_xids) for game in games]
+
+
+@database_sync_to_async
+def delete_cluster_data() -> None:
+    guild_xids = [build_guild(OFFSET + i).id for i in range(2)]
+    user_xids = [build_author(OFFSET + i).id for i in range(PLAYERS)]
+    games = DatabaseSession.query(Game).filter(Game.guild_xid.in_(guild_xids))
+    game_ids = [game.id for game in games]
+    for model in (Job, Play, Queue, Post):
+        rows = DatabaseSession.query(model).filter(model.game_id.in_(game_ids))  # type: ignore
+        rows.delete(synchronize_session=False)
+    for query in (
+        games,
+        DatabaseSession.query(Mirror).filter(Mirror.from_guild_xid.in_(guild_xids)),
+        DatabaseSession.query(Channel).filter(Channel.guild_xid.in_(guild_xids)),
+        DatabaseSession.query(Guild).filter(Guild.xid.in_(guild_xids)),  # type: ignore
+        DatabaseSession.query(User).filter(User.xid.in_(user_xids)),
+    ):
+        query.delete(synchronize_session=False)
+
+
+@pytest_asyncio.fixture
+async def workers(worker_id: str) -> AsyncGenerator[list[SpellBot], None]:
+    """Two bots that share nothing but the database, like the workers of a cluster."""
+    db_url = f"{settings.DATABASE_URL}-{worker_id}"
+    bots = [
+        build_bot(mock_games=True, create_connection=False, shard_ids=[i], shard_count=2)
+        for i in range(2)
+    ]
+    for bot in bots:
+        # The locks have to be taken in the test database, like the rest of the data.
+        assert isinstance(bot.locks, AdvisoryLockManager)
+        await bot.locks.close()
+        bot.locks = AdvisoryLockManager(db_url, f"spellbot-test-locks-{worker_id}")
+    try:
+        yield bots
+    finally:
+        for bot in bots:
+            assert isinstance(bot.locks, AdvisoryLockManager)
+            await bot.locks.close()
+        async with db_session_manager():
+            await delete_cluster_data()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("async_database")
+class TestNoDoubleSeating:
+    """
+    A harness for matchmaking in a cluster.
+
+    Players in two guilds, whose channels are mirrored to each other and whose shards
+    are run by different workers, all look for the same kind of game at the same time.
+    Every join from either guild may seat the player in a game in either channel, so
+    only locks shared by the workers keep them from overfilling a game, seating a player
+    twice, or leaving players waiting apart.
+    """
+
+    async def test_concurrent_joins_from_different_workers(
+        self,
+        workers: list[SpellBot],
+    ) -> None:
+        guilds = [build_guild(OFFSET + i) for i in range(2)]
+        channels = [build_channel(guild, OFFSET + i) for i, guild in enumerate(guilds)]
+        async with db_session_manager():
+            for guild, channel in zip(guilds, channels, strict=True):
+                await GuildsService().upsert(guild)
+                await ChannelsService().upsert(channel)
+            mirrors = MirrorsService()
+            await mirrors.add_mirror(guilds[0].id, channels[0].id, guilds[1].id, channels[1].id)
+            await mirrors.add_mirror(guilds[1].id, channels[1].id, guilds[0].id, channels[0].id)
+
+        async def join(player: int) -> None:
+            # Each guild lives on one shard, and so in one worker.
+            shard = player % 2
+            author = build_author(OFFSET + player)
+            interaction = build_interaction(guilds[shard], channels[shard], author)
+            async with LookingForGameAction.create(workers[shard], interaction) as action:
+                await action.execute(seats=SEATS, format=GameFormat.MODERN.value)
+
+        message_ids = count(OFFSET)
+
+        async def post(*args: Any, **kwargs: Any) -> discord.Message:
+            return build_message(guilds[0], channels[0], build_author(), next(message_ids))
+
+        async def fetch_channel(_: Any, guild_xid: int, channel_xid: int) -> discord.TextChannel:
+            return next(channel for channel in channels if channel.id == channel_xid)
+
+        with mock_operations(lfg_action):
+            lfg_action.safe_followup_channel.side_effect = post
+            lfg_action.safe_channel_reply.side_effect = post
+            lfg_action.safe_fetch_text_channel.side_effect = fetch_channel
+            await asyncio.gather(*(join(player) for player in range(PLAYERS)))
+
+        async with db_session_manager():
+            games = await seating()
+
+        # Every player is in exactly one game.
+        user_xids = sorted(xid for _, _, player_xids in games for xid in player_xids)
+        assert user_xids == [build_author(OFFSET + i).id for i in range(PLAYERS)]
+        # No game was overfilled, and nobody was left waiting in a game of their own.
+        assert all(len(player_xids) == seats for _, seats, player_xids in games)
+        assert {status for status, _, _ in games} == {GameStatus.STARTED.value}
+        assert len(games) == PLAYERS // SEATS
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, text
+
+from spellbot import database
+from spellbot.database import (
+    DatabaseSession,
+    atomic,
+    current_async_session,
+    database_sync_to_async,
+    db_session_manager,
+    dispose_async_engine,
+    initialize_async_engine,
+    initialize_connection,
+    using_async_engine,
+)
+from spellbot.models import Guild, create_all
+from spellbot.services import GuildsService
+from spellbot.settings import settings
+from tests.mocks import build_guild
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+GUILD_XID = 7_000_000
+
+
+@database_sync_to_async
+def backend_pid() -> int:
+    DatabaseSession.execute(text("SELECT pg_sleep(0.05)"))
+    return DatabaseSession.execute(text("SELECT pg_backend_pid()")).scalar_one()
+
+
+@database_sync_to_async
+def delete_guild(xid: int) -> None:
+    DatabaseSession.query(Guild).filter(Guild.xid == xid).delete(synchronize_session=False)
+
+
+class GuildError(Exception):
+    pass
+
+
+def guild_exists(db_url: str, xid: int) -> bool:
+    """Check for a guild from a connection of its own, which only sees committed rows."""
+    engine = create_engine(db_url, isolation_level="AUTOCOMMIT")
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text("SELECT 1 FROM guilds WHERE xid = :xid"), {"xid": xid})
+            return row.first() is not None
+    finally:
+        engine.dispose()
+
+
+@database_sync_to_async
+def add_guild_atomically(db_url: str, xid: int, *, fail: bool = False) -> None:
+    with atomic():
+        DatabaseSession.add(Guild(xid=xid, name="guild"))
+        DatabaseSession.flush()
+        # Like any other write to an autocommit connection, but not yet committed.
+        assert not guild_exists(db_url, xid)
+        if fail:
+            raise GuildError
+
+
+@pytest_asyncio.fixture(params=["sync", "async"])
+async def autocommit_database(
+    request: pytest.FixtureRequest,
+    worker_id: str,
+) -> AsyncGenerator[str, None]:
+    """Use sessions on autocommit connections, like outside of tests, in either mode."""
+    db_url = f"{settings.DATABASE_URL}-{worker_id}"
+    create_all(db_url)
+    if request.param == "async":
+        initialize_async_engine(db_url, f"spellbot-test-async-{worker_id}")
+    else:
+        await initialize_connection("spellbot-test", worker_id=worker_id, run_migrations=False)
+    try:
+        yield db_url
+    finally:
+        if request.param == "async":
+            await dispose_async_engine()
+        else:
+            database.connection.close()
+            database.engine.dispose()
+        engine = create_engine(db_url, isolation_level="AUTOCOMMIT")
+        with engine.connect() as conn:
+            conn.execute(text("DELETE FROM guilds WHERE xid = :xid"), {"xid": GUILD_XID})
+        engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.nosession
+class TestAtomic:
+    async def test_commits(self, autocommit_database: str) -> None:
+        async with db_session_manager():
+            await add_guild_atomically(autocommit_database, GUILD_XID)
+            assert guild_exists(autocommit_database, GUILD_XID)
+
+    async def test_rolls_back(self, autocommit_database: str) -> None:
+        async with db_session_manager():
+            with pytest.raises(GuildError):
+                await add_guild_atomically(autocommit_database, GUILD_XID, fail=True)
+        # Nor is it written when the session is committed at the end.
+        assert not guild_exists(autocommit_database, GUILD_XID)
+
+
+@pytest.mark.asyncio
+class TestDatabase:
+    async def test_default_mode(self) -> None:
+        assert not using_async_engine()
+        async with db_session_manager():
+            assert current_async_session.get() is None
+
+    @pytest.mark.usefixtures("async_database")
+    async def test_async_mode(self) -> None:
+        assert using_async_engine()
+        guilds = GuildsService()
+        guild = build_guild(987654321)
+        try:
+            async with db_session_manager():
+                assert current_async_session.get() is not None
+                await guilds.upsert(guild)
+            assert current_async_session.get() is None
+
+            async with db_session_manager():
+                assert await guilds.select(guild.id)
+        finally:
+            async with db_session_manager():
+                await delete_guild(guild.id)
+
+    @pytest.mark.usefixtures("async_database")
+    async def test_async_mode_concurrent_sessions(self) -> None:
+        async def run() -> int:
+            async with db_session_manager():
+                return await backend_pid()
+
+        pids = await asyncio.gather(run(), run(), run())
+        assert len(set(pids)) == 3
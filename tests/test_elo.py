@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+
+from spellbot.database import DatabaseSession
+from spellbot.elo import DEFAULT_ELO, elo_changes, place, replay, replay_plays
+from spellbot.models import Record
+from spellbot.services import GamesService
+from tests.benchmarks import count_queries
+
+if TYPE_CHECKING:
+    from spellbot.models import Channel, Game, Guild
+    from tests.fixtures import Factories
+
+
+def legacy_elo_change(elo1: int, place1: int, elo2: int, place2: int) -> int:
+    s = 1.0 if place1 < place2 else 0.5 if place1 == place2 else 0.0
+    ea = 1 / (1.0 + pow(10.0, (elo2 - elo1) / 400.0))
+    return round(32 * (s - ea))
+
+
+class TestElo:
+    def test_place(self) -> None:
+        assert place(None) == 3
+        assert place(0) == 3
+        assert place(1) == 2
+        assert place(3) == 1
+        assert place(5) == 1
+
+    def test_elo_changes_two_players(self) -> None:
+        assert elo_changes([1500, 1500], [1, 3]) == [16, -16]
+        assert elo_changes([1500, 1500], [2, 2]) == [0, 0]
+
+    @pytest.mark.parametrize(
+        ("elos", "places"),
+        [
+            ([1500, 1500, 1500, 1500], [1, 2, 3, 3]),
+            ([1612, 1433, 1500, 1721], [3, 1, 3, 2]),
+            ([2000, 1000, 1250], [1, 3, 2]),
+        ],
+    )
+    def test_elo_changes_match_pairwise(self, elos: list[int], places: list[int]) -> None:
+        expected = [
+            sum(
+                legacy_elo_change(elos[i], places[i], elos[j], places[j])
+                for j in range(len(elos))
+                if i != j
+            )
+            for i in range(len(elos))
+        ]
+        assert elo_changes(elos, places) == expected
+
+    def test_replay_plays(self) -> None:
+        elos = replay_plays([(1, 10, 3), (1, 20, 0), (2, 10, 0), (2, 30, 3)])
+        # the second game is between players with different ELOs
+        assert elos == {10: DEFAULT_ELO - 1, 20: DEFAULT_ELO - 16, 30: DEFAULT_ELO + 17}
+
+
+@pytest.mark.asyncio
+class TestEloRecords:
+    async def test_update_records(
+        self,
+        guild: Guild,
+        channel: Channel,
+        game: Game,
+        factories: Factories,
+    ) -> None:
+        winner = factories.user.create()
+        loser = factories.user.create()
+        bystander = factories.user.create()
+        factories.record.create(guild=guild, channel=channel, user=winner, elo=1500)
+        factories.record.create(guild=guild, channel=channel, user=bystander, elo=1234)
+        plays = {
+            winner.xid: factories.play.create(user_xid=winner.xid, game_id=game.id, points=3),
+            loser.xid: factories.play.create(user_xid=loser.xid, game_id=game.id, points=0),
+        }
+
+        games = GamesService()
+        await games.select(game.id)
+        with count_queries() as statements:
+            await games.update_records({xid: play.to_dict() for xid, play in plays.items()})
+        # one to load the records, one to update them, and one to create the new one
+        assert len(statements) == 3
+
+        DatabaseSession.expire_all()
+        elos = {r.user_xid: r.elo for r in DatabaseSession.query(Record).all()}
+        assert elos == {winner.xid: 1516, loser.xid: 1484, bystander.xid: 1234}
+
+    async def test_replay(self, guild: Guild, channel: Channel, factories: Factories) -> None:
+        users = [factories.user.create() for _ in range(3)]
+        start = datetime.now(tz=UTC)
+        results = [(0, 1), (1, 2), (0, 2), (2, 0)]
+        for n, (winner, loser) in enumerate(results):
+            game = factories.game.create(guild=guild, channel=channel)
+            confirmed_at = start + timedelta(minutes=n)
+            for user, points in ((users[winner], 3), (users[loser], 0)):
+                factories.play.create(
+                    user_xid=user.xid,
+                    game_id=game.id,
+                    points=points,
+                    confirmed_at=confirmed_at,
+                )
+        # a game that hasn't been confirmed by every player yet doesn't count
+        game = factories.game.create(guild=guild, channel=channel)
+        factories.play.create(user_xid=users[0].xid, game_id=game.id, points=3)
+        factories.play.create(
+            user_xid=users[1].xid,
+            game_id=game.id,
+            points=0,
+            confirmed_at=start,
+        )
+        factories.record.create(guild=guild, channel=channel, user=users[0], elo=9000)
+
+        assert replay(guild.xid, channel.xid, batch_size=2) == 3
+
+        DatabaseSession.expire_all()
+        elos = {r.user_xid: r.elo for r in DatabaseSession.query(Record).all()}
+        expected = replay_plays(
+            (n, users[xid].xid, points)
+            for n, (winner, loser) in enumerate(results)
+            for xid, points in ((winner, 3), (loser, 0))
+        )
+        assert elos == expected
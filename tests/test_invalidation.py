@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import TYPE_CHECKING
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from spellbot.database import database_sync_to_async, db_session_manager
+from spellbot.invalidation import InvalidationBus, handle_message, invalidate
+from spellbot.settings import settings
+from spellbot.upsert_cache import channel_cache, set_degraded, user_cache, verify_cache
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Callable
+
+
+@pytest_asyncio.fixture
+async def bus(worker_id: str) -> AsyncGenerator[InvalidationBus, None]:
+    bus = InvalidationBus(
+        f"{settings.DATABASE_URL}-{worker_id}",
+        f"spellbot-test-invalidations-{worker_id}",
+        heartbeat_s=5,
+    )
+    yield bus
+    await bus.stop()
+    set_degraded(False)
+
+
+@database_sync_to_async
+def invalidate_channel(xid: int) -> None:
+    invalidate(channel_cache, xid)
+
+
+async def eventually(predicate: Callable[[], bool]) -> None:
+    for _ in range(500):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    pytest.fail("timed out")  # pragma: no cover
+
+
+class TestHandleMessage:
+    def test_invalidate(self) -> None:
+        user_cache.put(1, "name", "value", user_cache.version(1))
+        handle_message(json.dumps({"cache": "users", "key": 1}))
+        assert user_cache.get(1, "name") is None
+
+    def test_composite_key(self) -> None:
+        verify_cache.put((1, 2), None, True, verify_cache.version((1, 2)))
+        handle_message(json.dumps({"cache": "verify", "key": [1, 2]}))
+        assert verify_cache.get((1, 2), None) is None
+
+    def test_clear(self) -> None:
+        user_cache.put(1, "name", "value", user_cache.version(1))
+        handle_message(json.dumps({"cache": None}))
+        assert len(user_cache) == 0
+
+    def test_unknown_cache(self) -> None:
+        handle_message(json.dumps({"cache": "nope", "key": 1}))
+
+
+@pytest.mark.asyncio
+class TestInvalidationBus:
+    @pytest.mark.usefixtures("async_database")
+    async def test_invalidations_reach_other_processes(self, bus: InvalidationBus) -> None:
+        assert await bus.heartbeat()
+        assert not channel_cache.degraded
+
+        epoch, version = channel_cache.version(1)
+        async with db_session_manager():
+            await invalidate_channel(1)
+
+        # Evicted here right away, and then again when the notification comes back,
+        # which may already have happened by the time invalidate_channel() returns.
+        assert channel_cache.version(1)[1] > version
+        await eventually(lambda: channel_cache.version(1) == (epoch, version + 2))
+
+    async def test_degraded_until_reconnected(self, bus: InvalidationBus) -> None:
+        bus.start()
+        assert channel_cache.degraded
+        bus.task.cancel()  # type: ignore
+
+        assert await bus.heartbeat()
+        assert not channel_cache.degraded
+
+        # The listener's connection is lost.
+        assert bus.connection is not None
+        pid = await bus.connection.scalar(text("SELECT pg_backend_pid()"))
+        async with bus.engine.connect() as other:
+            await other.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+        await eventually(lambda: channel_cache.degraded)
+
+        assert not await bus.heartbeat()
+        assert channel_cache.degraded
+
+        # Once it's back anything cached in the meantime is forgotten.
+        channel_cache.put(1, "name", "value", channel_cache.version(1))
+        assert await bus.heartbeat()
+        assert not channel_cache.degraded
+        assert channel_cache.get(1, "name") is None
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from spellbot.leader import LeaderElection
+from spellbot.settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Callable
+
+
+@pytest_asyncio.fixture
+async def elect(worker_id: str) -> AsyncGenerator[Callable[[str], LeaderElection], None]:
+    """Build leader elections that campaign like separate bot processes would."""
+    db_url = f"{settings.DATABASE_URL}-{worker_id}"
+    key = random.randint(1, 2**31)  # noqa: S311
+    elections: list[LeaderElection] = []
+
+    def factory(app: str) -> LeaderElection:
+        election = LeaderElection(db_url, app, key=key, heartbeat_s=5)
+        elections.append(election)
+        return election
+
+    yield factory
+    for election in elections:
+        await election.stop()
+
+
+@pytest.mark.asyncio
+class TestLeaderElection:
+    async def test_one_leader(self, elect: Callable[[str], LeaderElection]) -> None:
+        first, second = elect("spellbot-first"), elect("spellbot-second")
+
+        assert await first.heartbeat()
+        assert not await second.heartbeat()
+
+        # Heartbeats keep the leader in place and the other process waiting.
+        assert await first.heartbeat()
+        assert not await second.heartbeat()
+
+    async def test_failover_on_crash(self, elect: Callable[[str], LeaderElection]) -> None:
+        first, second = elect("spellbot-first"), elect("spellbot-second")
+        assert await first.heartbeat()
+        assert not await second.heartbeat()
+
+        # The leader's process dies, taking its database session with it.
+        assert first.connection is not None
+        assert second.connection is not None
+        pid = await first.connection.scalar(text("SELECT pg_backend_pid()"))
+        await second.connection.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+
+        assert await second.heartbeat()
+        assert not await first.heartbeat()
+        # The old leader rejoins as a follower once it has reconnected.
+        assert not await first.heartbeat()
+        assert first.connection is not None
+
+    async def test_hand_off_on_stop(self, elect: Callable[[str], LeaderElection]) -> None:
+        first, second = elect("spellbot-first"), elect("spellbot-second")
+        assert await first.heartbeat()
+        assert not await second.heartbeat()
+
+        await first.stop()
+
+        assert not first.is_leader
+        assert await second.heartbeat()
+
+    async def test_run(self, elect: Callable[[str], LeaderElection]) -> None:
+        election = elect("spellbot-first")
+        election.heartbeat_s = 0.01
+        election.start()
+        await election.stop()
+        assert election.task is None
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from spellbot import link_client
+from spellbot.link_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LinkClient,
+    LinkTimeoutError,
+)
+from spellbot.settings import settings
+from tests.mocks.link_server import FakeLinkServer
+
+HEADERS = {"key": "auth-key"}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "LINK_BACKOFF_S", 0)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_failures(self) -> None:
+        breaker = CircuitBreaker(failures=2, reset_s=30)
+        breaker.failure()
+        assert breaker.allow()
+        breaker.failure()
+        assert breaker.is_open
+        assert not breaker.allow()
+
+    def test_success_resets_failures(self) -> None:
+        breaker = CircuitBreaker(failures=2, reset_s=30)
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        assert not breaker.is_open
+
+    def test_half_open(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        breaker = CircuitBreaker(failures=1, reset_s=30)
+        breaker.failure()
+        now = time.monotonic()
+        monkeypatch.setattr(link_client.time, "monotonic", lambda: now + 31)
+
+        # only a single trial request is let through
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        breaker.success()
+        assert not breaker.is_open
+        assert breaker.allow()
+
+    def test_half_open_failure(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        breaker = CircuitBreaker(failures=1, reset_s=30)
+        breaker.failure()
+        now = time.monotonic()
+        monkeypatch.setattr(link_client.time, "monotonic", lambda: now + 31)
+        assert breaker.allow()
+
+        breaker.failure()
+        assert not breaker.allow()
+
+
+@pytest.mark.asyncio
+class TestLinkClient:
+    async def test_reuses_connections(self) -> None:
+        client = LinkClient("test", timeout_s=5)
+        async with FakeLinkServer() as server:
+            for _ in range(5):
+                response = await client.post(server.url, headers=HEADERS)
+                assert response.status == 200
+            await client.close()
+
+        assert server.requests == 5
+        assert len(server.connections) == 1
+
+    async def test_retries_server_errors(self) -> None:
+        client = LinkClient("test", timeout_s=5, attempts=3)
+        async with FakeLinkServer(fail_first=2) as server:
+            response = await client.post(server.url, headers=HEADERS)
+            await client.close()
+
+        assert response.status == 200
+        assert server.requests == 3
+        assert client.breaker.failures == 0
+
+    async def test_returns_last_server_error(self) -> None:
+        client = LinkClient("test", timeout_s=5, attempts=2)
+        async with FakeLinkServer(fail_first=10) as server:
+            response = await client.post(server.url, headers=HEADERS)
+            await client.close()
+
+        assert response.status == 503
+        assert response.body == b"upstream request timeout"
+        assert server.requests == 2
+        assert client.breaker.failures == 1
+
+    async def test_hedges_slow_requests(self) -> None:
+        client = LinkClient("test", timeout_s=5, hedge_after_s=0.05)
+        async with FakeLinkServer(stall_every=2) as server:
+            # the first request is fast, the second one stalls and gets hedged
+            await client.post(server.url, headers=HEADERS)
+            start = time.perf_counter()
+            response = await client.post(server.url, headers=HEADERS)
+            elapsed = time.perf_counter() - start
+            await client.close()
+
+        assert response.status == 200
+        assert response.body == b'{"gameUrl": "https://www.spelltable.com/game/3"}'
+        assert elapsed < 1
+        assert server.requests == 3
+
+    async def test_timeout(self) -> None:
+        client = LinkClient("test", timeout_s=0.1, hedge_after_s=1, attempts=2)
+        async with FakeLinkServer(stall_every=1) as server:
+            with pytest.raises(LinkTimeoutError):
+                await client.post(server.url, headers=HEADERS)
+            await client.close()
+
+        assert server.requests == 2
+        assert client.breaker.failures == 1
+
+    async def test_circuit_open(self) -> None:
+        client = LinkClient("test", timeout_s=5)
+        client.breaker.opened_at = time.monotonic()
+        async with FakeLinkServer() as server:
+            with pytest.raises(CircuitOpenError):
+                await client.post(server.url, headers=HEADERS)
+            await client.close()
+
+        assert server.requests == 0
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import pytest
+import pytest_asyncio
+
+from spellbot.locks import (
+    AdvisoryLockManager,
+    LockManager,
+    advisory_key,
+    queue_key,
+    seat_key,
+    user_key,
+)
+from spellbot.settings import settings
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Callable
+
+
+@pytest_asyncio.fixture
+async def advisory(worker_id: str) -> AsyncGenerator[Callable[[], AdvisoryLockManager], None]:
+    """Build advisory lock managers that lock like separate bot processes would."""
+    db_url = f"{settings.DATABASE_URL}-{worker_id}"
+    managers: list[AdvisoryLockManager] = []
+
+    def factory() -> AdvisoryLockManager:
+        manager = AdvisoryLockManager(db_url, f"spellbot-test-locks-{worker_id}", pool_size=1)
+        managers.append(manager)
+        return manager
+
+    yield factory
+    for manager in managers:
+        await manager.close()
+
+
+@pytest.mark.asyncio
+class TestLockManager:
+    async def test_acquire_and_cleanup(self) -> None:
+        locks = LockManager()
+        key = queue_key(1, 2, 3, 4, 5)
+        async with locks.acquire([key, user_key(6)]):
+            assert locks.locked(key)
+            assert locks.locked(user_key(6))
+            assert len(locks) == 2
+        assert not locks.locked(key)
+        assert len(locks) == 0
+
+    async def test_duplicate_keys(self) -> None:
+        locks = LockManager()
+        async with locks.acquire([user_key(1), user_key(1)]):
+            assert len(locks) == 1
+        assert len(locks) == 0
+
+    async def test_disjoint_keys_run_concurrently(self) -> None:
+        locks = LockManager()
+        inside = asyncio.Event()
+        release = asyncio.Event()
+
+        async def holder() -> None:
+            async with locks.acquire([queue_key(1, 1, 1, 4, 1)]):
+                inside.set()
+                await release.wait()
+
+        task = asyncio.create_task(holder())
+        await inside.wait()
+        async with locks.acquire([queue_key(1, 2, 1, 4, 1)]):
+            assert locks.locked(queue_key(1, 1, 1, 4, 1))
+        release.set()
+        await task
+
+    async def test_shared_keys_are_serialized(self) -> None:
+        locks = LockManager()
+        order: list[str] = []
+
+        async def worker(name: str, keys: list[tuple[str | int, ...]]) -> None:
+            async with locks.acquire(keys):
+                order.append(f"{name}-start")
+                await asyncio.sleep(0.01)
+                order.append(f"{name}-end")
+
+        await asyncio.gather(
+            worker("a", [user_key(1), user_key(2)]),
+            worker("b", [user_key(2), user_key(3)]),
+        )
+        assert order == ["a-start", "a-end", "b-start", "b-end"]
+
+    async def test_opposite_order_does_not_deadlock(self) -> None:
+        locks = LockManager()
+
+        async def worker(keys: list[tuple[str | int, ...]]) -> None:
+            for _ in range(25):
+                async with locks.acquire(keys):
+                    await asyncio.sleep(0)
+
+        await asyncio.wait_for(
+            asyncio.gather(
+                worker([user_key(1), seat_key(2), queue_key(1, 1, 1, 4, 1)]),
+                worker([queue_key(1, 1, 1, 4, 1), seat_key(2), user_key(1)]),
+            ),
+            timeout=5,
+        )
+        assert len(locks) == 0
+
+    async def test_cancelled_waiter_releases_references(self) -> None:
+        locks = LockManager()
+        inside = asyncio.Event()
+        release = asyncio.Event()
+
+        async def holder() -> None:
+            async with locks.acquire([user_key(1)]):
+                inside.set()
+                await release.wait()
+
+        async def waiter() -> None:
+            async with locks.acquire([user_key(1)]):
+                pass  # pragma: no cover
+
+        held = asyncio.create_task(holder())
+        await inside.wait()
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        release.set()
+        await held
+        assert len(locks) == 0
+
+
+class TestAdvisoryKey:
+    def test_stable_and_distinct(self) -> None:
+        assert advisory_key(user_key(1)) == advisory_key(user_key(1))
+        assert advisory_key(user_key(1)) != advisory_key(seat_key(1))
+        assert -(2**63) <= advisory_key(queue_key(1, 2, 3, 4, 5)) < 2**63
+
+
+@pytest.mark.asyncio
+class TestAdvisoryLockManager:
+    async def test_excludes_other_processes(
+        self,
+        advisory: Callable[[], AdvisoryLockManager],
+    ) -> None:
+        first, second = advisory(), advisory()
+        order: list[str] = []
+
+        async def worker(locks: AdvisoryLockManager, name: str) -> None:
+            async with locks.acquire([user_key(1), queue_key(1, 2, 3, 4, 5)]):
+                order.append(f"{name}-start")
+                await asyncio.sleep(0.05)
+                order.append(f"{name}-end")
+
+        await asyncio.gather(worker(first, "a"), worker(second, "b"))
+        assert order in (
+            ["a-start", "a-end", "b-start", "b-end"],
+            ["b-start", "b-end", "a-start", "a-end"],
+        )
+
+    async def test_nested_acquire_reuses_connection(
+        self,
+        advisory: Callable[[], AdvisoryLockManager],
+    ) -> None:
+        # With a pool of one connection, a second connection would never become free.
+        locks, other = advisory(), advisory()
+        async with locks.acquire([user_key(1)]):
+            async with asyncio.timeout(5), locks.acquire([seat_key(1)]):
+                pass
+            # The nested lock is released and the outer one is still held.
+            async with asyncio.timeout(5), other.acquire([seat_key(1)]):
+                pass
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.1), other.acquire([user_key(1)]):
+                    pass
+
+    async def test_cancelled_waiter_leaves_nothing_locked(
+        self,
+        advisory: Callable[[], AdvisoryLockManager],
+    ) -> None:
+        holder, waiter = advisory(), advisory()
+        async with holder.acquire([user_key(1)]):
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.1), waiter.acquire([user_key(2), user_key(1)]):
+                    pass
+
+        async with asyncio.timeout(5), holder.acquire([user_key(1), user_key(2)]):
+            pass
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING, cast
+
+import pytest
+
+from spellbot.database import DatabaseSession
+from spellbot.enums import GameFormat, GameService
+from spellbot.locks import queue_key
+from spellbot.matchmaking import MatchmakingIndexError
+from spellbot.models import Game, GameStatus
+from spellbot.services import GamesService, UsersService
+
+if TYPE_CHECKING:
+    from spellbot.matchmaking import MatchmakingIndex
+    from spellbot.models import Channel, Guild
+    from tests.fixtures import Factories
+
+FORMAT = GameFormat.COMMANDER.value
+SERVICE = GameService.SPELLTABLE.value
+
+
+@pytest.mark.asyncio
+class TestMatchmakingIndex:
+    async def test_rebuild(
+        self,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+        matchmaking_index: MatchmakingIndex,
+    ) -> None:
+        pending = factories.game.create(guild=guild, channel=channel, seats=4)
+        started = factories.game.create(
+            guild=guild,
+            channel=channel,
+            seats=4,
+            status=GameStatus.STARTED.value,
+        )
+        factories.user.create(xid=101, game=pending)
+        factories.user.create(xid=102, game=started)
+
+        matchmaking_index.rebuild()
+
+        assert matchmaking_index.enabled
+        assert pending.id in matchmaking_index
+        assert started.id not in matchmaking_index
+        assert matchmaking_index.player_count(pending.id) == 1
+        assert matchmaking_index.check() == []
+
+    async def test_candidates(
+        self,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+        matchmaking_index: MatchmakingIndex,
+    ) -> None:
+        game1 = factories.game.create(guild=guild, channel=channel, seats=2)
+        game2 = factories.game.create(guild=guild, channel=channel, seats=2)
+        game3 = factories.game.create(guild=guild, channel=channel, seats=2)
+        factories.user.create(xid=101, game=game1)
+        factories.user.create(xid=102, game=game2)
+        factories.user.create(xid=103)
+        factories.user.create(xid=104)
+        factories.block.create(user_xid=103, blocked_user_xid=101)
+        matchmaking_index.rebuild()
+        key = queue_key(guild.xid, channel.xid, FORMAT, 2, SERVICE)
+
+        assert matchmaking_index.candidates([key], [104]) == [game1.id, game2.id, game3.id]
+        assert matchmaking_index.candidates([key], [103]) == [game2.id, game3.id]
+        assert matchmaking_index.candidates([key], [103, 104]) == [game3.id]
+        assert matchmaking_index.candidates([key, key], [103, 104]) == [game3.id]
+
+    async def test_check_detects_drift(
+        self,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+        matchmaking_index: MatchmakingIndex,
+    ) -> None:
+        game = factories.game.create(guild=guild, channel=channel)
+        matchmaking_index.rebuild()
+        factories.user.create(xid=101, game=game)
+        other = factories.game.create(guild=guild, channel=channel)
+
+        assert matchmaking_index.check() == [
+            f"game {other.id} is pending but not indexed",
+            f"game {game.id} has players [101], not []",
+        ]
+        key = queue_key(guild.xid, channel.xid, FORMAT, game.seats, SERVICE)
+        with pytest.raises(MatchmakingIndexError):
+            matchmaking_index.candidates([key], [102])
+
+    async def test_block_cache_is_invalidated(
+        self,
+        factories: Factories,
+        matchmaking_index: MatchmakingIndex,
+    ) -> None:
+        factories.user.create(xid=101)
+        factories.user.create(xid=102)
+        matchmaking_index.rebuild()
+        assert matchmaking_index.conflicts([101]) == set()
+
+        users = UsersService()
+        await users.block(101, 102)
+        assert matchmaking_index.conflicts([102]) == {101}
+        await users.unblock(101, 102)
+        assert matchmaking_index.conflicts([101]) == set()
+        assert matchmaking_index.check() == []
+
+    async def test_stale_game_is_evicted(
+        self,
+        factories: Factories,
+        guild: Guild,
+        channel: Channel,
+        matchmaking_index: MatchmakingIndex,
+    ) -> None:
+        game = factories.game.create(guild=guild, channel=channel, seats=4)
+        factories.user.create(xid=101)
+        matchmaking_index.rebuild()
+        matchmaking_index.verify = False
+        game.status = GameStatus.STARTED.value
+        DatabaseSession.flush()
+
+        new = await GamesService().upsert(
+            guild_xid=guild.xid,
+            channel_xid=channel.xid,
+            author_xid=101,
+            friends=[],
+            seats=4,
+            format=FORMAT,
+            service=SERVICE,
+        )
+
+        assert new
+        assert game.id not in matchmaking_index
+
+
+@pytest.mark.asyncio
+class TestMatchmakingIndexConsistency:
+    async def test_random_operations(
+        self,
+        factories: Factories,
+        guild: Guild,
+        matchmaking_index: MatchmakingIndex,
+    ) -> None:
+        """Drive the services through random operations and compare against the database."""
+        rng = random.Random(1234)  # noqa: S311
+        channels = [factories.channel.create(guild=guild) for _ in range(2)]
+        xids = [factories.user.create(xid=100 + i).xid for i in range(12)]
+        matchmaking_index.rebuild()
+
+        def find(games: GamesService, channel: Channel, joiners: list[int], seats: int) -> int:
+            found = games._find_existing(
+                guild_xid=guild.xid,
+                channel_xid=channel.xid,
+                author_xid=joiners[0],
+                friends=joiners[1:],
+                seats=seats,
+                format=FORMAT,
+                service=SERVICE,
+            )
+            return cast(int, found.id) if found else 0
+
+        for _ in range(150):
+            games = GamesService()
+            channel = rng.choice(channels)
+            seats = rng.choice([2, 4])
+            joiners = rng.sample(xids, rng.choice([1, 1, 1, 2]))
+            op = rng.choice(["lfg", "lfg", "lfg", "leave", "block", "unblock", "expire"])
+
+            if op == "lfg":
+                new = await games.upsert(
+                    guild_xid=guild.xid,
+                    channel_xid=channel.xid,
+                    author_xid=joiners[0],
+                    friends=joiners[1:],
+                    seats=seats,
+                    format=FORMAT,
+                    service=SERVICE,
+                )
+                game_dict = await games.to_dict()
+                if new:
+                    await games.add_post(guild.xid, channel.xid, rng.randint(1, 10**9))
+                if await games.fully_seated():
+                    await games.make_ready(f"https://example.com/{game_dict['id']}")
+            elif op == "leave":
+                users = UsersService()
+                await users.select(joiners[0])
+                await users.leave_game(channel.xid)
+            elif op == "block":
+                await UsersService().block(joiners[0], rng.choice(xids))
+            elif op == "unblock":
+                await UsersService().unblock(joiners[0], rng.choice(xids))
+            else:
+                pending = DatabaseSession.query(Game.id).filter(
+                    Game.status == GameStatus.PENDING.value,
+                    Game.deleted_at.is_(None),
+                )
+                if game_ids := [row[0] for row in pending]:
+                    await games.delete_games([rng.choice(game_ids)])
+
+            assert matchmaking_index.check() == []
+
+            # The index and the SQL query must agree on which game would be joined.
+            probe = rng.sample(xids, rng.choice([1, 2]))
+            indexed = find(games, channel, probe, seats)
+            matchmaking_index.enabled = False
+            try:
+                expected = find(games, channel, probe, seats)
+            finally:
+                matchmaking_index.enabled = True
+            assert indexed == expected
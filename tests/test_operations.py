@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import TYPE_CHECKING
 from unittest.mock import ANY, AsyncMock, MagicMock, Mock
@@ -13,6 +14,7 @@ from discord.utils import MISSING
 
 from spellbot import operations
 from spellbot.operations import (
+    fan_out,
     retry,
     safe_add_role,
     safe_channel_reply,
@@ -76,6 +78,62 @@ class TestOperationsRetry:
         assert tried_once
 
 
+@pytest.mark.asyncio
+class TestOperationsFanOut:
+    async def test_happy_path(self) -> None:
+        async def func(target: int) -> int:
+            await asyncio.sleep(0.01 * (5 - target))
+            return target * 2
+
+        result = await fan_out([1, 2, 3, 2], func)
+
+        assert list(result.results.items()) == [(1, 2), (2, 4), (3, 6)]
+        assert result.failures == {}
+
+    async def test_failures(self) -> None:
+        error = DiscordException()
+
+        async def func(target: int) -> int:
+            if target == 2:
+                raise error
+            return target
+
+        result = await fan_out([1, 2, 3], func)
+
+        assert result.results == {1: 1, 3: 3}
+        assert result.failures == {2: error}
+
+    async def test_limit(self) -> None:
+        in_flight = 0
+        max_in_flight = 0
+
+        async def func(target: int) -> None:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        await fan_out(range(10), func, limit=3)
+
+        assert max_in_flight == 3
+
+    async def test_bucket(self) -> None:
+        calls: list[tuple[str, int]] = []
+
+        async def func(target: int) -> None:
+            calls.append(("start", target))
+            await asyncio.sleep(0.01)
+            calls.append(("end", target))
+
+        await fan_out([1, 2, 3, 4], func, bucket=lambda target: target % 2)
+
+        # targets in the same bucket never overlap, but the two buckets run concurrently
+        assert calls.index(("end", 1)) < calls.index(("start", 3))
+        assert calls.index(("end", 2)) < calls.index(("start", 4))
+        assert calls.index(("start", 2)) < calls.index(("end", 1))
+
+
 @pytest.mark.asyncio
 class TestOperationsDeferInteraction:
     async def test_happy_path(self) -> None:
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from discord.errors import HTTPException
+
+from spellbot import prometheus
+from spellbot.locks import LockManager, user_key
+from spellbot.prometheus import (
+    CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    RateLimitHandler,
+    Registry,
+    build_exporter_app,
+    timed_request,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiohttp.test_utils import TestClient
+    from aiohttp.web import Application
+
+
+class TestRegistry:
+    def test_counter(self) -> None:
+        registry = Registry()
+        counter = registry.register(Counter("hits_total", "Hits.", ["path"]))
+        counter.inc(path="/a")
+        counter.inc(2, path='/"b"')
+        assert registry.render() == (
+            "# HELP hits_total Hits.\n"
+            "# TYPE hits_total counter\n"
+            'hits_total{path="/a"} 1\n'
+            'hits_total{path="/\\"b\\""} 2\n'
+        )
+
+    def test_gauge(self) -> None:
+        registry = Registry()
+        registry.register(Gauge("temp", "Temperature.")).set(21.5)
+        registry.register(Gauge("load", "Load.", ["cpu"], collect=lambda: {("0",): 2}))
+        assert registry.render() == (
+            "# HELP temp Temperature.\n"
+            "# TYPE temp gauge\n"
+            "temp 21.5\n"
+            "# HELP load Load.\n"
+            "# TYPE load gauge\n"
+            'load{cpu="0"} 2\n'
+        )
+
+    def test_histogram(self) -> None:
+        registry = Registry()
+        histogram = registry.register(Histogram("took", "Time taken.", ["op"], buckets=[1, 5]))
+        for value in (0.5, 3, 10):
+            histogram.observe(value, op="x")
+        assert registry.render() == (
+            "# HELP took Time taken.\n"
+            "# TYPE took histogram\n"
+            'took_bucket{op="x",le="1"} 1\n'
+            'took_bucket{op="x",le="5"} 2\n'
+            'took_bucket{op="x",le="+Inf"} 3\n'
+            'took_sum{op="x"} 13.5\n'
+            'took_count{op="x"} 3\n'
+        )
+
+    def test_histogram_time(self) -> None:
+        histogram = Histogram("took", "Time taken.")
+        with pytest.raises(RuntimeError), histogram.time():
+            raise RuntimeError
+        assert histogram.counts[()][0] == 1
+
+    def test_wrong_labels(self) -> None:
+        counter = Counter("hits_total", "Hits.", ["path"])
+        with pytest.raises(ValueError, match="takes labels"):
+            counter.inc(route="/a")
+
+    def test_duplicate(self) -> None:
+        registry = Registry()
+        registry.register(Counter("hits_total", "Hits."))
+        with pytest.raises(ValueError, match="already registered"):
+            registry.register(Counter("hits_total", "Hits."))
+
+
+class TestInstrumentation:
+    def test_rate_limit_handler(self) -> None:
+        before = dict(prometheus.DISCORD_RATE_LIMITS.totals)
+        log = logging.getLogger("test_rate_limits")
+        log.addHandler(handler := RateLimitHandler())
+        try:
+            log.warning("We are being rate limited. %s %s responded with 429.", "GET", "/")
+            log.warning("Global rate limit has been hit. Retrying in %.2f seconds.", 1.0)
+            log.warning("Something else")
+        finally:
+            log.removeHandler(handler)
+        after = prometheus.DISCORD_RATE_LIMITS.totals
+        assert after[("route",)] == before.get(("route",), 0) + 1
+        assert after[("global",)] == before.get(("global",), 0) + 1
+
+    @pytest.mark.asyncio
+    async def test_timed_request(self) -> None:
+        route = MagicMock(method="POST", path="/interactions/123/abc/callback")
+        key = ("POST", "/interactions/{interaction_id}/{interaction_token}/callback", "ok")
+
+        assert await timed_request(AsyncMock(return_value=42), None, (route,), {}) == 42
+        assert sum(prometheus.DISCORD_HTTP_SECONDS.counts[key]) >= 1
+
+        error = HTTPException(MagicMock(status=404), "not found")
+        with pytest.raises(HTTPException):
+            await timed_request(AsyncMock(side_effect=error), None, (route,), {})
+        assert sum(prometheus.DISCORD_HTTP_SECONDS.counts[(*key[:2], "404")]) >= 1
+
+    @pytest.mark.asyncio
+    async def test_lock_wait(self) -> None:
+        before = sum(prometheus.LOCK_WAIT_SECONDS.counts.get(("user",), []))
+        async with LockManager().acquire([user_key(1)]):
+            pass
+        assert sum(prometheus.LOCK_WAIT_SECONDS.counts[("user",)]) == before + 1
+
+
+@pytest.mark.asyncio
+class TestExporter:
+    async def test_metrics_endpoint(
+        self,
+        aiohttp_client: Callable[[Application], Awaitable[TestClient]],
+    ) -> None:
+        client = await aiohttp_client(build_exporter_app())
+        resp = await client.get("/metrics")
+        assert resp.status == 200
+        assert resp.headers["Content-Type"] == CONTENT_TYPE
+        text = await resp.text()
+        assert "# TYPE spellbot_interaction_seconds histogram" in text
+        # The test database connection is a single connection from the default pool.
+        assert 'spellbot_db_pool_connections{state="checked_out"} 1' in text
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import TYPE_CHECKING, Any
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.client_exceptions import ClientOSError
+from discord.http import HTTPClient, Ratelimit, Route
+
+from spellbot.actions import TasksAction
+from spellbot.operations import safe_fetch_user
+from spellbot.scheduler import (
+    MAX_TRIES,
+    Lane,
+    RestScheduler,
+    background,
+    current_lane,
+    find_ratelimit,
+    install_scheduler,
+    scheduler,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Awaitable, Callable
+
+    from aiohttp.test_utils import TestServer
+    from pytest_mock import MockerFixture
+
+    from spellbot import SpellBot
+
+PATH = "/channels/{channel_id}/messages/{message_id}"
+ROUTE = Route("DELETE", PATH, channel_id=1, message_id=2)
+
+
+def build_http(key: str | None = None, **bucket: float) -> Any:
+    http = MagicMock()
+    http._bucket_hashes = {}
+    http._buckets = {}
+    if key is not None:
+        ratelimit = Ratelimit(None)
+        ratelimit.limit = int(bucket["limit"])
+        ratelimit.remaining = int(bucket["remaining"])
+        ratelimit.expires = asyncio.get_running_loop().time() + bucket["reset_after"]
+        http._buckets[key] = ratelimit
+    return http
+
+
+@pytest.mark.asyncio
+class TestFindRatelimit:
+    async def test_unknown(self) -> None:
+        assert find_ratelimit(build_http(), ROUTE) is None
+
+    async def test_route_key(self) -> None:
+        http = build_http(f"{ROUTE.key}:1", limit=5, remaining=5, reset_after=1)
+        assert find_ratelimit(http, ROUTE) is http._buckets[f"{ROUTE.key}:1"]
+
+    async def test_bucket_hash(self) -> None:
+        http = build_http("abc1", limit=5, remaining=5, reset_after=1)
+        http._bucket_hashes[ROUTE.key] = "abc"
+        assert find_ratelimit(http, ROUTE) is http._buckets["abc1"]
+
+    async def test_no_buckets(self) -> None:
+        # Like a version of discord.py that keeps its rate limits somewhere else.
+        http = MagicMock(spec=[])
+        assert find_ratelimit(http, ROUTE) is None
+
+
+@pytest.mark.asyncio
+class TestRestScheduler:
+    async def test_interactive(self) -> None:
+        scheduler = RestScheduler()
+        wrapped = AsyncMock(return_value=42)
+
+        assert await scheduler.request(wrapped, build_http(), (ROUTE,), {}) == 42
+
+        wrapped.assert_called_once_with(ROUTE)
+        assert not scheduler.interactive
+
+    async def test_background_with_headroom(self) -> None:
+        scheduler = RestScheduler(reserve=1)
+        http = build_http(f"{ROUTE.key}:1", limit=5, remaining=2, reset_after=60)
+        wrapped = AsyncMock(return_value=42)
+
+        with background():
+            result = await asyncio.wait_for(scheduler.request(wrapped, http, (ROUTE,), {}), 1)
+
+        assert result == 42
+
+    async def test_background_without_buckets(self) -> None:
+        scheduler = RestScheduler(reserve=1)
+        wrapped = AsyncMock(return_value=42)
+
+        with background():
+            coro = scheduler.request(wrapped, MagicMock(spec=[]), (ROUTE,), {})
+            result = await asyncio.wait_for(coro, 1)
+
+        assert result == 42
+
+    async def test_background_leaves_reserve(self) -> None:
+        scheduler = RestScheduler(reserve=1)
+        http = build_http(f"{ROUTE.key}:1", limit=5, remaining=1, reset_after=0.05)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        with background():
+            await asyncio.wait_for(scheduler.request(AsyncMock(), http, (ROUTE,), {}), 1)
+
+        assert loop.time() - start >= 0.05
+
+    async def test_background_yields_to_interactive(self) -> None:
+        scheduler = RestScheduler()
+        http = build_http()
+        calls: list[str] = []
+        release = asyncio.Event()
+
+        async def interactive(route: Route) -> None:
+            calls.append("interactive")
+            await release.wait()
+            calls.append("interactive done")
+
+        async def bulk(route: Route) -> None:
+            calls.append("background")
+
+        async def run_background() -> None:
+            with background():
+                await scheduler.request(bulk, http, (ROUTE,), {})
+
+        first = asyncio.create_task(scheduler.request(interactive, http, (ROUTE,), {}))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(run_background())
+        await asyncio.sleep(0.01)
+        assert calls == ["interactive"]
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert calls == ["interactive", "interactive done", "background"]
+
+    async def test_retries(self, mocker: MockerFixture) -> None:
+        mocker.patch("spellbot.scheduler.asyncio.sleep", AsyncMock())
+        scheduler = RestScheduler()
+        wrapped = AsyncMock(side_effect=[ClientOSError, 42])
+
+        assert await scheduler.request(wrapped, build_http(), (ROUTE,), {}) == 42
+        assert wrapped.call_count == 2
+
+    async def test_gives_up(self, mocker: MockerFixture) -> None:
+        mocker.patch("spellbot.scheduler.asyncio.sleep", AsyncMock())
+        scheduler = RestScheduler()
+        wrapped = AsyncMock(side_effect=ClientOSError)
+
+        with pytest.raises(ClientOSError):
+            await scheduler.request(wrapped, build_http(), (ROUTE,), {})
+        assert wrapped.call_count == MAX_TRIES
+        assert not scheduler.interactive
+
+
+class TestLanes:
+    def test_background(self) -> None:
+        assert current_lane.get() is Lane.INTERACTIVE
+        with background():
+            assert current_lane.get() is Lane.BACKGROUND
+        assert current_lane.get() is Lane.INTERACTIVE
+
+    @pytest.mark.asyncio
+    async def test_tasks_run_in_background(self, bot: SpellBot) -> None:
+        async with TasksAction.create(bot):
+            assert current_lane.get() is Lane.BACKGROUND
+        assert current_lane.get() is Lane.INTERACTIVE
+
+
+def json_response(data: dict[str, Any], status: int = 200, **headers: str) -> web.Response:
+    # discord.py only decodes JSON sent without a charset, like Discord sends it.
+    body = json.dumps(data).encode()
+    return web.Response(body=body, status=status, content_type="application/json", headers=headers)
+
+
+class FakeDiscord:
+    """A Discord API that answers each user fetch with the next of a list of responses."""
+
+    def __init__(self) -> None:
+        self.responses: list[web.Response] = []
+        self.requests = 0
+        self.app = web.Application()
+        self.app.router.add_get("/api/v10/users/@me", self.user)
+        self.app.router.add_get("/api/v10/users/{user_id}", self.fetch_user)
+
+    async def user(self, request: web.Request) -> web.Response:
+        return json_response(
+            {
+                "id": request.match_info.get("user_id", "1"),
+                "username": "user",
+                "discriminator": "0",
+                "avatar": None,
+                "global_name": None,
+            },
+        )
+
+    async def fetch_user(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.responses:
+            return self.responses.pop(0)
+        return await self.user(request)
+
+
+@pytest_asyncio.fixture
+async def discord_api(
+    aiohttp_server: Callable[[web.Application], Awaitable[TestServer]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> FakeDiscord:
+    api = FakeDiscord()
+    server = await aiohttp_server(api.app)
+    monkeypatch.setattr(Route, "BASE", str(server.make_url("/api/v10")))
+
+    # Don't wait out discord.py's backoff between retries.
+    sleep = asyncio.sleep
+
+    async def short_sleep(delay: float, *args: Any) -> Any:
+        return await sleep(min(delay, 0.01), *args)
+
+    monkeypatch.setattr("discord.http.asyncio.sleep", short_sleep)
+    return api
+
+
+@pytest_asyncio.fixture
+async def client(
+    discord_api: FakeDiscord,
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncGenerator[discord.Client, None]:
+    # Installed like it is in setup_hook, and uninstalled again afterwards.
+    monkeypatch.setattr(HTTPClient, "request", HTTPClient.request)
+    install_scheduler()
+    client = discord.Client(intents=discord.Intents.none())
+    await client.http.static_login("token")
+    yield client
+    await client.http.close()
+
+
+@pytest.mark.asyncio
+class TestInstalledScheduler:
+    async def test_retries_server_errors(
+        self,
+        client: discord.Client,
+        discord_api: FakeDiscord,
+        mocker: MockerFixture,
+    ) -> None:
+        send = mocker.spy(scheduler, "send")
+        discord_api.responses = [
+            json_response({"message": "oops"}, status=502),
+            json_response(
+                {"message": "slow down", "retry_after": 0.01, "global": False},
+                status=429,
+                Via="1.1 google",
+            ),
+        ]
+
+        user = await safe_fetch_user(client, 42)
+
+        assert user is not None
+        assert user.id == 42
+        assert discord_api.requests == 3
+        send.assert_called_once()
+
+    async def test_retries_connection_errors(
+        self,
+        client: discord.Client,
+        discord_api: FakeDiscord,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        mocker.patch("spellbot.scheduler.asyncio.sleep", AsyncMock())
+        # The connection fails before the request gets to Discord.
+        session = client.http._HTTPClient__session  # type: ignore
+        request = session.request
+        failures = iter([ClientOSError()])
+
+        def flaky_request(*args: Any, **kwargs: Any) -> Any:
+            if failure := next(failures, None):
+                raise failure
+            return request(*args, **kwargs)
+
+        monkeypatch.setattr(session, "request", flaky_request)
+
+        user = await safe_fetch_user(client, 42)
+
+        assert user is not None
+        assert user.id == 42
+        assert discord_api.requests == 1
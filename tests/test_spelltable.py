@@ -1,145 +1,68 @@
 from __future__ import annotations
 
-from contextlib import asynccontextmanager
-from typing import TYPE_CHECKING, Any, cast
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from aiohttp.client_exceptions import ClientError
-from aiohttp_retry.client import RetryClient
 
 from spellbot import spelltable
+from spellbot.link_client import LinkClient, LinkResponse
 from spellbot.settings import Settings
 from spellbot.spelltable import generate_spelltable_link as generate_link
+from tests.mocks.link_server import FakeLinkServer
 
-if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator
+
+def mock_client(**kwargs: Any) -> LinkClient:
+    client = MagicMock(spec=LinkClient)
+    client.post = AsyncMock(**kwargs)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    settings = MagicMock(spec=Settings)
+    settings.SPELLTABLE_AUTH_KEY = "auth-key"
+    settings.SPELLTABLE_CREATE = "https://create"
+    monkeypatch.setattr(spelltable, "settings", settings)
+    return settings
 
 
 @pytest.mark.asyncio
 class TestSpellTable:
-    async def test_generate_link(self, monkeypatch: pytest.MonkeyPatch) -> None:
-        settings = MagicMock(spec=Settings)
-        settings.SPELLTABLE_AUTH_KEY = "auth-key"
-        settings.SPELLTABLE_CREATE = "https://create"
-        monkeypatch.setattr(spelltable, "settings", settings)
-
-        mock_response = MagicMock()
+    async def test_generate_link(self) -> None:
         game_url = "https://game"
-        mock_response.read = AsyncMock(
-            return_value=b'{"gameUrl": "' + game_url.encode() + b'" }',
+        client = mock_client(
+            return_value=LinkResponse(200, b'{"gameUrl": "' + game_url.encode() + b'" }'),
         )
 
-        class MockClient:
-            @asynccontextmanager
-            async def post(self, *args: Any, **kwargs: Any):
-                yield mock_response
-
-        mock_client = MockClient()
-
-        @asynccontextmanager
-        async def MockRetryClient(*args: Any, **kwargs: Any) -> AsyncGenerator[RetryClient, None]:
-            yield cast(RetryClient, mock_client)
-
-        monkeypatch.setattr(spelltable, "RetryClient", MockRetryClient)
-
-        assert await generate_link(MagicMock()) == game_url
-
-    async def test_generate_link_upstream_timeout(self, monkeypatch: pytest.MonkeyPatch) -> None:
-        settings = MagicMock(spec=Settings)
-        settings.SPELLTABLE_AUTH_KEY = "auth-key"
-        settings.SPELLTABLE_CREATE = "https://create"
-        monkeypatch.setattr(spelltable, "settings", settings)
-
-        mock_response = MagicMock()
-        mock_response.read = AsyncMock(return_value=b"upstream request timeout")
-
-        class MockClient:
-            @asynccontextmanager
-            async def post(self, *args: Any, **kwargs: Any):
-                yield mock_response
-
-        mock_client = MockClient()
-
-        @asynccontextmanager
-        async def MockRetryClient(*args: Any, **kwargs: Any) -> AsyncGenerator[RetryClient, None]:
-            yield cast(RetryClient, mock_client)
-
-        monkeypatch.setattr(spelltable, "RetryClient", MockRetryClient)
-
-        assert await generate_link(MagicMock()) is None
-
-    async def test_generate_link_missing_game_url(self, monkeypatch: pytest.MonkeyPatch) -> None:
-        settings = MagicMock(spec=Settings)
-        settings.SPELLTABLE_AUTH_KEY = "auth-key"
-        settings.SPELLTABLE_CREATE = "https://create"
-        monkeypatch.setattr(spelltable, "settings", settings)
-
-        mock_response = MagicMock()
-        mock_response.read = AsyncMock(return_value=b'{"error": 123}')
-
-        class MockClient:
-            @asynccontextmanager
-            async def post(self, *args: Any, **kwargs: Any):
-                yield mock_response
-
-        mock_client = MockClient()
-
-        @asynccontextmanager
-        async def MockRetryClient(*args: Any, **kwargs: Any) -> AsyncGenerator[RetryClient, None]:
-            yield cast(RetryClient, mock_client)
-
-        monkeypatch.setattr(spelltable, "RetryClient", MockRetryClient)
-
-        assert await generate_link(MagicMock()) is None
-
-    async def test_generate_link_non_json(self, monkeypatch: pytest.MonkeyPatch) -> None:
-        settings = MagicMock(spec=Settings)
-        settings.SPELLTABLE_AUTH_KEY = "auth-key"
-        settings.SPELLTABLE_CREATE = "https://create"
-        monkeypatch.setattr(spelltable, "settings", settings)
-
-        mock_response = MagicMock()
-        mock_response.read = AsyncMock(return_value=b"foobar")
-
-        class MockClient:
-            @asynccontextmanager
-            async def post(self, *args: Any, **kwargs: Any):
-                yield mock_response
-
-        mock_client = MockClient()
+        assert await generate_link(MagicMock(), client) == game_url
 
-        @asynccontextmanager
-        async def MockRetryClient(
-            *args: Any,
-            **kwargs: Any,
-        ) -> AsyncGenerator[RetryClient, None]:
-            yield cast(RetryClient, mock_client)
+    async def test_generate_link_upstream_timeout(self) -> None:
+        client = mock_client(return_value=LinkResponse(503, b"upstream request timeout"))
 
-        monkeypatch.setattr(spelltable, "RetryClient", MockRetryClient)
+        assert await generate_link(MagicMock(), client) is None
 
-        assert await generate_link(MagicMock()) is None
+    async def test_generate_link_missing_game_url(self) -> None:
+        client = mock_client(return_value=LinkResponse(200, b'{"error": 123}'))
 
-    async def test_generate_link_raises_error(self, monkeypatch: pytest.MonkeyPatch) -> None:
-        settings = MagicMock(spec=Settings)
-        settings.SPELLTABLE_AUTH_KEY = "auth-key"
-        settings.SPELLTABLE_CREATE = "https://create"
-        monkeypatch.setattr(spelltable, "settings", settings)
+        assert await generate_link(MagicMock(), client) is None
 
-        class MockClient:  # pragma: no cover
-            @asynccontextmanager
-            async def post(self, *args: Any, **kwargs: Any):
-                raise ClientError
+    async def test_generate_link_non_json(self) -> None:
+        client = mock_client(return_value=LinkResponse(200, b"foobar"))
 
-                # Need to yield to satisfy static analysis of @asynccontextmanager.
-                yield
+        assert await generate_link(MagicMock(), client) is None
 
-        mock_client = MockClient()
+    async def test_generate_link_raises_error(self) -> None:
+        client = mock_client(side_effect=ClientError)
 
-        @asynccontextmanager
-        async def MockRetryClient(*args: Any, **kwargs: Any) -> AsyncGenerator[RetryClient, None]:
-            yield cast(RetryClient, mock_client)
+        assert await generate_link(MagicMock(), client) is None
 
-        monkeypatch.setattr(spelltable, "RetryClient", MockRetryClient)
+    async def test_generate_link_from_server(self, settings: MagicMock) -> None:
+        client = LinkClient("spelltable", timeout_s=5)
+        async with FakeLinkServer() as server:
+            settings.SPELLTABLE_CREATE = server.url
+            link = await generate_link(MagicMock(), client)
+            await client.close()
 
-        assert await generate_link(MagicMock()) is None
+        assert link == "https://spelltable.wizards.com/game/1"
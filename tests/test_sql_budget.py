@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import text
+
+from spellbot.database import DatabaseSession, database_sync_to_async
+from spellbot.models import Guild
+from spellbot.sql_budget import current_sql_stats, sql_budget, sql_stats
+
+
+@database_sync_to_async
+def query_guilds() -> list[Guild]:
+    return DatabaseSession.query(Guild).all()
+
+
+@pytest.mark.asyncio
+class TestSqlBudget:
+    async def test_counts_statements_and_rows(self, guild: Guild) -> None:
+        with sql_stats() as stats:
+            guilds = await query_guilds()
+            DatabaseSession.execute(text("SELECT 1"))
+
+        assert guilds == [guild]
+        assert stats.statements == 2
+        assert stats.rows == 2
+        assert stats.seconds > 0
+        assert current_sql_stats.get() is None
+
+    async def test_nested(self) -> None:
+        with sql_stats() as outer:
+            DatabaseSession.execute(text("SELECT 1"))
+            with sql_stats() as inner:
+                DatabaseSession.execute(text("SELECT 2"))
+
+        assert inner.statements == 1
+        assert outer.statements == 2
+
+    async def test_untracked(self) -> None:
+        with sql_stats() as stats:
+            pass
+        DatabaseSession.execute(text("SELECT 1"))
+        assert stats.statements == 0
+
+    async def test_within_budget(self) -> None:
+        with sql_budget(2) as stats:
+            await query_guilds()
+            await query_guilds()
+        assert stats.captured is not None
+        assert len(stats.captured) == 2
+
+    async def test_over_budget(self) -> None:
+        match = "ran 2 SQL statements, over the budget of 1"
+        with pytest.raises(AssertionError, match=match), sql_budget(1):  # noqa: PT012
+            DatabaseSession.execute(text("SELECT 1"))
+            DatabaseSession.execute(text("SELECT 2"))
+
+
+class TestSqlStats:
+    def test_report(self) -> None:
+        with sql_stats() as stats:
+            stats.add("SELECT 1", 3, 0.0125)
+        span = MagicMock()
+        stats.report(span)
+        span.set_metric.assert_any_call("db.statements", 1)
+        span.set_metric.assert_any_call("db.rows", 3)
+        span.set_metric.assert_any_call("db.duration_ms", 12.5)
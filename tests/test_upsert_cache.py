@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from spellbot.settings import settings
+from spellbot.upsert_cache import UpsertCache
+
+if TYPE_CHECKING:
+    import pytest
+
+
+class TestUpsertCache:
+    def test_get_and_put(self) -> None:
+        cache = UpsertCache("test")
+        assert cache.get(1, "name") is None
+
+        cache.put(1, "name", "value", cache.version(1))
+        assert cache.get(1, "name") == "value"
+        assert len(cache) == 1
+
+    def test_fingerprint_changed(self) -> None:
+        cache = UpsertCache("test")
+        cache.put(1, "name", "value", cache.version(1))
+
+        assert cache.get(1, "new-name") is None
+        assert len(cache) == 0
+
+    def test_expired(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        cache = UpsertCache("test")
+        cache.put(1, "name", "value", cache.version(1))
+
+        monkeypatch.setattr("spellbot.upsert_cache.time.monotonic", lambda: float("inf"))
+        assert cache.get(1, "name") is None
+
+    def test_degraded(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        cache = UpsertCache("test")
+        cache.put(1, "name", "value", cache.version(1))
+        now = time.monotonic()
+        monkeypatch.setattr("spellbot.upsert_cache.time.monotonic", lambda: now + 60)
+        assert cache.get(1, "name") == "value"
+
+        # Entries written before invalidations started getting missed expire early too.
+        cache.degraded = True
+        assert cache.get(1, "name") is None
+
+    def test_disabled(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(settings, "UPSERT_CACHE_TTL_S", 0)
+        cache = UpsertCache("test")
+        assert not cache.enabled
+
+        cache.put(1, "name", "value", cache.version(1))
+        assert cache.get(1, "name") is None
+
+    def test_invalidate(self) -> None:
+        cache = UpsertCache("test")
+        cache.put(1, "name", "value", cache.version(1))
+        cache.put(2, "name", "value", cache.version(2))
+
+        cache.invalidate(1)
+        assert cache.get(1, "name") is None
+        assert cache.get(2, "name") == "value"
+
+    def test_invalidated_while_upserting(self) -> None:
+        cache = UpsertCache("test")
+        version = cache.version(1)
+        cache.invalidate(1)
+
+        cache.put(1, "name", "stale", version)
+        assert cache.get(1, "name") is None
+
+    def test_cleared_while_upserting(self) -> None:
+        cache = UpsertCache("test")
+        version = cache.version(1)
+        cache.clear()
+
+        cache.put(1, "name", "stale", version)
+        assert cache.get(1, "name") is None
+
+    def test_size_limit(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(settings, "UPSERT_CACHE_SIZE", 2)
+        cache = UpsertCache("test")
+        for key in range(3):
+            cache.put(key, "name", "value", cache.version(key))
+
+        assert len(cache) == 2
+        assert cache.get(0, "name") is None
+        assert cache.get(2, "name") == "value"
+
+    def test_listeners(self) -> None:
+        cache = UpsertCache("test")
+        calls: list[object] = []
+        cache.listeners.append(calls.append)
+
+        cache.invalidate(1)
+        cache.clear()
+
+        assert calls == [1, None]
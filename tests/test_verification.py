@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from spellbot.upsert_cache import channel_cache
+from spellbot.verification import VerificationPolicies, VerificationPolicy, verification_policies
+
+VERIFIED_ONLY = VerificationPolicy(auto_verify=False, verified_only=True, unverified_only=False)
+NONE = VerificationPolicy(auto_verify=False, verified_only=False, unverified_only=False)
+
+
+class TestVerificationPolicies:
+    def test_not_loaded(self) -> None:
+        policies = VerificationPolicies()
+        assert policies.needs_database(1)
+
+    def test_load(self) -> None:
+        policies = VerificationPolicies()
+        policies.load({1: VERIFIED_ONLY, 2: NONE}, policies.version())
+
+        assert policies.needs_database(1)
+        assert not policies.needs_database(2)
+        assert not policies.needs_database(3)
+        assert len(policies) == 1
+
+    def test_load_after_clear(self) -> None:
+        policies = VerificationPolicies()
+        version = policies.version()
+        policies.clear()
+
+        policies.load({1: VERIFIED_ONLY}, version)
+        assert not policies.loaded
+
+    def test_invalidated_while_loading(self) -> None:
+        policies = VerificationPolicies()
+        version = policies.version()
+        policies.invalidate(2)
+
+        policies.load({1: VERIFIED_ONLY}, version)
+        assert policies.needs_database(2)
+
+    def test_update(self) -> None:
+        policies = VerificationPolicies()
+        policies.load({}, policies.version())
+
+        policies.update(1, VERIFIED_ONLY, policies.version(1))
+        assert policies.needs_database(1)
+
+        policies.update(1, NONE, policies.version(1))
+        assert not policies.needs_database(1)
+
+    def test_invalidate(self) -> None:
+        policies = VerificationPolicies()
+        policies.load({}, policies.version())
+        version = policies.version(1)
+
+        policies.invalidate(1)
+        assert policies.needs_database(1)
+
+        # What was read before the invalidation may already be out of date.
+        policies.update(1, NONE, version)
+        assert policies.needs_database(1)
+
+        policies.update(1, NONE, policies.version(1))
+        assert not policies.needs_database(1)
+
+    def test_follows_channel_cache(self) -> None:
+        verification_policies.load({}, verification_policies.version())
+
+        channel_cache.invalidate(1)
+        assert verification_policies.needs_database(1)
+        assert not verification_policies.needs_database(2)
+
+        channel_cache.degraded = True
+        try:
+            assert verification_policies.needs_database(2)
+        finally:
+            channel_cache.degraded = False
+
+        channel_cache.clear()
+        assert not verification_policies.loaded
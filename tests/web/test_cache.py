@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from spellbot.web import cache
+from spellbot.web.cache import PageCache, page_etag
+
+if TYPE_CHECKING:
+    import pytest
+
+
+class TestPageCache:
+    def test_get_and_put(self) -> None:
+        pages = PageCache(size=10)
+        assert pages.get("key", "etag") is None
+
+        pages.put("key", "etag", "body")
+        assert pages.get("key", "etag") == "body"
+        assert pages.get("key", "other") is None
+
+    def test_evicts_least_recently_used(self) -> None:
+        pages = PageCache(size=2)
+        pages.put("a", "etag", "a")
+        pages.put("b", "etag", "b")
+        pages.get("a", "etag")
+        pages.put("c", "etag", "c")
+
+        assert len(pages) == 2
+        assert pages.get("a", "etag") == "a"
+        assert pages.get("b", "etag") is None
+
+    def test_disabled(self) -> None:
+        pages = PageCache(size=0)
+        pages.put("key", "etag", "body")
+        assert pages.get("key", "etag") is None
+
+
+class TestPageEtag:
+    def test_changes_with_updates(self) -> None:
+        etag = page_etag("key", datetime(2020, 1, 1))  # noqa: DTZ001
+        assert etag == page_etag("key", datetime(2020, 1, 1))  # noqa: DTZ001
+        assert etag != page_etag("key", datetime(2020, 1, 2))  # noqa: DTZ001
+        assert etag != page_etag("other", datetime(2020, 1, 1))  # noqa: DTZ001
+
+    def test_changes_over_time(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(cache.time, "time", lambda: 0)
+        etag = page_etag("key", None)
+        monkeypatch.setattr(cache.time, "time", lambda: cache.settings.RECORD_CACHE_TTL_S)
+        assert page_etag("key", None) != etag
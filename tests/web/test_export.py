@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import pytest
+import pytz
+
+from spellbot.enums import GameFormat
+from spellbot.settings import settings
+from spellbot.web.api.export import FIELDS
+
+if TYPE_CHECKING:
+    from aiohttp.client import ClientSession
+
+    from spellbot.models import Channel, Guild
+    from tests.fixtures import Factories
+
+GAMES = 5
+
+
+@pytest.fixture
+def history(factories: Factories) -> tuple[Guild, Channel]:
+    user1 = factories.user.create(xid=101, name="user1")
+    user2 = factories.user.create(xid=102, name="user,2")
+    guild = factories.guild.create(xid=201, name="guild")
+    channel = factories.channel.create(xid=301, name="channel", guild=guild)
+    for i in range(GAMES):
+        game = factories.game.create(
+            id=i + 1,
+            guild=guild,
+            channel=channel,
+            format=GameFormat.MODERN.value,
+            updated_at=datetime(2020, 1, 1, i, tzinfo=pytz.utc),
+        )
+        factories.post.create(guild=guild, channel=channel, game=game, message_xid=900 + i)
+        factories.play.create(game_id=game.id, user_xid=user1.xid, points=i)
+        factories.play.create(game_id=game.id, user_xid=user2.xid, points=None)
+    return guild, channel
+
+
+@pytest.mark.asyncio
+class TestWebExport:
+    @pytest.mark.parametrize("batch_size", [2, 500])
+    async def test_channel_csv(
+        self,
+        client: ClientSession,
+        history: tuple[Guild, Channel],
+        batch_size: int,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", batch_size)
+        guild, channel = history
+
+        resp = await client.get(f"/g/{guild.xid}/c/{channel.xid}/export")
+
+        assert resp.status == 200
+        assert resp.headers["Content-Type"] == "text/csv"
+        assert resp.headers["Transfer-Encoding"] == "chunked"
+        assert resp.headers["Content-Disposition"] == (
+            'attachment; filename="spellbot-201-c-301.csv"'
+        )
+        rows = list(csv.DictReader(io.StringIO(await resp.text())))
+        assert len(rows) == GAMES * 2
+        assert [row["game"] for row in rows[::2]] == ["5", "4", "3", "2", "1"]
+        assert rows[0] == {
+            "game": "5",
+            "time": "2020-01-01T04:00:00+00:00",
+            "guild": "201",
+            "guild_name": "guild",
+            "channel": "301",
+            "channel_name": "channel",
+            "format": "Modern",
+            "link": "",
+            "user_name": "user1",
+            "user_xid": "101",
+            "points": "4",
+        }
+        assert rows[1]["user_name"] == "user,2"
+        assert rows[1]["points"] == "0"
+
+    async def test_user_ndjson(
+        self,
+        client: ClientSession,
+        history: tuple[Guild, Channel],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+        guild, _ = history
+
+        resp = await client.get(f"/g/{guild.xid}/u/101/export?format=ndjson")
+
+        assert resp.status == 200
+        assert resp.headers["Content-Type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in (await resp.text()).splitlines()]
+        assert len(rows) == GAMES * 2
+        assert [row["game"] for row in rows[::2]] == [5, 4, 3, 2, 1]
+        assert rows[-1]["user_xid"] == 102
+        assert rows[-1]["points"] == 0
+
+    async def test_empty_history(self, client: ClientSession, factories: Factories) -> None:
+        guild = factories.guild.create(xid=201, name="guild")
+
+        resp = await client.get(f"/g/{guild.xid}/u/101/export")
+
+        assert resp.status == 200
+        assert (await resp.text()).splitlines() == [",".join(FIELDS)]
+
+    async def test_invalid_format(
+        self,
+        client: ClientSession,
+        history: tuple[Guild, Channel],
+    ) -> None:
+        guild, channel = history
+        resp = await client.get(f"/g/{guild.xid}/c/{channel.xid}/export?format=xml")
+        assert resp.status == 400
+
+    async def test_invalid_ids(self, client: ClientSession) -> None:
+        resp = await client.get("/g/abc/c/xyz/export")
+        assert resp.status == 404
+
+    async def test_missing_channel(self, client: ClientSession, factories: Factories) -> None:
+        guild = factories.guild.create(xid=201, name="guild")
+        resp = await client.get(f"/g/{guild.xid}/c/404/export")
+        assert resp.status == 404
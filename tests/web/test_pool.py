@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from spellbot.database import (
+    DatabaseSession,
+    database_sync_to_async,
+    db_session_manager,
+    using_async_engine,
+)
+from spellbot.models import Channel, Game, Guild, Play, Post, User
+from spellbot.services import Cursor
+from spellbot.settings import settings
+from spellbot.web import build_web_app, database_pool
+from spellbot.web.api import export
+
+
+@database_sync_to_async
+def add_guild(xid: int) -> None:
+    DatabaseSession.add(Guild(xid=xid, name="guild"))
+    DatabaseSession.commit()
+
+
+@database_sync_to_async
+def delete_guild(xid: int) -> None:
+    DatabaseSession.query(Guild).filter(Guild.xid == xid).delete()
+    DatabaseSession.commit()
+
+
+@database_sync_to_async
+def add_history(guild_xid: int, user_xid: int, games: int) -> None:
+    DatabaseSession.add(Guild(xid=guild_xid, name="guild"))
+    DatabaseSession.add(Channel(xid=guild_xid, guild_xid=guild_xid, name="channel"))
+    DatabaseSession.add(User(xid=user_xid, name="user"))
+    for n in range(games):
+        game = Game(
+            guild_xid=guild_xid,
+            channel_xid=guild_xid,
+            seats=2,
+            started_at=datetime.now(tz=UTC),
+        )
+        DatabaseSession.add(game)
+        DatabaseSession.flush()
+        DatabaseSession.add(Play(game_id=game.id, user_xid=user_xid, og_guild_xid=guild_xid))
+        DatabaseSession.add(
+            Post(
+                game_id=game.id,
+                guild_xid=guild_xid,
+                channel_xid=guild_xid,
+                message_xid=guild_xid + n,
+            ),
+        )
+    DatabaseSession.commit()
+
+
+@database_sync_to_async
+def delete_history(guild_xid: int, user_xid: int) -> None:
+    DatabaseSession.query(Post).filter(Post.guild_xid == guild_xid).delete()
+    DatabaseSession.query(Play).filter(Play.user_xid == user_xid).delete()
+    DatabaseSession.query(Game).filter(Game.guild_xid == guild_xid).delete()
+    DatabaseSession.query(User).filter(User.xid == user_xid).delete()
+    DatabaseSession.query(Guild).filter(Guild.xid == guild_xid).delete()
+    DatabaseSession.commit()
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiohttp.test_utils import TestClient
+
+
+@pytest.mark.asyncio
+class TestWebDatabasePool:
+    async def test_pool_lifecycle(
+        self,
+        aiohttp_client: Callable[..., Awaitable[TestClient]],
+        monkeypatch: pytest.MonkeyPatch,
+        worker_id: str,
+    ) -> None:
+        monkeypatch.setattr(settings, "DATABASE_URL", f"{settings.DATABASE_URL}-{worker_id}")
+        app = build_web_app()
+        app.cleanup_ctx.append(database_pool("spellbot-test-web"))
+
+        client = await aiohttp_client(app)
+        assert using_async_engine()
+
+        # Requests each get their own pooled connection and are served concurrently.
+        responses = await asyncio.gather(
+            *(client.get(f"/g/{404 + n}/c/{404 + n}") for n in range(settings.WEB_POOL_SIZE * 2)),
+        )
+        assert [resp.status for resp in responses] == [404] * settings.WEB_POOL_SIZE * 2
+
+        # Record queries, cursors included, run on the pool's asyncpg connections.
+        guild_xid = 9_000_000 + abs(hash(worker_id)) % 1_000
+        async with db_session_manager():
+            await add_guild(guild_xid)
+        try:
+            cursor = Cursor(datetime(2020, 1, 1), 1).encode()  # noqa: DTZ001
+            resp = await client.get(f"/g/{guild_xid}/u/101?before={cursor}")
+            assert resp.status == 200
+            resp = await client.get(f"/g/{guild_xid}/u/101/export")
+            assert resp.status == 200
+        finally:
+            async with db_session_manager():
+                await delete_guild(guild_xid)
+
+        await client.close()
+        assert not using_async_engine()
+
+    async def test_export_gives_back_its_connection(
+        self,
+        aiohttp_client: Callable[..., Awaitable[TestClient]],
+        monkeypatch: pytest.MonkeyPatch,
+        worker_id: str,
+    ) -> None:
+        monkeypatch.setattr(settings, "DATABASE_URL", f"{settings.DATABASE_URL}-{worker_id}")
+        monkeypatch.setattr(settings, "WEB_POOL_SIZE", 1)
+        monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 1)
+        app = build_web_app()
+        app.cleanup_ctx.append(database_pool("spellbot-test-web"))
+        client = await aiohttp_client(app)
+
+        # Like a slow client, the export stalls after writing out its first page.
+        stalled, resume = asyncio.Event(), asyncio.Event()
+        fetch = export.fetch
+
+        async def slow_fetch(*args: Any) -> Any:
+            if args[-1] is not None:
+                stalled.set()
+                await resume.wait()
+            return await fetch(*args)
+
+        monkeypatch.setattr(export, "fetch", slow_fetch)
+
+        guild_xid = 9_100_000 + abs(hash(worker_id)) % 1_000
+        user_xid = guild_xid + 1
+        async with db_session_manager():
+            await add_history(guild_xid, user_xid, games=2)
+        try:
+            download = await client.get(f"/g/{guild_xid}/u/{user_xid}/export")
+            await asyncio.wait_for(stalled.wait(), 5)
+
+            # Meanwhile the pool's only connection is free for other requests.
+            resp = await asyncio.wait_for(client.get(f"/g/{guild_xid}/u/{user_xid}"), 5)
+            assert resp.status == 200
+
+            resume.set()
+            assert download.status == 200
+            assert len((await download.text()).splitlines()) == 3
+        finally:
+            resume.set()
+            async with db_session_manager():
+                await delete_history(guild_xid, user_xid)
+            await client.close()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import re
 from datetime import datetime
 from typing import TYPE_CHECKING
 
@@ -8,10 +9,13 @@ import pytz
 
 from spellbot.enums import GameFormat
 from spellbot.models import GameStatus
+from spellbot.services import GamesService, PlaysService
+from spellbot.services.plays import CHANNEL_PAGE_SIZE
 
 if TYPE_CHECKING:
     from aiohttp.client import ClientSession
     from freezegun.api import FrozenDateTimeFactory
+    from pytest_mock import MockerFixture
     from syrupy.assertion import SnapshotAssertion
 
     from tests.fixtures import Factories
@@ -385,3 +389,135 @@ class TestWebRecord:
         guild = factories.guild.create(xid=201, name="guild")
         resp = await client.get(f"/g/{guild.xid}/c/404")
         assert resp.status == 404
+
+    async def test_channel_record_pages(
+        self,
+        client: ClientSession,
+        factories: Factories,
+    ) -> None:
+        user = factories.user.create(xid=101, name="user")
+        guild = factories.guild.create(xid=201, name="guild")
+        channel = factories.channel.create(xid=301, name="channel", guild=guild)
+        for i in range(CHANNEL_PAGE_SIZE + 1):
+            game = factories.game.create(guild=guild, channel=channel)
+            factories.post.create(guild=guild, channel=channel, game=game, message_xid=900 + i)
+            factories.play.create(game_id=game.id, user_xid=user.xid, points=1)
+
+        resp = await client.get(f"/g/{guild.xid}/c/{channel.xid}")
+        assert resp.status == 200
+        text = await resp.text()
+        assert "Previous page" not in text
+        match = re.search(r'href="([^"]*\?before=[^"]*)"', text)
+        assert match
+
+        resp = await client.get(match[1])
+        assert resp.status == 200
+        text = await resp.text()
+        assert "Next page" not in text
+        assert f'href="/g/{guild.xid}/c/{channel.xid}?after=' in text
+
+    async def test_channel_record_invalid_cursor(
+        self,
+        client: ClientSession,
+        factories: Factories,
+    ) -> None:
+        guild = factories.guild.create(xid=201, name="guild")
+        channel = factories.channel.create(xid=301, name="channel", guild=guild)
+        resp = await client.get(f"/g/{guild.xid}/c/{channel.xid}?before=bogus")
+        assert resp.status == 400
+
+    async def test_channel_record_oversized_cursor(
+        self,
+        client: ClientSession,
+        factories: Factories,
+    ) -> None:
+        guild = factories.guild.create(xid=201, name="guild")
+        channel = factories.channel.create(xid=301, name="channel", guild=guild)
+        resp = await client.get(f"/g/{guild.xid}/c/{channel.xid}?after=99999999999999999999_1")
+        assert resp.status == 400
+
+
+@pytest.mark.asyncio
+class TestWebRecordCache:
+    async def test_conditional_requests(self, client: ClientSession, factories: Factories) -> None:
+        user = factories.user.create(xid=101, name="user")
+        guild = factories.guild.create(xid=201, name="guild")
+        channel = factories.channel.create(xid=301, name="channel", guild=guild)
+        game = factories.game.create(guild=guild, channel=channel)
+        factories.post.create(guild=guild, channel=channel, game=game, message_xid=901)
+        factories.play.create(game_id=game.id, user_xid=user.xid, points=1)
+        url = f"/g/{guild.xid}/c/{channel.xid}"
+
+        resp = await client.get(url)
+        assert resp.status == 200
+        etag = resp.headers["ETag"]
+        last_modified = resp.headers["Last-Modified"]
+        assert resp.headers["Cache-Control"] == "no-cache"
+
+        resp = await client.get(url, headers={"If-None-Match": etag})
+        assert resp.status == 304
+        assert resp.headers["ETag"] == etag
+
+        resp = await client.get(url, headers={"If-Modified-Since": last_modified})
+        assert resp.status == 304
+
+        resp = await client.get(url, headers={"If-None-Match": '"stale"'})
+        assert resp.status == 200
+
+        # a different timezone is a different page
+        resp = await client.get(
+            url,
+            headers={"If-None-Match": etag},
+            cookies={"timezone_offset": "480", "timezone_name": "America/Los_Angeles"},
+        )
+        assert resp.status == 200
+        assert resp.headers["ETag"] != etag
+
+    async def test_cached_page(
+        self,
+        client: ClientSession,
+        factories: Factories,
+        mocker: MockerFixture,
+    ) -> None:
+        user = factories.user.create(xid=101, name="user")
+        guild = factories.guild.create(xid=201, name="guild")
+        factories.channel.create(xid=301, name="channel", guild=guild)
+        records = mocker.spy(PlaysService, "user_records")
+        url = f"/g/{guild.xid}/u/{user.xid}"
+
+        first = await client.get(url)
+        second = await client.get(url)
+
+        assert first.status == second.status == 200
+        assert await first.text() == await second.text()
+        assert records.call_count == 1
+
+    async def test_invalidated_by_points(
+        self,
+        client: ClientSession,
+        factories: Factories,
+    ) -> None:
+        user = factories.user.create(xid=101, name="user")
+        guild = factories.guild.create(xid=201, name="guild")
+        channel = factories.channel.create(xid=301, name="channel", guild=guild)
+        game = factories.game.create(
+            guild=guild,
+            channel=channel,
+            updated_at=datetime(2020, 1, 1, tzinfo=pytz.utc),
+        )
+        factories.post.create(guild=guild, channel=channel, game=game, message_xid=901)
+        factories.play.create(game_id=game.id, user_xid=user.xid, points=1)
+        url = f"/g/{guild.xid}/u/{user.xid}"
+
+        resp = await client.get(url)
+        etag = resp.headers["ETag"]
+        assert "<em>1 points</em>" in await resp.text()
+
+        games = GamesService()
+        await games.select(game.id)
+        await games.add_points(user.xid, 7)
+
+        resp = await client.get(url, headers={"If-None-Match": etag})
+        assert resp.status == 200
+        assert resp.headers["ETag"] != etag
+        assert "<em>7 points</em>" in await resp.text()